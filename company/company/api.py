@@ -15,6 +15,13 @@ from frappe.utils import (
 )
 from datetime import datetime, timedelta
 from calendar import monthrange
+from company.company.document_numbering import assign_document_number, preview_next_number
+from company.company.collection_balance import update_parent_balance, validate_collection_amount
+from company.company.hr_snapshot import get_hr_snapshot
+from company.company.bulk_conversion import make_invoice_from_estimation
+from company.company.geo_lookup import get_city_names, get_state_names
+from company.company.finance_summary import get_summary, get_tracker_totals, period_range
+from company.company.settings_cache import get_settings
 
 @frappe.whitelist()
 def bootstrap_salary_components():
@@ -44,7 +51,6 @@ def bootstrap_salary_components():
     
     return "Bootstrap completed"
 
-from frappe.utils import get_bench_path
 from frappe.utils.file_manager import save_file
 
 @frappe.whitelist()
@@ -53,6 +59,9 @@ def is_hrms_notification_enabled(fieldname):
     Check if a specific HRMS notification is enabled.
     """
     try:
+        settings = get_settings("HRMS Settings")
+        if fieldname in settings:
+            return bool(settings[fieldname])
         enabled = frappe.db.get_single_value("HRMS Settings", fieldname)
         # Checkboxes in Frappe are 1 (True) or 0 (False)
         return bool(enabled)
@@ -90,77 +99,25 @@ def get_hrms_settings():
 # =================== ESTIMATION REFERENCE ===================
 @frappe.whitelist()
 def get_next_estimation_preview():
-    """Get next Estimation number for preview or assignment"""
-    today = getdate()
-    year = today.year
-
-    if today.month < 4:
-        start_year = year - 1
-        end_year = year
-    else:
-        start_year = year
-        end_year = year + 1
-
-    fy = f"{str(start_year)[-2:]}-{str(end_year)[-2:]}"  # e.g., 25-26
-
-    # Get last saved Estimation for this FY
-    last = frappe.db.sql("""
-        SELECT ref_no FROM `tabEstimation`
-        WHERE ref_no LIKE %s
-        ORDER BY creation DESC LIMIT 1
-    """, (f"IB-E/{fy}/%",), as_dict=True)
-
-    if last:
-        last_num = int(last[0].ref_no.split("/")[-1])
-        next_num = last_num + 1
-    else:
-        next_num = 1
-
-    return f"IB-E/{fy}/{str(next_num).zfill(3)}"
+    """Get next Estimation number for preview (does not reserve it)"""
+    return preview_next_number("Estimation")
 
 
 def before_insert_estimation(doc, method):
-    """Assign Estimation ref_no automatically if not set"""
-    if not doc.ref_no:
-        doc.ref_no = get_next_estimation_preview()
+    """Reserve the Estimation ref_no, including a prefilled preview"""
+    assign_document_number(doc)
 
 
 # =================== INVOICE REFERENCE ===================
 @frappe.whitelist()
 def get_next_invoice_preview():
-    """Get next Invoice number for preview or assignment"""
-    today = getdate()
-    year = today.year
-
-    if today.month < 4:
-        start_year = year - 1
-        end_year = year
-    else:
-        start_year = year
-        end_year = year + 1
-
-    fy = f"{str(start_year)[-2:]}-{str(end_year)[-2:]}"  # e.g., 25-26
-
-    # Get last saved Invoice for this FY
-    last = frappe.db.sql("""
-        SELECT ref_no FROM `tabInvoice`
-        WHERE ref_no LIKE %s
-        ORDER BY creation DESC LIMIT 1
-    """, (f"IB-I/{fy}/%",), as_dict=True)
-
-    if last:
-        last_num = int(last[0].ref_no.split("/")[-1])
-        next_num = last_num + 1
-    else:
-        next_num = 1
-
-    return f"IB-I/{fy}/{str(next_num).zfill(3)}"
+    """Get next Invoice number for preview (does not reserve it)"""
+    return preview_next_number("Invoice")
 
 
 def before_insert_invoice(doc, method):
-    """Assign Invoice ref_no automatically if not set"""
-    if not doc.ref_no:
-        doc.ref_no = get_next_invoice_preview()
+    """Reserve the Invoice ref_no, including a prefilled preview"""
+    assign_document_number(doc)
 
 
 @frappe.whitelist()
@@ -177,52 +134,15 @@ def update_invoice_received_balance(doc, method):
     """
     Update received_amount and balance_amount in Invoice
     whenever an Invoice Collection is inserted/updated/deleted.
+    Applies only the change in amount_collected under a row lock on the Invoice.
     """
-    invoice_name = doc.invoice
-    if not invoice_name:
-        return
-
-    # Call the existing function
-    total_collected = flt(get_total_collected(invoice_name))
-
-    grand_total = flt(frappe.db.get_value("Invoice", invoice_name, "grand_total") or 0)
-    balance = grand_total - total_collected
-    if balance < 0:
-        balance = 0
-
-    frappe.db.set_value("Invoice", invoice_name, {
-        "received_amount": total_collected,
-        "balance_amount": balance
-    })
+    update_parent_balance(doc, method)
 
 def validate_invoice_collection(doc, method):
     """
     Prevent Invoice Collection from exceeding Invoice grand_total
     """
-    if not doc.invoice:
-        return
-
-    # Get grand total & already collected
-    invoice = frappe.db.get_value("Invoice", doc.invoice, ["grand_total"], as_dict=True)
-    if not invoice:
-        return
-
-    already_collected = frappe.db.sql("""
-        SELECT SUM(amount_collected)
-        FROM `tabInvoice Collection`
-        WHERE invoice=%s AND name != %s
-    """, (doc.invoice, doc.name))[0][0] or 0
-
-    new_total = flt(already_collected) + flt(doc.amount_collected)
-
-    if new_total > flt(invoice.grand_total):
-        frappe.throw(
-            f"Collection exceeds Invoice Amount.<br><br>"
-            f"Grand Total: {invoice.grand_total}<br>"
-            f"Already Collected: {already_collected}<br>"
-            f"Trying to Add: {doc.amount_collected}<br><br>"
-            f"Remaining Balance: {invoice.grand_total - already_collected}"
-        )
+    validate_collection_amount(doc, method)
 
 # =================== PURCHASE COLLECTION ===================
 @frappe.whitelist()
@@ -239,50 +159,15 @@ def update_purchase_paid_balance(doc, method):
     """
     Update paid_amount and balance_amount in Purchase
     whenever a Purchase Collection is inserted/updated/deleted.
+    Applies only the change in amount_collected under a row lock on the Purchase.
     """
-    purchase_name = doc.purchase
-    if not purchase_name:
-        return
-
-    total_collected = flt(get_total_purchase_collected(purchase_name))
-
-    grand_total = flt(frappe.db.get_value("Purchase", purchase_name, "grand_total") or 0)
-    balance = grand_total - total_collected
-    if balance < 0:
-        balance = 0
-
-    frappe.db.set_value("Purchase", purchase_name, {
-        "paid_amount": total_collected,
-        "balance_amount": balance
-    })
+    update_parent_balance(doc, method)
 
 def validate_purchase_collection(doc, method):
     """
     Prevent Purchase Collection from exceeding Purchase grand_total
     """
-    if not doc.purchase:
-        return
-
-    purchase = frappe.db.get_value("Purchase", doc.purchase, ["grand_total"], as_dict=True)
-    if not purchase:
-        return
-
-    already_collected = frappe.db.sql("""
-        SELECT SUM(amount_collected)
-        FROM `tabPurchase Collection`
-        WHERE purchase=%s AND name != %s
-    """, (doc.purchase, doc.name))[0][0] or 0
-
-    new_total = flt(already_collected) + flt(doc.amount_collected)
-
-    if new_total > flt(purchase.grand_total):
-        frappe.throw(
-            f"Collection exceeds Purchase Amount.<br><br>"
-            f"Grand Total: {purchase.grand_total}<br>"
-            f"Already Collected: {already_collected}<br>"
-            f"Trying to Add: {doc.amount_collected}<br><br>"
-            f"Remaining Balance: {purchase.grand_total - already_collected}"
-        )
+    validate_collection_amount(doc, method)
 
 def validate_purchase_with_collections(doc, method):
     """
@@ -307,41 +192,13 @@ def get_todays_followups():
 # =================== EXPENSES REFERENCE ===================
 @frappe.whitelist()
 def get_next_expense_preview():
-    """Get next Expense number for preview or assignment"""
-    today = getdate()
-    year = today.year
-
-    # Financial Year (April → March)
-    if today.month < 4:
-        start_year = year - 1
-        end_year = year
-    else:
-        start_year = year
-        end_year = year + 1
-
-    fy = f"{str(start_year)[-2:]}-{str(end_year)[-2:]}"  # e.g., 25-26
-
-    # Get last saved Expense for this FY
-    last = frappe.db.sql("""
-        SELECT expense_no FROM `tabExpenses`
-        WHERE expense_no LIKE %s
-        ORDER BY creation DESC LIMIT 1
-    """, (f"EXP/{fy}/%",), as_dict=True)
-
-    if last:
-        last_num = int(last[0].expense_no.split("/")[-1])
-        next_num = last_num + 1
-    else:
-        next_num = 1
-
-    return f"EXP/{fy}/{str(next_num).zfill(3)}"
+    """Get next Expense number for preview (does not reserve it)"""
+    return preview_next_number("Expenses")
 
 
 def before_insert_expense(doc, method):
-    """Assign Expense number automatically if not set"""
-    if not doc.expense_no:
-        doc.expense_no = get_next_expense_preview()
-        doc.name = doc.expense_no  
+    """Reserve the Expense number, including a prefilled preview"""
+    assign_document_number(doc)
 
 @frappe.whitelist()
 def get_leave_allocation_preview(year: int, month: int):
@@ -930,25 +787,7 @@ def get_today_leave_employees():
     Returns a list of employees who are on approved leave today,
     only for Paid Leave and Unpaid Leave
     """
-
-    today_date = getdate(today())
-
-    leave_apps = frappe.get_all(
-        "Leave Application",
-        filters={
-            "workflow_state": "Approved",
-            "from_date": ["<=", today_date],
-            "to_date": [">=", today_date],
-        },
-        fields=["employee", "employee_name", "leave_type", "from_date", "to_date"]
-    )
-
-    # Convert dates to string for JS
-    for app in leave_apps:
-        app["from_date"] = str(app["from_date"])
-        app["to_date"] = str(app["to_date"])
-
-    return leave_apps
+    return get_hr_snapshot().todays_leaves
 
 
 
@@ -1572,35 +1411,14 @@ def get_today_birthdays():
     """
     Returns a list of employees who have birthday today
     """
-    employees = frappe.get_all(
-        "Employee",
-        filters={
-            "status": "Active"
-        },
-        fields=["employee_name", "employee_id", "dob"]
-    )
-    
-
-    today_mmdd = getdate(today()).strftime("%m-%d")  # e.g., "10-02"
-    result = []
-    
-    for emp in employees:
-        if not emp.dob:
-            continue
-
-        dob_date = getdate(emp.dob)  # convert to date object
-        emp_mmdd = dob_date.strftime("%m-%d")
-
-        
-
-        if emp_mmdd == today_mmdd:
-            res = result.append({
-                "employee_name": emp.employee_name,
-                "employee": emp.employee_id,
-                "dob": str(emp.dob)
-            })
-
-    return result
+    return [
+        {
+            "employee_name": emp["employee_name"],
+            "employee": emp["employee_id"],
+            "dob": emp["dob"]
+        }
+        for emp in get_hr_snapshot().todays_birthdays
+    ]
 
 
 @frappe.whitelist()
@@ -1853,17 +1671,10 @@ from typing import Optional
 def _get_credentials():
     """
     Load service account credentials from site_config fcm_key_path.
-    Returns google Credentials object.
-    """
-    key_relative = frappe.get_site_config().get("fcm_key_path")
-    if not key_relative:
-        frappe.throw("FCM key path not configured in site_config.json (fcm_key_path)")
-    key_path = frappe.get_site_path(key_relative)
-    creds = service_account.Credentials.from_service_account_file(
-        key_path,
-        scopes=["https://www.googleapis.com/auth/firebase.messaging"]
-    )
-    return creds
+    Returns google Credentials object (loaded once per process).
+    """
+    from company.company.push_notifications import get_service_account_credentials
+    return get_service_account_credentials()
 
 @frappe.whitelist(allow_guest=False)
 def save_fcm_token(token: str):
@@ -1916,43 +1727,23 @@ def _send_v1_message_to_token(token: str, title: str, body: str, data: dict = No
     Send a message to a device token using FCM HTTP v1.
     Returns FCM response JSON.
     """
-    creds = _get_credentials()
-    request = google.auth.transport.requests.Request()
-    creds.refresh(request)
-    access_token = creds.token
-    project_id = creds.project_id
-
-    message = {
-        "message": {
-            "token": token,
-            "data": {
-                "title": title,
-                "body": body,
-                **(data or {})
-            }
-        }
-    }
+    from company.company.push_notifications import build_message, send_to_tokens
 
-    url = f"https://fcm.googleapis.com/v1/projects/{project_id}/messages:send"
-    headers = {
-        "Authorization": f"Bearer {access_token}",
-        "Content-Type": "application/json; UTF-8"
-    }
-    resp = requests.post(url, headers=headers, json=message, timeout=10)
-    try:
-        return resp.json()
-    except ValueError:
-        return {"error": "non-json-response", "status_code": resp.status_code, "text": resp.text}
+    _, _, result = send_to_tokens([build_message(token, title, body, data)])[0]
+    return result
 
 def send_push_notification_to_user(user: str, title: str, body: str, data: dict = None):
     """
     Public helper to send a push notification to a Frappe User (by email/ID).
+    For many users at once use company.company.push_notifications.send_push_to_users.
     """
-    token = frappe.db.get_value("User", user, "fcm_token")
-    if not token:
+    from company.company.push_notifications import send_push_to_users
+
+    summary = send_push_to_users([user], title, body, data)
+    if user in summary.no_token:
         frappe.log_error(message=f"No FCM token for user {user}", title="FCM No Token")
         return {"error": "no_token", "message": f"No token for user {user}"}
-    return _send_v1_message_to_token(token, title, body, data)
+    return summary.responses.get(user)
 
 def send_chat_notification_to_user(user: str, title: str, body: str):
     """
@@ -1960,27 +1751,10 @@ def send_chat_notification_to_user(user: str, title: str, body: str):
     Strips HTML from body content before sending.
     """
     try:
-        from bs4 import BeautifulSoup
-        
-        # Strip HTML tags from body while preserving newlines for alignment
-        if body:
-            soup = BeautifulSoup(body, 'html.parser')
-            
-            # Replace <br> tags with actual newlines
-            for br in soup.find_all("br"):
-                br.replace_with("\n")
-            
-            # Extract text with space separator (explicit <br> handled above will be newlines)
-            body = soup.get_text(separator=" ").strip()
-            
-            # Clean up: collapse multiple spaces but keep single newlines
-            import re
-            body = re.sub(r'[ \t]+', ' ', body) # Collapse horizontal whitespace
-            body = re.sub(r'\n\s*\n', '\n\n', body) # Collapse multiple empty lines to max 2
-            body = body.replace("\n\n\n", "\n\n") # Double safety
-        
+        from company.company.push_notifications import strip_html
+
         # Send the notification with a link to the chat SPA
-        return send_push_notification_to_user(user, title, body, data={"url": "/chat"})
+        return send_push_notification_to_user(user, title, strip_html(body), data={"url": "/chat"})
     except Exception as e:
         frappe.log_error(
             message=f"Error sending chat notification to {user}: {str(e)}",
@@ -2156,6 +1930,10 @@ def get_attendance_stats(range=None, from_date=None, to_date=None):
     # 1️⃣ IF EMPLOYEE NOT LINKED → RETURN GLOBAL COMPANY DATA
     # ============================================================
     if not employee:
+        # Standard ranges come from the shared HR snapshot
+        if range in ("today", "week", "month"):
+            snapshot = get_hr_snapshot()
+            return dict(snapshot.attendance_stats[range], last_sync=snapshot.last_sync)
         return get_global_attendance_stats(from_date, to_date)
 
     # ============================================================
@@ -2311,48 +2089,7 @@ def get_missing_attendance_chart_data():
     Returns daily missing attendance counts for the last 7 days.
     Used for Missing Attendance Chart in HR Dashboard.
     """
-    import datetime
-    
-    today = frappe.utils.getdate()
-    result = []
-    
-    # Get total active employees count
-    total_employees = frappe.db.count("Employee", {"status": "Active"})
-    
-    # Get all holiday lists
-    holiday_list_names = frappe.db.get_list("Holiday List", pluck="name")
-    
-    for i in range(6, -1, -1):  # Last 7 days (6 days ago to today)
-        date = today - datetime.timedelta(days=i)
-        
-        # Get holidays for this date
-        holidays = set()
-        if holiday_list_names:
-            holiday_rows = frappe.db.get_all(
-                "Holidays",
-                filters={
-                    "parent": ["in", holiday_list_names],
-                    "holiday_date": date,
-                    "is_working_day": 0
-                },
-                fields=["holiday_date"]
-            )
-            holidays = {frappe.utils.getdate(h["holiday_date"]) for h in holiday_rows}
-        
-        # If it's a holiday, missing count is 0
-        if date in holidays:
-            missing_count = 0
-        else:
-            # Count attendance records for this date
-            marked_attendance = frappe.db.count("Attendance", {"attendance_date": date})
-            missing_count = max(0, total_employees - marked_attendance)
-        
-        result.append({
-            "date": str(date),
-            "count": missing_count
-        })
-    
-    return result
+    return get_hr_snapshot().missing_attendance_chart
 
 
 # ==================================================================
@@ -2364,67 +2101,7 @@ def get_weekly_present_chart_data():
     Returns daily present counts for the current week (Monday to Sunday).
     Used for Weekly Present Count Chart in HR Dashboard.
     """
-    import datetime
-    
-    today = frappe.utils.getdate()
-    
-    # Find Monday of current week (weekday() returns 0 for Monday)
-    days_since_monday = today.weekday()
-    monday = today - datetime.timedelta(days=days_since_monday)
-    
-    result = []
-    
-    # Get all holiday lists
-    holiday_list_names = frappe.db.get_list("Holiday List", pluck="name")
-    
-    for i in range(7):  # Monday to Sunday
-        date = monday + datetime.timedelta(days=i)
-        
-        # For future dates, show 0 count
-        if date > today:
-            day_name = date.strftime('%a')
-            result.append({
-                "date": str(date),
-                "day": day_name,
-                "count": 0
-            })
-            continue
-        
-        # Get holidays for this date
-        holidays = set()
-        if holiday_list_names:
-            holiday_rows = frappe.db.get_all(
-                "Holidays",
-                filters={
-                    "parent": ["in", holiday_list_names],
-                    "holiday_date": date,
-                    "is_working_day": 0
-                },
-                fields=["holiday_date"]
-            )
-            holidays = {frappe.utils.getdate(h["holiday_date"]) for h in holiday_rows}
-        
-        # Count present attendance
-        present_count = frappe.db.count("Attendance", {
-            "attendance_date": date,
-            "status": "Present"
-        })
-        
-        # Add holiday count to present
-        if date in holidays:
-            # Count total employees as present on holidays
-            total_employees = frappe.db.count("Employee", {"status": "Active"})
-            present_count = total_employees
-        
-        day_name = date.strftime('%a')  # Mon, Tue, Wed, etc.
-        
-        result.append({
-            "date": str(date),
-            "day": day_name,
-            "count": present_count
-        })
-    
-    return result
+    return get_hr_snapshot().weekly_present_chart
 
 
 @frappe.whitelist()
@@ -2457,49 +2134,15 @@ def get_month_holidays(month=None, year=None):
     return result
 
 
-# Keep the file loaded in memory for performance
-LOCATION_CACHE = None
-
-def load_location_data():
-    global LOCATION_CACHE
-    if LOCATION_CACHE:
-        return LOCATION_CACHE
-
-    path = os.path.join(
-        get_bench_path(),
-        "apps", "company", "company", "utils", "location_data.json"
-    )
-
-    with open(path, "r", encoding="utf-8") as f:
-        LOCATION_CACHE = json.load(f)
-
-    return LOCATION_CACHE
-
-
 @frappe.whitelist()
 def get_states(country):
-    data = load_location_data()
-
-    for c in data:
-        if c["country"] == country:
-            # return array of state names EXACTLY like old API
-            return [state["name"] for state in c["states"]]
-
-    return []
+    # State names in file order, served from the indexed geo store
+    return get_state_names(country)
 
 
 @frappe.whitelist()
 def get_cities(country, state):
-    data = load_location_data()
-
-    for c in data:
-        if c["country"] == country:
-            for st in c["states"]:
-                if st["name"].lower().strip() == state.lower().strip():
-                    # return list of city names EXACTLY like old API
-                    return st["cities"]
-
-    return []
+    return get_city_names(country, state)
     
     
 #=================== Convert Estimation to Invoice ==========================
@@ -2525,11 +2168,7 @@ def convert_estimation_to_invoice(estimation):
         return existing_invoice
 
     # Create new invoice
-    inv = frappe.new_doc("Invoice")
-    inv.flags.ignore_mandatory = True
-
-    # Copy main fields
-    fields_to_copy = [
+    inv = make_invoice_from_estimation(est, est.get("table_qecz"), fields=[
         "client_name",
         "billing_name",
         "total_qty",
@@ -2538,40 +2177,7 @@ def convert_estimation_to_invoice(estimation):
         "overall_discount",
         "grand_total",
         "description"
-    ]
-
-    for f in fields_to_copy:
-        inv.set(f, est.get(f))
-
-    # Invoice date
-    inv.invoice_date = frappe.utils.nowdate()
-
-    # Conversion flags
-    inv.converted_from_estimation = 1
-    inv.converted_estimation_id = est.name
-
-    # Copy items
-    for item in est.get("table_qecz"):
-        inv.append("table_qecz", {
-            "service": item.service,
-            "hsn_code": item.hsn_code,
-            "description": item.description,
-            "quantity": item.quantity,
-            "price": item.price,
-            "discount_type": item.discount_type,
-            "discount": item.discount,
-            "tax_type": item.tax_type,
-            "tax_category": item.tax_category,
-            "tax_percent": item.tax_percent,
-            "tax_amount": item.tax_amount,
-            "cgst": item.cgst,
-            "sgst": item.sgst,
-            "igst": item.igst,
-            "sub_total": item.sub_total
-        })
-
-    # Save invoice
-    inv.insert(ignore_permissions=True, ignore_mandatory=True)
+    ])
 
     # SUCCESS MESSAGE
     frappe.msgprint(
@@ -2940,44 +2546,11 @@ def submit_job_application():
 
 @frappe.whitelist()
 def get_expense_income_summary(filter_type=None, from_date=None, to_date=None):
+    from_date, to_date = period_range(filter_type, from_date, to_date)
+    sources = get_summary(["income", "expense"], from_date, to_date)["sources"]
 
-    conditions_income = ""
-    conditions_expense = ""
-
-    # ---------------------- FILTER HANDLING ----------------------
-    if filter_type == "today":
-        conditions_income = "WHERE date = CURDATE()"
-        conditions_expense = "WHERE date = CURDATE()"
-
-    elif filter_type == "this_week":
-        conditions_income = "WHERE YEARWEEK(date) = YEARWEEK(CURDATE())"
-        conditions_expense = "WHERE YEARWEEK(date) = YEARWEEK(CURDATE())"
-
-    elif filter_type == "this_month":
-        conditions_income = "WHERE MONTH(date) = MONTH(CURDATE()) AND YEAR(date) = YEAR(CURDATE())"
-        conditions_expense = "WHERE MONTH(date) = MONTH(CURDATE()) AND YEAR(date) = YEAR(CURDATE())"
-
-    elif filter_type == "this_year":
-        conditions_income = "WHERE YEAR(date) = YEAR(CURDATE())"
-        conditions_expense = "WHERE YEAR(date) = YEAR(CURDATE())"
-
-    elif filter_type == "custom" and from_date and to_date:
-        conditions_income = f"WHERE date BETWEEN '{from_date}' AND '{to_date}'"
-        conditions_expense = f"WHERE date BETWEEN '{from_date}' AND '{to_date}'"
-
-
-    # ---------------------- QUERY ----------------------
-    total_income = frappe.db.sql(f"""
-        SELECT IFNULL(SUM(amount), 0)
-        FROM `tabIncome`
-        {conditions_income}
-    """)[0][0]
-
-    total_expense = frappe.db.sql(f"""
-        SELECT IFNULL(SUM(total), 0)
-        FROM `tabExpense`
-        {conditions_expense}
-    """)[0][0]
+    total_income = sources["income"]["total"]
+    total_expense = sources["expense"]["total"]
 
     return {
         "total_income": total_income,
@@ -2987,63 +2560,13 @@ def get_expense_income_summary(filter_type=None, from_date=None, to_date=None):
 
 @frappe.whitelist()
 def get_expense_tracker_summary(filter_type="", from_date="", to_date="", expense_type=""):
-    filters = []
-
-    if expense_type and expense_type != "All":
-        filters.append(["type", "=", expense_type])
-    
-    # Fallback to creation if date_time is not set
-    # Note: Using get_list with filters is easier for standard fields
-    
-    if filter_type == "today":
-        filters.append(["date_time", "between", [today() + " 00:00:00", today() + " 23:59:59"]])
-    
-    elif filter_type == "this_week":
-        start = add_days(today(), -7)
-        filters.append(["date_time", "between", [get_date_str(start) + " 00:00:00", today() + " 23:59:59"]])
-        
-    elif filter_type == "this_month":
-        start = get_first_day(today())
-        end = get_last_day(today())
-        filters.append(["date_time", "between", [get_date_str(start) + " 00:00:00", get_date_str(end) + " 23:59:59"]])
-
-        
-    elif filter_type == "this_year":
-        year = getdate(today()).year
-        filters.append(["date_time", "between", [f"{year}-01-01 00:00:00", f"{year}-12-31 23:59:59"]])
-        
-    elif filter_type == "custom" and from_date and to_date:
-        filters.append(["date_time", "between", [from_date + " 00:00:00", to_date + " 23:59:59"]])
-
-
-    # We fetch type and amount for all matching records and sum in Python
-    # This is very fast for reasonable amounts of data and much easier to debug
-    records = frappe.get_all("Expense Tracker", 
-        fields=["type", "amount"], 
-        filters=filters
-    )
-
-    income = 0
-    expense = 0
-    
-    for d in records:
-        val = float(d.amount or 0)
-        if d.type == "Income":
-            income += val
-        elif d.type == "Expense":
-            expense += val
+    if filter_type == "this_week":
+        # Rolling: the last seven days up to today
+        from_date, to_date = add_days(today(), -7), today()
+    else:
+        from_date, to_date = period_range(filter_type, from_date, to_date)
 
-    return {
-        "total_income": income,
-        "total_expense": expense,
-        "balance": income - expense,
-        "debug": {
-            "filters": filters,
-            "filter_type": filter_type,
-            "count": len(records),
-            "total_count": frappe.db.count("Expense Tracker")
-        }
-    }
+    return get_tracker_totals("expense_tracker", from_date, to_date, expense_type)
 
 
 
@@ -3163,36 +2686,10 @@ def send_daily_timesheet_reminders():
 def process_chat_message_queue():
     """
     Background job to process pending messages in the queue.
+    Kept for jobs enqueued under this name; see company.company.chat_broadcast.
     """
-    pending_messages = frappe.get_all(
-        "Chat Message Queue",
-        filters={"status": "Pending"},
-        fields=["name", "sender", "receiver", "content"]
-    )
-
-    for msg in pending_messages:
-        # Update status to Sending to prevent duplicate processing
-        frappe.db.set_value("Chat Message Queue", msg.name, "status", "Sending")
-        frappe.db.commit()
-
-        try:
-            if send_automated_chat_message(msg.sender, msg.receiver, msg.content):
-                frappe.db.set_value("Chat Message Queue", msg.name, {
-                    "status": "Sent",
-                    "sent_on": frappe.utils.now_datetime()
-                })
-            else:
-                frappe.db.set_value("Chat Message Queue", msg.name, {
-                    "status": "Failed",
-                    "error_message": "send_automated_chat_message returned False"
-                })
-        except Exception as e:
-            frappe.db.set_value("Chat Message Queue", msg.name, {
-                "status": "Failed",
-                "error_message": str(e)
-            })
-        
-        frappe.db.commit()
+    from company.company.chat_broadcast import process_queue
+    return process_queue()
 
 
 def _get_attendance_status(hours, p_threshold, h_threshold):
@@ -3260,7 +2757,7 @@ def get_month_calendar_data(month=None, year=None):
     start_date = f"{year}-{month:02d}-01"
     end_date = get_last_day(getdate(start_date))
     
-    settings = frappe.get_doc("HRMS Settings")
+    settings = get_settings("HRMS Settings")
     source = settings.get("weekly_chart_source") or "Attendance"
     p_threshold = settings.get("present_threshold") or 5.0
     h_threshold = settings.get("half_day_threshold") or 3.0
@@ -0,0 +1,268 @@
+import functools
+import heapq
+import json
+import re
+import time
+
+import frappe
+from frappe.utils import cint
+
+# Per-endpoint instrumentation for whitelisted API calls. With `enable_api_metrics` set in
+# site config, every /api/method/ request counts its SQL statements and DB time (by
+# wrapping frappe.db.sql for the request, the way frappe.recorder does), keeps the
+# fingerprints of its slowest queries, and pushes one JSON sample onto a capped Redis
+# list per endpoint. The API Metrics page reads those rolling windows back as p50/p95.
+#
+# @query_budget declares how many queries an endpoint may issue; overruns are logged
+# whether or not the request-level metrics are enabled.
+SAMPLE_WINDOW = 500
+SLOW_QUERIES_PER_REQUEST = 3
+FINGERPRINT_LENGTH = 300
+# Endpoints not called for this long drop off the page
+METRICS_TTL = 24 * 60 * 60
+
+ENDPOINTS_KEY = "company:api_metrics:endpoints"
+SAMPLES_KEY = "company:api_metrics:samples:{0}"
+
+METHOD_PATH = re.compile(r"^/api/(?:v\d+/)?method/([^/]+)")
+
+logger = frappe.logger("api_metrics")
+
+
+def is_enabled():
+    return bool(cint(frappe.conf.get("enable_api_metrics")))
+
+
+def fingerprint(query):
+    """Query text with literals replaced, so the same statement groups together."""
+    query = str(query)
+    query = re.sub(r"'(?:[^'\\]|\\.)*'", "?", query)
+    query = re.sub(r"\b\d+(?:\.\d+)?\b", "?", query)
+    query = re.sub(r"\s+", " ", query).strip()
+    query = re.sub(r"\(\?(?:\s*,\s*\?)+\)", "(?+)", query)
+    return query[:FINGERPRINT_LENGTH]
+
+
+# --------------------------------------------------------------------
+# QUERY TRACKING
+# --------------------------------------------------------------------
+
+class QueryTracker:
+    """Counts the statements run through frappe.db.sql while installed."""
+
+    def __init__(self):
+        self.count = 0
+        self.db_time = 0.0
+        self.slowest = []
+        self.budget_violations = []
+        self._original_sql = None
+
+    def record(self, query, duration):
+        self.count += 1
+        self.db_time += duration
+        # Min-heap of the slowest few; fingerprinting only happens for those
+        if len(self.slowest) < SLOW_QUERIES_PER_REQUEST:
+            heapq.heappush(self.slowest, (duration, self.count, query))
+        elif duration > self.slowest[0][0]:
+            heapq.heapreplace(self.slowest, (duration, self.count, query))
+
+    def install(self):
+        db_sql = self._original_sql = frappe.db.sql
+
+        def sql(query, *args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return db_sql(query, *args, **kwargs)
+            finally:
+                self.record(query, time.perf_counter() - start)
+
+        frappe.db.sql = sql
+        return self
+
+    def uninstall(self):
+        if self._original_sql is not None and frappe.db:
+            frappe.db.sql = self._original_sql
+            self._original_sql = None
+
+    def slow_queries(self):
+        return [
+            [round(duration * 1000, 2), fingerprint(query)]
+            for duration, _, query in sorted(self.slowest, reverse=True)
+        ]
+
+
+def get_active_tracker():
+    return getattr(frappe.local, "api_metrics_tracker", None)
+
+
+def query_budget(max_queries, max_db_ms=None):
+    """
+    Declare the most queries (and optionally DB milliseconds) an endpoint should need:
+
+        @frappe.whitelist()
+        @query_budget(40)
+        def get_dashboard_data(): ...
+
+    Overruns are logged and, when API metrics are on, counted on the API Metrics page.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            tracker = get_active_tracker()
+            own_tracker = tracker is None and bool(frappe.db)
+            if own_tracker:
+                tracker = QueryTracker().install()
+            start_count, start_time = (tracker.count, tracker.db_time) if tracker else (0, 0.0)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                if tracker:
+                    check_budget(fn, tracker, tracker.count - start_count,
+                        (tracker.db_time - start_time) * 1000, max_queries, max_db_ms)
+                if own_tracker:
+                    tracker.uninstall()
+        return wrapper
+    return decorator
+
+
+def check_budget(fn, tracker, queries, db_ms, max_queries, max_db_ms):
+    if queries <= max_queries and (max_db_ms is None or db_ms <= max_db_ms):
+        return
+    method = f"{fn.__module__}.{fn.__qualname__}"
+    tracker.budget_violations.append(method)
+    logger.warning(
+        f"[QUERY BUDGET] {method}: {queries} queries / {db_ms:.1f} ms "
+        f"(budget {max_queries} queries" + (f" / {max_db_ms} ms)" if max_db_ms is not None else ")")
+    )
+
+
+# --------------------------------------------------------------------
+# REQUEST HOOKS
+# --------------------------------------------------------------------
+
+def get_request_endpoint():
+    request = getattr(frappe.local, "request", None)
+    match = METHOD_PATH.match(request.path) if request else None
+    return match.group(1) if match else None
+
+
+def before_request():
+    if not is_enabled() or not frappe.db:
+        return
+    endpoint = get_request_endpoint()
+    if not endpoint:
+        return
+    frappe.local.api_metrics_tracker = QueryTracker().install()
+    frappe.local.api_metrics_start = (endpoint, time.perf_counter())
+
+
+def after_request(response=None, request=None):
+    tracker = get_active_tracker()
+    if not tracker:
+        return
+    frappe.local.api_metrics_tracker = None
+    tracker.uninstall()
+
+    endpoint, start = frappe.local.api_metrics_start
+    try:
+        record_sample(endpoint, tracker, time.perf_counter() - start, response)
+    except Exception:
+        # Metrics must never break the response
+        logger.exception(f"[API METRICS] could not record {endpoint}")
+
+
+def record_sample(endpoint, tracker, duration, response=None):
+    size = None
+    if response is not None and not getattr(response, "direct_passthrough", False):
+        size = response.calculate_content_length()
+
+    sample = {
+        "ts": int(time.time()),
+        "total_ms": round(duration * 1000, 2),
+        "db_ms": round(tracker.db_time * 1000, 2),
+        "py_ms": round(max(duration - tracker.db_time, 0) * 1000, 2),
+        "queries": tracker.count,
+        "size": size,
+        "status": getattr(response, "status_code", None),
+        "slow": tracker.slow_queries(),
+        "budget": tracker.budget_violations,
+    }
+
+    cache = frappe.cache()
+    key = SAMPLES_KEY.format(endpoint)
+    cache.lpush(key, json.dumps(sample))
+    cache.ltrim(key, 0, SAMPLE_WINDOW - 1)
+    cache.hset(ENDPOINTS_KEY, endpoint, sample["ts"])
+
+
+# --------------------------------------------------------------------
+# REPORT
+# --------------------------------------------------------------------
+
+def percentile(values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not values:
+        return None
+    index = max(0, min(len(values) - 1, -(-len(values) * pct // 100) - 1))
+    return values[int(index)]
+
+
+def summarize(endpoint, samples):
+    def stat(field):
+        values = sorted(s[field] for s in samples if s.get(field) is not None)
+        return {"p50": percentile(values, 50), "p95": percentile(values, 95), "max": values[-1] if values else None}
+
+    slow = {}
+    for sample in samples:
+        for ms, query in sample.get("slow") or []:
+            entry = slow.setdefault(query, {"query": query, "count": 0, "max_ms": 0})
+            entry["count"] += 1
+            entry["max_ms"] = max(entry["max_ms"], ms)
+
+    return {
+        "endpoint": endpoint,
+        "calls": len(samples),
+        "last_called": samples[0]["ts"] if samples else None,
+        "total_ms": stat("total_ms"),
+        "db_ms": stat("db_ms"),
+        "py_ms": stat("py_ms"),
+        "queries": stat("queries"),
+        "size": stat("size"),
+        "budget_violations": sum(1 for s in samples if s.get("budget")),
+        "slow_queries": sorted(slow.values(), key=lambda q: q["max_ms"], reverse=True)[:5],
+    }
+
+
+@frappe.whitelist()
+def get_endpoint_metrics():
+    """Rolling p50/p95 per endpoint over its last SAMPLE_WINDOW calls."""
+    frappe.only_for("System Manager")
+
+    cache = frappe.cache()
+    cutoff = time.time() - METRICS_TTL
+    metrics = []
+    for endpoint, last_seen in (cache.hgetall(ENDPOINTS_KEY) or {}).items():
+        endpoint = frappe.safe_decode(endpoint)
+        key = SAMPLES_KEY.format(endpoint)
+        if cint(last_seen) < cutoff:
+            cache.hdel(ENDPOINTS_KEY, endpoint)
+            cache.delete_value(key)
+            continue
+        samples = [json.loads(s) for s in cache.lrange(key, 0, SAMPLE_WINDOW - 1) or []]
+        if samples:
+            metrics.append(summarize(endpoint, samples))
+
+    return {
+        "enabled": is_enabled(),
+        "window": SAMPLE_WINDOW,
+        "endpoints": sorted(metrics, key=lambda m: m["queries"]["p95"] or 0, reverse=True),
+    }
+
+
+@frappe.whitelist(methods=["POST"])
+def clear_endpoint_metrics():
+    frappe.only_for("System Manager")
+    cache = frappe.cache()
+    for endpoint in (cache.hgetall(ENDPOINTS_KEY) or {}):
+        cache.delete_value(SAMPLES_KEY.format(frappe.safe_decode(endpoint)))
+    cache.delete_value(ENDPOINTS_KEY)
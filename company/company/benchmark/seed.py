@@ -0,0 +1,503 @@
+import csv
+import io
+import json
+import os
+import random
+from datetime import datetime, time, timedelta
+
+import frappe
+from frappe.utils import add_days, getdate, now_datetime, nowdate
+
+from company.company.hr_snapshot import month_day_key
+from company.company.phone_index import normalize_phone_key
+from company.company.settings_cache import clear_settings_cache
+
+# Synthetic data for the benchmark suite. Rows are written straight to the tables with
+# frappe.db.bulk_insert (a year of attendance for thousands of employees would take hours
+# through the ORM), all under a "BENCH-" name prefix so `clear` can remove them again.
+# The generator is seeded, so a given scale always produces the same data set and
+# results stay comparable across runs and machines.
+#
+# Only run this against a throwaway site with `allow_benchmark_data` in site config:
+#
+#   bench --site bench.local execute company.company.benchmark.seed.seed --kwargs "{'scale': 'small'}"
+PREFIX = "BENCH-"
+RANDOM_SEED = 20240601
+CHUNK_SIZE = 10_000
+
+SCALES = {
+    "small": {
+        "employees": 200, "days": 90, "leads": 10_000, "contacts": 10_000, "accounts": 500,
+        "invoices": 2_000, "campaign_recipients": 200, "salary_slip_employees": 50,
+        "import_days": 3,
+    },
+    "default": {
+        "employees": 2_000, "days": 365, "leads": 100_000, "contacts": 100_000, "accounts": 5_000,
+        "invoices": 20_000, "campaign_recipients": 1_000, "salary_slip_employees": 200,
+        "import_days": 5,
+    },
+}
+
+LEAVE_TYPES = [
+    # leave_type_name, is_paid, max_leaves, carry_forward, reset_frequency
+    (f"{PREFIX}Casual", 1, 1, 1, "Every 3 months"),
+    (f"{PREFIX}Sick", 1, 1, 0, None),
+]
+LEAD_SOURCE = f"{PREFIX}Website"
+PAYMENT_TYPE = f"{PREFIX}Bank Transfer"
+EMAIL_TEMPLATE = f"{PREFIX}Template"
+CAMPAIGN = f"{PREFIX}Campaign"
+
+SALARY_COMPONENTS = [
+    # component_name, type, percentage of CTC / 12
+    ("Basic", "Earning", 50),
+    ("HRA", "Earning", 20),
+    ("Special Allowance", "Earning", 30),
+    ("PF", "Deduction", 6),
+]
+
+
+def check_allowed():
+    if not frappe.conf.get("allow_benchmark_data"):
+        frappe.throw("Benchmark data may only be used on a site with `allow_benchmark_data` in site config")
+
+
+def get_manifest_path():
+    return frappe.get_site_path("private", "benchmarks", "manifest.json")
+
+
+def get_manifest():
+    path = get_manifest_path()
+    if not os.path.exists(path):
+        frappe.throw("No benchmark data on this site; run company.company.benchmark.seed.seed first")
+    with open(path) as f:
+        return frappe._dict(json.load(f))
+
+
+# --------------------------------------------------------------------
+# BULK WRITES
+# --------------------------------------------------------------------
+
+class RowWriter:
+    """Buffers rows per doctype and bulk-inserts them CHUNK_SIZE at a time."""
+
+    def __init__(self):
+        self.now = now_datetime()
+        self.buffers = {}
+        self.counts = {}
+
+    def add(self, doctype, values, parent=None):
+        row = {
+            "owner": "Administrator", "modified_by": "Administrator",
+            "creation": self.now, "modified": self.now, "docstatus": 0,
+        }
+        if parent:
+            doctype_parent, parentfield, parent_name, idx = parent
+            row.update({
+                "name": frappe.generate_hash(length=12), "parent": parent_name,
+                "parenttype": doctype_parent, "parentfield": parentfield, "idx": idx,
+            })
+        row.update(values)
+
+        buffer = self.buffers.setdefault(doctype, [])
+        buffer.append(row)
+        if len(buffer) >= CHUNK_SIZE:
+            self.flush(doctype)
+
+    def flush(self, doctype=None):
+        for dt in [doctype] if doctype else list(self.buffers):
+            rows = self.buffers.get(dt)
+            if not rows:
+                continue
+            # Rows of one doctype may set different optional fields
+            fields = list(dict.fromkeys(f for row in rows for f in row))
+            frappe.db.bulk_insert(dt, fields, [tuple(r.get(f) for f in fields) for r in rows])
+            self.counts[dt] = self.counts.get(dt, 0) + len(rows)
+            self.buffers[dt] = []
+        frappe.db.commit()
+
+
+# --------------------------------------------------------------------
+# SEED
+# --------------------------------------------------------------------
+
+def seed(scale="default"):
+    """Generate the benchmark data set; any earlier BENCH- data is cleared first."""
+    check_allowed()
+    if scale not in SCALES:
+        frappe.throw(f"Unknown scale {scale!r}; use one of {', '.join(SCALES)}")
+
+    clear()
+    config = frappe._dict(SCALES[scale])
+    rng = random.Random(RANDOM_SEED)
+    writer = RowWriter()
+
+    period_end = getdate(add_days(nowdate(), -1))
+    period_start = getdate(add_days(period_end, -(config.days - 1)))
+
+    seed_masters(writer)
+    employees = seed_employees(writer, rng, config, period_start)
+    seed_attendance_and_sessions(writer, rng, employees, period_start, period_end)
+    seed_presence(writer, rng, employees)
+    leads = seed_leads(writer, rng, config)
+    contacts = seed_contacts(writer, rng, config, leads)
+    seed_invoices(writer, rng, config, contacts, period_start, period_end)
+    seed_campaign(writer, leads[:config.campaign_recipients])
+    writer.flush()
+
+    # The import file covers working days after the seeded period, so it never collides
+    # with existing attendance
+    import_dates = working_days(add_days(nowdate(), 1), config.import_days)
+    upload = seed_attendance_upload(rng, employees, import_dates)
+
+    salary_month = getdate(add_days(period_end.replace(day=1), -1))
+    manifest = {
+        "scale": scale,
+        "seeded_at": str(now_datetime()),
+        "period_start": str(period_start),
+        "period_end": str(period_end),
+        "employees": len(employees),
+        "salary_slip_employees": [e["name"] for e in employees[:config.salary_slip_employees]],
+        "salary_year": salary_month.year,
+        "salary_month": salary_month.month,
+        "presence_employee": employees[0]["name"],
+        "presence_user": employees[0]["user"],
+        "campaign": CAMPAIGN,
+        "upload_attendance": upload,
+        "import_dates": [str(d) for d in import_dates],
+        "rows": writer.counts,
+    }
+    os.makedirs(os.path.dirname(get_manifest_path()), exist_ok=True)
+    with open(get_manifest_path(), "w") as f:
+        json.dump(manifest, f, indent=1)
+
+    frappe.db.commit()
+    return manifest
+
+
+def seed_masters(writer):
+    for name, is_paid, max_leaves, carry_forward, frequency in LEAVE_TYPES:
+        writer.add("Leave Type", {
+            "name": name, "leave_type_name": name, "is_paid": is_paid, "max_leaves": max_leaves,
+            "carry_forward": carry_forward, "reset_frequency": frequency, "status": "Active",
+        })
+    writer.add("Lead From", {"name": LEAD_SOURCE, "lead_from": LEAD_SOURCE})
+    writer.add("Payment Type", {"name": PAYMENT_TYPE, "payment_type": PAYMENT_TYPE})
+    writer.flush()
+
+    # Campaign sends should not sleep between batches while being timed
+    frappe.db.set_single_value("CRM Email Settings", "batch_delay", 0)
+    clear_settings_cache()
+
+
+def seed_employees(writer, rng, config, period_start):
+    employees = []
+    for i in range(1, config.employees + 1):
+        name = f"{PREFIX}EMP-{i:05d}"
+        user = f"bench.emp{i:05d}@example.com"
+        ctc = rng.randrange(300_000, 2_400_000, 1_000)
+        joining = add_days(period_start, -rng.randint(0, 5 * 365))
+        dob = add_days(period_start, -rng.randint(22 * 365, 55 * 365))
+
+        writer.add("User", {
+            "name": user, "email": user, "first_name": f"Bench {i:05d}", "full_name": f"Bench {i:05d}",
+            "enabled": 1, "user_type": "System User", "send_welcome_email": 0,
+        })
+
+        monthly = ctc / 12
+        earnings = [c for c in SALARY_COMPONENTS if c[1] == "Earning"]
+        deductions = [c for c in SALARY_COMPONENTS if c[1] == "Deduction"]
+        total_earnings = sum(monthly * c[2] / 100 for c in earnings)
+        total_deductions = sum(monthly * c[2] / 100 for c in deductions)
+        writer.add("Employee", {
+            "name": name, "employee_id": f"BE{i:05d}", "employee_name": f"Bench Employee {i:05d}",
+            "email": user, "user": user, "status": "Active", "date_of_joining": joining,
+            "doj_month_day": month_day_key(joining), "dob": dob, "dob_month_day": month_day_key(dob),
+            "ctc": ctc,
+            "total_earnings": total_earnings, "total_deductions": total_deductions,
+            "net_salary": total_earnings - total_deductions,
+        })
+        for parentfield, components in (("earnings", earnings), ("deductions", deductions)):
+            for idx, (component, kind, pct) in enumerate(components, 1):
+                writer.add("Salary Structure", {
+                    "component_name": component, "type": kind, "percentage": pct,
+                    "amount": monthly * pct / 100,
+                }, parent=("Employee", parentfield, name, idx))
+
+        employees.append({"name": name, "employee_id": f"BE{i:05d}", "user": user})
+    writer.flush()
+    return employees
+
+
+def working_days(start, count):
+    days, day = [], getdate(start)
+    while len(days) < count:
+        if day.weekday() < 5:
+            days.append(day)
+        day = add_days(day, 1)
+    return days
+
+
+def seed_attendance_and_sessions(writer, rng, employees, period_start, period_end):
+    attendance_no = session_no = 0
+    day = period_start
+    while day <= period_end:
+        if day.weekday() < 5:
+            for emp in employees:
+                roll = rng.random()
+                attendance_no += 1
+                if roll < 0.05:
+                    writer.add("Attendance", {
+                        "name": f"{PREFIX}ATD-{attendance_no:08d}", "employee": emp["name"],
+                        "employee_id": emp["employee_id"], "attendance_date": day, "status": "Absent",
+                    })
+                    continue
+                if roll < 0.09:
+                    writer.add("Attendance", {
+                        "name": f"{PREFIX}ATD-{attendance_no:08d}", "employee": emp["name"],
+                        "employee_id": emp["employee_id"], "attendance_date": day, "status": "On Leave",
+                        "leave_type": LEAVE_TYPES[0][0],
+                    })
+                    continue
+
+                login = datetime.combine(day, time(9)) + timedelta(minutes=rng.randint(-30, 45))
+                lunch = datetime.combine(day, time(13)) + timedelta(minutes=rng.randint(-20, 20))
+                lunch_end = lunch + timedelta(minutes=rng.randint(30, 60))
+                logout = datetime.combine(day, time(18)) + timedelta(minutes=rng.randint(-45, 90))
+                active = (lunch - login).total_seconds() + (logout - lunch_end).total_seconds()
+                on_break = (lunch_end - lunch).total_seconds()
+                hours = active / 3600
+
+                writer.add("Attendance", {
+                    "name": f"{PREFIX}ATD-{attendance_no:08d}", "employee": emp["name"],
+                    "employee_id": emp["employee_id"], "attendance_date": day, "status": "Present",
+                    "in_time": login.time(), "out_time": logout.time(),
+                    "working_hours_decimal": round(hours, 2),
+                    "working_hours_display": f"{int(hours)}h {int(hours % 1 * 60)}m",
+                })
+
+                session_no += 1
+                session = f"{PREFIX}SES-{session_no:08d}"
+                writer.add("Employee Session", {
+                    "name": session, "employee": emp["name"], "login_time": login, "login_date": day,
+                    "logout_time": logout, "last_seen": logout, "status": "Inactive",
+                    "total_work_hours": round(hours, 2), "total_break_hours": round(on_break / 3600, 2),
+                    "closed_active_seconds": active, "closed_break_seconds": on_break,
+                    "closed_status_seconds": json.dumps({"Available": active, "Break": on_break}),
+                })
+                for idx, (start, end, status) in enumerate(
+                    ((login, lunch, "Available"), (lunch, lunch_end, "Break"), (lunch_end, logout, "Available")), 1
+                ):
+                    writer.add("Employee Session Interval", {
+                        "from_time": start, "to_time": end, "status": status,
+                        "duration_seconds": (end - start).total_seconds(),
+                    }, parent=("Employee Session", "intervals", session, idx))
+                writer.add("Employee Break", {
+                    "name": f"{PREFIX}BRK-{session_no:08d}", "session": session, "break_start": lunch,
+                    "break_end": lunch_end, "break_duration": on_break / 60,
+                })
+        day = add_days(day, 1)
+    writer.flush()
+
+
+def seed_presence(writer, rng, employees):
+    now = now_datetime()
+    for emp in employees:
+        writer.add("Employee Presence", {
+            "name": emp["name"], "employee": emp["name"], "status": "Available", "last_updated": now,
+        })
+
+    # One open session today for the employee that ping_presence runs as
+    login = now - timedelta(hours=2)
+    writer.add("Employee Session", {
+        "name": f"{PREFIX}SES-ACTIVE", "employee": employees[0]["name"], "login_time": login,
+        "login_date": login.date(), "last_seen": now, "status": "Active",
+        "closed_active_seconds": 0, "open_interval_from": login, "open_interval_status": "Available",
+    })
+    writer.add("Employee Session Interval", {"from_time": login, "status": "Available"},
+        parent=("Employee Session", "intervals", f"{PREFIX}SES-ACTIVE", 1))
+
+    # Daily reminders for every tenth employee, spread over the working day
+    for i, emp in enumerate(employees[::10], 1):
+        writer.add("Employee Remainder", {
+            "name": f"{PREFIX}REM-{i:05d}", "employee": emp["name"], "type": "Break", "status": "Active",
+            "repeat": "Daily", "time": time(rng.randint(9, 18), rng.choice((0, 15, 30, 45))),
+            "message": "Time for a short break",
+        })
+    writer.flush()
+
+
+def phone_number(rng):
+    return f"+91 9{rng.randint(100000000, 999999999)}"
+
+
+def seed_leads(writer, rng, config):
+    leads = []
+    for i in range(1, config.leads + 1):
+        name = f"{PREFIX}LEAD-{i:06d}"
+        phone = phone_number(rng)
+        email = f"lead{i:06d}@example.com"
+        writer.add("Lead", {
+            "name": name, "lead_name": f"Bench Lead {i:06d}", "company_name": f"Bench Co {i % 5000:04d}",
+            "phone_number": phone, "phone_key": normalize_phone_key(phone), "email": email,
+            "leads_type": rng.choice(("Incoming", "Outgoing")), "leads_from": LEAD_SOURCE,
+            "status": "Converted" if rng.random() < 0.2 else "Not Converted",
+            "interest_level": rng.choice(("High", "Medium", "Low")),
+            "date_and_time": now_datetime() - timedelta(minutes=rng.randint(0, 365 * 24 * 60)),
+        })
+        leads.append({"name": name, "lead_name": f"Bench Lead {i:06d}", "email": email})
+    writer.flush()
+    return leads
+
+
+def seed_contacts(writer, rng, config, leads):
+    contacts = []
+    for i in range(1, config.contacts + 1):
+        name = f"{PREFIX}CLT-{i:06d}"
+        phone = phone_number(rng)
+        writer.add("Contacts", {
+            "name": name, "first_name": f"Bench Contact {i:06d}", "phone": phone,
+            "phone_key": normalize_phone_key(phone), "email": f"contact{i:06d}@example.com",
+            "source_lead": leads[(i - 1) % len(leads)]["name"] if leads else None,
+            "customer_type": "Sales",
+        })
+        contacts.append(name)
+
+    for i in range(1, config.accounts + 1):
+        writer.add("Accounts", {
+            "name": f"{PREFIX}ACC-{i:05d}", "account_name": f"Bench Account {i:05d}",
+            "owner_name": "Administrator",
+        })
+    writer.flush()
+    return contacts
+
+
+def seed_invoices(writer, rng, config, contacts, period_start, period_end):
+    span = (period_end - period_start).days
+    for i in range(1, config.invoices + 1):
+        name = f"{PREFIX}INV-{i:06d}"
+        invoice_date = add_days(period_start, rng.randint(0, span))
+        contact = rng.choice(contacts)
+
+        total = qty_total = 0
+        for idx in range(1, rng.randint(1, 5) + 1):
+            qty = rng.randint(1, 10)
+            price = rng.randrange(500, 50_000, 100)
+            tax = qty * price * 0.18
+            total += qty * price + tax
+            qty_total += qty
+            writer.add("Invoice Items", {
+                "description": f"Service {idx}", "quantity": qty, "price": price,
+                "tax_amount": tax, "cgst": tax / 2, "sgst": tax / 2, "sub_total": qty * price + tax,
+            }, parent=("Invoice", "table_qecz", name, idx))
+
+        received = 0
+        roll = rng.random()
+        if roll < 0.6:
+            # Paid in one or two collections, the rest left outstanding
+            for part in range(rng.randint(1, 2)):
+                amount = round(total * rng.uniform(0.3, 0.6), 2)
+                received += amount
+                writer.add("Invoice Collection", {
+                    "name": f"{PREFIX}INVC-{i:06d}-{part}", "invoice": name, "customer": contact,
+                    "collection_date": add_days(invoice_date, rng.randint(0, 60)),
+                    "amount_collected": amount, "mode_of_payment": PAYMENT_TYPE,
+                    "amount_pending": round(total - received, 2),
+                })
+
+        writer.add("Invoice", {
+            "name": name, "ref_no": name, "client_name": contact,
+            "billing_name": f"{PREFIX}ACC-{rng.randint(1, config.accounts):05d}",
+            "invoice_date": invoice_date, "due_date": add_days(invoice_date, 30),
+            "total_qty": qty_total, "total_amount": total, "grand_total": total,
+            "received_amount": received, "balance_amount": round(total - received, 2),
+        })
+    writer.flush()
+
+
+def seed_campaign(writer, leads):
+    writer.add("CRM Email Template", {
+        "name": EMAIL_TEMPLATE, "template_name": EMAIL_TEMPLATE, "is_active": 1,
+        "subject": "Hello {{ lead_name }}", "email_content": "<p>Hello {{ lead_name }}</p>",
+        "template_for": "Lead",
+    })
+    writer.add("CRM Email Campaign", {
+        "name": CAMPAIGN, "campaign_name": CAMPAIGN, "email_template": EMAIL_TEMPLATE,
+        "status": "Running", "target_type": "Lead", "total_recipients": len(leads),
+    })
+    for i, lead in enumerate(leads, 1):
+        writer.add("CRM Email Queue", {
+            "name": f"{PREFIX}EQ-{i:06d}", "campaign": CAMPAIGN, "recipient_name": lead["lead_name"],
+            "recipient_email": lead["email"], "reference_doctype": "Lead", "reference_name": lead["name"],
+            "subject": f"Hello {lead['lead_name']}", "email_content": f"<p>Hello {lead['lead_name']}</p>",
+            "status": "Pending", "retry_count": 0,
+        })
+    writer.flush()
+
+
+def seed_attendance_upload(rng, employees, dates):
+    """An Upload Attendance with a device-export CSV (header on row 5) for `dates`."""
+    out = io.StringIO()
+    out.write("Attendance Report\nBenchmark Device\n\n\n")
+    sheet = csv.writer(out)
+    sheet.writerow(["Person ID", "Name", "Date", "Check-In", "Check-Out"])
+    for day in dates:
+        for i, emp in enumerate(employees):
+            check_in = f"{9 + rng.randint(-1, 0):02d}:{rng.randint(0, 59):02d}:00"
+            check_out = "-" if rng.random() < 0.03 else f"{18 + rng.randint(0, 1):02d}:{rng.randint(0, 59):02d}:00"
+            sheet.writerow([emp["employee_id"], f"Bench Employee {i + 1:05d}", str(day), check_in, check_out])
+
+    file_doc = frappe.get_doc({
+        "doctype": "File", "file_name": f"{PREFIX}attendance.csv", "is_private": 1,
+        "content": out.getvalue(),
+    }).insert(ignore_permissions=True)
+
+    upload = frappe.get_doc({
+        "doctype": "Upload Attendance", "att_fr_date": dates[0], "att_to_date": dates[-1],
+        "attendance_file": file_doc.file_url, "upload_date": nowdate(),
+    }).insert(ignore_permissions=True)
+    frappe.db.commit()
+    return upload.name
+
+
+# --------------------------------------------------------------------
+# CLEAR
+# --------------------------------------------------------------------
+
+# Every doctype the seed, or a benchmarked function running on seeded data, writes to
+SEEDED_BY_NAME = [
+    "Leave Type", "Lead From", "Payment Type", "Employee", "Attendance", "Employee Session",
+    "Employee Break", "Employee Presence", "Employee Remainder", "Lead", "Contacts", "Accounts",
+    "Invoice", "Invoice Collection", "CRM Email Template", "CRM Email Campaign", "CRM Email Queue",
+]
+SEEDED_BY_EMPLOYEE = ["Attendance", "Salary Slip", "Leave Allocation", "Employee Remainder Queue"]
+
+
+def delete_with_children(doctype, filters):
+    names = frappe.get_all(doctype, filters=filters, pluck="name")
+    for i in range(0, len(names), CHUNK_SIZE):
+        chunk = names[i:i + CHUNK_SIZE]
+        for table in frappe.get_meta(doctype).get_table_fields():
+            frappe.db.delete(table.options, {"parent": ["in", chunk], "parenttype": doctype})
+        frappe.db.delete(doctype, {"name": ["in", chunk]})
+    return len(names)
+
+
+def clear():
+    """Remove every BENCH- row (and what the benchmarks generated from them)."""
+    check_allowed()
+    employee_filter = {"employee": ["like", f"{PREFIX}%"]}
+    for doctype in SEEDED_BY_EMPLOYEE:
+        delete_with_children(doctype, employee_filter)
+    for doctype in SEEDED_BY_NAME:
+        delete_with_children(doctype, {"name": ["like", f"{PREFIX}%"]})
+
+    frappe.db.delete("User", {"name": ["like", "bench.emp%@example.com"]})
+    for upload in frappe.get_all("Upload Attendance", filters={"attendance_file": ["like", f"%{PREFIX}%"]}, pluck="name"):
+        frappe.delete_doc("Upload Attendance", upload, ignore_permissions=True, force=True)
+    for file_name in frappe.get_all("File", filters={"file_name": ["like", f"{PREFIX}%"]}, pluck="name"):
+        frappe.delete_doc("File", file_name, ignore_permissions=True, force=True)
+
+    if os.path.exists(get_manifest_path()):
+        os.remove(get_manifest_path())
+    frappe.db.commit()
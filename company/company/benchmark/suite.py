@@ -0,0 +1,264 @@
+import glob
+import json
+import os
+import statistics
+import subprocess
+import time
+
+import frappe
+from frappe.utils import now_datetime
+
+from company.company.api_metrics import QueryTracker
+from company.company.benchmark.seed import PREFIX, check_allowed, delete_with_children, get_manifest
+
+# Times the app's hot paths against the seeded benchmark data. Every case runs
+# `repeat` times after an untimed warm-up; cases that write get a setup step that puts
+# the data back first, so each run does the same work. Wall time, query count and DB time
+# are recorded per run and the medians are saved under private/benchmarks/, one JSON
+# file per run, for `compare` to diff against an earlier result.
+#
+#   bench --site bench.local execute company.company.benchmark.suite.run --kwargs "{'label': 'baseline'}"
+#   bench --site bench.local execute company.company.benchmark.suite.compare
+DEFAULT_REPEAT = 3
+
+
+def get_results_dir():
+    return frappe.get_site_path("private", "benchmarks")
+
+
+# --------------------------------------------------------------------
+# CASE SETUP
+# --------------------------------------------------------------------
+
+def bench_employee_filter():
+    return {"employee": ["like", f"{PREFIX}%"]}
+
+
+def reset_salary_slips(m):
+    delete_with_children("Salary Slip", {"employee": ["in", m.salary_slip_employees]})
+    frappe.db.commit()
+
+
+def reset_leave_allocations(m):
+    delete_with_children("Leave Allocation", bench_employee_filter())
+    frappe.db.commit()
+
+
+def reset_imported_attendance(m):
+    frappe.db.delete("Attendance", {**bench_employee_filter(), "attendance_date": ["in", m.import_dates]})
+    frappe.db.set_value("Upload Attendance", m.upload_attendance, "imported", 0)
+    frappe.db.commit()
+
+
+def reset_campaign(m):
+    frappe.db.sql("""
+        UPDATE `tabCRM Email Queue`
+        SET status = 'Pending', retry_count = 0, sent_on = NULL, error_message = NULL
+        WHERE campaign = %s
+    """, (m.campaign,))
+    frappe.db.set_value("CRM Email Campaign", m.campaign, {"status": "Running", "sent_count": 0, "failed_count": 0})
+    frappe.db.commit()
+
+
+def reset_remainder_queue(m):
+    frappe.db.delete("Employee Remainder Queue", bench_employee_filter())
+    frappe.db.commit()
+
+
+def clear_hr_snapshot(m):
+    from company.company.hr_snapshot import _clear_hr_snapshot
+    _clear_hr_snapshot()
+
+
+# --------------------------------------------------------------------
+# CASES
+# --------------------------------------------------------------------
+
+def get_cases():
+    """name -> case; `call(m)` gets the seed manifest, `user` defaults to Administrator."""
+    from company.company.doctype.crm_email_campaign.crm_email_campaign import process_campaign
+    from company.company.doctype.salary_slip.salary_slip import generate_salary_slips_from_employee
+    from company.company.doctype.upload_attendance.upload_attendance import import_attendance
+    from company.company.employee_remainder_api import check_and_enqueue_reminders
+    from company.company.frontend_api import (
+        auto_allocate_monthly_leaves,
+        get_dashboard_stats,
+        get_hr_dashboard_data,
+    )
+    from company.company.presence_api import get_detailed_sessions, ping_presence
+
+    case = frappe._dict
+    return {
+        "get_dashboard_stats": case(call=lambda m: get_dashboard_stats()),
+        "get_hr_dashboard_data (cold)": case(call=lambda m: get_hr_dashboard_data(), setup=clear_hr_snapshot),
+        "get_hr_dashboard_data (cached)": case(call=lambda m: get_hr_dashboard_data()),
+        "generate_salary_slips_from_employee": case(
+            call=lambda m: generate_salary_slips_from_employee(
+                year=m.salary_year, month=m.salary_month, employees=m.salary_slip_employees
+            ),
+            setup=reset_salary_slips,
+        ),
+        "auto_allocate_monthly_leaves": case(
+            call=lambda m: auto_allocate_monthly_leaves(m.salary_year, m.salary_month),
+            setup=reset_leave_allocations,
+        ),
+        "import_attendance": case(
+            call=lambda m: import_attendance(m.upload_attendance),
+            setup=reset_imported_attendance,
+        ),
+        "process_campaign": case(call=lambda m: process_campaign(m.campaign), setup=reset_campaign),
+        "get_detailed_sessions": case(call=lambda m: get_detailed_sessions()),
+        "get_detailed_sessions (month, all staff)": case(
+            call=lambda m: get_detailed_sessions(
+                from_date=m.period_end[:8] + "01", to_date=m.period_end, limit_page_length=0
+            ),
+        ),
+        "ping_presence": case(
+            call=lambda m: ping_presence(m.presence_employee),
+            user=lambda m: m.presence_user,
+        ),
+        "check_and_enqueue_reminders": case(
+            call=lambda m: check_and_enqueue_reminders(),
+            setup=reset_remainder_queue,
+        ),
+    }
+
+
+# --------------------------------------------------------------------
+# RUN
+# --------------------------------------------------------------------
+
+def time_case(case, manifest):
+    if case.setup:
+        case.setup(manifest)
+
+    frappe.set_user(case.user(manifest) if case.user else "Administrator")
+    tracker = QueryTracker().install()
+    start = time.perf_counter()
+    try:
+        case.call(manifest)
+        frappe.db.commit()
+    finally:
+        elapsed = time.perf_counter() - start
+        tracker.uninstall()
+        frappe.set_user("Administrator")
+
+    return {"ms": elapsed * 1000, "queries": tracker.count, "db_ms": tracker.db_time * 1000}
+
+
+def summarize_runs(runs):
+    def median(field):
+        return round(statistics.median(r[field] for r in runs), 2)
+
+    return {
+        "runs": len(runs),
+        "ms": median("ms"),
+        "min_ms": round(min(r["ms"] for r in runs), 2),
+        "max_ms": round(max(r["ms"] for r in runs), 2),
+        "queries": median("queries"),
+        "db_ms": median("db_ms"),
+    }
+
+
+def get_app_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=frappe.get_app_path("company"), text=True,
+            stderr=subprocess.DEVNULL,
+        ).strip()
+    except Exception:
+        return None
+
+
+def run(repeat=DEFAULT_REPEAT, cases=None, label=None):
+    """Benchmark all cases (or the named ones) and save the result; returns its path."""
+    check_allowed()
+    manifest = get_manifest()
+    available = get_cases()
+    if isinstance(cases, str):
+        cases = [c.strip() for c in cases.split(",") if c.strip()]
+    unknown = set(cases or []) - set(available)
+    if unknown:
+        frappe.throw(f"Unknown benchmark case(s): {', '.join(sorted(unknown))}")
+
+    results = {}
+    for name, case in available.items():
+        if cases and name not in cases:
+            continue
+        try:
+            # Warm-up fills the document/meta caches so runs compare steady-state cost
+            time_case(case, manifest)
+            results[name] = summarize_runs([time_case(case, manifest) for _ in range(int(repeat))])
+        except Exception as e:
+            frappe.db.rollback()
+            results[name] = {"error": str(e)}
+        print(format_row(name, results[name]))
+
+    result = {
+        "label": label,
+        "started": str(now_datetime()),
+        "commit": get_app_commit(),
+        "scale": manifest.scale,
+        "seeded_at": manifest.seeded_at,
+        "repeat": int(repeat),
+        "cases": results,
+    }
+    stamp = now_datetime().strftime("%Y%m%d-%H%M%S")
+    path = os.path.join(get_results_dir(), f"run-{stamp}{'-' + label if label else ''}.json")
+    with open(path, "w") as f:
+        json.dump(result, f, indent=1)
+    return path
+
+
+def format_row(name, result):
+    if "error" in result:
+        return f"{name:<42} ERROR {result['error']}"
+    return (
+        f"{name:<42} {result['ms']:>10.1f} ms  {result['queries']:>8.0f} queries  "
+        f"{result['db_ms']:>10.1f} ms db"
+    )
+
+
+# --------------------------------------------------------------------
+# COMPARE
+# --------------------------------------------------------------------
+
+def load_result(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(baseline=None, current=None):
+    """
+    Diff two saved runs (file paths; default: the two most recent). Returns
+    {case: {"ms": (before, after, % change), "queries": (...)}} and prints a table.
+    """
+    if not (baseline and current):
+        runs = sorted(glob.glob(os.path.join(get_results_dir(), "run-*.json")))
+        if len(runs) < 2:
+            frappe.throw("Need two saved benchmark runs to compare")
+        baseline, current = baseline or runs[-2], current or runs[-1]
+
+    before, after = load_result(baseline), load_result(current)
+    if before.get("scale") != after.get("scale"):
+        print(f"Warning: comparing scale {before.get('scale')!r} with {after.get('scale')!r}")
+
+    def delta(old, new):
+        return round((new - old) / old * 100, 1) if old else None
+
+    diff = {}
+    print(f"{'case':<42} {'ms before':>10} {'ms after':>10} {'Δ%':>7} {'q before':>9} {'q after':>8}")
+    for name, new in after["cases"].items():
+        old = before["cases"].get(name)
+        if not old or "error" in old or "error" in new:
+            continue
+        diff[name] = {
+            "ms": (old["ms"], new["ms"], delta(old["ms"], new["ms"])),
+            "queries": (old["queries"], new["queries"], delta(old["queries"], new["queries"])),
+        }
+        change = diff[name]["ms"][2]
+        print(
+            f"{name:<42} {old['ms']:>10.1f} {new['ms']:>10.1f} "
+            f"{change if change is not None else '-':>7} {old['queries']:>9.0f} {new['queries']:>8.0f}"
+        )
+    return diff
@@ -0,0 +1,388 @@
+import json
+
+import frappe
+from frappe import _
+from frappe.utils import now, nowdate
+
+# Month-end batch conversions: Lead -> Accounts/Contacts and Estimation -> Invoice.
+# Every record a chunk refers to (leads, matching accounts and contacts, estimations,
+# their items and existing invoices) is prefetched in a few queries. Each chunk is one
+# transaction with a savepoint per item, so a failing item is reported and rolled back
+# without affecting the rest. Batches larger than a chunk run on the long queue.
+BULK_CHUNK_SIZE = 50
+BULK_JOB_PREFIX = "company:bulk_conversion"
+BULK_JOB_TTL = 24 * 60 * 60
+
+LEAD_FIELDS = [
+    "name", "lead_name", "company_name", "email", "phone_number", "gstin",
+    "country", "state", "city", "billing_address", "status",
+]
+
+# Estimation header fields copied onto the Invoice
+INVOICE_FIELDS = [
+    "customer_name",
+    "billing_name",
+    "billing_address",
+    "phone_number",
+    "deal",
+    "total_qty",
+    "total_amount",
+    "overall_discount_type",
+    "overall_discount",
+    "grand_total",
+    "description",
+    "terms_and_conditions",
+    "bank_account",
+]
+
+ESTIMATION_FIELDS = [
+    "name", "client_name", "customer_name", "billing_name", "billing_address", "deal",
+    "total_qty", "total_amount", "overall_discount_type", "overall_discount",
+    "grand_total", "description", "terms_and_conditions", "bank_account",
+]
+
+ITEM_FIELDS = [
+    "service", "hsn_code", "description", "quantity", "price", "discount_type", "discount",
+    "tax_type", "tax_category", "tax_percent", "tax_amount", "cgst", "sgst", "igst", "sub_total",
+]
+
+
+def parse_names(names):
+    if isinstance(names, str):
+        names = json.loads(names) if names.strip().startswith("[") else [names]
+    return list(dict.fromkeys(n for n in names or [] if n))
+
+
+def chunks(items, size=BULK_CHUNK_SIZE):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+# --------------------------------------------------------------------
+# LEADS
+# --------------------------------------------------------------------
+
+def prefetch_lead_lookups(leads):
+    """Existing accounts, contacts and contact-company links for a set of leads."""
+    company_names = list({l.company_name for l in leads if l.company_name})
+    emails = list({l.email for l in leads if l.email})
+    phones = list({l.phone_number for l in leads if l.phone_number})
+
+    lookups = frappe._dict({"accounts": {}, "by_email": {}, "by_phone": {}, "links": set(), "link_idx": {}})
+
+    if company_names:
+        for row in frappe.get_all(
+            "Accounts",
+            filters={"account_name": ["in", company_names]},
+            fields=["name", "account_name"],
+            order_by="creation asc"
+        ):
+            lookups.accounts.setdefault(row.account_name, row.name)
+
+    or_filters = []
+    if emails:
+        or_filters.append(["email", "in", emails])
+    if phones:
+        or_filters.append(["phone", "in", phones])
+    if or_filters:
+        for row in frappe.get_all(
+            "Contacts", or_filters=or_filters, fields=["name", "email", "phone"], order_by="creation asc"
+        ):
+            if row.email:
+                lookups.by_email.setdefault(row.email, row.name)
+            if row.phone:
+                lookups.by_phone.setdefault(row.phone, row.name)
+
+    contacts = list(set(lookups.by_email.values()) | set(lookups.by_phone.values()))
+    if contacts:
+        for row in frappe.get_all(
+            "Contact Company",
+            filters={"parent": ["in", contacts], "parenttype": "Contacts"},
+            fields=["parent", "company_name", "idx"]
+        ):
+            lookups.links.add((row.parent, row.company_name))
+            lookups.link_idx[row.parent] = max(lookups.link_idx.get(row.parent, 0), row.idx or 0)
+
+    return lookups
+
+
+def convert_lead_row(lead, lookups, pending_links):
+    """
+    Convert one lead using prefetched `lookups`. Links of existing contacts to the
+    account are appended to `pending_links` and inserted together by `insert_contact_links`.
+    """
+    messages = []
+
+    if not lead.company_name:
+        frappe.throw("Company Name is required to create a Company")
+
+    if not (lead.email or lead.phone_number):
+        frappe.throw("Email or Phone is required to create a Contact")
+
+    account_name = lookups.accounts.get(lead.company_name)
+    if account_name:
+        messages.append({"type": "warning", "text": f"Company already exists: {account_name}"})
+    else:
+        account = frappe.new_doc("Accounts")
+        account.account_name = lead.company_name
+        account.phone_number = lead.phone_number
+        account.gstin = lead.gstin
+        account.country = lead.country
+        account.state = lead.state
+        account.city = lead.city
+        account.insert()
+
+        account_name = account.name
+        messages.append({"type": "success", "text": f"New Company created: {account_name}"})
+
+    contact_name = (lead.email and lookups.by_email.get(lead.email)) or (
+        lead.phone_number and lookups.by_phone.get(lead.phone_number)
+    )
+    existing_contact = bool(contact_name)
+    if existing_contact:
+        messages.append({"type": "warning", "text": f"Contact already exists: {contact_name}"})
+    else:
+        contact_doc = frappe.new_doc("Contacts")
+        contact_doc.first_name = lead.lead_name
+        contact_doc.email = lead.email
+        contact_doc.phone = lead.phone_number
+        contact_doc.country = lead.country
+        contact_doc.state = lead.state
+        contact_doc.city = lead.city
+        contact_doc.address = lead.billing_address
+        contact_doc.source_lead = lead.name
+        contact_doc.append("company_name", {
+            "doctype": "Contact Company",
+            "company_name": account_name
+        })
+        contact_doc.insert()
+
+        contact_name = contact_doc.name
+        messages.append({"type": "success", "text": f"New Contact created: {contact_name}"})
+
+    frappe.db.set_value("Lead", lead.name, {
+        "status": "Converted",
+        "converted_account": account_name,
+        "converted_contact": contact_name,
+    })
+
+    # Everything was written; only now make the new records visible to later leads
+    lookups.accounts[lead.company_name] = account_name
+    if lead.email:
+        lookups.by_email.setdefault(lead.email, contact_name)
+    if lead.phone_number:
+        lookups.by_phone.setdefault(lead.phone_number, contact_name)
+
+    if not existing_contact:
+        lookups.links.add((contact_name, account_name))
+        lookups.link_idx[contact_name] = 1
+    elif (contact_name, account_name) not in lookups.links:
+        lookups.links.add((contact_name, account_name))
+        lookups.link_idx[contact_name] = lookups.link_idx.get(contact_name, 0) + 1
+        pending_links.append((contact_name, account_name, lookups.link_idx[contact_name]))
+        messages.append({"type": "success", "text": f"Linked existing contact to company: {account_name}"})
+
+    return {"account": account_name, "contact": contact_name, "messages": messages}
+
+
+def insert_contact_links(pending_links):
+    """Insert Contact Company rows for existing contacts in one statement."""
+    if not pending_links:
+        return
+    timestamp, user = now(), frappe.session.user
+    fields = [
+        "name", "owner", "creation", "modified", "modified_by", "docstatus",
+        "parent", "parenttype", "parentfield", "idx", "company_name",
+    ]
+    values = [
+        (frappe.generate_hash(length=10), user, timestamp, timestamp, user, 0,
+         contact, "Contacts", "company_name", idx, account)
+        for contact, account, idx in pending_links
+    ]
+    frappe.db.bulk_insert("Contact Company", fields, values)
+
+
+def convert_lead_chunk(names, skip_converted=True):
+    """Convert up to a chunk of leads in the current transaction; per-lead results."""
+    leads = {l.name: l for l in frappe.get_all(
+        "Lead", filters={"name": ["in", names]}, fields=LEAD_FIELDS
+    )}
+    lookups = prefetch_lead_lookups(list(leads.values()))
+    pending_links = []
+    results = []
+
+    for name in names:
+        lead = leads.get(name)
+        if not lead:
+            results.append({"name": name, "status": "error", "message": _("Lead not found")})
+            continue
+        if skip_converted and lead.status == "Converted":
+            results.append({"name": name, "status": "skipped", "message": _("Already converted")})
+            continue
+
+        frappe.db.savepoint("bulk_convert_row")
+        try:
+            result = convert_lead_row(lead, lookups, pending_links)
+            results.append({"name": name, "status": "success", **result})
+        except Exception as e:
+            frappe.db.rollback(save_point="bulk_convert_row")
+            frappe.clear_last_message()
+            results.append({"name": name, "status": "error", "message": str(e)})
+
+    insert_contact_links(pending_links)
+    return results
+
+
+# --------------------------------------------------------------------
+# ESTIMATIONS
+# --------------------------------------------------------------------
+
+def make_invoice_from_estimation(est, items, fields=None):
+    """Insert an Invoice for an Estimation (doc or prefetched row) and its item rows."""
+    inv = frappe.new_doc("Invoice")
+    inv.flags.ignore_mandatory = True
+
+    for f in fields or INVOICE_FIELDS:
+        inv.set(f, est.get(f))
+
+    # Set client_name (contact ID) from estimation
+    inv.client_name = est.client_name
+    inv.invoice_date = nowdate()
+
+    # Conversion flags
+    inv.converted_from_estimation = 1
+    inv.converted_estimation_id = est.name
+
+    for item in items:
+        inv.append("table_qecz", {f: item.get(f) for f in ITEM_FIELDS})
+
+    inv.insert(ignore_permissions=True, ignore_mandatory=True)
+    return inv
+
+
+def convert_estimation_chunk(names):
+    """Convert up to a chunk of estimations in the current transaction; per-item results."""
+    estimations = {e.name: e for e in frappe.get_all(
+        "Estimation", filters={"name": ["in", names]}, fields=ESTIMATION_FIELDS
+    )}
+
+    items = {}
+    for row in frappe.get_all(
+        "Estimation Items",
+        filters={"parent": ["in", names], "parenttype": "Estimation", "parentfield": "table_qecz"},
+        fields=["parent", *ITEM_FIELDS],
+        order_by="parent asc, idx asc"
+    ):
+        items.setdefault(row.parent, []).append(row)
+
+    existing = dict(frappe.get_all(
+        "Invoice",
+        filters={"converted_estimation_id": ["in", names]},
+        fields=["converted_estimation_id", "name"],
+        as_list=True
+    ))
+
+    results = []
+    for name in names:
+        est = estimations.get(name)
+        if not est:
+            results.append({"name": name, "status": "error", "message": _("Estimation not found")})
+            continue
+        if name in existing:
+            results.append({"name": name, "status": "skipped", "invoice": existing[name],
+                            "message": _("Invoice {0} already created").format(existing[name])})
+            continue
+
+        frappe.db.savepoint("bulk_convert_row")
+        try:
+            inv = make_invoice_from_estimation(est, items.get(name, []))
+            results.append({"name": name, "status": "success", "invoice": inv.name})
+        except Exception as e:
+            frappe.db.rollback(save_point="bulk_convert_row")
+            frappe.clear_last_message()
+            results.append({"name": name, "status": "error", "message": str(e)})
+
+    return results
+
+
+# --------------------------------------------------------------------
+# API / BACKGROUND JOBS
+# --------------------------------------------------------------------
+
+CONVERTERS = {
+    "Lead": convert_lead_chunk,
+    "Estimation": convert_estimation_chunk,
+}
+
+
+@frappe.whitelist()
+def convert_leads(leads):
+    """Convert a list of leads; runs inline for one chunk, otherwise returns a job id."""
+    frappe.has_permission("Lead", "write", throw=True)
+    return run_bulk_conversion("Lead", parse_names(leads))
+
+
+@frappe.whitelist()
+def convert_estimations_to_invoices(estimations):
+    """Convert a list of estimations; runs inline for one chunk, otherwise returns a job id."""
+    frappe.has_permission("Invoice", "create", throw=True)
+    return run_bulk_conversion("Estimation", parse_names(estimations))
+
+
+def run_bulk_conversion(doctype, names):
+    if not names:
+        frappe.throw(_("Nothing to convert"))
+
+    if len(names) <= BULK_CHUNK_SIZE:
+        return {"queued": False, "results": CONVERTERS[doctype](names)}
+
+    job_id = frappe.generate_hash(length=12)
+    set_bulk_job_status(job_id, status="Queued", doctype=doctype, done=0, total=len(names), results=[])
+    frappe.enqueue(
+        "company.company.bulk_conversion.process_bulk_conversion",
+        queue="long",
+        timeout=3600,
+        job_id=job_id,
+        doctype=doctype,
+        names=names
+    )
+    return {"queued": True, "job_id": job_id, "total": len(names)}
+
+
+def process_bulk_conversion(job_id, doctype, names):
+    """Long-queue job: convert chunk by chunk, committing and reporting after each."""
+    results = []
+    try:
+        for chunk in chunks(names):
+            results.extend(CONVERTERS[doctype](chunk))
+            frappe.db.commit()
+            set_bulk_job_status(job_id, status="Running", done=len(results), results=results)
+        set_bulk_job_status(job_id, status="Completed")
+    except Exception:
+        frappe.db.rollback()
+        frappe.log_error(title=f"Bulk {doctype} Conversion {job_id} Failed")
+        set_bulk_job_status(job_id, status="Failed", done=len(results), results=results)
+
+
+def get_bulk_job_key(job_id):
+    return f"{BULK_JOB_PREFIX}:{job_id}"
+
+
+def set_bulk_job_status(job_id, **status):
+    key = get_bulk_job_key(job_id)
+    current = frappe.cache().get_value(key) or {"job_id": job_id, "user": frappe.session.user}
+    current.update(status)
+    frappe.cache().set_value(key, current, expires_in_sec=BULK_JOB_TTL)
+
+    progress = {k: v for k, v in current.items() if k != "results"}
+    frappe.publish_realtime("bulk_conversion_progress", progress, user=current["user"])
+    return current
+
+
+@frappe.whitelist()
+def get_bulk_conversion_status(job_id):
+    """Progress and per-item results of a queued conversion."""
+    status = frappe.cache().get_value(get_bulk_job_key(job_id))
+    if status and status["user"] != frappe.session.user and "System Manager" not in frappe.get_roles():
+        frappe.throw(_("Not permitted"), frappe.PermissionError)
+    return status
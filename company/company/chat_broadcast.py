@@ -0,0 +1,324 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import frappe
+from frappe.utils import add_to_date, cint, now_datetime
+
+from company.company.api import get_chatbot_user
+
+# Chat Message Queue processing for Manual Chat Message broadcasts. Receivers are queued
+# with one bulk insert; workers then claim Pending rows CLAIM_BATCH_SIZE at a time with
+# FOR UPDATE SKIP LOCKED and mark them Sending with a lease (the row's `modified`).
+# Rows still Sending once the lease has expired belong to a worker that died and go
+# back to Pending. For each batch the direct rooms of all (sender, receiver) pairs are
+# looked up in one query and the missing ones created up front, the messages are sent
+# from a small thread pool (each thread on its own DB connection, since the chat app
+# writes a Chat Message per send), and the outcomes are written with one UPDATE.
+#
+# Delivery is at least once: a worker that dies after sending but before recording
+# the batch leaves rows that are sent again when the lease expires.
+CLAIM_BATCH_SIZE = 200
+# Must comfortably exceed the time one batch takes to send
+LEASE_MINUTES = 15
+DEFAULT_WORKERS = 4
+ERROR_MESSAGE_LENGTH = 1000
+
+PROCESS_JOB_ID = "company:chat_broadcast"
+
+logger = frappe.logger("chat_broadcast")
+
+
+def get_worker_count():
+    return max(1, cint(frappe.conf.get("chat_broadcast_workers")) or DEFAULT_WORKERS)
+
+
+# --------------------------------------------------------------------
+# QUEUE
+# --------------------------------------------------------------------
+
+def queue_messages(sender, receivers, content, manual_chat_message=None):
+    """Queue `content` from `sender` to every receiver (one bulk insert) and start processing."""
+    # "Select All Users" includes the sender, who has no direct room with themselves
+    receivers = [r for r in dict.fromkeys(receivers or []) if r and r != sender]
+    if not receivers:
+        return 0
+
+    now, user = now_datetime(), frappe.session.user
+    fields = [
+        "name", "owner", "creation", "modified", "modified_by", "docstatus",
+        "sender", "receiver", "content", "status", "manual_chat_message",
+    ]
+    values = [
+        (frappe.generate_hash(length=10), user, now, now, user, 0,
+            sender, receiver, content, "Pending", manual_chat_message)
+        for receiver in receivers
+    ]
+    frappe.db.bulk_insert("Chat Message Queue", fields, values)
+    enqueue_processing()
+    return len(receivers)
+
+
+def enqueue_processing():
+    """Start a queue run after the current transaction commits, unless one is already queued."""
+    frappe.enqueue(
+        "company.company.chat_broadcast.process_queue",
+        queue="long",
+        at_front=True,
+        job_id=PROCESS_JOB_ID,
+        deduplicate=True,
+        enqueue_after_commit=True,
+    )
+
+
+def enqueue_if_pending():
+    """Scheduler safety net: picks up rows left behind by a finished run or a dead worker."""
+    if has_pending_work():
+        enqueue_processing()
+
+
+def has_pending_work():
+    return bool(frappe.db.sql("""
+        SELECT name FROM `tabChat Message Queue`
+        WHERE status = 'Pending'
+           OR (status = 'Sending' AND modified < %s)
+        LIMIT 1
+    """, (get_lease_cutoff(),)))
+
+
+# --------------------------------------------------------------------
+# CLAIM
+# --------------------------------------------------------------------
+
+def get_lease_cutoff():
+    return add_to_date(now_datetime(), minutes=-LEASE_MINUTES)
+
+
+def release_expired_leases():
+    frappe.db.sql("""
+        UPDATE `tabChat Message Queue`
+        SET status = 'Pending'
+        WHERE status = 'Sending' AND modified < %s
+    """, (get_lease_cutoff(),))
+    frappe.db.commit()
+
+
+def claim_batch(limit=CLAIM_BATCH_SIZE):
+    """Lock the oldest Pending rows, mark them Sending and commit, so other workers skip them."""
+    rows = frappe.db.sql("""
+        SELECT name, sender, receiver, content
+        FROM `tabChat Message Queue`
+        WHERE status = 'Pending'
+        ORDER BY creation
+        LIMIT %s
+        FOR UPDATE SKIP LOCKED
+    """, (limit,), as_dict=True)
+
+    if rows:
+        frappe.db.sql("""
+            UPDATE `tabChat Message Queue`
+            SET status = 'Sending', modified = %s
+            WHERE name IN %s
+        """, (now_datetime(), tuple(r.name for r in rows)))
+    frappe.db.commit()
+    return rows
+
+
+# --------------------------------------------------------------------
+# ROOMS
+# --------------------------------------------------------------------
+
+def get_direct_rooms(pairs):
+    """{(sender, receiver): room} for the pairs that already share a direct room, in one query."""
+    if not pairs:
+        return {}
+    rows = frappe.db.sql("""
+        SELECT u1.user AS sender, u2.user AS receiver, c.name AS room
+        FROM `tabClefinCode Chat Channel` c
+        JOIN `tabClefinCode Chat Channel User` u1 ON u1.parent = c.name
+        JOIN `tabClefinCode Chat Channel User` u2 ON u2.parent = c.name
+        WHERE c.type = 'Direct'
+        AND c.is_parent = 1
+        AND u1.name != u2.name
+        AND u1.user IN %(senders)s
+        AND u2.user IN %(receivers)s
+        ORDER BY c.creation
+    """, {
+        "senders": tuple({s for s, _ in pairs}),
+        "receivers": tuple({r for _, r in pairs}),
+    }, as_dict=True)
+
+    rooms = {}
+    for row in rows:
+        key = (row.sender, row.receiver)
+        if key in pairs:
+            rooms.setdefault(key, row.room)
+    return rooms
+
+
+def create_direct_room(sender, receiver, sender_full_name, content):
+    from clefincode_chat.api.api_1_2_1.api import create_channel
+
+    users = [
+        {"email": sender, "platform": "Chat"},
+        {"email": receiver, "platform": "Chat"}
+    ]
+    res = create_channel(
+        channel_name="",
+        users=json.dumps(users),
+        type="Direct",
+        last_message=content,
+        creator_email=sender,
+        creator=sender_full_name
+    )
+    if res and res.get("results") and res["results"][0].get("room"):
+        return res["results"][0]["room"]
+    return None
+
+
+def prepare_batch(rows):
+    """
+    Resolve sender, display name and room for every claimed row. Returns the rows
+    ready to send and {name: error} for the ones that cannot be sent. Missing rooms are
+    created here, on the calling thread, so two workers never create the same room.
+    """
+    chatbot = None
+    if any(not r.sender for r in rows):
+        chatbot = get_chatbot_user()
+
+    ready, errors = [], {}
+    for row in rows:
+        row.sender = row.sender or chatbot
+        if not row.sender:
+            errors[row.name] = "No sender and no user with the Chat Bot role"
+        elif not row.receiver or not row.content:
+            errors[row.name] = "Receiver and content are required"
+        elif row.receiver == row.sender:
+            errors[row.name] = "Sender and receiver are the same user"
+        else:
+            ready.append(row)
+
+    senders = {r.sender for r in ready}
+    full_names = dict(frappe.db.sql(
+        "SELECT name, full_name FROM `tabUser` WHERE name IN %s", (tuple(senders),)
+    )) if senders else {}
+
+    rooms = get_direct_rooms({(r.sender, r.receiver) for r in ready})
+    for row in ready:
+        row.sender_full_name = full_names.get(row.sender) or row.sender
+        key = (row.sender, row.receiver)
+        if key not in rooms:
+            try:
+                rooms[key] = create_direct_room(row.sender, row.receiver, row.sender_full_name, row.content)
+                frappe.db.commit()
+            except Exception as e:
+                frappe.db.rollback()
+                rooms[key] = None
+                logger.error(f"[CHAT BROADCAST] could not create room {row.sender} -> {row.receiver}: {e}")
+        row.room = rooms[key]
+        if not row.room:
+            errors[row.name] = "Direct chat room could not be created"
+
+    return [r for r in ready if r.room], errors
+
+
+# --------------------------------------------------------------------
+# SEND
+# --------------------------------------------------------------------
+
+def send_rows(rows):
+    """Send on the current connection, committing each message. Returns {name: error or None}."""
+    from clefincode_chat.api.api_1_2_1.api import send
+
+    outcomes = {}
+    for row in rows:
+        try:
+            send(row.content, row.sender_full_name, row.room, row.sender, skip_notification=1)
+            frappe.db.commit()
+            outcomes[row.name] = None
+        except Exception as e:
+            frappe.db.rollback()
+            outcomes[row.name] = str(e) or repr(e)
+    return outcomes
+
+
+def send_rows_in_thread(site, sites_path, user, rows):
+    """Worker thread entry point: a site context and DB connection of its own."""
+    frappe.init(site=site, sites_path=sites_path)
+    try:
+        frappe.connect()
+        frappe.set_user(user)
+        return send_rows(rows)
+    except Exception as e:
+        return {row.name: str(e) or repr(e) for row in rows}
+    finally:
+        frappe.destroy()
+
+
+def send_batch(rows, workers=None):
+    workers = min(workers or get_worker_count(), len(rows))
+    if workers <= 1:
+        return send_rows(rows)
+
+    site, sites_path, user = frappe.local.site, frappe.local.sites_path, frappe.session.user
+    chunks = [rows[i::workers] for i in range(workers)]
+    outcomes = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for result in pool.map(lambda chunk: send_rows_in_thread(site, sites_path, user, chunk), chunks):
+            outcomes.update(result)
+    return outcomes
+
+
+def record_outcomes(outcomes):
+    """Write Sent / Failed, sent_on and error_message for a whole batch in one UPDATE."""
+    if not outcomes:
+        return
+
+    values = {
+        "now": now_datetime(),
+        "names": tuple(outcomes),
+        "sent": tuple(name for name, error in outcomes.items() if not error) or ("",),
+    }
+    error_cases = []
+    for i, (name, error) in enumerate((n, e) for n, e in outcomes.items() if e):
+        error_cases.append(f"WHEN %(name_{i})s THEN %(error_{i})s")
+        values[f"name_{i}"] = name
+        values[f"error_{i}"] = error[:ERROR_MESSAGE_LENGTH]
+    error_expr = f"CASE name {' '.join(error_cases)} ELSE NULL END" if error_cases else "NULL"
+
+    frappe.db.sql(f"""
+        UPDATE `tabChat Message Queue`
+        SET status = IF(name IN %(sent)s, 'Sent', 'Failed'),
+            sent_on = IF(name IN %(sent)s, %(now)s, NULL),
+            error_message = {error_expr},
+            modified = %(now)s
+        WHERE name IN %(names)s
+    """, values)
+    frappe.db.commit()
+
+
+# --------------------------------------------------------------------
+# RUN
+# --------------------------------------------------------------------
+
+def process_queue():
+    """Claim and send batches until no Pending rows are left."""
+    release_expired_leases()
+
+    sent = failed = 0
+    while True:
+        rows = claim_batch()
+        if not rows:
+            break
+
+        ready, outcomes = prepare_batch(rows)
+        if ready:
+            outcomes.update(send_batch(ready))
+        record_outcomes(outcomes)
+
+        batch_failed = sum(1 for error in outcomes.values() if error)
+        sent += len(outcomes) - batch_failed
+        failed += batch_failed
+
+    if sent or failed:
+        logger.info(f"[CHAT BROADCAST] sent={sent} failed={failed}")
+    return {"sent": sent, "failed": failed}
@@ -0,0 +1,241 @@
+import json
+from contextlib import contextmanager
+
+import frappe
+from frappe import _
+from frappe.utils import flt
+
+# Collection doctype -> the document whose paid/balance columns it maintains
+COLLECTION_TARGETS = {
+    "Invoice Collection": {
+        "parent_doctype": "Invoice",
+        "link_field": "invoice",
+        "paid_field": "received_amount",
+    },
+    "Purchase Collection": {
+        "parent_doctype": "Purchase",
+        "link_field": "purchase",
+        "paid_field": "paid_amount",
+    },
+}
+
+
+def lock_parent(parent_doctype, parent_name, paid_field):
+    """
+    Row-lock the Invoice/Purchase for the rest of the transaction and return its
+    grand_total and stored paid amount. Concurrent collections on the same parent
+    wait here until the first transaction commits.
+    """
+    row = frappe.db.sql(f"""
+        SELECT grand_total, `{paid_field}` AS paid
+        FROM `tab{parent_doctype}`
+        WHERE name = %s
+        FOR UPDATE
+    """, (parent_name,), as_dict=True)
+    return row[0] if row else None
+
+
+def _pending_deltas():
+    """Deltas collected inside `deferred_balance_updates`, or None when applying immediately."""
+    return frappe.flags.get("collection_balance_deltas")
+
+
+def apply_balance_delta(collection_doctype, parent_name, delta):
+    """Add `delta` to the parent's paid amount and recompute its balance in place."""
+    if not parent_name or not flt(delta):
+        return
+
+    pending = _pending_deltas()
+    if pending is not None:
+        key = (collection_doctype, parent_name)
+        pending[key] = flt(pending.get(key)) + flt(delta)
+        return
+
+    target = COLLECTION_TARGETS[collection_doctype]
+    parent = lock_parent(target["parent_doctype"], parent_name, target["paid_field"])
+    if not parent:
+        return
+
+    paid = flt(parent.paid) + flt(delta)
+    balance = flt(parent.grand_total) - paid
+    if balance < 0:
+        balance = 0
+
+    frappe.db.set_value(target["parent_doctype"], parent_name, {
+        target["paid_field"]: paid,
+        "balance_amount": balance
+    }, update_modified=False)
+
+
+def get_collection_deltas(doc, method=None):
+    """
+    Return [(parent_name, delta)] describing how this insert/update/trash moves the
+    parent's paid amount. Moving a collection to another parent yields two deltas.
+    """
+    link_field = COLLECTION_TARGETS[doc.doctype]["link_field"]
+    parent_name = doc.get(link_field)
+    amount = flt(doc.amount_collected)
+
+    if method == "on_trash":
+        return [(parent_name, -amount)]
+
+    before = doc.get_doc_before_save()
+    if not before:
+        return [(parent_name, amount)]
+
+    old_parent = before.get(link_field)
+    old_amount = flt(before.amount_collected)
+    if old_parent == parent_name:
+        return [(parent_name, amount - old_amount)]
+    return [(old_parent, -old_amount), (parent_name, amount)]
+
+
+def update_parent_balance(doc, method=None):
+    """doc_events handler for Invoice/Purchase Collection on_update and on_trash."""
+    for parent_name, delta in get_collection_deltas(doc, method):
+        apply_balance_delta(doc.doctype, parent_name, delta)
+
+
+def validate_collection_amount(doc, method=None):
+    """
+    Prevent a collection from exceeding its parent's grand_total, using the stored
+    paid amount (under row lock) instead of re-summing every collection.
+    """
+    target = COLLECTION_TARGETS[doc.doctype]
+    parent_name = doc.get(target["link_field"])
+    if not parent_name:
+        return
+
+    parent = lock_parent(target["parent_doctype"], parent_name, target["paid_field"])
+    if not parent:
+        return
+
+    already_collected = flt(parent.paid)
+    pending = _pending_deltas()
+    if pending:
+        already_collected += flt(pending.get((doc.doctype, parent_name)))
+
+    # The stored amount already contains this collection's previous value
+    before = doc.get_doc_before_save() if not doc.is_new() else None
+    if before and before.get(target["link_field"]) == parent_name:
+        already_collected -= flt(before.amount_collected)
+
+    grand_total = flt(parent.grand_total)
+    if flt(already_collected) + flt(doc.amount_collected) > grand_total:
+        frappe.throw(
+            f"Collection exceeds {target['parent_doctype']} Amount.<br><br>"
+            f"Grand Total: {grand_total}<br>"
+            f"Already Collected: {already_collected}<br>"
+            f"Trying to Add: {doc.amount_collected}<br><br>"
+            f"Remaining Balance: {grand_total - already_collected}"
+        )
+
+
+@contextmanager
+def deferred_balance_updates():
+    """
+    Collect balance deltas for every collection written inside the block and apply
+    them once per parent on exit, so a batch of hundreds of rows updates each
+    Invoice/Purchase a single time.
+    """
+    if _pending_deltas() is not None:
+        # Already batching; the outermost block flushes
+        yield
+        return
+
+    frappe.flags.collection_balance_deltas = {}
+    try:
+        yield
+        pending = frappe.flags.collection_balance_deltas
+    finally:
+        frappe.flags.collection_balance_deltas = None
+
+    # Lock parents in a stable order to avoid deadlocks between concurrent batches
+    for (collection_doctype, parent_name), delta in sorted(pending.items()):
+        apply_balance_delta(collection_doctype, parent_name, delta)
+
+
+@frappe.whitelist()
+def insert_collections(doctype, collections):
+    """
+    Batch API for imports: insert many Invoice/Purchase Collections and update each
+    parent's balance once. Returns per-row results; failed rows are rolled back
+    individually and do not affect the rest of the batch.
+    """
+    if doctype not in COLLECTION_TARGETS:
+        frappe.throw(_("Unsupported collection doctype: {0}").format(doctype))
+    frappe.has_permission(doctype, "create", throw=True)
+
+    if isinstance(collections, str):
+        collections = json.loads(collections)
+
+    results = []
+    with deferred_balance_updates():
+        for idx, row in enumerate(collections, 1):
+            frappe.db.savepoint("collection_row")
+            pending_snapshot = dict(_pending_deltas())
+            try:
+                doc = frappe.get_doc({**row, "doctype": doctype})
+                doc.insert()
+                results.append({"row": idx, "status": "success", "name": doc.name})
+            except Exception as e:
+                frappe.db.rollback(save_point="collection_row")
+                frappe.flags.collection_balance_deltas = pending_snapshot
+                results.append({"row": idx, "status": "error", "message": str(e)})
+
+    return results
+
+
+@frappe.whitelist()
+def reconcile_collection_balances(doctype=None, names=None):
+    """
+    Drift repair: recompute paid/balance amounts from the collection rows with one
+    grouped query per parent doctype and fix only the records that disagree.
+    `doctype` limits the run to "Invoice" or "Purchase"; `names` to specific records.
+
+    bench --site <site> execute company.company.collection_balance.reconcile_collection_balances
+    """
+    frappe.only_for("System Manager")
+
+    if isinstance(names, str):
+        names = json.loads(names) if names.startswith("[") else [names]
+
+    fixed = {}
+    for collection_doctype, target in COLLECTION_TARGETS.items():
+        parent_doctype = target["parent_doctype"]
+        if doctype and doctype != parent_doctype:
+            continue
+
+        conditions = ""
+        values = {}
+        if names:
+            conditions = "WHERE p.name IN %(names)s"
+            values["names"] = tuple(names)
+
+        drifted = frappe.db.sql(f"""
+            SELECT p.name, p.grand_total, p.`{target['paid_field']}` AS paid,
+                p.balance_amount, IFNULL(c.total, 0) AS total
+            FROM `tab{parent_doctype}` p
+            LEFT JOIN (
+                SELECT `{target['link_field']}` AS parent_name, SUM(amount_collected) AS total
+                FROM `tab{collection_doctype}`
+                GROUP BY `{target['link_field']}`
+            ) c ON c.parent_name = p.name
+            {conditions}
+        """, values, as_dict=True)
+
+        count = 0
+        for row in drifted:
+            total = flt(row.total, 2)
+            balance = max(flt(row.grand_total, 2) - total, 0)
+            if flt(row.paid, 2) == total and flt(row.balance_amount, 2) == balance:
+                continue
+            frappe.db.set_value(parent_doctype, row.name, {
+                target["paid_field"]: total,
+                "balance_amount": balance
+            }, update_modified=False)
+            count += 1
+        fixed[parent_doctype] = count
+
+    frappe.db.commit()
+    return fixed
@@ -2,131 +2,18 @@ import frappe
 from frappe.utils import get_datetime, add_days
 from frappe.utils import strip_html
 from frappe.utils import get_datetime, now_datetime
+from company.company.event_sync import sync_record_to_event
+from company.company.bulk_conversion import convert_lead_row, insert_contact_links, prefetch_lead_lookups
 
 @frappe.whitelist()
 def convert_lead(lead_name):
     lead = frappe.get_doc("Lead", lead_name)
-    messages = []
 
-    # ----------------------------------------------------
-    # 0️⃣ VALIDATIONS
-    # ----------------------------------------------------
-
-    if not lead.company_name:
-        frappe.throw("Company Name is required to create a Company")
-
-    if not (lead.email or lead.phone_number):
-        frappe.throw("Email or Phone is required to create a Contact")
-
-    # ----------------------------------------------------
-    # 1️⃣ ACCOUNT (Accounts) — Create or reuse
-    # ----------------------------------------------------
-    account_name = frappe.db.get_value(
-        "Accounts",
-        {"account_name": lead.company_name},
-        "name"
-    )
-
-    if account_name:
-        messages.append({
-            "type": "warning",
-            "text": f"Company already exists: {account_name}"
-        })
-    else:
-        account = frappe.new_doc("Accounts")
-        account.account_name = lead.company_name
-        account.phone_number = lead.phone_number
-        account.gstin = lead.gstin
-        account.country = lead.country
-        account.state = lead.state
-        account.city = lead.city
-        account.insert()
-
-        account_name = account.name
-        messages.append({
-            "type": "success",
-            "text": f"New Company created: {account_name}"
-        })
-
-    # ----------------------------------------------------
-    # 2️⃣ CONTACT (Contacts) — Create or reuse
-    # ----------------------------------------------------
-    existing_contacts = frappe.get_all(
-        "Contacts",
-        or_filters=[
-            ["email", "=", lead.email] if lead.email else ["name", "=", ""],
-            ["phone", "=", lead.phone_number] if lead.phone_number else ["name", "=", ""],
-        ],
-        fields=["name"],
-        limit=1
-    )
-
-    if existing_contacts:
-        contact_name = existing_contacts[0].name
-        messages.append({
-            "type": "warning",
-            "text": f"Contact already exists: {contact_name}"
-        })
-    else:
-        contact_doc = frappe.new_doc("Contacts")
-        contact_doc.first_name = lead.lead_name
-        contact_doc.email = lead.email
-        contact_doc.phone = lead.phone_number
-        contact_doc.country = lead.country
-        contact_doc.state = lead.state
-        contact_doc.city = lead.city
-        contact_doc.address = lead.billing_address
-        contact_doc.source_lead = lead.name
-        # Link the account via the Contact Company child table
-        contact_doc.append("company_name", {
-            "doctype": "Contact Company",
-            "company_name": account_name
-        })
-        contact_doc.insert()
-
-        contact_name = contact_doc.name
-        messages.append({
-            "type": "success",
-            "text": f"New Contact created: {contact_name}"
-        })
-
-    # ----------------------------------------------------
-    # 3️⃣ ENSURE COMPANY LINK — If contact already existed, add company if not linked
-    # ----------------------------------------------------
-    already_linked = frappe.db.exists(
-        "Contact Company",
-        {"parent": contact_name, "parenttype": "Contacts", "company_name": account_name}
-    )
-
-    if existing_contacts and not already_linked:
-        frappe.get_doc("Contacts", contact_name).append("company_name", {
-            "doctype": "Contact Company",
-            "company_name": account_name
-        })
-        # Use db.insert for child table to avoid full doc save overhead
-        child = frappe.new_doc("Contact Company")
-        child.parenttype = "Contacts"
-        child.parentfield = "company_name"
-        child.parent = contact_name
-        child.company_name = account_name
-        child.insert()
-        messages.append({
-            "type": "success",
-            "text": f"Linked existing contact to company: {account_name}"
-        })
-
-    # ----------------------------------------------------
-    # 4️⃣ UPDATE LEAD STATUS
-    # ----------------------------------------------------
-    lead.db_set("status", "Converted")
-    lead.db_set("converted_account", account_name)
-    lead.db_set("converted_contact", contact_name)
-
-    return {
-        "account": account_name,
-        "contact": contact_name,
-        "messages": messages
-    }
+    # Same conversion as the bulk API, with the lookups done for this one lead
+    pending_links = []
+    result = convert_lead_row(lead, prefetch_lead_lookups([lead]), pending_links)
+    insert_contact_links(pending_links)
+    return result
 
 
 @frappe.whitelist()
@@ -366,105 +253,6 @@ def get_events_with_category(start, end, filters=None):
     return events
 
 
-def sync_event_to_call(doc, method):
-    """Sync Event changes back to Calls (bi-directional sync)."""
-
-    # Avoid infinite loop
-    if frappe.flags.get("ignore_event_sync"):
-        return
-
-    # Only sync when event is linked to Calls
-    if doc.reference_doctype != "Calls" or not doc.reference_docname:
-        return
-
-    call = frappe.get_doc("Calls", doc.reference_docname)
-
-    # Title (subject before '- hh:mm')
-    if doc.subject:
-        call.title = doc.subject.split("-")[0].strip()
-
-    # Time
-    call.call_start_time = doc.starts_on
-    call.call_end_time = doc.ends_on
-
-    # Status
-    call.outgoing_call_status = "Completed" if doc.status == "Completed" else "Scheduled"
-
-    # Prevent loop
-    frappe.flags.ignore_call_sync = True
-
-    call.save(ignore_permissions=True)
-
-
-
-def sync_event_to_meeting(doc, method):
-    """Sync Event changes back to Meeting (bi-directional sync)."""
-
-    # Avoid infinite loop
-    if frappe.flags.get("ignore_meeting_sync"):
-        return
-
-    # Only sync when event is linked to Meeting
-    if doc.reference_doctype != "Meeting" or not doc.reference_docname:
-        return
-
-    meeting = frappe.get_doc("Meeting", doc.reference_docname)
-
-    # Title (subject before '- hh:mm')
-    if doc.subject:
-        meeting.title = doc.subject.split("-")[0].strip()
-
-    # Time — MUST use update() because 'from' is a Python keyword
-    meeting.update({
-        "from": doc.starts_on,
-        "to": doc.ends_on
-    })
-
-    # Status
-    meeting.outgoing_call_status = (
-        "Completed" if doc.status == "Completed" else "Scheduled"
-    )
-
-    # Prevent loop
-    frappe.flags.ignore_meeting_sync = True
-    meeting.save(ignore_permissions=True)
-    frappe.flags.ignore_meeting_sync = False
-
-
-def sync_event_to_todo(doc, method):    
-    """Sync Event changes back to ToDo (bi-directional sync)."""
-
-    # Avoid infinite loop
-    if frappe.flags.get("ignore_todo_sync"):
-        return
-
-    # Only sync when event is linked to ToDo
-    if doc.reference_doctype != "ToDo" or not doc.reference_docname:
-        return
-
-    todo = frappe.get_doc("ToDo", doc.reference_docname)
-
-    # Title (subject before '- hh:mm')
-    if doc.subject:
-        todo.description = doc.subject.split("-")[0].strip()
-
-    todo.update({
-        "date": doc.starts_on,
-    })
-
-    todo.priority = doc.priority
-    # Status
-    todo.status = (
-        "Closed" if doc.status == "Closed" else "Open"
-    )   
-
-    # Prevent loop
-    frappe.flags.ignore_todo_sync = True
-    todo.save(ignore_permissions=True)
-    frappe.flags.ignore_todo_sync = False
-
-
-
 def validate_event(doc, method=None):
     """
     Calendar validation for Calls, Meetings, and ToDo
@@ -534,7 +322,7 @@ def _validate_call_event(doc):
 # MEETING VALIDATION (FIXED)
 # ------------------------------------------------
 def _validate_meeting_event(doc):
-    meeting = frappe.get_doc("Meeting", doc.reference_docname)
+    meeting_status = frappe.db.get_value("Meeting", doc.reference_docname, "outgoing_call_status")
 
     if not doc.starts_on:
         frappe.throw("Meeting start time is required.")
@@ -543,12 +331,12 @@ def _validate_meeting_event(doc):
     now_dt = now_datetime()
 
     # Scheduled → future only
-    if meeting.outgoing_call_status == "Scheduled":
+    if meeting_status == "Scheduled":
         if start_dt < now_dt:
             frappe.throw("Scheduled Meeting cannot be in the past.")
 
     # Completed → past only
-    elif meeting.outgoing_call_status == "Completed":
+    elif meeting_status == "Completed":
         if start_dt > now_dt:
             frappe.throw("Completed Meeting cannot be in the future.")
 
@@ -558,7 +346,7 @@ def _validate_meeting_event(doc):
 # ------------------------------------------------
 def _validate_todo_event(doc):
 
-    todo = frappe.get_doc("ToDo", doc.reference_docname)
+    todo_status = frappe.db.get_value("ToDo", doc.reference_docname, "status")
 
     if not doc.starts_on:
         frappe.throw("ToDo due date is required.")
@@ -570,7 +358,7 @@ def _validate_todo_event(doc):
     # -------------------------
     # OPEN TODO
     # -------------------------
-    if todo.status == "Open":
+    if todo_status == "Open":
         # ❌ Yesterday or earlier
         if start_date < today:
             frappe.throw("Open ToDo cannot have a past due date.")
@@ -578,7 +366,7 @@ def _validate_todo_event(doc):
     # -------------------------
     # CLOSED TODO
     # -------------------------
-    elif todo.status == "Closed":
+    elif todo_status == "Closed":
         # ❌ Future dates
         if start_date > today:
             frappe.throw("Completed ToDo cannot be in the future.")
@@ -656,62 +444,12 @@ def force_delete_doc(doctype, name):
 
 def create_event_for_todo(doc, method=None):
     """Create Event when ToDo is created."""
-    if frappe.flags.get("ignore_todo_sync"):
-        return
-
-    # Check if event already exists
-    if frappe.db.exists("Event", {"reference_doctype": "ToDo", "reference_docname": doc.name}):
-        return
-
-    event = frappe.new_doc("Event")
-    event.subject = doc.description or "Todo Tasks"
-    event.event_category = "Todo"
-    event.event_type = "Private"
-    
-    date_str = doc.date or doc.creation
-    if date_str:
-        event.starts_on = f"{date_str} 00:00:00" if len(str(date_str)) <= 10 else str(date_str)
-        event.ends_on = event.starts_on
-    else:
-        event.starts_on = frappe.utils.now_datetime()
-        event.ends_on = event.starts_on
-
-    event.status = "Closed" if doc.status == "Closed" else "Open"
-    event.all_day = 1
-    event.reference_doctype = "ToDo"
-    event.reference_docname = doc.name
-
-    frappe.flags.ignore_todo_sync = True
-    event.insert(ignore_permissions=True)
-    frappe.flags.ignore_todo_sync = False
-    frappe.db.commit()
+    sync_record_to_event(doc)
 
 
 def update_event_for_todo(doc, method=None):
-    """Update Event when ToDo is updated."""
-    if frappe.flags.get("ignore_todo_sync"):
-        return
-
-    event_name = frappe.db.get_value("Event", {"reference_doctype": "ToDo", "reference_docname": doc.name}, "name")
-    
-    if not event_name:
-        create_event_for_todo(doc)
-        return
-
-    event = frappe.get_doc("Event", event_name)
-    event.subject = doc.description or "Todo Tasks"
-    
-    date_str = doc.date or doc.creation
-    if date_str:
-        event.starts_on = f"{date_str} 00:00:00" if len(str(date_str)) <= 10 else str(date_str)
-        event.ends_on = event.starts_on
-
-    event.status = "Closed" if doc.status == "Closed" else "Open"
-    
-    frappe.flags.ignore_todo_sync = True
-    event.save(ignore_permissions=True)
-    frappe.flags.ignore_todo_sync = False
-    frappe.db.commit()
+    """Update Event when ToDo is updated (changed fields only)."""
+    sync_record_to_event(doc)
 
 
 def delete_event_for_todo(doc, method=None):
@@ -1125,11 +863,7 @@ def get_purchase_settlement_export_fields():
     return valid_fields
 
 
-import hashlib
-
-def _make_file_token(file_id):
-    secret = frappe.local.conf.get("encryption_key") or frappe.local.site
-    return hashlib.sha256(f"{file_id}-{secret}".encode()).hexdigest()[:32]
+from company.company.file_streaming import download_signed_file, make_file_token as _make_file_token
 
 
 @frappe.whitelist()
@@ -1156,50 +890,15 @@ def get_proposal_attachments(proposal_ids):
 
 @frappe.whitelist(allow_guest=True)
 def download_proposal_attachment(file_id, token):
-    """Downloads a proposal attachment file using a valid signed token, bypassing permission checks."""
-    if not file_id or not token:
-        frappe.respond_as_web_page("Invalid request", "Missing file ID or token.", http_status_code=400)
-        return
+    """Streams a proposal attachment file using a valid signed token, bypassing permission checks."""
+    def resolve_url():
+        # Fetch file details without calling get_doc
+        file_details = frappe.db.get_value("Proposal Attachment", {"name": file_id}, ["file_name", "attachment"], as_dict=True)
+        if not file_details:
+            return None, None
+        return file_details.attachment, file_details.file_name
 
-    expected_token = _make_file_token(file_id)
-    if token != expected_token:
-        frappe.throw("Invalid or expired link", frappe.PermissionError)
-
-    # Fetch file details without calling get_doc
-    file_details = frappe.db.get_value("Proposal Attachment", {"name": file_id}, ["file_name", "attachment"], as_dict=True)
-    if not file_details or not file_details.attachment:
-        frappe.respond_as_web_page("Not Found", "The requested file could not be found.", http_status_code=404)
-        return
-
-    file_url = file_details.attachment
-
-    import os
-    site_path = frappe.get_site_path()
-    
-    if file_url.startswith("/private/"):
-        relative_path = file_url.lstrip("/")
-    elif file_url.startswith("/files/"):
-        relative_path = os.path.join("public", file_url.lstrip("/"))
-    else:
-        relative_path = file_url.lstrip("/")
-
-    file_path = os.path.abspath(os.path.join(site_path, relative_path))
-
-    # Security check: Ensure file path is within site path to prevent path traversal
-    if not file_path.startswith(os.path.abspath(site_path)):
-        frappe.throw("Access denied", frappe.PermissionError)
-
-    if not os.path.exists(file_path):
-        frappe.respond_as_web_page("File Not Found", "The file could not be found on disk.", http_status_code=404)
-        return
-
-    # Read and return the file
-    with open(file_path, "rb") as f:
-        file_content = f.read()
-
-    frappe.local.response.filename = file_details.file_name or os.path.basename(file_path)
-    frappe.local.response.filecontent = file_content
-    frappe.local.response.type = "download"
+    return download_signed_file("proposal", file_id, token, resolve_url)
 
 
 @frappe.whitelist()
@@ -1314,42 +1013,8 @@ def get_estimation_export_data(filters=None):
 
 @frappe.whitelist(allow_guest=True)
 def download_estimation_attachment(file_path, token):
-    """Downloads an estimation attachment file using a valid signed token, bypassing permission checks."""
-    if not file_path or not token:
-        frappe.respond_as_web_page("Invalid request", "Missing file path or token.", http_status_code=400)
-        return
-
-    expected_token = _make_file_token(file_path)
-    if token != expected_token:
-        frappe.throw("Invalid or expired link", frappe.PermissionError)
-
-    import os
-    site_path = frappe.get_site_path()
-    
-    if file_path.startswith("/private/"):
-        relative_path = file_path.lstrip("/")
-    elif file_path.startswith("/files/"):
-        relative_path = os.path.join("public", file_path.lstrip("/"))
-    else:
-        relative_path = file_path.lstrip("/")
-
-    file_path_on_disk = os.path.abspath(os.path.join(site_path, relative_path))
-
-    # Security check: Ensure file path is within site path to prevent path traversal
-    if not file_path_on_disk.startswith(os.path.abspath(site_path)):
-        frappe.throw("Access denied", frappe.PermissionError)
-
-    if not os.path.exists(file_path_on_disk):
-        frappe.respond_as_web_page("File Not Found", "The file could not be found on disk.", http_status_code=404)
-        return
-
-    # Read and return the file
-    with open(file_path_on_disk, "rb") as f:
-        file_content = f.read()
-
-    frappe.local.response.filename = os.path.basename(file_path_on_disk)
-    frappe.local.response.filecontent = file_content
-    frappe.local.response.type = "download"
+    """Streams an estimation attachment file using a valid signed token, bypassing permission checks."""
+    return download_signed_file("estimation", file_path, token, lambda: (file_path, None))
 
 
 @frappe.whitelist()
@@ -1429,42 +1094,8 @@ def get_invoice_export_data(filters=None):
 
 @frappe.whitelist(allow_guest=True)
 def download_invoice_attachment(file_path, token):
-    """Downloads an invoice attachment file using a valid signed token, bypassing permission checks."""
-    if not file_path or not token:
-        frappe.respond_as_web_page("Invalid request", "Missing file path or token.", http_status_code=400)
-        return
-
-    expected_token = _make_file_token(file_path)
-    if token != expected_token:
-        frappe.throw("Invalid or expired link", frappe.PermissionError)
-
-    import os
-    site_path = frappe.get_site_path()
-    
-    if file_path.startswith("/private/"):
-        relative_path = file_path.lstrip("/")
-    elif file_path.startswith("/files/"):
-        relative_path = os.path.join("public", file_path.lstrip("/"))
-    else:
-        relative_path = file_path.lstrip("/")
-
-    file_path_on_disk = os.path.abspath(os.path.join(site_path, relative_path))
-
-    # Security check: Ensure file path is within site path to prevent path traversal
-    if not file_path_on_disk.startswith(os.path.abspath(site_path)):
-        frappe.throw("Access denied", frappe.PermissionError)
-
-    if not os.path.exists(file_path_on_disk):
-        frappe.respond_as_web_page("File Not Found", "The file could not be found on disk.", http_status_code=404)
-        return
-
-    # Read and return the file
-    with open(file_path_on_disk, "rb") as f:
-        file_content = f.read()
-
-    frappe.local.response.filename = os.path.basename(file_path_on_disk)
-    frappe.local.response.filecontent = file_content
-    frappe.local.response.type = "download"
+    """Streams an invoice attachment file using a valid signed token, bypassing permission checks."""
+    return download_signed_file("invoice", file_path, token, lambda: (file_path, None))
 
 
 
@@ -1589,40 +1220,6 @@ def get_purchase_export_data(filters=None):
 
 @frappe.whitelist(allow_guest=True)
 def download_purchase_attachment(file_path, token):
-    """Downloads a purchase attachment file using a valid signed token, bypassing permission checks."""
-    if not file_path or not token:
-        frappe.respond_as_web_page("Invalid request", "Missing file path or token.", http_status_code=400)
-        return
-
-    expected_token = _make_file_token(file_path)
-    if token != expected_token:
-        frappe.throw("Invalid or expired link", frappe.PermissionError)
-
-    import os
-    site_path = frappe.get_site_path()
-    
-    if file_path.startswith("/private/"):
-        relative_path = file_path.lstrip("/")
-    elif file_path.startswith("/files/"):
-        relative_path = os.path.join("public", file_path.lstrip("/"))
-    else:
-        relative_path = file_path.lstrip("/")
-
-    file_path_on_disk = os.path.abspath(os.path.join(site_path, relative_path))
-
-    # Security check: Ensure file path is within site path to prevent path traversal
-    if not file_path_on_disk.startswith(os.path.abspath(site_path)):
-        frappe.throw("Access denied", frappe.PermissionError)
-
-    if not os.path.exists(file_path_on_disk):
-        frappe.respond_as_web_page("File Not Found", "The file could not be found on disk.", http_status_code=404)
-        return
-
-    # Read and return the file
-    with open(file_path_on_disk, "rb") as f:
-        file_content = f.read()
-
-    frappe.local.response.filename = os.path.basename(file_path_on_disk)
-    frappe.local.response.filecontent = file_content
-    frappe.local.response.type = "download"
+    """Streams a purchase attachment file using a valid signed token, bypassing permission checks."""
+    return download_signed_file("purchase", file_path, token, lambda: (file_path, None))
 
@@ -10,6 +10,8 @@ import requests
 from datetime import datetime
 from frappe import _
 
+from company.company.phone_index import find_lead_by_phone
+
 # Set logger
 def get_logger():
     return frappe.logger("crm_meta_api")
@@ -518,26 +520,8 @@ def process_meta_lead_job(meta_lead_name, queue_job_name):
             if not duplicate_lead and phone and limit_by in ("Email or Phone", "Phone Only"):
                 clean_phone = "".join(filter(str.isdigit, phone))
                 if len(clean_phone) >= 10:
-                    last_10_digits = clean_phone[-10:]
-                    
-                    # Check parent field
-                    duplicate_lead = frappe.db.sql("""
-                        SELECT name FROM `tabLead`
-                        WHERE RIGHT(REPLACE(REPLACE(REPLACE(phone_number, ' ', ''), '-', ''), '+', ''), 10) = %s
-                        LIMIT 1
-                    """, (last_10_digits,), as_dict=False)
-                    
-                    if duplicate_lead:
-                        duplicate_lead = duplicate_lead[0][0]
-                    else:
-                        # Check child table
-                        duplicate_lead = frappe.db.sql("""
-                            SELECT lp.parent FROM `tabLead Phone` lp
-                            WHERE RIGHT(REPLACE(REPLACE(REPLACE(lp.phone, ' ', ''), '-', ''), '+', ''), 10) = %s
-                            LIMIT 1
-                        """, (last_10_digits,), as_dict=False)
-                        if duplicate_lead:
-                            duplicate_lead = duplicate_lead[0][0]
+                    # Main number and Lead Phone rows, via the indexed phone_key
+                    duplicate_lead = find_lead_by_phone(clean_phone)
                             
         if duplicate_lead:
             # Raise exception to fail processing and log duplicate
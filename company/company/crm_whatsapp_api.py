@@ -4,23 +4,29 @@ from frappe.utils import now_datetime
 from datetime import timedelta
 import secrets
 
+from company.company.file_streaming import (
+    DownloadNotFound,
+    get_cached_download,
+    get_site_file_path,
+    respond_not_found,
+    stream_file,
+)
+from company.company.phone_index import find_conversation_by_phone, find_lead_by_phone
+from company.company.whatsapp_sender import (
+    WhatsAppSender,
+    clean_phone_number,
+    get_monthly_sent_count,
+    release_monthly_quota,
+    reserve_monthly_quota,
+)
+
 # --------------------------------------------------------------------
 # TEST CONNECTION
 # --------------------------------------------------------------------
 
 @frappe.whitelist(allow_guest=False)
 def get_monthly_message_count():
-    from frappe.utils import get_first_day, today
-    start_of_month = get_first_day(today())
-    count = frappe.db.count(
-        "CRM WhatsApp Message",
-        filters={
-            "creation": [">=", start_of_month],
-            "message_direction": "Outgoing",
-            "status": "Sent"
-        }
-    )
-    return count
+    return get_monthly_sent_count()
 
 
 @frappe.whitelist()
@@ -100,30 +106,50 @@ def get_temporary_file_url(file_doc):
 @frappe.whitelist(allow_guest=True)
 def download_file(token):
 
-    file_name = frappe.cache().get_value(
-        f"wa_file:{token}"
-    )
+    link_key = f"wa_file:{token}"
 
-    if not file_name:
-        frappe.throw(
-            "Link expired",
-            frappe.PermissionError
-        )
+    def resolve():
+        file_name = frappe.cache().get_value(link_key)
 
-    file_doc = frappe.get_doc(
-        "File",
-        file_name
-    )
+        if not file_name:
+            frappe.throw(
+                "Link expired",
+                frappe.PermissionError
+            )
 
-    frappe.local.response.filename = (
-        file_doc.file_name
-    )
+        file_url, download_name = frappe.db.get_value(
+            "File",
+            file_name,
+            ["file_url", "file_name"]
+        ) or (None, None)
+
+        if not file_url:
+            raise DownloadNotFound
+
+        return {
+            "path": get_site_file_path(file_url),
+            "filename": download_name
+        }
 
-    frappe.local.response.filecontent = (
-        file_doc.get_content()
+    # The resolved file is cached only for the rest of the link's lifetime
+    remaining = frappe.cache().ttl(
+        frappe.cache().make_key(link_key)
     )
 
-    frappe.local.response.type = "download"
+    try:
+        target = get_cached_download(
+            f"wa_file:{token}",
+            resolve,
+            remaining
+        )
+    except DownloadNotFound:
+        respond_not_found()
+        return
+
+    return stream_file(
+        target["path"],
+        target["filename"]
+    )
 
 
 # --------------------------------------------------------------------
@@ -133,12 +159,12 @@ def download_file(token):
 @frappe.whitelist()
 def send_whatsapp(phone, message=None, attachment=None):
 
-    settings = frappe.get_single(
-        "CRM WhatsApp Settings"
-    )
+    reserved = False
 
     try:
-        clean_phone = "".join(filter(str.isdigit, str(phone)))
+        sender = WhatsAppSender()
+
+        clean_phone = clean_phone_number(phone)
         if not clean_phone:
             return {
                 "success": False,
@@ -146,359 +172,207 @@ def send_whatsapp(phone, message=None, attachment=None):
             }
 
         # Check max success send message limit
-        limit = settings.max_success_send_message_limit or 0
-        if limit > 0:
-            count = get_monthly_message_count()
-            if count >= limit:
-                return {
-                    "success": False,
-                    "error": f"Max success send message limit of {limit} reached."
-                }
-
-        url = (
-            f"https://graph.facebook.com/v23.0/"
-            f"{settings.phone_number_id}/messages"
-        )
-
-        headers = {
-            "Authorization":
-                f"Bearer {settings.get_password('access_token')}",
-            "Content-Type":
-                "application/json"
-        }
-
-        payload = None
-        message_type = "Text"
-
-        # ----------------------------------------------------
-        # ATTACHMENT MESSAGE
-        # ----------------------------------------------------
-
-        if attachment:
-
-            file_doc = frappe.get_doc(
-                "File",
-                {
-                    "file_url": attachment
-                }
-            )
-
-            if file_doc.is_private:
-                file_url = get_temporary_file_url(
-                    file_doc
-                )
-            else:
-                import urllib.parse
-                file_url = frappe.utils.get_url(
-                    urllib.parse.quote(file_doc.file_url, safe='/')
-                )
-
-            extension = (
-                file_doc.file_name.split(".")[-1]
-                .lower()
-            )
-
-            image_extensions = [
-                "jpg",
-                "jpeg",
-                "png",
-                "gif",
-                "webp"
-            ]
-
-            if extension in image_extensions:
-
-                payload = {
-                    "messaging_product": "whatsapp",
-                    "to": clean_phone,
-                    "type": "image",
-                    "image": {
-                        "link": file_url,
-                        "caption": message or ""
-                    }
-                }
-
-                message_type = "Image"
-
-            else:
-
-                payload = {
-                    "messaging_product": "whatsapp",
-                    "to": clean_phone,
-                    "type": "document",
-                    "document": {
-                        "link": file_url,
-                        "filename": file_doc.file_name
-                    }
-                }
-
-                message_type = "Document"
-
-        # ----------------------------------------------------
-        # TEXT MESSAGE
-        # ----------------------------------------------------
-
-        else:
-
-            payload = {
-                "messaging_product": "whatsapp",
-                "to": clean_phone,
-                "type": "text",
-                "text": {
-                    "body": message or ""
-                }
+        limit = sender.monthly_limit
+        if not reserve_monthly_quota(limit):
+            return {
+                "success": False,
+                "error": f"Max success send message limit of {limit} reached."
             }
+        reserved = True
 
-        # ----------------------------------------------------
-        # SEND TEXT FIRST + DOCUMENT SECOND
-        # ----------------------------------------------------
-
-        meta_message_id = ""
-        result = {}
+        prepared = sender.prepare(
+            clean_phone,
+            message=message,
+            attachment=attachment
+        )
 
-        if (
-            attachment
-            and message
-            and message_type == "Document"
-        ):
+        success, result = sender.post(prepared)
 
-            # Send text first
+        frappe.logger().info(
+            f"WhatsApp {prepared.message_type} Response: {result}"
+        )
 
-            text_payload = {
-                "messaging_product": "whatsapp",
-                "to": clean_phone,
-                "type": "text",
-                "text": {
-                    "body": message
-                }
+        if not success:
+            release_monthly_quota()
+            reserved = False
+            return {
+                "success": False,
+                "error": result
             }
 
-            text_response = requests.post(
-                url,
-                headers=headers,
-                json=text_payload,
-                timeout=30
-            )
-
-            text_result = text_response.json()
+        return record_outgoing_message(prepared, result)
 
-            frappe.logger().info(
-                f"WhatsApp Text Response: {text_result}"
-            )
-
-            if text_response.status_code != 200:
-
-                return {
-                    "success": False,
-                    "error": text_result
-                }
-
-            # Send document second
-
-            response = requests.post(
-                url,
-                headers=headers,
-                json=payload,
-                timeout=30
-            )
-
-            result = response.json()
-
-            frappe.logger().info(
-                f"WhatsApp Document Response: {result}"
-            )
+    except Exception:
 
-            if response.status_code != 200:
+        if reserved:
+            release_monthly_quota()
 
-                return {
-                    "success": False,
-                    "error": result
-                }
+        frappe.log_error(
+            frappe.get_traceback(),
+            "WhatsApp Send Message Error"
+        )
 
-        else:
+        return {
 
-            response = requests.post(
-                url,
-                headers=headers,
-                json=payload,
-                timeout=30
-            )
+            "success": False,
 
-            result = response.json()
+            "error":
+                frappe.get_traceback()
 
-            frappe.logger().info(
-                f"WhatsApp Response: {result}"
-            )
+        }
 
-            if response.status_code != 200:
 
-                return {
-                    "success": False,
-                    "error": result
-                }
+def record_outgoing_message(prepared, result):
+    """
+    Store a message accepted by Meta against its conversation.
+    `prepared` is the message built by WhatsAppSender.prepare.
+    """
 
-        # ----------------------------------------------------
-        # GET META MESSAGE ID
-        # ----------------------------------------------------
+    clean_phone = prepared.phone
+    message = prepared.message
+    attachment = prepared.attachment
+    message_type = prepared.message_type
 
-        if result.get("messages"):
+    # ----------------------------------------------------
+    # GET META MESSAGE ID
+    # ----------------------------------------------------
 
-            meta_message_id = (
-                result["messages"][0]
-                .get("id", "")
-            )
+    meta_message_id = ""
 
-        # ----------------------------------------------------
-        # GET OR CREATE CONVERSATION
-        # ----------------------------------------------------
+    if result.get("messages"):
 
-        conversation_name = frappe.db.exists(
-            "CRM WhatsApp Conversation",
-            {
-                "mobile_number": clean_phone
-            }
+        meta_message_id = (
+            result["messages"][0]
+            .get("id", "")
         )
 
-        if conversation_name:
-
-            conversation = frappe.get_doc(
-                "CRM WhatsApp Conversation",
-                conversation_name
-            )
-
-        else:
-
-            conversation = frappe.get_doc({
-
-                "doctype":
-                    "CRM WhatsApp Conversation",
-
-                "mobile_number":
-                    clean_phone,
+    # ----------------------------------------------------
+    # GET OR CREATE CONVERSATION
+    # ----------------------------------------------------
 
-                "contact_name":
-                    clean_phone,
+    conversation_name = find_conversation_by_phone(
+        clean_phone
+    )
 
-                "status":
-                    "Open",
+    if not conversation_name:
 
-                "unread_count":
-                    0
+        conversation = frappe.get_doc({
 
-            })
+            "doctype":
+                "CRM WhatsApp Conversation",
 
-            conversation.insert(
-                ignore_permissions=True
-            )
+            "mobile_number":
+                clean_phone,
 
-        # ----------------------------------------------------
-        # STORE MESSAGE
-        # ----------------------------------------------------
+            "contact_name":
+                clean_phone,
 
-        # Try to find a matching lead to link
-        lead_name = frappe.db.get_value("Lead", {"phone_number": ["like", f"%{clean_phone[-10:]}"]})
+            "status":
+                "Open",
 
-        msg_doc = frappe.get_doc({
+            "unread_count":
+                0
 
-            "doctype":
-                "CRM WhatsApp Message",
+        })
 
-            "conversation":
-                conversation.name,
+        conversation.insert(
+            ignore_permissions=True
+        )
 
-            "mobile_number":
-                clean_phone,
+        conversation_name = conversation.name
 
-            "message_direction":
-                "Outgoing",
+    # ----------------------------------------------------
+    # STORE MESSAGE
+    # ----------------------------------------------------
 
-            "message_type":
-                message_type,
+    # Try to find a matching lead to link
+    lead_name = find_lead_by_phone(clean_phone)
 
-            "message_content":
-                message or "",
+    msg_doc = frappe.get_doc({
 
-            "attachment":
-                attachment or "",
+        "doctype":
+            "CRM WhatsApp Message",
 
-            "meta_message_id":
-                meta_message_id,
+        "conversation":
+            conversation_name,
 
-            "status":
-                "Sent",
+        "mobile_number":
+            clean_phone,
 
-            "lead":
-                lead_name,
+        "message_direction":
+            "Outgoing",
 
-            "raw_payload":
-                frappe.as_json(
-                    result,
-                    indent=2
-                )
+        "message_type":
+            message_type,
 
-        })
+        "message_content":
+            message or "",
 
-        msg_doc.insert(
-            ignore_permissions=True
-        )
+        "attachment":
+            attachment or "",
 
-        # ----------------------------------------------------
-        # UPDATE CONVERSATION
-        # ----------------------------------------------------
+        "meta_message_id":
+            meta_message_id,
 
-        update_vals = {
-            "last_message_on": frappe.utils.now()
-        }
+        "status":
+            "Sent",
 
-        if message:
-            update_vals["last_message"] = message
-        elif attachment:
-            update_vals["last_message"] = f"{message_type} Sent"
+        "lead":
+            lead_name,
 
-        frappe.db.set_value(
-            "CRM WhatsApp Conversation",
-            conversation.name,
-            update_vals
-        )
+        "raw_payload":
+            frappe.as_json(
+                result,
+                indent=2
+            )
 
-        frappe.db.commit()
+    })
 
-        return {
+    msg_doc.insert(
+        ignore_permissions=True
+    )
 
-            "success": True,
+    # ----------------------------------------------------
+    # UPDATE CONVERSATION
+    # ----------------------------------------------------
 
-            "message":
-                "WhatsApp Message Sent Successfully",
+    update_vals = {
+        "last_message_on": frappe.utils.now()
+    }
 
-            "conversation":
-                conversation.name,
+    if message:
+        update_vals["last_message"] = message
+    elif attachment:
+        update_vals["last_message"] = f"{message_type} Sent"
 
-            "message_doc":
-                msg_doc.name,
+    frappe.db.set_value(
+        "CRM WhatsApp Conversation",
+        conversation_name,
+        update_vals
+    )
 
-            "meta_message_id":
-                meta_message_id,
+    frappe.db.commit()
 
-            "data":
-                result
+    return {
 
-        }
+        "success": True,
 
-    except Exception:
+        "message":
+            "WhatsApp Message Sent Successfully",
 
-        frappe.log_error(
-            frappe.get_traceback(),
-            "WhatsApp Send Message Error"
-        )
+        "conversation":
+            conversation_name,
 
-        return {
+        "message_doc":
+            msg_doc.name,
 
-            "success": False,
+        "meta_message_id":
+            meta_message_id,
 
-            "error":
-                frappe.get_traceback()
+        "data":
+            result
 
-        }
+    }
 
 
 # --------------------------------------------------------------------
@@ -510,18 +384,7 @@ def get_whatsapp_messages(phone, start=0, limit=10):
     if not phone:
         return []
 
-    clean_phone = "".join(filter(str.isdigit, str(phone)))
-
-    conversation_name = frappe.db.get_value(
-        "CRM WhatsApp Conversation",
-        {"mobile_number": clean_phone}
-    )
-
-    if not conversation_name and clean_phone != phone:
-        conversation_name = frappe.db.get_value(
-            "CRM WhatsApp Conversation",
-            {"mobile_number": phone}
-        )
+    conversation_name = find_conversation_by_phone(phone)
 
     if not conversation_name:
         return []
@@ -5,6 +5,8 @@ import frappe
 from datetime import datetime
 from werkzeug.wrappers import Response
 
+from company.company.phone_index import find_conversation_by_phone, find_lead_by_phone
+
 
 LOG_FILE = (
     "/home/innoblitz/frappe-dev/server/com-bench/"
@@ -198,14 +200,7 @@ def get_or_create_conversation(phone):
     try:
         clean_phone = "".join(filter(str.isdigit, str(phone)))
 
-        conversation_name = frappe.db.get_value(
-            "CRM WhatsApp Conversation", {"mobile_number": clean_phone}
-        )
-
-        if not conversation_name:
-            conversation_name = frappe.db.get_value(
-                "CRM WhatsApp Conversation", {"mobile_number": phone}
-            )
+        conversation_name = find_conversation_by_phone(clean_phone)
 
         if conversation_name:
 
@@ -257,7 +252,7 @@ def create_message(
             return
 
         # Try to find a matching lead to link
-        lead_name = frappe.db.get_value("Lead", {"phone_number": ["like", f"%{clean_phone[-10:]}"]})
+        lead_name = find_lead_by_phone(clean_phone)
 
         doc = frappe.get_doc(
             {
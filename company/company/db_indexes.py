@@ -0,0 +1,166 @@
+import frappe
+from frappe.utils import add_days, cint, now_datetime, nowdate
+
+# Composite indexes for the filters the API and scheduler modules run most often
+# (api.py, frontend_api.py, presence_api.py, employee_remainder_api.py and the jobs
+# they enqueue). The doctype JSON can only mark single columns with search_index, so
+# these are added here, after every migrate and on install; add_index skips indexes
+# that already exist.
+#
+# `check_hot_queries` EXPLAINs a representative query for each of them and fails when
+# one has no usable index left and would be answered with a full table scan:
+#
+#   bench --site <site> execute company.company.db_indexes.check_hot_queries
+HOT_QUERY_INDEXES = {
+    # get_active_session_name / session history by employee and day
+    "Employee Session": [["employee", "status"], ["employee", "login_date"]],
+    # Idle detection: status transitions for presences not updated since a cutoff
+    "Employee Presence": [["status", "last_updated"]],
+    # process_remainder_queue, is_already_enqueued_today, get_last_enqueued_time
+    "Employee Remainder Queue": [
+        ["status", "scheduled_time"],
+        ["employee", "hr_reminder_id"],
+        ["employee", "remainder"],
+    ],
+    # Unread badges and the "unread only" list filters; duplicate checks on create
+    "HR Read Tracker": [
+        ["read_by", "is_read", "reference_doctype"],
+        ["reference_doctype", "reference_name"],
+    ],
+    # process_campaign batches
+    "CRM Email Queue": [["campaign", "status"]],
+    # Per-employee attendance ranges (salary slips, leave balance) and daily counts
+    "Attendance": [["employee", "attendance_date"], ["attendance_date", "status"]],
+    # Monthly allocation lookups and carry-forward
+    "Leave Allocation": [["employee", "leave_type", "from_date"]],
+    # Delivery status webhooks
+    "CRM WhatsApp Message": [["meta_message_id"]],
+    "Timesheet": [["employee", "timesheet_date"]],
+    # Chat broadcast claims (oldest Pending first) and lease expiry
+    "Chat Message Queue": [["status", "creation"], ["status", "modified"]],
+}
+
+
+def add_hot_query_indexes():
+    """after_migrate / after_install: add any missing index from HOT_QUERY_INDEXES."""
+    for doctype, indexes in HOT_QUERY_INDEXES.items():
+        if not frappe.db.table_exists(doctype):
+            continue
+        for fields in indexes:
+            if all(frappe.db.has_column(doctype, field) for field in fields):
+                frappe.db.add_index(doctype, fields)
+
+
+# --------------------------------------------------------------------
+# EXPLAIN CHECK
+# --------------------------------------------------------------------
+
+def get_hot_queries():
+    """(label, query, values) for each index above, shaped like the code that uses it."""
+    today, now = nowdate(), now_datetime()
+    values = {
+        "employee": "EMP-00001", "user": "user@example.com", "today": today, "now": now,
+        "from_date": add_days(today, -30), "campaign": "Campaign", "doctype": "Leave Application",
+        "name": "NAME-0001",
+    }
+    queries = [
+        ("Active session", """
+            SELECT name FROM `tabEmployee Session`
+            WHERE employee = %(employee)s AND status = 'Active'
+            ORDER BY login_time DESC LIMIT 1"""),
+        ("Sessions by day", """
+            SELECT name FROM `tabEmployee Session`
+            WHERE employee = %(employee)s AND login_date BETWEEN %(from_date)s AND %(today)s"""),
+        ("Idle presences", """
+            SELECT employee FROM `tabEmployee Presence`
+            WHERE status = 'Away' AND last_updated < %(now)s"""),
+        ("Due remainders", """
+            SELECT name FROM `tabEmployee Remainder Queue`
+            WHERE status = 'Pending' AND scheduled_time <= %(now)s"""),
+        ("HR remainder enqueued today", """
+            SELECT name FROM `tabEmployee Remainder Queue`
+            WHERE employee = %(employee)s AND hr_reminder_id = %(name)s AND creation >= %(today)s
+            ORDER BY creation DESC LIMIT 1"""),
+        ("Remainder enqueued today", """
+            SELECT name FROM `tabEmployee Remainder Queue`
+            WHERE employee = %(employee)s AND remainder = %(name)s AND scheduled_time >= %(today)s
+            LIMIT 1"""),
+        ("Unread HR items", """
+            SELECT reference_doctype, reference_name FROM `tabHR Read Tracker`
+            WHERE read_by = %(user)s AND is_read = 0 AND reference_doctype = %(doctype)s"""),
+        ("HR read tracker exists", """
+            SELECT name FROM `tabHR Read Tracker`
+            WHERE reference_doctype = %(doctype)s AND reference_name = %(name)s LIMIT 1"""),
+        ("Campaign batch", """
+            SELECT name, status, retry_count FROM `tabCRM Email Queue`
+            WHERE campaign = %(campaign)s AND status IN ('Pending', 'Failed') LIMIT 100"""),
+        ("Employee attendance range", """
+            SELECT status, attendance_date FROM `tabAttendance`
+            WHERE employee = %(employee)s AND attendance_date BETWEEN %(from_date)s AND %(today)s"""),
+        ("Attendance counts for a day", """
+            SELECT status, COUNT(*) FROM `tabAttendance`
+            WHERE attendance_date = %(today)s GROUP BY status"""),
+        ("Monthly leave allocation", """
+            SELECT name FROM `tabLeave Allocation`
+            WHERE employee = %(employee)s AND leave_type = %(name)s AND from_date = %(from_date)s
+            AND status = 'Approved' LIMIT 1"""),
+        ("WhatsApp status webhook", """
+            SELECT name FROM `tabCRM WhatsApp Message` WHERE meta_message_id = %(name)s LIMIT 1"""),
+        ("Timesheet for today", """
+            SELECT name FROM `tabTimesheet` WHERE employee = %(employee)s AND timesheet_date = %(today)s
+            LIMIT 1"""),
+        ("Due call/meeting reminders", """
+            SELECT name FROM `tabReminder Queue`
+            WHERE status = 'Pending' AND trigger_at <= %(now)s ORDER BY trigger_at LIMIT 100"""),
+        ("Chat broadcast claim", """
+            SELECT name FROM `tabChat Message Queue`
+            WHERE status = 'Pending' ORDER BY creation LIMIT 200"""),
+        ("Expired chat broadcast leases", """
+            SELECT name FROM `tabChat Message Queue`
+            WHERE status = 'Sending' AND modified < %(now)s"""),
+    ]
+    return [(label, query, values) for label, query in queries]
+
+
+def explain(query, values):
+    return frappe.db.sql(f"EXPLAIN {query}", values, as_dict=True)
+
+
+def find_full_scans(plan):
+    """
+    Plan rows that scan the whole table with no index to choose from. A small table may
+    legitimately be scanned even when an index exists, so an index merely not being
+    picked (empty `key` but non-empty `possible_keys`) is not treated as a regression.
+    """
+    return [
+        row for row in plan
+        if (row.get("type") or "").upper() == "ALL" and not row.get("possible_keys")
+    ]
+
+
+@frappe.whitelist()
+def check_hot_queries(raise_on_failure=True):
+    """EXPLAIN every hot query; fails listing the ones left without a usable index."""
+    frappe.only_for("System Manager")
+
+    report, failures = [], []
+    for label, query, values in get_hot_queries():
+        plan = explain(query, values)
+        scans = find_full_scans(plan)
+        report.append({
+            "query": label,
+            "ok": not scans,
+            "plan": [
+                {k: row.get(k) for k in ("table", "type", "possible_keys", "key", "rows")}
+                for row in plan
+            ],
+        })
+        if scans:
+            failures.append(f"{label}: full scan of {', '.join(r.get('table') or '?' for r in scans)}")
+
+    if failures and cint(raise_on_failure):
+        frappe.throw(
+            "Hot queries without a usable index:<br>" + "<br>".join(failures),
+            title="Index regression",
+        )
+    return report
@@ -3,7 +3,8 @@
 
 import frappe
 from frappe.model.document import Document
-from frappe.utils import get_datetime, now_datetime, format_datetime
+from frappe.utils import get_datetime, now_datetime
+from company.company.event_sync import sync_record_to_event
 from company.company.reminders import handle_call_reminder
 
 class Calls(Document):
@@ -34,30 +35,7 @@ class Calls(Document):
         handle_call_reminder(self)
 
         """Update or create Event when Call is modified."""
-
-        if frappe.flags.get("ignore_call_sync"):
-            return  
-
-        # Create if not exists
-        if not frappe.db.exists("Event", {
-            "reference_doctype": "Calls",
-            "reference_docname": self.name
-        }):
-            create_event_for_call(self)
-        else:
-            update_event_for_call(self)
-
-        # Sync status
-        if self.outgoing_call_status == "Completed":
-            event_name = frappe.db.get_value(
-                "Event",
-                {"reference_doctype": "Calls", "reference_docname": self.name},
-                "name"
-            )
-            if event_name:
-                event = frappe.get_doc("Event", event_name)
-                event.status = "Completed"
-                event.save(ignore_permissions=True)
+        sync_record_to_event(self)
 
     def on_trash(self):
         """
@@ -69,66 +47,7 @@ class Calls(Document):
 
 def create_event_for_call(doc):
     """Creates Calendar Event automatically from Call."""
-
-    # Prevent duplicate creation
-    if frappe.db.exists("Event", {
-        "reference_doctype": "Calls",
-        "reference_docname": doc.name
-    }):
-        return
-
-    event = frappe.new_doc("Event")
-
-    # -------- TITLE FORMAT --------
-    call_start_time = doc.get("call_start_time")
-    if call_start_time:
-        formatted_start = format_datetime(call_start_time, "hh:mm a")
-        event.subject = f"{doc.title} - {formatted_start}"
-    else:
-        event.subject = doc.title
-
-    # Category
-    event.event_category = "Call"
-    event.event_type = "Private"
-
-    # -------- TIME --------
-    event.starts_on = doc.get("call_start_time")
-    event.ends_on = doc.get("call_end_time")
-
-    # Status
-    event.status = doc.outgoing_call_status
-
-    # Always timed
-
-    start = get_datetime(doc.get("call_start_time"))
-    end = get_datetime(doc.get("call_end_time"))
-
-    if start.date() == end.date():
-        event.all_day = 0
-    else:
-        event.all_day = 0 
-
-    # -------- COLOR --------
-    status = doc.outgoing_call_status
-    color_map = {
-        "Scheduled": "#FBC02D",
-        "Completed": "#0DB260",
-    }
-    event.color = color_map.get(status, "#FBC02D")
-
-    # -------- DESCRIPTION --------
-    event.description = f"""
-        <b>Call For:</b> {doc.call_for or ''}<br>
-        <b>Purpose:</b> {doc.call_purpose or ''}<br>
-        <b>Agenda:</b><br>{doc.call_agenda or ''}
-    """
-
-    # -------- LINK EVENT BACK TO MEETING --------
-    event.reference_doctype = "Calls"
-    event.reference_docname = doc.name
-
-    event.insert(ignore_permissions=True)
-    frappe.db.commit()
+    sync_record_to_event(doc)
 
 
 # -------------------------------------------------------
@@ -136,61 +55,5 @@ def create_event_for_call(doc):
 # -------------------------------------------------------
 
 def update_event_for_call(doc):
-    """Updates Calendar Event linked to this Call."""
-
-    event_name = frappe.db.get_value(
-        "Event",
-        {"reference_doctype": "Calls", "reference_docname": doc.name},
-        "name"
-    )
-
-    if not event_name:
-        return  # No event found
-
-    event = frappe.get_doc("Event", event_name)
-
-    # -------- TITLE FORMAT --------
-    call_start_time = doc.get("call_start_time")
-    if call_start_time:
-        formatted_start = format_datetime(call_start_time, "hh:mm a")
-        event.subject = f"{doc.title} - {formatted_start}"
-    else:
-        event.subject = doc.title
-
-    # -------- TIME --------
-    event.starts_on = doc.get("call_start_time")
-    event.ends_on = doc.get("call_end_time")
-
-    # Status
-    event.status = doc.outgoing_call_status
-
-    # Always timed
-    start = get_datetime(doc.get("call_start_time"))
-    end = get_datetime(doc.get("call_end_time"))
-
-    if not start or not end:
-        return
-
-    if start.date() == end.date():
-        event.all_day = 0
-    else:
-        event.all_day = 0 
-
-    # -------- COLOR --------
-    status = doc.outgoing_call_status
-    color_map = {
-        "Scheduled": "#FBC02D",
-        "Completed": "#0DB260",
-    }
-    event.color = color_map.get(status, "#FBC02D")
-
-    # -------- DESCRIPTION --------
-    event.description = f"""
-        <b>Call For:</b> {doc.call_for or ''}<br>
-        <b>Purpose:</b> {doc.call_purpose or ''}<br>
-        <b>Agenda:</b><br>{doc.call_agenda or ''}
-    """
-
-    # Save changes
-    event.save(ignore_permissions=True)
-    frappe.db.commit()
+    """Updates Calendar Event linked to this Call (changed fields only)."""
+    sync_record_to_event(doc)
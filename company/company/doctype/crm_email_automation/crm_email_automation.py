@@ -3,6 +3,7 @@ from frappe import _
 from frappe.model.document import Document
 from datetime import datetime, timedelta
 import calendar
+from company.company.settings_cache import get_settings
 
 class CRMEmailAutomation(Document):
 	def validate(self):
@@ -98,7 +99,7 @@ def calculate_next_run(frequency, start_date, run_time_str, week_day=None, day_o
 def process_email_automations():
 	# Check if email automation is globally enabled
 	try:
-		settings = frappe.get_single("CRM Email Settings")
+		settings = get_settings("CRM Email Settings")
 		if not settings.enable_email_automation:
 			return
 	except Exception:
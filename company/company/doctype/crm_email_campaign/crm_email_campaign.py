@@ -8,6 +8,7 @@ from frappe.model.document import Document
 import re
 from urllib.parse import quote
 from frappe.model.document import Document
+from company.company.settings_cache import get_settings
 
 class CRMEmailCampaign(Document):
 	pass
@@ -380,9 +381,10 @@ def process_campaign(campaign_name):
 	auto_retry = True
 
 	try:
-		settings = frappe.get_single("CRM Email Settings")
+		settings = get_settings("CRM Email Settings")
 		max_batch_size = int(settings.max_emails_per_batch or 100)
-		batch_delay = int(settings.batch_delay or 5)
+		# 0 is a valid delay; the settings cache fills in 5 when the field was never saved
+		batch_delay = int(settings.batch_delay)
 		max_retries = int(settings.maximum_retry_count or 3)
 		auto_retry = bool(settings.auto_retry_failed_emails)
 	except Exception:
@@ -547,7 +549,7 @@ def send_campaign_email(queue_doc):
 	default_email_id = None
 	default_name = None
 	try:
-		settings = frappe.get_single("CRM Email Settings")
+		settings = get_settings("CRM Email Settings")
 		if settings.default_email_account:
 			email_account = frappe.get_cached_doc("Email Account", settings.default_email_account)
 			if email_account.email_id:
@@ -5,6 +5,7 @@ import re
 import time
 import frappe
 from frappe.model.document import Document
+from company.company.settings_cache import get_settings
 
 
 class CRMWhatsAppCampaign(Document):
@@ -513,119 +514,127 @@ def process_campaign(campaign_name):
 	"""
 	Background queue processor.
 	Sends WhatsApp messages in batches, respecting Paused / Cancelled status.
+	Each batch is fanned out over the WhatsApp sender's worker pool; queue rows and
+	messages are written back from this job's thread as recipients finish.
 	"""
-	campaign = frappe.get_doc("CRM WhatsApp Campaign", campaign_name)
-	from company.company.crm_whatsapp_api import send_whatsapp
+	from company.company.crm_whatsapp_api import record_outgoing_message
+	from company.company.whatsapp_sender import (
+		WhatsAppSender,
+		release_monthly_quota,
+		reserve_monthly_quota,
+	)
 
 	max_batch_size = 50
 	batch_delay = 5
 	max_retries = 3
 	auto_retry = True
 
+	wa_settings = get_settings("CRM WhatsApp Settings")
+
 	# Allow override via CRM WhatsApp Settings if those fields exist
-	try:
-		wa_settings = frappe.get_single("CRM WhatsApp Settings")
-		if hasattr(wa_settings, "max_messages_per_batch") and wa_settings.max_messages_per_batch:
-			max_batch_size = int(wa_settings.max_messages_per_batch)
-		if hasattr(wa_settings, "batch_delay") and wa_settings.batch_delay:
-			batch_delay = int(wa_settings.batch_delay)
-		if hasattr(wa_settings, "maximum_retry_count") and wa_settings.maximum_retry_count:
-			max_retries = int(wa_settings.maximum_retry_count)
-		if hasattr(wa_settings, "auto_retry_failed") and wa_settings.auto_retry_failed is not None:
-			auto_retry = bool(wa_settings.auto_retry_failed)
-	except Exception:
-		pass
+	if wa_settings.get("max_messages_per_batch"):
+		max_batch_size = int(wa_settings.max_messages_per_batch)
+	if wa_settings.get("batch_delay"):
+		batch_delay = int(wa_settings.batch_delay)
+	if wa_settings.get("maximum_retry_count"):
+		max_retries = int(wa_settings.maximum_retry_count)
+	if wa_settings.get("auto_retry_failed") is not None:
+		auto_retry = bool(wa_settings.auto_retry_failed)
+
+	sender = WhatsAppSender(wa_settings)
+	extra_attachments = {}
+
+	def get_extra_attachments(template_name):
+		# Attachments after the first are sent as follow-up messages
+		if template_name not in extra_attachments:
+			files = []
+			if template_name and frappe.db.exists("CRM WhatsApp Template", template_name):
+				template = frappe.get_doc("CRM WhatsApp Template", template_name)
+				if template.allow_attachment:
+					files = [att.file for att in template.default_attachment[1:] if att.file]
+			extra_attachments[template_name] = files
+		return extra_attachments[template_name]
+
+	def mark_failed(queue_name, error):
+		frappe.db.set_value("CRM WhatsApp Queue", queue_name, {
+			"status": "Failed",
+			"error_message": str(error or "Unknown error")[:500]
+		})
 
 	while True:
-		campaign.reload()
-		if campaign.status in ["Paused", "Cancelled"]:
+		status = frappe.db.get_value("CRM WhatsApp Campaign", campaign_name, "status")
+		if status in ["Paused", "Cancelled"]:
 			break
 
-		status_filter = ["Pending", "Failed"] if auto_retry else ["Pending"]
-
-		queues = frappe.get_all(
-			"CRM WhatsApp Queue",
-			filters=[
-				["campaign", "=", campaign.name],
-				["status", "in", status_filter]
-			],
-			fields=["name", "status", "retry_count"],
-			limit=max_batch_size
-		)
+		retry_condition = "OR (status = 'Failed' AND IFNULL(retry_count, 0) < %(max_retries)s)" if auto_retry else ""
+		queues = frappe.db.sql(f"""
+			SELECT name, recipient_phone, message_content, attachment, whatsapp_template, retry_count
+			FROM `tabCRM WhatsApp Queue`
+			WHERE campaign = %(campaign)s
+				AND (status = 'Pending' {retry_condition})
+			ORDER BY creation
+			LIMIT %(limit)s
+		""", {"campaign": campaign_name, "max_retries": max_retries, "limit": max_batch_size}, as_dict=True)
 
 		if not queues:
 			break
 
-		processed_any = False
-
+		jobs = {}
 		for row in queues:
-			campaign.reload()
-			if campaign.status in ["Paused", "Cancelled"]:
-				break
+			frappe.db.set_value("CRM WhatsApp Queue", row.name, {
+				"status": "Processing",
+				"retry_count": (row.retry_count or 0) + 1
+			})
 
-			if row.status == "Failed" and (row.retry_count or 0) >= max_retries:
+			try:
+				messages = [sender.prepare(row.recipient_phone, row.message_content, row.attachment or None)]
+				for attachment in get_extra_attachments(row.whatsapp_template):
+					messages.append(sender.prepare(row.recipient_phone, None, attachment))
+			except Exception as e:
+				mark_failed(row.name, e)
 				continue
 
-			queue_doc = frappe.get_doc("CRM WhatsApp Queue", row.name)
-			processed_any = True
+			if not reserve_monthly_quota(sender.monthly_limit, len(messages)):
+				mark_failed(row.name, f"Max success send message limit of {sender.monthly_limit} reached.")
+				continue
 
-			try:
-				queue_doc.status = "Processing"
-				queue_doc.retry_count = (queue_doc.retry_count or 0) + 1
-				queue_doc.save(ignore_permissions=True)
-
-				template = None
-				if queue_doc.whatsapp_template:
-					try:
-						template = frappe.get_doc("CRM WhatsApp Template", queue_doc.whatsapp_template)
-					except Exception:
-						pass
-
-				response = send_whatsapp(
-					phone=queue_doc.recipient_phone,
-					message=queue_doc.message_content,
-					attachment=queue_doc.attachment or None
-				)
-
-				if response.get("success") and template and template.allow_attachment and template.default_attachment and len(template.default_attachment) > 1:
-					for idx, att in enumerate(template.default_attachment):
-						if idx == 0:
-							continue
-						if att.file:
-							send_whatsapp(
-								phone=queue_doc.recipient_phone,
-								message=None,
-								attachment=att.file
-							)
-
-				if response.get("success"):
-					queue_doc.status = "Sent"
-					queue_doc.sent_on = frappe.utils.now()
-					queue_doc.error_message = ""
-				else:
-					queue_doc.status = "Failed"
-					queue_doc.error_message = str(
-						response.get("error") or "Unknown error"
-					)[:500]
-
-				queue_doc.save(ignore_permissions=True)
+			jobs[row.name] = messages
 
-			except Exception as e:
-				queue_doc.status = "Failed"
-				queue_doc.error_message = str(e)[:500]
-				queue_doc.save(ignore_permissions=True)
+		frappe.db.commit()
 
-			# Update campaign counters after each message
-			campaign.sent_count = frappe.db.count(
-				"CRM WhatsApp Queue", {"campaign": campaign.name, "status": "Sent"}
-			)
-			campaign.failed_count = frappe.db.count(
-				"CRM WhatsApp Queue", {"campaign": campaign.name, "status": "Failed"}
-			)
-			campaign.save(ignore_permissions=True)
+		for queue_name, outcomes in sender.send_many(jobs):
+			sent = [(prepared, result) for prepared, success, result in outcomes if success]
+			release_monthly_quota(len(jobs[queue_name]) - len(sent))
 
-		if not processed_any:
-			break
+			for prepared, result in sent:
+				try:
+					record_outgoing_message(prepared, result)
+				except Exception:
+					frappe.log_error(frappe.get_traceback(), "WhatsApp Campaign Record Error")
+
+			# The queue row follows the main message; follow-up attachments are best effort
+			first_prepared, first_success, first_result = outcomes[0]
+			if first_success:
+				frappe.db.set_value("CRM WhatsApp Queue", queue_name, {
+					"status": "Sent",
+					"sent_on": frappe.utils.now(),
+					"error_message": ""
+				})
+			else:
+				mark_failed(queue_name, first_result)
+
+		# Update campaign counters once per batch
+		counts = dict(frappe.db.sql("""
+			SELECT status, COUNT(*)
+			FROM `tabCRM WhatsApp Queue`
+			WHERE campaign = %s AND status IN ('Sent', 'Failed')
+			GROUP BY status
+		""", (campaign_name,)))
+		frappe.db.set_value("CRM WhatsApp Campaign", campaign_name, {
+			"sent_count": counts.get("Sent", 0),
+			"failed_count": counts.get("Failed", 0)
+		})
+		frappe.db.commit()
 
 		time.sleep(batch_delay)
 
@@ -633,12 +642,13 @@ def process_campaign(campaign_name):
 	remaining = frappe.db.count(
 		"CRM WhatsApp Queue",
 		{
-			"campaign": campaign.name,
+			"campaign": campaign_name,
 			"status": ["in", ["Pending", "Processing"]]
 		}
 	)
 
-	campaign.reload()
-	if remaining == 0 and campaign.status == "Running":
+	status = frappe.db.get_value("CRM WhatsApp Campaign", campaign_name, "status")
+	if remaining == 0 and status == "Running":
+		campaign = frappe.get_doc("CRM WhatsApp Campaign", campaign_name)
 		campaign.status = "Completed"
-		campaign.save(ignore_permissions=True)
\ No newline at end of file
+		campaign.save(ignore_permissions=True)
@@ -1,9 +1,16 @@
 # Copyright (c) 2026, deepak and Contributors
 # See license.txt
 
-# import frappe
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import frappe
 from frappe.tests import IntegrationTestCase
 
+from company.company.whatsapp_sender import TokenBucket, WhatsAppSender
+
 
 # On IntegrationTestCase, the doctype test records and all
 # link-field test record dependencies are recursively loaded
@@ -12,6 +19,32 @@ EXTRA_TEST_RECORD_DEPENDENCIES = []  # eg. ["User"]
 IGNORE_TEST_RECORD_DEPENDENCIES = []  # eg. ["User"]
 
 
+class MockGraphHandler(BaseHTTPRequestHandler):
+	"""Minimal stand-in for the Graph API /media and /messages endpoints."""
+
+	protocol_version = "HTTP/1.1"
+
+	def do_POST(self):
+		body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+		with self.server.lock:
+			self.server.calls.append((self.path, self.client_address[1], body))
+			count = len(self.server.calls)
+
+		if self.path.endswith("/media"):
+			payload = {"id": "media-1"}
+		else:
+			payload = {"messages": [{"id": f"wamid.{count}"}]}
+
+		data = json.dumps(payload).encode()
+		self.send_response(200)
+		self.send_header("Content-Type", "application/json")
+		self.send_header("Content-Length", str(len(data)))
+		self.end_headers()
+		self.wfile.write(data)
+
+	def log_message(self, *args):
+		pass
+
 
 class IntegrationTestCRMWhatsAppCampaign(IntegrationTestCase):
 	"""
@@ -19,4 +52,64 @@ class IntegrationTestCRMWhatsAppCampaign(IntegrationTestCase):
 	Use this class for testing interactions between multiple components.
 	"""
 
-	pass
+	def setUp(self):
+		self.server = ThreadingHTTPServer(("127.0.0.1", 0), MockGraphHandler)
+		self.server.calls = []
+		self.server.lock = threading.Lock()
+		threading.Thread(target=self.server.serve_forever, daemon=True).start()
+		frappe.conf.whatsapp_graph_api_url = f"http://127.0.0.1:{self.server.server_port}/v23.0"
+
+		settings = frappe.get_single("CRM WhatsApp Settings")
+		settings.phone_number_id = "1234567890"
+		settings.access_token = "test-token"
+		settings.messages_per_second = 1000
+		settings.max_concurrent_sends = 4
+		settings.save(ignore_permissions=True)
+
+	def tearDown(self):
+		self.server.shutdown()
+		self.server.server_close()
+		frappe.conf.pop("whatsapp_graph_api_url", None)
+
+	def make_attachment(self):
+		return frappe.get_doc({
+			"doctype": "File",
+			"file_name": "brochure.pdf",
+			"content": f"%PDF-1.4 {frappe.generate_hash()}".encode(),
+			"is_private": 0
+		}).insert(ignore_permissions=True).file_url
+
+	def test_media_uploaded_once_for_all_recipients(self):
+		sender = WhatsAppSender()
+		attachment = self.make_attachment()
+		jobs = {
+			f"queue-{i}": [sender.prepare(f"+91 98765 432{i:02d}", "Hello", attachment)]
+			for i in range(20)
+		}
+
+		results = dict(sender.send_many(jobs))
+
+		self.assertEqual(len(results), 20)
+		self.assertTrue(all(success for outcomes in results.values() for _, success, _ in outcomes))
+
+		paths = [path for path, _, _ in self.server.calls]
+		self.assertEqual(paths.count("/v23.0/1234567890/media"), 1)
+		# Document messages send the text first, then the document by media ID
+		self.assertEqual(paths.count("/v23.0/1234567890/messages"), 40)
+
+		documents = [json.loads(body) for path, _, body in self.server.calls if path.endswith("/messages")]
+		documents = [d for d in documents if d["type"] == "document"]
+		self.assertTrue(all(d["document"]["id"] == "media-1" for d in documents))
+
+		# Keep-alive: requests reuse the pooled connections instead of one per message
+		ports = {port for path, port, _ in self.server.calls if path.endswith("/messages")}
+		self.assertLessEqual(len(ports), sender.max_workers)
+
+	def test_token_bucket_limits_rate(self):
+		bucket = TokenBucket(rate=50, capacity=5)
+		start = time.monotonic()
+		for _ in range(30):
+			bucket.acquire()
+
+		# 5 tokens are available immediately, the other 25 refill at 50/second
+		self.assertGreaterEqual(time.monotonic() - start, 0.45)
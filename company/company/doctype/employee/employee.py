@@ -1,9 +1,16 @@
 import frappe
 from frappe.model.document import Document
+from company.company.hr_snapshot import month_day_key
 
 class Employee(Document):
 	def validate(self):
 		self.validate_duplicate_components()
+		self.set_month_day_keys()
+
+	def set_month_day_keys(self):
+		# Indexed MMDD keys for today's birthdays / work anniversaries
+		self.dob_month_day = month_day_key(self.dob)
+		self.doj_month_day = month_day_key(self.date_of_joining)
 
 	def validate_duplicate_components(self):
 		components = []
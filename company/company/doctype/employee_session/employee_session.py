@@ -2,6 +2,8 @@ import frappe
 from frappe.model.document import Document
 from frappe.utils import time_diff_in_seconds, flt
 
+from company.company.session_totals import INACTIVE_STATUSES, compute_interval_totals, get_live_break_seconds
+
 class EmployeeSession(Document):
 	def validate(self):
 		self.calculate_hours()
@@ -23,8 +25,24 @@ class EmployeeSession(Document):
 				d.duration_seconds = max(0, time_diff_in_seconds(ref_time, d.from_time))
 
 			# Count everything as work EXCEPT Offline, Break, and Away
-			if d.status not in ('Offline', 'Break', 'Away'):
+			if d.status not in INACTIVE_STATUSES:
 				total_work_seconds += flt(d.duration_seconds)
 
 		# Convert total seconds to hours
 		self.total_work_hours = flt(total_work_seconds / 3600.0, 3)
+
+		# Running totals read by the live presence counters
+		self.update(compute_interval_totals(self.intervals))
+		self.sync_break_totals()
+
+	def sync_break_totals(self):
+		# Break totals are adjusted in the database by the Employee Break hooks; reload
+		# them so saving a session loaded earlier does not overwrite newer values
+		if not self.is_new():
+			totals = frappe.db.get_value("Employee Session", self.name,
+				["closed_break_seconds", "open_break_start"], as_dict=True)
+			if totals:
+				self.closed_break_seconds = totals.closed_break_seconds
+				self.open_break_start = totals.open_break_start
+
+		self.total_break_hours = flt(get_live_break_seconds(self)) / 3600.0
@@ -2,6 +2,7 @@ import frappe
 from frappe.model.document import Document
 from frappe.model.naming import make_autoname
 from frappe.utils import getdate
+from company.company.document_numbering import assign_document_number
 
 class Estimation(Document):
     
@@ -28,35 +29,7 @@ class Estimation(Document):
             self.name = self.ref_no
 
     def before_insert(self):
-        if not self.ref_no:
-            today = getdate()
-            year = today.year
-
-            if today.month < 4:
-                start_year = year - 1
-                end_year = year
-            else:
-                start_year = year
-                end_year = year + 1
-
-            fy = f"{str(start_year)[-2:]}-{str(end_year)[-2:]}"
-
-            last = frappe.db.sql("""
-                SELECT ref_no
-                FROM `tabEstimation`
-                WHERE ref_no LIKE %s
-                ORDER BY creation DESC
-                LIMIT 1
-            """, (f"IB-E/{fy}/%",), as_dict=True)
-
-            if last:
-                last_num = int(last[0].ref_no.split("/")[-1])
-                next_num = last_num + 1
-            else:
-                next_num = 1
-
-            self.ref_no = f"IB-E/{fy}/{str(next_num).zfill(3)}"
-            self.name = self.ref_no
+        assign_document_number(self)
 
         
     def calculate_child_rows(self):
@@ -1,9 +1,11 @@
 # Copyright (c) 2025, deepak and Contributors
 # See license.txt
 
-# import frappe
+import frappe
 from frappe.tests import IntegrationTestCase
+from frappe.utils import today
 
+from company.company.document_numbering import preview_next_number
 
 # On IntegrationTestCase, the doctype test records and all
 # link-field test record dependencies are recursively loaded
@@ -19,4 +21,29 @@ class IntegrationTestExpenses(IntegrationTestCase):
 	Use this class for testing interactions between multiple components.
 	"""
 
-	pass
+	def make_expense(self, expense_no):
+		if not frappe.db.exists("Payment Type", "_Test Payment Type"):
+			frappe.get_doc({"doctype": "Payment Type", "payment_type": "_Test Payment Type"}).insert()
+		return frappe.get_doc({
+			"doctype": "Expenses",
+			"expense_no": expense_no,
+			"date": today(),
+			"payment_type": "_Test Payment Type",
+		}).insert()
+
+	def test_prefilled_previews_reserve_consecutive_numbers(self):
+		# The Desk form prefills expense_no with the preview before saving
+		first_preview = preview_next_number("Expenses")
+		first = self.make_expense(first_preview)
+		self.assertEqual(first.expense_no, first_preview)
+		self.assertEqual(first.name, first_preview)
+
+		second_preview = preview_next_number("Expenses")
+		self.assertNotEqual(second_preview, first_preview)
+		second = self.make_expense(second_preview)
+		self.assertEqual(second.expense_no, second_preview)
+
+		# A form still showing an old preview gets the next free number instead
+		next_free = preview_next_number("Expenses")
+		third = self.make_expense(first_preview)
+		self.assertEqual(third.expense_no, next_free)
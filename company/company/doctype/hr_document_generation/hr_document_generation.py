@@ -2,6 +2,8 @@
 # Copyright (c) 2026, Administrator and contributors
 # For license information, please see license.txt
 
+import hashlib
+
 import frappe
 from frappe import _
 from frappe.model.document import Document
@@ -64,16 +66,26 @@ class HRDocumentGeneration(Document):
 			self.rendered_content = result.get("content", "")
 
 
+# Rendered output is cached per template version, employee version, overrides and day;
+# templates that use {{ now }} are always rendered fresh.
+RENDER_CACHE_PREFIX = "company:hr_document_render"
+RENDER_CACHE_TTL = 6 * 60 * 60
+
+
 def render_document_template(template_name, employee_id, custom_subject=None, custom_content=None):
 	"""
 	Renders an HR Document Template for a specific Employee.
 	Supports overriding subject or template_content on individual document generation.
 	"""
-	if not frappe.db.exists("HR Document Template", template_name):
+	template = frappe.db.get_value(
+		"HR Document Template",
+		template_name,
+		["is_active", "category", "subject", "template_content", "modified"],
+		as_dict=True,
+	)
+	if not template:
 		frappe.throw(_("Template '{0}' does not exist").format(template_name))
 
-	template = frappe.get_doc("HR Document Template", template_name)
-
 	if not template.is_active:
 		frappe.throw(_("Template '{0}' is not active").format(template_name))
 
@@ -82,9 +94,25 @@ def render_document_template(template_name, employee_id, custom_subject=None, cu
 		if not cat_active:
 			frappe.throw(_("HR Document Category '{0}' is not active").format(template.category))
 
-	if not frappe.db.exists("Employee", employee_id):
+	employee_modified = frappe.db.get_value("Employee", employee_id, "modified")
+	if not employee_modified:
 		frappe.throw(_("Employee '{0}' does not exist").format(employee_id))
 
+	# Determine subject and content to render (prefer custom per-document overrides if provided)
+	raw_subject = custom_subject if custom_subject and custom_subject.strip() else template.subject
+	raw_content = custom_content if custom_content and custom_content.strip() else template.template_content
+
+	cache_key = None
+	if "now" not in (raw_subject or "") + (raw_content or ""):
+		signature = "|".join(str(part) for part in (
+			template_name, template.modified, employee_id, employee_modified,
+			frappe.utils.nowdate(), raw_subject, raw_content,
+		))
+		cache_key = f"{RENDER_CACHE_PREFIX}:{hashlib.sha1(signature.encode()).hexdigest()}"
+		cached = frappe.cache().get_value(cache_key)
+		if cached:
+			return cached
+
 	emp_doc = frappe.get_doc("Employee", employee_id)
 
 	# Build rendering context
@@ -94,10 +122,6 @@ def render_document_template(template_name, employee_id, custom_subject=None, cu
 	context["current_date"] = frappe.utils.formatdate(frappe.utils.nowdate(), "yyyy-MM-dd")
 	context["now"] = frappe.utils.now_datetime()
 
-	# Determine subject and content to render (prefer custom per-document overrides if provided)
-	raw_subject = custom_subject if custom_subject and custom_subject.strip() else template.subject
-	raw_content = custom_content if custom_content and custom_content.strip() else template.template_content
-
 	rendered_subject = ""
 	rendered_content = ""
 
@@ -115,7 +139,10 @@ def render_document_template(template_name, employee_id, custom_subject=None, cu
 			frappe.log_error(f"Content Render Error: {str(e)}", "HR Document Render")
 			rendered_content = raw_content
 
-	return {
+	result = {
 		"subject": rendered_subject,
 		"content": rendered_content,
 	}
+	if cache_key:
+		frappe.cache().set_value(cache_key, result, expires_in_sec=RENDER_CACHE_TTL)
+	return result
@@ -1,6 +1,7 @@
 import frappe
 from frappe.model.document import Document
 from frappe.utils import getdate, flt
+from company.company.document_numbering import assign_document_number
 
 class Invoice(Document):
 
@@ -10,6 +11,12 @@ class Invoice(Document):
         self.calculate_totals()
         self.validate_grand_total()
 
+        # A new invoice has nothing collected yet; afterwards these are
+        # maintained incrementally by the Invoice Collection hooks
+        if self.is_new():
+            self.received_amount = 0
+            self.balance_amount = self.grand_total
+
         # Only validate collections for existing invoices
         if not self.is_new():
             if frappe.db.exists("Invoice Collection", {"invoice": self.name}):
@@ -33,56 +40,8 @@ class Invoice(Document):
             self.name = self.ref_no
 
     def before_insert(self):
-        """Generate Invoice ref_no before inserting"""
-        if not self.ref_no:
-            today = getdate()
-            year = today.year
-
-            # Financial Year (April → March)
-            if today.month < 4:
-                start_year = year - 1
-                end_year = year
-            else:
-                start_year = year
-                end_year = year + 1
-
-            fy = f"{str(start_year)[-2:]}-{str(end_year)[-2:]}"  # e.g., 25-26
-
-            # Get last Invoice in this FY
-            last = frappe.db.sql("""
-                SELECT ref_no FROM `tabInvoice`
-                WHERE ref_no LIKE %s
-                ORDER BY creation DESC LIMIT 1
-            """, (f"IB-I/{fy}/%",), as_dict=True)
-
-            if last:
-                last_num = int(last[0].ref_no.split("/")[-1])
-                next_num = last_num + 1
-            else:
-                next_num = 1
-
-            # Assign ref_no
-            self.ref_no = f"IB-I/{fy}/{str(next_num).zfill(3)}"
-
-            # Also set document name
-            self.name = self.ref_no
-
-    def after_insert(self):
-        """Update received_amount and balance_amount after saving the invoice"""
-        total_collected = frappe.db.sql("""
-            SELECT SUM(amount_collected) FROM `tabInvoice Collection`
-            WHERE invoice=%s
-        """, self.name)[0][0] or 0
-
-        balance_amount = flt(self.grand_total) - flt(total_collected)
-        if balance_amount < 0:
-            balance_amount = 0
-
-        # Use set_value to persist to DB
-        frappe.db.set_value(self.doctype, self.name, {
-            "received_amount": flt(total_collected),
-            "balance_amount": flt(balance_amount)
-        })
+        """Reserve the Invoice ref_no (also when the form prefilled the preview) and name"""
+        assign_document_number(self)
 
     def calculate_child_rows(self):
         for item in self.table_qecz:
@@ -1,8 +1,15 @@
-import json
 import frappe
 from frappe import _
 from frappe.model.document import Document
 from frappe.utils import formatdate, get_url
+from company.company.notification_fanout import (
+    get_employee_contacts,
+    get_hr_settings,
+    get_role_users,
+    queue_chat,
+    queue_email,
+    split_emails
+)
 
 class LeaveApplication(Document):
 
@@ -10,18 +17,13 @@ class LeaveApplication(Document):
     # EMPLOYEE SUBMITS LEAVE → MAIL HR (Background)
     # =================================================
     def on_submit(self):
-        """Enqueue HR notifications in background to avoid submit delay"""
-        # 🛡️ Prevent double enqueuing in the same request
-        if frappe.flags.get(f"enqueued_submit_notification_{self.name}"):
+        """Notify HR; deliveries are queued and sent in the background after commit"""
+        # 🛡️ Prevent double notifications in the same request
+        if frappe.flags.get(f"queued_submit_notification_{self.name}"):
             return
 
-        frappe.enqueue(
-            "company.company.doctype.leave_application.leave_application.send_submit_notification",
-            doc_name=self.name,
-            submitter_user=frappe.session.user,
-            enqueue_after_commit=True
-        )
-        frappe.flags[f"enqueued_submit_notification_{self.name}"] = True
+        self.send_submit_mail_to_hr()
+        frappe.flags[f"queued_submit_notification_{self.name}"] = True
 
     def validate(self):
         self.validate_dates()
@@ -73,7 +75,7 @@ class LeaveApplication(Document):
             )
 
         # InnoChat Notification to Employee
-        receiver = frappe.db.get_value("Employee", self.employee, "user")
+        receiver = self.get_employee_user()
         if receiver and receiver != frappe.session.user:
             content = (
                 f"<b>❌ Leave Rejected</b><br><br>"
@@ -89,151 +91,28 @@ class LeaveApplication(Document):
     # GET HR EMAIL SETTINGS
     # =================================================
     def get_hr_settings(self):
-        """Fetch HR email and CC from Company Email Settings"""
-        settings = frappe.get_all(
-            "Company Email Settings",
-            fields=["hr_email", "hr_cc_emails", "hr_name"],
-            limit=1
-        )
-        if settings:
-            return settings[0]
-        return {}
-
-    def get_hr_users(self):
-        """Get valid HR User IDs for chat notifications"""
+        """Fetch HR email and CC from Company Email Settings (cached)"""
+        return get_hr_settings()
 
-        roles = ["HR"]
-        role_users = frappe.get_all(
-            "Has Role",
-            filters={"role": ["in", roles], "parenttype": "User"},
-            pluck="parent"
-            )
-        # Filter unique and active users
-        hr_users = [u for u in set(role_users) if frappe.db.get_value("User", u, "enabled")]
+    def get_employee_user(self):
+        """Get the user linked to the employee"""
+        return get_employee_contacts(self.employee).user
 
-        return list(set(hr_users))
+    def get_hr_users(self):
+        """Get valid HR User IDs for chat notifications (cached per role)"""
+        return get_role_users("HR")
 
     def send_chat_notification(self, sender, receiver, content):
-        """Send a chat message via clefincode_chat. Create/Verify channel and send message."""
-        log_data = {
-            "sender_id": sender,
-            "receiver_id": receiver,
-            "content": content
-        }
-        
-        try:
-            from clefincode_chat.api.api_1_2_1.api import send, create_channel, share_doctype, get_profile_id
-            
-            # 1. Check if direct room exists (Using system IDs)
-            room_name = frappe.db.sql("""
-                SELECT c.name
-                FROM `tabClefinCode Chat Channel` c
-                JOIN `tabClefinCode Chat Channel User` u1 ON u1.parent = c.name
-                JOIN `tabClefinCode Chat Channel User` u2 ON u2.parent = c.name
-                WHERE c.type = 'Direct'
-                AND c.is_parent = 1
-                AND u1.user = %s
-                AND u2.user = %s
-            """, (sender, receiver), pluck=True)
-
-            if room_name:
-                room_name = room_name[0]
-                log_data["room_name_found"] = room_name
-                # Ensure HR receiver is active and not removed
-                frappe.db.sql("""
-                    UPDATE `tabClefinCode Chat Channel User`
-                    SET is_removed = 0, active = 1
-                    WHERE parent = %s AND user = %s
-                """, (room_name, receiver))
-                # Ensure document sharing is active
-                share_doctype("ClefinCode Chat Channel", room_name, receiver)
-            else:
-                # 2. Create channel using system IDs
-                users = [
-                    {"email": sender, "platform": "Chat"},
-                    {"email": receiver, "platform": "Chat"}
-                ]
-                sender_full_name = frappe.db.get_value("User", sender, "full_name") or sender
-                res = create_channel(
-                    channel_name="", 
-                    users=json.dumps(users),
-                    type="Direct",
-                    last_message=content,
-                    creator_email=sender,
-                    creator=sender_full_name
-                )
-                log_data["create_channel_response"] = res
-                
-                if res and res.get("results"):
-                    room_name = res["results"][0]["room"]
-                    log_data["new_room_name"] = room_name
-                else:
-                    frappe.log_error(title="Leave App: Chat Channel Creation Failed", message=frappe.as_json(log_data))
-
-            if room_name:
-                # 3. Diagnostic Logging: Verify Membership State
-                members = frappe.get_all("ClefinCode Chat Channel User", 
-                                        filters={"parent": room_name}, 
-                                        fields=["user", "is_removed", "active"])
-                log_data["channel_members_final"] = members
-
-                sender_full_name = frappe.db.get_value("User", sender, "full_name") or sender
-                
-                # 4. Send the message
-                send_res = send(
-                    content=content,
-                    user=sender_full_name,
-                    room=room_name,
-                    email=sender
-                )
-                log_data["send_response"] = send_res
-                
-                if send_res and isinstance(send_res, dict) and send_res.get("results"):
-                    log_data["message_name"] = send_res["results"][0].get("new_message_name")
-
-                # 5. Force Sidebar Refresh for HR
-                # Explicitly publish to HR user's session to ensure sidebar update
-                refresh_data = {
-                    "room": room_name,
-                    "realtime_type": "update_room",
-                    "content": content,
-                    "user": sender_full_name,
-                    "sender_email": sender,
-                    "room_type": "Direct"
-                }
-                frappe.publish_realtime(event="update_room", message=refresh_data, user=receiver)
-                frappe.publish_realtime(event="new_chat_notification", message=refresh_data, user=receiver)
-                
-                # Final log to verify success and parameters
-                frappe.log_error(title="Leave App Chat Debug", message=frappe.as_json(log_data))
-            else:
-                log_data["error"] = "Room name could not be determined"
-                frappe.log_error(title="Leave App Chat Failed", message=frappe.as_json(log_data))
-                
-        except Exception as e:
-            log_data["exception"] = str(e)
-            log_data["traceback"] = frappe.get_traceback()
-            frappe.log_error(title="Leave Application Chat Notification Exception", message=frappe.as_json(log_data))
-
+        """Queue a chat message; it is delivered by the background notification job."""
+        queue_chat(self, sender, receiver, content)
 
     # =================================================
     # GET EMPLOYEE EMAILS
     # =================================================
     def get_employee_emails(self):
         """Fetch both company email and personal email of the employee"""
-        emp = frappe.db.get_value("Employee", self.employee, ["email", "personal_email"], as_dict=True)
-        if not emp:
-            return [], None
-        
-        emails = []
-        primary_email = emp.email or emp.personal_email
-        
-        if emp.email:
-            emails.append(emp.email)
-        if emp.personal_email:
-            emails.append(emp.personal_email)
-            
-        return list(set(emails)), primary_email
+        contacts = get_employee_contacts(self.employee)
+        return contacts.emails, contacts.primary_email
 
     # =================================================
     # 1️⃣ EMPLOYEE SUBMIT → HR
@@ -245,15 +124,11 @@ class LeaveApplication(Document):
 
         emp_emails, primary_email = self.get_employee_emails()
         sender_name = f"{self.employee_name} <{primary_email}>" if primary_email else hr_email
-    
-        cc_list = []
-        if cc_emails:
-            cc_list = [e.strip() for e in cc_emails.replace("\n", ",").split(",") if e.strip()]
-        
+
         if hr_email:
             self.send_email(
                 recipients=[hr_email],
-                cc=cc_list,
+                cc=split_emails(cc_emails),
                 subject=f"📩 New Leave Request - {self.employee_name}",
                 header="New Leave Request",
                 icon="📩",
@@ -289,17 +164,8 @@ class LeaveApplication(Document):
             f"Please review and take necessary action."
         )
 
-        for receiver in hr_users:
-            # Skip sending to self
-            if receiver == sender:
-                continue
-                
-            try:
-                # Log final IDs being used for verification
-                frappe.logger().debug(f"Leave App: Chat Dispatch -> Sender ID: {sender}, Receiver ID: {receiver}")
-                self.send_chat_notification(sender, receiver, content)
-            except Exception as e:
-                frappe.log_error(title="Leave Application Submit Chat Loop Error", message=frappe.get_traceback())
+        # Skips the sender if they are HR themselves
+        self.send_chat_notification(sender, hr_users, content)
 
 
     # =================================================
@@ -347,7 +213,7 @@ class LeaveApplication(Document):
                 )
 
             # InnoChat Notification to Employee
-            receiver = frappe.db.get_value("Employee", self.employee, "user")
+            receiver = self.get_employee_user()
             if receiver and receiver != frappe.session.user:
                 content = (
                     f"<b>📩 Clarification Requested</b><br><br>"
@@ -365,15 +231,10 @@ class LeaveApplication(Document):
         elif current_state == "Pending" and previous_state == "Clarification Requested":
             emp_reply = self.get_latest_employee_reply()
             
-            cc_emails = hr_settings.get("hr_cc_emails")
-            cc_list = []
-            if cc_emails:
-                cc_list = [e.strip() for e in cc_emails.replace("\n", ",").split(",") if e.strip()]
-
             if hr_email:
                 self.send_email(
                     recipients=[hr_email],
-                    cc=cc_list,
+                    cc=split_emails(hr_settings.get("hr_cc_emails")),
                     subject=f"📩 Reply from Employee - {self.employee_name}",
                     header="Reply Received",
                     icon="📩",
@@ -395,9 +256,7 @@ class LeaveApplication(Document):
                 f"<b>To:</b> {frappe.utils.formatdate(self.to_date)}<br><br>"
                 f"Employee has replied to the clarification request."
             )
-            for hr_user in hr_users:
-                if hr_user != frappe.session.user:
-                    self.send_chat_notification(frappe.session.user, hr_user, content)
+            self.send_chat_notification(frappe.session.user, hr_users, content)
 
         # -------------------------------------------------
         # HR → APPROVE → EMPLOYEE ONLY
@@ -417,7 +276,7 @@ class LeaveApplication(Document):
                 )
 
             # InnoChat Notification to Employee
-            receiver = frappe.db.get_value("Employee", self.employee, "user")
+            receiver = self.get_employee_user()
             if receiver and receiver != frappe.session.user:
                 content = (
                     f"<b>✅ Leave Approved</b><br><br>"
@@ -589,21 +448,21 @@ class LeaveApplication(Document):
         </div>
         """
 
-        frappe.sendmail(
-            recipients=[r for r in recipients if r],
+        queue_email(
+            self,
+            recipients=recipients,
             cc=cc,
             subject=subject,
             message=message,
             sender=sender,
-            reply_to=reply_to,
-            reference_doctype="Leave Application",
-            reference_name=self.name
+            reply_to=reply_to
         )
 
 
 def send_submit_notification(doc_name, submitter_user):
     """
-    Background job to send submit notification to HR.
+    Background job to send submit notification to HR (kept for jobs queued before
+    notifications were sent from on_submit).
     Sets the session user to ensure InnoChat identifies the correct employee sender.
     """
     if not doc_name or not submitter_user:
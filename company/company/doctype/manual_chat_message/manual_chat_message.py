@@ -3,7 +3,7 @@
 
 import frappe
 from frappe.model.document import Document
-from company.company.api import send_automated_chat_message
+from company.company.chat_broadcast import queue_messages
 
 class ManualChatMessage(Document):
 	@frappe.whitelist()
@@ -27,32 +27,18 @@ class ManualChatMessage(Document):
 		if not receivers:
 			frappe.throw("At least one receiver is required")
 
-		# Add to queue
-		for receiver in receivers:
-			self.add_to_queue(self.sender, receiver, self.content)
+		# Add to queue; processing starts once this request commits
+		queued = self.add_to_queue(receivers)
 
-		# Trigger background processing
-		frappe.enqueue(
-			"company.company.api.process_chat_message_queue",
-			queue="long",
-			at_front=True
-		)
+		frappe.msgprint(f"Queued {queued} messages for background processing.")
+		return {"success": queued}
 
-		frappe.msgprint(f"Queued {len(receivers)} messages for background processing.")
-		return {"success": len(receivers)}
-
-	def add_to_queue(self, sender, receiver, content):
+	def add_to_queue(self, receivers):
 		"""
-		Creates a record in Chat Message Queue.
+		Creates the Chat Message Queue records for all receivers in one insert
+		and enqueues the background job that sends them.
 		"""
-		queue_doc = frappe.new_doc("Chat Message Queue")
-		queue_doc.sender = sender
-		queue_doc.receiver = receiver
-		queue_doc.content = content
-		queue_doc.manual_chat_message = self.name
-		queue_doc.status = "Pending"
-		queue_doc.insert(ignore_permissions=True)
-		return queue_doc
+		return queue_messages(self.sender, receivers, self.content, manual_chat_message=self.name)
 
 	def process_scheduled_send(self):
 		"""
@@ -95,17 +81,9 @@ class ManualChatMessage(Document):
 		receivers = self.get_receivers()
 		frappe.logger().info(f"[SCHEDULED SEND] Processing {len(receivers)} receivers")
 		
-		for receiver in receivers:
-			self.add_to_queue(self.sender, receiver, self.content)
-		
-		# Trigger background processing
-		if receivers:
-			frappe.enqueue(
-				"company.company.api.process_chat_message_queue",
-				queue="long",
-				at_front=True
-			)
-			frappe.logger().info(f"[SCHEDULED SEND] Queued {len(receivers)} messages for processing")
+		queued = self.add_to_queue(receivers)
+		if queued:
+			frappe.logger().info(f"[SCHEDULED SEND] Queued {queued} messages for processing")
 		
 		# Update last sent date
 		self.db_set("last_sent_date", today)
@@ -121,16 +99,9 @@ class ManualChatMessage(Document):
 		if not receivers:
 			frappe.throw("No receivers found (check 'Select All Users' or receivers table)")
 		
-		for receiver in receivers:
-			self.add_to_queue(self.sender, receiver, self.content)
-		
-		frappe.enqueue(
-			"company.company.api.process_chat_message_queue",
-			queue="long",
-			at_front=True
-		)
+		queued = self.add_to_queue(receivers)
 		
-		return f"Test complete. Queued {len(receivers)} messages for processing."
+		return f"Test complete. Queued {queued} messages for processing."
 
 @frappe.whitelist()
 def get_all_users():
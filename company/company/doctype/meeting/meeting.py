@@ -3,7 +3,8 @@
 
 import frappe
 from frappe.model.document import Document
-from frappe.utils import get_datetime, format_datetime, now_datetime
+from frappe.utils import get_datetime, now_datetime
+from company.company.event_sync import sync_record_to_event
 from company.company.reminders import handle_meet_reminder
 
 class Meeting(Document):
@@ -48,30 +49,7 @@ class Meeting(Document):
         handle_meet_reminder(self)
 
         """Update or create Event when Meeting is modified."""
-
-        if frappe.flags.get("ignore_meeting_sync"):
-            return 
-
-        # Create if not exists
-        if not frappe.db.exists("Event", {
-            "reference_doctype": "Meeting",
-            "reference_docname": self.name
-        }):
-            create_event_for_meeting(self)
-        else:
-            update_event_for_meeting(self)
-
-        # Sync status
-        if self.outgoing_call_status == "Completed":
-            event_name = frappe.db.get_value(
-                "Event",
-                {"reference_doctype": "Meeting", "reference_docname": self.name},
-                "name"
-            )
-            if event_name:
-                event = frappe.get_doc("Event", event_name)
-                event.status = "Completed"
-                event.save(ignore_permissions=True)
+        sync_record_to_event(self)
 
     def on_trash(self):
         """
@@ -87,67 +65,7 @@ class Meeting(Document):
 
 def create_event_for_meeting(doc):
     """Creates Calendar Event automatically from Meeting."""
-
-    # Prevent duplicate creation
-    if frappe.db.exists("Event", {
-        "reference_doctype": "Meeting",
-        "reference_docname": doc.name
-    }):
-        return
-
-    event = frappe.new_doc("Event")
-
-    # -------- TITLE FORMAT --------
-    meeting_start = doc.get("from")
-    if meeting_start:
-        formatted_start = format_datetime(meeting_start, "hh:mm a")
-        event.subject = f"{doc.title} - {formatted_start}"
-    else:
-        event.subject = doc.title
-
-    # Category
-    event.event_category = "Meeting"
-    event.event_type = "Private"
-
-    # -------- TIME --------
-    event.starts_on = doc.get("from")
-    event.ends_on = doc.get("to")
-
-    # Always timed
-
-    start = get_datetime(doc.get("from"))
-    end = get_datetime(doc.get("to"))
-
-    # Status
-    event.status = doc.outgoing_call_status
-
-    if start.date() == end.date():
-        event.all_day = 0
-    else:
-        event.all_day = 0 
-
-    # -------- COLOR --------
-    status = doc.outgoing_call_status
-    color_map = {
-        "Scheduled": "#FBC02D",
-        "Completed": "#0DB260",
-    }
-    event.color = color_map.get(status, "#FBC02D")
-
-    # -------- DESCRIPTION --------
-    event.description = f"""
-        <b>Meeting Venue:</b> {doc.meeting_venue or ''}<br>
-        <b>Location:</b> {doc.location or ''}<br>
-        <b>Host:</b> {doc.host or ''}<br>
-    """
-
-    # -------- LINK EVENT BACK TO MEETING --------
-    event.reference_doctype = "Meeting"
-    event.reference_docname = doc.name
-
-
-    event.insert(ignore_permissions=True)
-    frappe.db.commit()
+    sync_record_to_event(doc)
 
 
 # -------------------------------------------------------
@@ -155,58 +73,5 @@ def create_event_for_meeting(doc):
 # -------------------------------------------------------
 
 def update_event_for_meeting(doc):
-    """Updates Calendar Event linked to this Meeting."""
-
-    event_name = frappe.db.get_value(
-        "Event",
-        {"reference_doctype": "Meeting", "reference_docname": doc.name},
-        "name"
-    )
-
-    if not event_name:
-        return  # No event found
-
-    event = frappe.get_doc("Event", event_name)
-
-    # -------- TITLE FORMAT --------
-    meeting_start = doc.get("from")
-    if meeting_start:
-        formatted_start = format_datetime(meeting_start, "hh:mm a")
-        event.subject = f"{doc.title} - {formatted_start}"
-    else:
-        event.subject = doc.title
-
-    # -------- TIME --------
-    event.starts_on = doc.get("from")
-    event.ends_on = doc.get("to")
-
-    # Always timed
-    start = get_datetime(doc.get("from"))
-    end = get_datetime(doc.get("to"))
-
-    # Status
-    event.status = doc.outgoing_call_status
-
-    if start.date() == end.date():
-        event.all_day = 0
-    else:
-        event.all_day = 0 
-
-    # -------- COLOR --------
-    status = doc.outgoing_call_status
-    color_map = {
-        "Scheduled": "#FBC02D",
-        "Completed": "#0DB260",
-    }
-    event.color = color_map.get(status, "#FBC02D")
-
-    # -------- DESCRIPTION --------
-    event.description = f"""
-        <b>Meeting Venue:</b> {doc.meeting_venue or ''}<br>
-        <b>Location:</b> {doc.location or ''}<br>
-        <b>Host:</b> {doc.host or ''}<br>
-    """
-
-    # Save changes
-    event.save(ignore_permissions=True)
-    frappe.db.commit()
+    """Updates Calendar Event linked to this Meeting (changed fields only)."""
+    sync_record_to_event(doc)
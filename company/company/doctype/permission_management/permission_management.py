@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 import frappe
 from frappe.model.document import Document
+from company.company.permission_matrix import clear_permission_matrix_cache
 
 class PermissionManagement(Document):
     def validate(self):
@@ -12,6 +13,13 @@ class PermissionManagement(Document):
             if (perm.add_permission or perm.edit_permission or perm.delete_permission or perm.export_permission or perm.get("import_permission")):
                 perm.view_permission = 1
 
+    def on_update(self):
+        # Recompile lazily on the next get_user_permissions call
+        clear_permission_matrix_cache(self.name)
+
+    def on_trash(self):
+        clear_permission_matrix_cache(self.name)
+
     @frappe.whitelist()
     def populate_default_permissions(self):
         # Always build or sync permissions when backend_master_role is selected
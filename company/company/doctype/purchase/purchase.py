@@ -11,7 +11,7 @@ class Purchase(Document):
 		"""Validate prices, calculate balance_amount"""
 		self.validate_prices()
 		self.validate_grand_total()
-		if not self.paid_amount:
+		if self.is_new() or not self.paid_amount:
 			self.paid_amount = 0
 		
 		# Calculate balance_amount as grand_total - paid_amount
@@ -28,24 +28,6 @@ class Purchase(Document):
 		if not self.grand_total or float(self.grand_total) <= 0:
 			frappe.throw("Grand Total cannot be zero or negative")
 
-	def after_insert(self):
-		"""Update paid_amount and balance_amount after saving the purchase"""
-		total_paid = frappe.db.sql("""
-			SELECT SUM(amount_collected) FROM `tabPurchase Collection`
-			WHERE purchase=%s
-		""", self.name)[0][0] or 0
-
-		balance_amount = flt(self.grand_total) - flt(total_paid)
-		if balance_amount < 0:
-			balance_amount = 0
-
-		# Use set_value to persist to DB
-		frappe.db.set_value(self.doctype, self.name, {
-			"paid_amount": flt(total_paid),
-			"balance_amount": flt(balance_amount)
-		})
-		frappe.db.commit()
-
 
 @frappe.whitelist()
 @frappe.validate_and_sanitize_search_inputs
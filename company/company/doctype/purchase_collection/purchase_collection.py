@@ -3,43 +3,9 @@ from frappe.model.document import Document
 from frappe.utils import flt
 
 class PurchaseCollection(Document):
-    def on_update(self):
-        self.update_purchase_balance()
-
-    def after_insert(self):
-        self.update_purchase_balance()
-
-    def after_delete(self):
-        self.update_purchase_balance()
-
-    def on_submit(self):
-        self.update_purchase_balance()
-
-    def on_cancel(self):
-        self.update_purchase_balance()
-
-    def update_purchase_balance(self):
-        if not self.purchase:
-            return
-
-        # Get the sum of all collections for this purchase
-        total_collected = frappe.db.sql("""
-            SELECT SUM(amount_collected) FROM `tabPurchase Collection`
-            WHERE purchase=%s
-        """, self.purchase)[0][0] or 0
-
-        purchase_doc = frappe.get_doc("Purchase", self.purchase)
-        grand_total = flt(purchase_doc.grand_total)
-        
-        balance_amount = grand_total - flt(total_collected)
-        if balance_amount < 0:
-            balance_amount = 0
-
-        # Update the Purchase document
-        frappe.db.set_value("Purchase", self.purchase, {
-            "paid_amount": flt(total_collected),
-            "balance_amount": flt(balance_amount)
-        })
+    # paid_amount / balance_amount on the Purchase are maintained incrementally by the
+    # Purchase Collection doc_events (company.company.collection_balance)
+    pass
 
 # Global hooks for Purchase Collection
 @frappe.whitelist()
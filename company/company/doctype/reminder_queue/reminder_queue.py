@@ -1,9 +1,14 @@
 # Copyright (c) 2025, deepak and contributors
 # For license information, please see license.txt
 
-# import frappe
+import frappe
 from frappe.model.document import Document
 
 
 class ReminderQueue(Document):
 	pass
+
+
+def on_doctype_update():
+	# The dispatcher claims due rows with `status = 'Pending' AND trigger_at <= now`
+	frappe.db.add_index("Reminder Queue", ["status", "trigger_at"])
@@ -1,7 +1,14 @@
-import json
 import frappe
 from frappe.model.document import Document
 from frappe.utils import formatdate, get_url
+from company.company.notification_fanout import (
+    get_employee_contacts,
+    get_hr_settings,
+    get_role_users,
+    queue_chat,
+    queue_email,
+    split_emails
+)
 
 
 class Request(Document):
@@ -15,18 +22,13 @@ class Request(Document):
             )
 
     def on_submit(self):
-        """Enqueue HR notifications in background to avoid submit delay"""
-        # 🛡️ Prevent double enqueuing in the same request
-        if frappe.flags.get(f"enqueued_submit_notification_{self.name}"):
+        """Notify HR; deliveries are queued and sent in the background after commit"""
+        # 🛡️ Prevent double notifications in the same request
+        if frappe.flags.get(f"queued_submit_notification_{self.name}"):
             return
 
-        frappe.enqueue(
-            "company.company.doctype.request.request.send_submit_notification",
-            doc_name=self.name,
-            submitter_user=frappe.session.user,
-            enqueue_after_commit=True
-        )
-        frappe.flags[f"enqueued_submit_notification_{self.name}"] = True
+        self.notify_hr_on_submission()
+        frappe.flags[f"queued_submit_notification_{self.name}"] = True
 
     # =================================================
     # AUTO-SUBMIT AFTER INSERT
@@ -88,152 +90,28 @@ class Request(Document):
     # GET HR EMAIL SETTINGS
     # =================================================
     def get_hr_settings(self):
-        """Fetch HR email and CC from Company Email Settings"""
-        settings = frappe.get_all(
-            "Company Email Settings",
-            fields=["hr_email", "hr_cc_emails", "hr_name"],
-            limit=1
-        )
-        if settings:
-            return settings[0]
-        return {}
+        """Fetch HR email and CC from Company Email Settings (cached)"""
+        return get_hr_settings()
 
     def get_employee_user(self):
         """Get the user linked to the employee_id"""
-        return frappe.db.get_value("Employee", self.employee_id, "user")
+        return get_employee_contacts(self.employee_id).user
 
     def get_hr_users(self):
-        """Get valid HR User IDs for chat notifications"""
-        roles = ["HR"]
-        role_users = frappe.get_all(
-            "Has Role",
-            filters={"role": ["in", roles], "parenttype": "User"},
-            pluck="parent"
-        )
-        # Filter unique and active users
-        hr_users = [u for u in set(role_users) if frappe.db.get_value("User", u, "enabled")]
-
-        return list(set(hr_users))
+        """Get valid HR User IDs for chat notifications (cached per role)"""
+        return get_role_users("HR")
 
     def send_chat_notification(self, sender, receiver, content):
-        """Send a chat message via clefincode_chat. Create/Verify channel and send message."""
-        log_data = {
-            "sender_id": sender,
-            "receiver_id": receiver,
-            "content": content
-        }
-        
-        try:
-            from clefincode_chat.api.api_1_2_1.api import send, create_channel, share_doctype, get_profile_id
-            
-            # 1. Check if direct room exists (Using system IDs)
-            room_name = frappe.db.sql("""
-                SELECT c.name
-                FROM `tabClefinCode Chat Channel` c
-                JOIN `tabClefinCode Chat Channel User` u1 ON u1.parent = c.name
-                JOIN `tabClefinCode Chat Channel User` u2 ON u2.parent = c.name
-                WHERE c.type = 'Direct'
-                AND c.is_parent = 1
-                AND u1.user = %s
-                AND u2.user = %s
-            """, (sender, receiver), pluck=True)
-
-            if room_name:
-                room_name = room_name[0]
-                log_data["room_name_found"] = room_name
-                # Ensure HR receiver is active and not removed
-                frappe.db.sql("""
-                    UPDATE `tabClefinCode Chat Channel User`
-                    SET is_removed = 0, active = 1
-                    WHERE parent = %s AND user = %s
-                """, (room_name, receiver))
-                # Ensure document sharing is active
-                share_doctype("ClefinCode Chat Channel", room_name, receiver)
-            else:
-                # 2. Create channel using system IDs
-                users = [
-                    {"email": sender, "platform": "Chat"},
-                    {"email": receiver, "platform": "Chat"}
-                ]
-                sender_full_name = frappe.db.get_value("User", sender, "full_name") or sender
-                res = create_channel(
-                    channel_name="", 
-                    users=json.dumps(users),
-                    type="Direct",
-                    last_message=content,
-                    creator_email=sender,
-                    creator=sender_full_name
-                )
-                log_data["create_channel_response"] = res
-                
-                if res and res.get("results"):
-                    room_name = res["results"][0]["room"]
-                    log_data["new_room_name"] = room_name
-                else:
-                    frappe.log_error(title="Request App: Chat Channel Creation Failed", message=frappe.as_json(log_data))
-
-            if room_name:
-                # 3. Diagnostic Logging: Verify Membership State
-                members = frappe.get_all("ClefinCode Chat Channel User", 
-                                        filters={"parent": room_name}, 
-                                        fields=["user", "is_removed", "active"])
-                log_data["channel_members_final"] = members
-
-                sender_full_name = frappe.db.get_value("User", sender, "full_name") or sender
-                
-                # 4. Send the message
-                send_res = send(
-                    content=content,
-                    user=sender_full_name,
-                    room=room_name,
-                    email=sender
-                )
-                log_data["send_response"] = send_res
-                
-                if send_res and isinstance(send_res, dict) and send_res.get("results"):
-                    log_data["message_name"] = send_res["results"][0].get("new_message_name")
-
-                # 5. Force Sidebar Refresh for HR
-                refresh_data = {
-                    "room": room_name,
-                    "realtime_type": "update_room",
-                    "content": content,
-                    "user": sender_full_name,
-                    "sender_email": sender,
-                    "room_type": "Direct"
-                }
-                frappe.publish_realtime(event="update_room", message=refresh_data, user=receiver)
-                frappe.publish_realtime(event="new_chat_notification", message=refresh_data, user=receiver)
-                
-                # Final log to verify success and parameters
-                frappe.log_error(title="Request Chat Debug", message=frappe.as_json(log_data))
-            else:
-                log_data["error"] = "Room name could not be determined"
-                frappe.log_error(title="Request Chat Failed", message=frappe.as_json(log_data))
-                
-        except Exception as e:
-            log_data["exception"] = str(e)
-            log_data["traceback"] = frappe.get_traceback()
-            frappe.log_error(title="Request Chat Notification Exception", message=frappe.as_json(log_data))
+        """Queue a chat message; it is delivered by the background notification job."""
+        queue_chat(self, sender, receiver, content)
 
     # =================================================
     # GET EMPLOYEE EMAILS
     # =================================================
     def get_employee_emails(self):
         """Fetch both company email and personal email of the employee"""
-        emp = frappe.db.get_value("Employee", self.employee_id, ["email", "personal_email"], as_dict=True)
-        if not emp:
-            return [], None
-        
-        emails = []
-        primary_email = emp.email or emp.personal_email
-        
-        if emp.email:
-            emails.append(emp.email)
-        if emp.personal_email:
-            emails.append(emp.personal_email)
-            
-        return list(set(emails)), primary_email
+        contacts = get_employee_contacts(self.employee_id)
+        return contacts.emails, contacts.primary_email
 
     # =================================================
     # 1️⃣ EMPLOYEE SUBMIT → HR (Blue Theme)
@@ -247,13 +125,9 @@ class Request(Document):
         sender = f"{self.employee_name} <{primary_email}>" if primary_email else hr_email
 
         if hr_email:
-            cc_list = []
-            if cc_emails:
-                cc_list = [e.strip() for e in cc_emails.replace("\n", ",").split(",") if e.strip()]
-
             self.send_email(
                 recipients=[hr_email],
-                cc=cc_list,
+                cc=split_emails(cc_emails),
                 subject=f"📩 New Request - {self.employee_name}",
                 header="New Request Submitted",
                 icon="📩",
@@ -276,12 +150,7 @@ class Request(Document):
             f"Please review and take necessary action."
         )
 
-        for receiver in hr_users:
-            if receiver != sender_user:
-                try:
-                    self.send_chat_notification(sender_user, receiver, content)
-                except Exception:
-                    frappe.log_error(title="Request Submit Chat Loop Error", message=frappe.get_traceback())
+        self.send_chat_notification(sender_user, hr_users, content)
 
     # =================================================
     # 2️⃣ HR → APPROVE → EMPLOYEE (Green Theme)
@@ -432,15 +301,10 @@ class Request(Document):
         elif current_state == "Pending" and previous_state == "Clarification Requested":
             emp_reply = self.get_latest_employee_reply()
             
-            cc_emails = hr_settings.get("hr_cc_emails")
-            cc_list = []
-            if cc_emails:
-                cc_list = [e.strip() for e in cc_emails.replace("\n", ",").split(",") if e.strip()]
-
             if hr_email:
                 self.send_email(
                     recipients=[hr_email],
-                    cc=cc_list,
+                    cc=split_emails(hr_settings.get("hr_cc_emails")),
                     subject=f"📩 Reply from Employee - {self.employee_name}",
                     header="Reply Received",
                     icon="📩",
@@ -462,9 +326,7 @@ class Request(Document):
                 f"<b>Reply:</b> {emp_reply or '-'}<br><br>"
                 f"Employee has replied to the clarification request."
             )
-            for hr_user in hr_users:
-                if hr_user != sender_user:
-                    self.send_chat_notification(sender_user, hr_user, content)
+            self.send_chat_notification(sender_user, hr_users, content)
 
     # =================================================
     # FETCH LATEST HR QUERY
@@ -620,21 +482,21 @@ class Request(Document):
         </div>
         """
 
-        frappe.sendmail(
-            recipients=[r for r in recipients if r],
+        queue_email(
+            self,
+            recipients=recipients,
             cc=cc,
             subject=subject,
             message=message_html,
             sender=sender,
-            reply_to=reply_to,
-            reference_doctype="Request",
-            reference_name=self.name
+            reply_to=reply_to
         )
 
 
 def send_submit_notification(doc_name, submitter_user):
     """
-    Background job to send submit notification to HR.
+    Background job to send submit notification to HR (kept for jobs queued before
+    notifications were sent from on_submit).
     Sets the session user to ensure InnoChat identifies the correct employee sender.
     """
     if not doc_name or not submitter_user:
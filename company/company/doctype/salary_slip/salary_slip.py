@@ -3,14 +3,17 @@ from frappe import _
 from datetime import datetime, timedelta
 from frappe.utils import flt, get_first_day, get_last_day, getdate, formatdate
 from frappe.model.document import Document
+from company.company.pdf_pipeline import get_cached_pdf, render_pdfs
+from company.company.settings_cache import get_settings
 from calendar import monthrange
+import traceback
 
 class SalarySlip(Document):
     def on_submit(self):
         """Triggered automatically when a Salary Slip is submitted (approved)."""
-        self.send_email_notification()
+        queue_salary_slip_email(self.name)
 
-    def send_email_notification(self):
+    def send_email_notification(self, pdf_content=None):
         """Send salary slip PDF via email to the employee."""
         try:
             recipients = []
@@ -21,13 +24,8 @@ class SalarySlip(Document):
 
             if recipients:
                 month_year = formatdate(self.pay_period_start, "MMMM YYYY")
-                print_format = frappe.get_meta("Salary Slip").default_print_format or "Standard"
-                pdf_content = frappe.get_print(
-                    "Salary Slip",
-                    self.name,
-                    print_format=print_format,
-                    as_pdf=True
-                )
+                if pdf_content is None:
+                    pdf_content = get_cached_pdf("Salary Slip", self.name)
 
                 message = f"""
                 <div style="font-family: 'Montserrat', 'Segoe UI', Arial, sans-serif; background:#f4f6f8; padding:30px;">
@@ -51,7 +49,7 @@ class SalarySlip(Document):
                     subject=f"Salary Slip for {month_year}",
                     message=message,
                     attachments=[{
-                        "fname": f"Salary_Slip_{self.employee}_{month_year.replace(' ', '_')}.pdf",
+                        "fname": self.get_pdf_filename(),
                         "fcontent": pdf_content
                     }],
                     reference_doctype="Salary Slip",
@@ -61,6 +59,171 @@ class SalarySlip(Document):
         except Exception as e:
             frappe.log_error(message=frappe.get_traceback(), title=f"Email Error for {self.employee_name}")
 
+    def get_pdf_filename(self):
+        month_year = formatdate(self.pay_period_start, "MMMM YYYY")
+        return f"Salary_Slip_{self.employee}_{month_year.replace(' ', '_')}.pdf"
+
+
+
+# =================== SALARY SLIP EMAILS ===================
+# Rendering a slip PDF takes seconds, so submitting no longer emails inline: slips
+# submitted in a request are collected and emailed by one long-queue job after commit,
+# which renders them in parallel through the PDF cache.
+
+SALARY_SLIP_BATCH_PREFIX = "company:salary_slip_batch"
+SALARY_SLIP_BATCH_TTL = 24 * 60 * 60
+SALARY_SLIP_BATCH_CHUNK = 20
+
+
+def queue_salary_slip_email(name):
+    names = getattr(frappe.local, "salary_slip_email_queue", None)
+    if names is None:
+        names = frappe.local.salary_slip_email_queue = []
+        frappe.db.after_commit.add(flush_salary_slip_emails)
+        frappe.db.after_rollback.add(discard_salary_slip_emails)
+    names.append(name)
+
+
+def discard_salary_slip_emails():
+    frappe.local.salary_slip_email_queue = None
+
+
+def flush_salary_slip_emails():
+    names = getattr(frappe.local, "salary_slip_email_queue", None)
+    frappe.local.salary_slip_email_queue = None
+    if names:
+        frappe.enqueue(
+            "company.company.doctype.salary_slip.salary_slip.send_salary_slip_emails",
+            queue="long",
+            names=names
+        )
+
+
+def send_salary_slip_emails(names, on_progress=None):
+    """
+    Email each slip its PDF; PDFs are rendered a chunk at a time in parallel. A slip
+    whose PDF fails to render is logged and skipped. Returns ({filename: PDF bytes},
+    [names that failed to render]).
+    """
+    pdfs, failed = {}, []
+    for i in range(0, len(names), SALARY_SLIP_BATCH_CHUNK):
+        chunk = names[i:i + SALARY_SLIP_BATCH_CHUNK]
+        errors = {}
+        rendered = render_pdfs("Salary Slip", chunk, errors=errors)
+        for name in chunk:
+            if name not in rendered:
+                failed.append(name)
+                frappe.log_error(
+                    message="".join(traceback.format_exception(errors[name])),
+                    title=f"Salary Slip PDF Error for {name}"
+                )
+                continue
+            slip = frappe.get_doc("Salary Slip", name)
+            slip.send_email_notification(pdf_content=rendered[name])
+            pdfs[slip.get_pdf_filename()] = rendered[name]
+        frappe.db.commit()
+        if on_progress:
+            on_progress(min(i + len(chunk), len(names)), len(names), failed)
+    return pdfs, failed
+
+
+def get_salary_slip_batch_key(batch_id):
+    return f"{SALARY_SLIP_BATCH_PREFIX}:{batch_id}"
+
+
+def set_salary_slip_batch_status(batch_id, user, **status):
+    key = get_salary_slip_batch_key(batch_id)
+    current = frappe.cache().get_value(key) or {}
+    current.update(status, batch_id=batch_id)
+    frappe.cache().set_value(key, current, expires_in_sec=SALARY_SLIP_BATCH_TTL)
+    frappe.publish_realtime("salary_slip_batch_progress", current, user=user)
+    return current
+
+
+@frappe.whitelist()
+def email_salary_slips_for_month(year, month):
+    """Queue emailing every submitted slip of a month; returns a batch id to poll."""
+    frappe.only_for(("HR", "System Manager"))
+    year, month = int(year), int(month)
+    names = frappe.get_all(
+        "Salary Slip",
+        filters={
+            "docstatus": 1,
+            "pay_period_start": ["between", [
+                get_first_day(f"{year}-{month:02d}-01"), get_last_day(f"{year}-{month:02d}-01")
+            ]],
+        },
+        order_by="employee_name asc",
+        pluck="name"
+    )
+    if not names:
+        frappe.throw(_("No submitted salary slips found for {0}-{1:02d}").format(year, month))
+
+    batch_id = frappe.generate_hash(length=12)
+    set_salary_slip_batch_status(
+        batch_id, frappe.session.user, status="Queued", done=0, total=len(names), failed=[], file_url=None
+    )
+    frappe.enqueue(
+        "company.company.doctype.salary_slip.salary_slip.process_salary_slip_batch",
+        queue="long",
+        timeout=3600,
+        batch_id=batch_id,
+        names=names,
+        year=year,
+        month=month,
+        user=frappe.session.user
+    )
+    return {"batch_id": batch_id, "total": len(names)}
+
+
+def process_salary_slip_batch(batch_id, names, year, month, user):
+    """
+    Long-queue job: email every slip, then bundle the PDFs into a private ZIP. Slips
+    whose PDF failed to render are listed in the status under `failed`.
+    """
+    import io
+    import zipfile
+
+    def on_progress(done, total, failed):
+        set_salary_slip_batch_status(batch_id, user, status="Running", done=done, total=total, failed=failed)
+
+    try:
+        pdfs, failed = send_salary_slip_emails(names, on_progress=on_progress)
+        if not pdfs:
+            set_salary_slip_batch_status(batch_id, user, status="Failed", failed=failed)
+            return
+
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+            for filename, content in pdfs.items():
+                archive.writestr(filename, content)
+
+        file_doc = frappe.get_doc({
+            "doctype": "File",
+            "file_name": f"Salary_Slips_{year}_{month:02d}.zip",
+            "is_private": 1,
+            "content": buffer.getvalue(),
+        })
+        file_doc.flags.ignore_permissions = True
+        file_doc.owner = user
+        file_doc.insert()
+        frappe.db.commit()
+
+        set_salary_slip_batch_status(
+            batch_id, user, status="Completed", file_url=file_doc.file_url, failed=failed
+        )
+    except Exception:
+        frappe.db.rollback()
+        frappe.log_error(title=f"Salary Slip Batch {batch_id} Failed")
+        set_salary_slip_batch_status(batch_id, user, status="Failed")
+
+
+@frappe.whitelist()
+def get_salary_slip_batch_status(batch_id):
+    """Progress of a month batch: status, done/total, failed slips and the ZIP url once complete."""
+    frappe.only_for(("HR", "System Manager"))
+    return frappe.cache().get_value(get_salary_slip_batch_key(batch_id))
+
 
 
 @frappe.whitelist()
@@ -73,7 +236,7 @@ def preview_salary_slip(employee, start_date, end_date):
     end_date = getdate(end_date)
     
     # 0. Fetch Settings
-    settings = frappe.get_single("HRMS Settings")
+    settings = get_settings("HRMS Settings")
     calc_source = settings.salary_calculation_source or "Attendance"
     holiday_handling = settings.salary_holiday_handling or "Include in Working Days"
     present_threshold = flt(settings.salary_slip_present_threshold) or 5.0
@@ -396,7 +559,7 @@ def get_salary_slip_with_details(name):
     end_date   = getdate(doc.pay_period_end)
 
     # Settings
-    settings          = frappe.get_single("HRMS Settings")
+    settings          = get_settings("HRMS Settings")
     calc_source       = getattr(doc, "calc_source", None) or settings.salary_calculation_source or "Attendance"
     holiday_handling  = getattr(doc, "holiday_handling", None) or settings.salary_holiday_handling or "Include in Working Days"
     present_threshold = flt(settings.salary_slip_present_threshold) or 5.0
@@ -1,7 +1,14 @@
-import json
 import frappe
 from frappe.model.document import Document
 from datetime import datetime, timedelta, date, time
+from company.company.notification_fanout import (
+    get_employee_contacts,
+    get_hr_settings,
+    get_role_users,
+    queue_chat,
+    queue_email,
+    split_emails
+)
 
 class WFHAttendance(Document):
     def validate(self):
@@ -177,133 +184,20 @@ class WFHAttendance(Document):
         return None
 
     def get_hr_settings(self):
-        """Fetch HR email and CC from Company Email Settings"""
-        settings = frappe.get_all(
-            "Company Email Settings",
-            fields=["hr_email", "hr_cc_emails", "hr_name"],
-            limit=1
-        )
-        if settings:
-            return settings[0]
-        return {}
+        """Fetch HR email and CC from Company Email Settings (cached)"""
+        return get_hr_settings()
 
     def get_employee_user(self):
         """Get the user linked to the employee"""
-        return frappe.db.get_value("Employee", self.employee, "user")
+        return get_employee_contacts(self.employee).user
 
     def get_hr_users(self):
-        """Get valid HR User IDs for chat notifications"""
-        roles = ["HR"]
-        role_users = frappe.get_all(
-            "Has Role",
-            filters={"role": ["in", roles], "parenttype": "User"},
-            pluck="parent"
-        )
-        # Filter unique and active users
-        hr_users = [u for u in set(role_users) if frappe.db.get_value("User", u, "enabled")]
-
-        return list(set(hr_users))
+        """Get valid HR User IDs for chat notifications (cached per role)"""
+        return get_role_users("HR")
 
     def send_chat_notification(self, sender, receiver, content):
-        """Send a chat message via clefincode_chat. Create/Verify channel and send message."""
-        log_data = {
-            "sender_id": sender,
-            "receiver_id": receiver,
-            "content": content
-        }
-        
-        try:
-            from clefincode_chat.api.api_1_2_1.api import send, create_channel, share_doctype, get_profile_id
-            
-            # 1. Check if direct room exists (Using system IDs)
-            room_name = frappe.db.sql("""
-                SELECT c.name
-                FROM `tabClefinCode Chat Channel` c
-                JOIN `tabClefinCode Chat Channel User` u1 ON u1.parent = c.name
-                JOIN `tabClefinCode Chat Channel User` u2 ON u2.parent = c.name
-                WHERE c.type = 'Direct'
-                AND c.is_parent = 1
-                AND u1.user = %s
-                AND u2.user = %s
-            """, (sender, receiver), pluck=True)
-
-            if room_name:
-                room_name = room_name[0]
-                log_data["room_name_found"] = room_name
-                # Ensure HR receiver is active and not removed
-                frappe.db.sql("""
-                    UPDATE `tabClefinCode Chat Channel User`
-                    SET is_removed = 0, active = 1
-                    WHERE parent = %s AND user = %s
-                """, (room_name, receiver))
-                # Ensure document sharing is active
-                share_doctype("ClefinCode Chat Channel", room_name, receiver)
-            else:
-                # 2. Create channel using system IDs
-                users = [
-                    {"email": sender, "platform": "Chat"},
-                    {"email": receiver, "platform": "Chat"}
-                ]
-                sender_full_name = frappe.db.get_value("User", sender, "full_name") or sender
-                res = create_channel(
-                    channel_name="", 
-                    users=json.dumps(users),
-                    type="Direct",
-                    last_message=content,
-                    creator_email=sender,
-                    creator=sender_full_name
-                )
-                log_data["create_channel_response"] = res
-                
-                if res and res.get("results"):
-                    room_name = res["results"][0]["room"]
-                    log_data["new_room_name"] = room_name
-                else:
-                    frappe.log_error(title="WFH App: Chat Channel Creation Failed", message=frappe.as_json(log_data))
-
-            if room_name:
-                # 3. Diagnostic Logging: Verify Membership State
-                members = frappe.get_all("ClefinCode Chat Channel User", 
-                                        filters={"parent": room_name}, 
-                                        fields=["user", "is_removed", "active"])
-                log_data["channel_members_final"] = members
-
-                sender_full_name = frappe.db.get_value("User", sender, "full_name") or sender
-                
-                # 4. Send the message
-                send_res = send(
-                    content=content,
-                    user=sender_full_name,
-                    room=room_name,
-                    email=sender
-                )
-                log_data["send_response"] = send_res
-                
-                if send_res and isinstance(send_res, dict) and send_res.get("results"):
-                    log_data["message_name"] = send_res["results"][0].get("new_message_name")
-
-                # 5. Force Sidebar Refresh
-                refresh_data = {
-                    "room": room_name,
-                    "realtime_type": "update_room",
-                    "content": content,
-                    "user": sender_full_name,
-                    "sender_email": sender,
-                    "room_type": "Direct"
-                }
-                frappe.publish_realtime(event="update_room", message=refresh_data, user=receiver)
-                frappe.publish_realtime(event="new_chat_notification", message=refresh_data, user=receiver)
-                
-                # Final log to verify success and parameters
-                frappe.log_error(title="WFH Chat Debug", message=frappe.as_json(log_data))
-            else:
-                log_data["error"] = "Room name could not be determined"
-                frappe.log_error(title="WFH Chat Failed", message=frappe.as_json(log_data))
-                
-        except Exception as e:
-            log_data["exception"] = str(e)
-            log_data["traceback"] = frappe.get_traceback()
-            frappe.log_error(title="WFH Chat Notification Exception", message=frappe.as_json(log_data))
+        """Queue a chat message; it is delivered by the background notification job."""
+        queue_chat(self, sender, receiver, content)
 
     def notify_hr_chat_on_submission(self):
         """InnoChat Notification to HR (Separate from email toggle)"""
@@ -320,12 +214,7 @@ class WFHAttendance(Document):
             f"Please review and take necessary action."
         )
 
-        for receiver in hr_users:
-            if receiver != sender_user:
-                try:
-                    self.send_chat_notification(sender_user, receiver, content)
-                except Exception:
-                    frappe.log_error(title="WFH Submit Chat Loop Error", message=frappe.get_traceback())
+        self.send_chat_notification(sender_user, hr_users, content)
 
     def notify_hr_for_approval(self):
         """Send email notification to HR when employee submits WFH Attendance"""
@@ -343,10 +232,6 @@ class WFHAttendance(Document):
         employee_email = frappe.db.get_value("Employee", self.employee, "personal_email")
         sender = f"{self.employee_name} <{employee_email}>" if employee_email else hr_email
 
-        cc_list = []
-        if cc_emails:
-            cc_list = [e.strip() for e in cc_emails.replace("\n", ",").split(",") if e.strip()]
-
 
         # Build sleek purple-styled table
         attendance_details = f"""
@@ -420,19 +305,15 @@ class WFHAttendance(Document):
         </div>
         """
 
-        try:
-            frappe.sendmail(
-                recipients=[hr_email],
-                cc=cc_list,
-                subject=f"WFH Approval Request - {self.employee_name} ({frappe.utils.formatdate(self.date)})",
-                message=message,
-                sender=sender,
-                reply_to=employee_email or hr_email,
-                reference_doctype=self.doctype,
-                reference_name=self.name
-            )
-        except Exception as e:
-            frappe.log_error(f"WFH Submit Mail Error: {str(e)}", "WFH Email Debug")
+        queue_email(
+            self,
+            recipients=[hr_email],
+            cc=split_emails(cc_emails),
+            subject=f"WFH Approval Request - {self.employee_name} ({frappe.utils.formatdate(self.date)})",
+            message=message,
+            sender=sender,
+            reply_to=employee_email or hr_email
+        )
 
     def notify_employee_chat_on_approval(self):
         """InnoChat Notification to Employee (Separate from email toggle)"""
@@ -459,8 +340,7 @@ class WFHAttendance(Document):
         hr_name = hr_settings.get("hr_name") or "HR Team"
         sender = f"{hr_name} <{hr_email}>" if hr_email else None
 
-        personal_email, company_email = frappe.db.get_value("Employee", self.employee, ["personal_email", "email"])
-        recipients = [r for r in [personal_email, company_email] if r]
+        recipients = get_employee_contacts(self.employee).emails
         if not recipients:
             return
 
@@ -514,14 +394,13 @@ class WFHAttendance(Document):
         </div>
         """
 
-        frappe.sendmail(
+        queue_email(
+            self,
             recipients=recipients,
             subject=f"✅ WFH Approved - {frappe.utils.formatdate(self.date)}",
             message=message,
             sender=sender,
-            reply_to=hr_email,
-            reference_doctype=self.doctype,
-            reference_name=self.name
+            reply_to=hr_email
         )
 
     def notify_employee_chat_on_rejection(self):
@@ -547,8 +426,7 @@ class WFHAttendance(Document):
         hr_name = hr_settings.get("hr_name") or "HR Team"
         sender = f"{hr_name} <{hr_email}>" if hr_email else None
 
-        personal_email, company_email = frappe.db.get_value("Employee", self.employee, ["personal_email", "email"])
-        recipients = [r for r in [personal_email, company_email] if r]
+        recipients = get_employee_contacts(self.employee).emails
         if not recipients:
             return
 
@@ -598,14 +476,13 @@ class WFHAttendance(Document):
         </div>
         """
 
-        frappe.sendmail(
+        queue_email(
+            self,
             recipients=recipients,
             subject=f"❌ WFH Rejected - {frappe.utils.formatdate(self.date)}",
             message=message,
             sender=sender,
-            reply_to=hr_email,
-            reference_doctype=self.doctype,
-            reference_name=self.name
+            reply_to=hr_email
         )
 
 
@@ -0,0 +1,146 @@
+import frappe
+from frappe.model.naming import getseries
+from frappe.utils import cint, cstr, getdate
+
+# Financial-year document numbers, e.g. IB-I/25-26/042.
+# Counters live in the standard `tabSeries` table keyed by the full prefix ("IB-I/25-26/"),
+# so allocation is a single locked row update instead of a LIKE scan over the doctype.
+DOCUMENT_SERIES = {
+    "Estimation": {"prefix": "IB-E", "fieldname": "ref_no"},
+    "Invoice": {"prefix": "IB-I", "fieldname": "ref_no"},
+    "Expenses": {"prefix": "EXP", "fieldname": "expense_no"},
+}
+
+SERIES_DIGITS = 3
+
+
+def get_financial_year(date=None):
+    """Return the April-March financial year label for `date`, e.g. "25-26"."""
+    date = getdate(date)
+    start_year = date.year - 1 if date.month < 4 else date.year
+    return f"{str(start_year)[-2:]}-{str(start_year + 1)[-2:]}"
+
+
+def get_series_key(doctype, date=None):
+    return f"{DOCUMENT_SERIES[doctype]['prefix']}/{get_financial_year(date)}/"
+
+
+def format_document_number(series_key, number):
+    return f"{series_key}{str(number).zfill(SERIES_DIGITS)}"
+
+
+def get_last_used_number(doctype, series_key):
+    """Highest number already used for `series_key` in the doctype's own records."""
+    fieldname = DOCUMENT_SERIES[doctype]["fieldname"]
+    last = frappe.db.sql(f"""
+        SELECT MAX(CAST(SUBSTRING(`{fieldname}`, %s) AS UNSIGNED))
+        FROM `tab{doctype}`
+        WHERE `{fieldname}` LIKE %s
+    """, (len(series_key) + 1, f"{series_key}%"))
+    return cint(last[0][0]) if last else 0
+
+
+def get_series_current(series_key):
+    current = frappe.db.sql("SELECT `current` FROM `tabSeries` WHERE `name` = %s", (series_key,))
+    return cint(current[0][0]) if current else None
+
+
+def parse_document_number(doctype, value):
+    """(series_key, number) for a value in the doctype's format, e.g. IB-I/25-26/042; else None."""
+    series_key, _, number = cstr(value).strip().rpartition("/")
+    prefix, _, financial_year = series_key.partition("/")
+    if prefix != DOCUMENT_SERIES[doctype]["prefix"] or "/" in financial_year or not number.isdigit():
+        return None
+    return f"{series_key}/", cint(number)
+
+
+def advance_series(series_key, number):
+    """Move the counter up to `number` if it is behind; locks the row until commit."""
+    frappe.db.sql("""
+        INSERT INTO `tabSeries` (`name`, `current`) VALUES (%s, %s)
+        ON DUPLICATE KEY UPDATE `current` = GREATEST(`current`, VALUES(`current`))
+    """, (series_key, number))
+
+
+def seed_series(doctype, series_key):
+    """
+    Make sure the counter row exists and is not behind the existing data.
+    Runs the scan once per series; afterwards the row is authoritative.
+    """
+    last_used = get_last_used_number(doctype, series_key)
+    advance_series(series_key, last_used)
+    return last_used
+
+
+def preview_next_number(doctype, date=None):
+    """Next number for display only; nothing is reserved."""
+    series_key = get_series_key(doctype, date)
+    current = get_series_current(series_key)
+    if current is None:
+        current = get_last_used_number(doctype, series_key)
+    return format_document_number(series_key, current + 1)
+
+
+def allocate_next_number(doctype, date=None):
+    """
+    Reserve the next number atomically. `getseries` locks the counter row with
+    SELECT ... FOR UPDATE, so concurrent inserts serialize on it until commit.
+    """
+    series_key = get_series_key(doctype, date)
+    if get_series_current(series_key) is None:
+        seed_series(doctype, series_key)
+    return f"{series_key}{getseries(series_key, SERIES_DIGITS)}"
+
+
+def reserve_document_number(doctype, value=None, date=None):
+    """
+    Number to insert a document under. The Desk forms prefill the field with the preview,
+    so a number of the current series is treated as a request, not a reservation: the
+    result is the next free number, and never lower than `value` (a stale preview moves
+    on, a number typed ahead of the counter is kept). A well-formed number of another
+    financial year is kept as given and its counter moved past it. Anything else is
+    kept untouched.
+    """
+    series_key = get_series_key(doctype, date)
+    parsed = parse_document_number(doctype, value) if value else None
+
+    if value and not parsed:
+        return value
+
+    if parsed and parsed[0] != series_key:
+        if get_series_current(parsed[0]) is None:
+            seed_series(doctype, parsed[0])
+        advance_series(*parsed)
+        return value
+
+    if parsed:
+        if get_series_current(series_key) is None:
+            seed_series(doctype, series_key)
+        advance_series(series_key, parsed[1] - 1)
+    return allocate_next_number(doctype, date)
+
+
+def assign_document_number(doc):
+    """
+    before_insert for the doctypes in DOCUMENT_SERIES: set the number field and name.
+    Both the controller and the doc_events hook call this, so it reserves once per insert.
+    """
+    if doc.flags.document_number_reserved:
+        return
+    fieldname = DOCUMENT_SERIES[doc.doctype]["fieldname"]
+    doc.set(fieldname, reserve_document_number(doc.doctype, doc.get(fieldname)))
+    doc.name = doc.get(fieldname)
+    doc.flags.document_number_reserved = True
+
+
+def backfill_document_series():
+    """Seed counters for every financial year already present in the data."""
+    for doctype, config in DOCUMENT_SERIES.items():
+        fieldname = config["fieldname"]
+        series_keys = frappe.db.sql_list(f"""
+            SELECT DISTINCT SUBSTRING_INDEX(`{fieldname}`, '/', 2)
+            FROM `tab{doctype}`
+            WHERE `{fieldname}` LIKE %s
+        """, (f"{config['prefix']}/%/%",))
+        for series_key in series_keys:
+            seed_series(doctype, f"{series_key}/")
@@ -12,6 +12,8 @@ from frappe.utils import (
 )
 from datetime import datetime
 from company.company.presence_api import get_live_active_seconds, get_live_break_seconds, get_live_status_seconds
+from company.company.session_totals import get_session_totals
+from company.company.settings_cache import get_settings
 
 @frappe.whitelist()
 def get_my_reminders():
@@ -112,7 +114,7 @@ def check_and_enqueue_reminders(hr_reminder_name=None):
 
     # 2. Process HR Organizational Reminders
     try:
-        settings = frappe.get_single("Employee Remainder Settings")
+        settings = get_settings("Employee Remainder Settings")
         if settings.enable_hr_reminders:
             # Fetch all active configurations from the new Doctype
             hr_configs = frappe.get_all("HR Remainder Configuration", fields=["name", "message", "trigger_time", "is_global"])
@@ -195,8 +197,7 @@ def check_and_enqueue_reminders(hr_reminder_name=None):
                     presence_status = frappe.db.get_value("Employee Presence", session.employee, "status")
                     if presence_status == "Away":
                         # Calculate Live Away duration
-                        session_doc = frappe.get_doc("Employee Session", session.name)
-                        away_seconds = get_live_status_seconds(session_doc, "Away")
+                        away_seconds = get_live_status_seconds(get_session_totals(session.name), "Away")
                         away_mins = away_seconds / 60.0
                         
                         if away_mins >= settings.max_break_duration_threshold:
@@ -222,12 +223,7 @@ def check_and_enqueue_reminders(hr_reminder_name=None):
                     if presence_status == "Break":
                         # Calculate Live Break duration (mapped to Lunch)
                         # Note: Breaks are tracked via Employee Break records, not intervals.
-                        # Use get_live_break_seconds with the session name explicitly
-                        class SessionStub:
-                            def __init__(self, name):
-                                self.name = name
-                        
-                        lunch_seconds = get_live_break_seconds(SessionStub(session.get('name')))
+                        lunch_seconds = get_live_break_seconds(get_session_totals(session.name))
                         lunch_mins = lunch_seconds / 60.0
                         
                         if lunch_mins >= settings.max_lunch_duration_threshold:
@@ -0,0 +1,354 @@
+import frappe
+from frappe.utils import cint, format_datetime, get_datetime, getdate
+
+from company.company.report_query import bump_report_versions
+
+# Two-way sync between calendar Events and the Calls, Meeting and ToDo records they
+# stand for. Each side is mapped to the other's fields, the mapped fields are compared
+# with what is stored, and only changed columns are written with a direct update, so a
+# sync never re-saves the other document and can never bounce back. Creating the Event
+# for a new record, and ToDo status changes (which maintain assignments), still go
+# through the document. Direct updates skip the "*" doc_events, so cached report
+# versions are bumped here for every doctype written.
+STATUS_COLORS = {
+    "Scheduled": "#FBC02D",
+    "Completed": "#0DB260",
+}
+
+EVENT_FIELDS = [
+    "name", "owner", "event_type", "subject", "starts_on", "ends_on", "status", "all_day",
+    "color", "description", "reference_doctype", "reference_docname",
+]
+
+
+def title_from_subject(subject):
+    """Record title from an Event subject ("<title> - hh:mm am")."""
+    return subject.split("-")[0].strip()
+
+
+def subject_with_time(title, start):
+    return f"{title} - {format_datetime(start, 'hh:mm a')}" if start else title
+
+
+# --------------------------------------------------------------------
+# FIELD MAPS
+# --------------------------------------------------------------------
+
+def event_values_for_call(doc):
+    return {
+        "subject": subject_with_time(doc.title, doc.get("call_start_time")),
+        "starts_on": doc.get("call_start_time"),
+        "ends_on": doc.get("call_end_time"),
+        "status": doc.outgoing_call_status,
+        "all_day": 0,
+        "color": STATUS_COLORS.get(doc.outgoing_call_status, STATUS_COLORS["Scheduled"]),
+        "description": f"""
+        <b>Call For:</b> {doc.call_for or ''}<br>
+        <b>Purpose:</b> {doc.call_purpose or ''}<br>
+        <b>Agenda:</b><br>{doc.call_agenda or ''}
+    """,
+    }
+
+
+def event_values_for_meeting(doc):
+    return {
+        "subject": subject_with_time(doc.title, doc.get("from")),
+        "starts_on": doc.get("from"),
+        "ends_on": doc.get("to"),
+        "status": doc.outgoing_call_status,
+        "all_day": 0,
+        "color": STATUS_COLORS.get(doc.outgoing_call_status, STATUS_COLORS["Scheduled"]),
+        "description": f"""
+        <b>Meeting Venue:</b> {doc.meeting_venue or ''}<br>
+        <b>Location:</b> {doc.location or ''}<br>
+        <b>Host:</b> {doc.host or ''}<br>
+    """,
+    }
+
+
+def event_values_for_todo(doc):
+    date = doc.date or doc.creation
+    if date:
+        starts_on = f"{date} 00:00:00" if len(str(date)) <= 10 else str(date)
+    else:
+        starts_on = frappe.utils.now_datetime()
+    return {
+        "subject": doc.description or "Todo Tasks",
+        "starts_on": starts_on,
+        "ends_on": starts_on,
+        "status": "Closed" if doc.status == "Closed" else "Open",
+    }
+
+
+def call_values_for_event(event):
+    values = {
+        "call_start_time": event.starts_on,
+        "call_end_time": event.ends_on,
+        "outgoing_call_status": "Completed" if event.status == "Completed" else "Scheduled",
+    }
+    if event.subject:
+        values["title"] = title_from_subject(event.subject)
+    return values
+
+
+def meeting_values_for_event(event):
+    values = {
+        "from": event.starts_on,
+        "to": event.ends_on,
+        "outgoing_call_status": "Completed" if event.status == "Completed" else "Scheduled",
+    }
+    if event.subject:
+        values["title"] = title_from_subject(event.subject)
+    return values
+
+
+def todo_values_for_event(event):
+    values = {
+        "date": getdate(event.starts_on) if event.starts_on else None,
+        "status": "Closed" if event.status == "Closed" else "Open",
+    }
+    if event.subject:
+        values["description"] = title_from_subject(event.subject)
+    if event.get("priority"):
+        values["priority"] = event.priority
+    return values
+
+
+def after_call_sync(record):
+    from company.company.reminders import handle_call_reminder
+    handle_call_reminder(record)
+
+
+def after_meeting_sync(record):
+    from company.company.reminders import handle_meet_reminder
+    handle_meet_reminder(record)
+
+
+SYNC_TARGETS = {
+    "Calls": frappe._dict({
+        "category": "Call",
+        "event_values": event_values_for_call,
+        "record_values": call_values_for_event,
+        # Everything the two maps and the reminder hook read from the record
+        "record_fields": [
+            "name", "title", "call_start_time", "call_end_time", "outgoing_call_status",
+            "call_for", "call_purpose", "call_agenda", "enable_reminder", "remind_before_minutes",
+        ],
+        "after_sync": after_call_sync,
+        "suppress_flag": "ignore_call_sync",
+    }),
+    "Meeting": frappe._dict({
+        "category": "Meeting",
+        "event_values": event_values_for_meeting,
+        "record_values": meeting_values_for_event,
+        "record_fields": [
+            "name", "title", "from", "to", "outgoing_call_status",
+            "meeting_venue", "location", "host", "enable_reminder", "remind_before_minutes",
+        ],
+        "after_sync": after_meeting_sync,
+        "suppress_flag": "ignore_meeting_sync",
+    }),
+    "ToDo": frappe._dict({
+        "category": "Todo",
+        "event_values": event_values_for_todo,
+        "record_values": todo_values_for_event,
+        "record_fields": ["name", "description", "date", "status", "priority", "creation"],
+        "after_sync": None,
+        "suppress_flag": "ignore_todo_sync",
+        # Closing/reopening a ToDo updates assignments on its reference document
+        "save_on_change": {"status"},
+        "all_day": 1,
+    }),
+}
+
+
+# --------------------------------------------------------------------
+# DIFF
+# --------------------------------------------------------------------
+
+def normalize(doctype, fieldname, value):
+    fieldtype = frappe.get_meta(doctype).get_field(fieldname)
+    fieldtype = fieldtype.fieldtype if fieldtype else None
+    if value in (None, ""):
+        return None
+    if fieldtype == "Datetime":
+        return get_datetime(value)
+    if fieldtype == "Date":
+        return getdate(value)
+    if fieldtype in ("Check", "Int"):
+        return cint(value)
+    return str(value)
+
+
+def get_changes(doctype, current, values):
+    """The subset of `values` that differs from the stored row `current`."""
+    return {
+        fieldname: value for fieldname, value in values.items()
+        if normalize(doctype, fieldname, current.get(fieldname)) != normalize(doctype, fieldname, value)
+    }
+
+
+# --------------------------------------------------------------------
+# RECORD -> EVENT
+# --------------------------------------------------------------------
+
+def sync_record_to_event(doc, event=None):
+    """
+    Create or update the Event for a Calls / Meeting / ToDo record. `event` is the
+    already fetched Event row, if the caller has it.
+    """
+    target = SYNC_TARGETS[doc.doctype]
+    if frappe.flags.get(target.suppress_flag):
+        return
+
+    if event is None:
+        event = get_linked_events([(doc.doctype, doc.name)]).get((doc.doctype, doc.name))
+
+    values = target.event_values(doc)
+    if not event:
+        create_event(doc, values)
+        return
+
+    changes = get_changes("Event", event, values)
+    if changes:
+        frappe.db.set_value("Event", event.name, changes)
+        bump_report_versions(["Event"])
+
+
+def create_event(doc, values):
+    target = SYNC_TARGETS[doc.doctype]
+    event = frappe.new_doc("Event")
+    event.update(values)
+    event.event_category = target.category
+    event.event_type = "Private"
+    event.all_day = target.get("all_day", 0)
+    event.reference_doctype = doc.doctype
+    event.reference_docname = doc.name
+
+    # The new Event's on_update must not write straight back to the record
+    flag = target.suppress_flag
+    previous, frappe.flags[flag] = frappe.flags.get(flag), True
+    try:
+        event.insert(ignore_permissions=True)
+    finally:
+        frappe.flags[flag] = previous
+
+
+def get_linked_events(references):
+    """{(reference_doctype, reference_docname): Event row} in one query."""
+    references = list(references)
+    if not references:
+        return {}
+    events = frappe.get_all(
+        "Event",
+        filters={
+            "reference_doctype": ["in", list({r[0] for r in references})],
+            "reference_docname": ["in", list({r[1] for r in references})],
+        },
+        fields=EVENT_FIELDS,
+        order_by="creation asc"
+    )
+    linked = {}
+    for event in events:
+        linked.setdefault((event.reference_doctype, event.reference_docname), event)
+    return linked
+
+
+# --------------------------------------------------------------------
+# EVENT -> RECORD
+# --------------------------------------------------------------------
+
+def sync_event_to_reference(doc, method=None):
+    """Event on_update: push calendar changes to the linked Calls / Meeting / ToDo."""
+    target = SYNC_TARGETS.get(doc.reference_doctype)
+    if not target or not doc.reference_docname or frappe.flags.get(target.suppress_flag):
+        return
+    sync_events_to_records([doc])
+
+
+def sync_events_to_records(events):
+    """Apply Event values to their linked records, reading each doctype in one query."""
+    by_doctype = {}
+    for event in events:
+        if event.reference_doctype in SYNC_TARGETS and event.reference_docname:
+            by_doctype.setdefault(event.reference_doctype, []).append(event)
+
+    written = set()
+    for doctype, doctype_events in by_doctype.items():
+        target = SYNC_TARGETS[doctype]
+        records = {r.name: r for r in frappe.get_all(
+            doctype,
+            filters={"name": ["in", [e.reference_docname for e in doctype_events]]},
+            fields=target.record_fields
+        )}
+
+        for event in doctype_events:
+            record = records.get(event.reference_docname)
+            if not record:
+                continue
+            changes = get_changes(doctype, record, target.record_values(event))
+            if not changes:
+                continue
+
+            if (target.save_on_change or set()) & set(changes):
+                # The ToDo's own on_update brings the Event back in step
+                doc = frappe.get_doc(doctype, record.name)
+                doc.update(changes)
+                doc.save(ignore_permissions=True)
+                continue
+
+            frappe.db.set_value(doctype, record.name, changes)
+            written.add(doctype)
+            record.update(changes)
+            record.doctype = doctype
+            if target.after_sync:
+                target.after_sync(record)
+
+            # Derived Event fields (subject time, colour) follow the updated record
+            sync_record_to_event(record, event)
+
+    bump_report_versions(written)
+
+
+# --------------------------------------------------------------------
+# CALENDAR
+# --------------------------------------------------------------------
+
+@frappe.whitelist()
+def move_events(changes):
+    """
+    Apply a calendar drag/resize of one or more Events: `changes` is
+    [{"name", "starts_on", "ends_on"}]. Events and their linked records are each read
+    in one query; only rows whose values actually change are written.
+    """
+    changes = frappe.parse_json(changes) if isinstance(changes, str) else changes
+    changes = {c["name"]: c for c in changes or [] if c.get("name")}
+    if not changes:
+        return []
+
+    # crm_api imports this module
+    from company.company.crm_api import validate_event
+
+    events = frappe.get_all("Event", filters={"name": ["in", list(changes)]}, fields=EVENT_FIELDS)
+    moved = []
+    for event in events:
+        frappe.has_permission("Event", "write", doc=frappe.get_doc({"doctype": "Event", **event}), throw=True)
+
+        values = {k: changes[event.name][k] for k in ("starts_on", "ends_on") if k in changes[event.name]}
+        start, end = values.get("starts_on", event.starts_on), values.get("ends_on", event.ends_on)
+        if start and end and get_datetime(start) > get_datetime(end):
+            frappe.throw(frappe._("{0}: start cannot be after end").format(event.subject or event.name))
+
+        # The direct write below skips Event.validate; apply the same calendar rules
+        validate_event(frappe.get_doc({"doctype": "Event", **event, **values}))
+
+        updates = get_changes("Event", event, values)
+        if updates:
+            frappe.db.set_value("Event", event.name, updates)
+            event.update(updates)
+            moved.append(event)
+
+    if moved:
+        bump_report_versions(["Event"])
+    sync_events_to_records(moved)
+    return [e.name for e in moved]
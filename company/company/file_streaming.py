@@ -0,0 +1,130 @@
+import hashlib
+import hmac
+import mimetypes
+import os
+from urllib.parse import quote
+
+import frappe
+from werkzeug.utils import send_file
+from werkzeug.wrappers import Response
+
+# Signed attachment links (proposal/estimation/invoice/purchase exports) and the
+# short-lived WhatsApp media links all end up here. Files are never read into memory:
+# behind nginx the download is handed off with X-Accel-Redirect, otherwise werkzeug
+# streams it in chunks with Range and ETag / If-None-Match support.
+#
+# Verifying a link means checking its token and resolving the file on disk; the result
+# is cached for as long as the link stays valid so repeated fetches skip both.
+DOWNLOAD_CACHE_PREFIX = "company:download"
+SIGNED_LINK_CACHE_TTL = 10 * 60
+
+
+class DownloadNotFound(Exception):
+    pass
+
+
+def make_file_token(value):
+    """Signed token for a file id / path; links built with it do not expire."""
+    secret = frappe.local.conf.get("encryption_key") or frappe.local.site
+    return hashlib.sha256(f"{value}-{secret}".encode()).hexdigest()[:32]
+
+
+def is_valid_file_token(value, token):
+    return bool(value and token) and hmac.compare_digest(str(token), make_file_token(value))
+
+
+def get_site_file_path(file_url):
+    """Absolute path on disk for a /files/... or /private/files/... URL, confined to the site."""
+    site_path = os.path.abspath(frappe.get_site_path())
+
+    if file_url.startswith("/private/"):
+        relative_path = file_url.lstrip("/")
+    elif file_url.startswith("/files/"):
+        relative_path = os.path.join("public", file_url.lstrip("/"))
+    else:
+        relative_path = file_url.lstrip("/")
+
+    file_path = os.path.abspath(os.path.join(site_path, relative_path))
+
+    # Prevent path traversal out of the site folder
+    if not file_path.startswith(site_path + os.sep):
+        frappe.throw("Access denied", frappe.PermissionError)
+    return file_path
+
+
+def get_cached_download(cache_key, resolve, ttl):
+    """
+    {"path", "filename"} for a link, from cache or `resolve()`. `resolve` verifies the
+    link and raises DownloadNotFound for missing files; failures are never cached.
+    """
+    cache_key = f"{DOWNLOAD_CACHE_PREFIX}:{cache_key}"
+    target = frappe.cache().get_value(cache_key)
+    if target and os.path.isfile(target["path"]):
+        return target
+
+    target = resolve()
+    if not os.path.isfile(target["path"]):
+        raise DownloadNotFound
+    frappe.cache().set_value(cache_key, target, expires_in_sec=max(int(ttl), 1))
+    return target
+
+
+def stream_file(path, filename=None, as_attachment=True):
+    """Werkzeug response for a file on disk; whitelisted methods may return it directly."""
+    filename = filename or os.path.basename(path)
+    mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+
+    # bench's nginx config serves /protected/<path inside the site> as an internal location
+    if frappe.request and frappe.request.headers.get("X-Use-X-Accel-Redirect"):
+        relative_path = os.path.relpath(path, os.path.abspath(frappe.get_site_path()))
+        response = Response(mimetype=mimetype)
+        response.headers["X-Accel-Redirect"] = quote(frappe.utils.encode("/protected/" + relative_path))
+        response.headers["Content-Disposition"] = (
+            f"{'attachment' if as_attachment else 'inline'}; filename*=UTF-8''{quote(filename)}"
+        )
+        return response
+
+    response = send_file(
+        path,
+        frappe.request.environ,
+        mimetype=mimetype,
+        as_attachment=as_attachment,
+        download_name=filename,
+        conditional=True,
+        etag=True,
+        max_age=0,
+    )
+    response.cache_control.private = True
+    return response
+
+
+def respond_not_found(message="The file could not be found on disk."):
+    frappe.respond_as_web_page("File Not Found", message, http_status_code=404)
+
+
+def download_signed_file(kind, value, token, resolve_url):
+    """
+    Shared body of the signed attachment endpoints. `value` is what the token signs;
+    `resolve_url()` returns (file_url, filename), either of which may be None.
+    """
+    if not value or not token:
+        frappe.respond_as_web_page("Invalid request", "Missing file or token.", http_status_code=400)
+        return None
+
+    def resolve():
+        if not is_valid_file_token(value, token):
+            frappe.throw("Invalid or expired link", frappe.PermissionError)
+        file_url, name = resolve_url()
+        if not file_url:
+            raise DownloadNotFound
+        path = get_site_file_path(file_url)
+        return {"path": path, "filename": name or os.path.basename(path)}
+
+    try:
+        cache_key = f"{kind}:{token}:{hashlib.sha1(frappe.utils.encode(value)).hexdigest()}"
+        target = get_cached_download(cache_key, resolve, SIGNED_LINK_CACHE_TTL)
+    except DownloadNotFound:
+        respond_not_found()
+        return None
+
+    return stream_file(target["path"], target["filename"])
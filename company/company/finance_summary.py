@@ -0,0 +1,226 @@
+import hashlib
+import json
+
+import frappe
+from frappe.utils import add_days, add_months, flt, get_first_day, get_last_day, getdate, today
+
+from company.company.document_numbering import get_financial_year
+from company.company.report_query import get_report_versions
+
+# Income / expense totals and chart series for the dashboards. Each source is read with
+# one grouped query (bucket x type) over a plain range predicate on its date column, so
+# the date index is usable and a 7-day chart costs the same single query as a total.
+# Results are cached per source set, range and bucket, tagged with the report versions of
+# the source doctypes (bumped by the "*" doc_events), so any save or delete misses.
+SUMMARY_CACHE_TTL = 10 * 60
+MAX_BUCKETS = 1000
+
+SOURCES = {
+    "invoices": frappe._dict(doctype="Invoice", date_field="invoice_date", amount_field="grand_total"),
+    "estimations": frappe._dict(doctype="Estimation", date_field="estimate_date", amount_field="grand_total"),
+    "purchases": frappe._dict(doctype="Purchase", date_field="bill_date", amount_field="grand_total"),
+    "expenses": frappe._dict(doctype="Expenses", date_field="date", amount_field="total"),
+    "expense_tracker": frappe._dict(
+        doctype="Expense Tracker", date_field="date_time", amount_field="amount",
+        type_field="type", types=("Income", "Expense"),
+    ),
+    "crm_expense_tracker": frappe._dict(
+        doctype="CRM Expense Tracker", date_field="date_time", amount_field="amount",
+        type_field="type", types=("Income", "Expense"),
+    ),
+    "income": frappe._dict(doctype="Income", date_field="date", amount_field="amount"),
+    "expense": frappe._dict(doctype="Expense", date_field="date", amount_field="total"),
+}
+
+# Bucket start for a date column, as SQL; `bucket_start` below is the Python twin
+BUCKET_SQL = {
+    "day": "DATE({col})",
+    "week": "DATE({col}) - INTERVAL WEEKDAY({col}) DAY",
+    "month": "DATE({col}) - INTERVAL (DAYOFMONTH({col}) - 1) DAY",
+    # April-March financial year, as in document numbering
+    "fy": "MAKEDATE(YEAR({col}) - (MONTH({col}) < 4), 1) + INTERVAL 3 MONTH",
+}
+
+
+def bucket_start(date, bucket):
+    date = getdate(date)
+    if bucket == "week":
+        return add_days(date, -date.weekday())
+    if bucket == "month":
+        return date.replace(day=1)
+    if bucket == "fy":
+        return date.replace(year=date.year - (date.month < 4), month=4, day=1)
+    return date
+
+
+def next_bucket(start, bucket):
+    if bucket == "week":
+        return add_days(start, 7)
+    if bucket == "month":
+        return add_months(start, 1)
+    if bucket == "fy":
+        return add_months(start, 12)
+    return add_days(start, 1)
+
+
+def bucket_label(start, bucket):
+    if bucket == "month":
+        return start.strftime("%Y-%m")
+    if bucket == "fy":
+        return get_financial_year(start)
+    return str(start)
+
+
+def iter_buckets(from_date, to_date, bucket):
+    start = bucket_start(from_date, bucket)
+    buckets = []
+    while start <= to_date:
+        buckets.append(start)
+        if len(buckets) > MAX_BUCKETS:
+            frappe.throw(f"Too many {bucket} buckets for this range; use a larger bucket")
+        start = next_bucket(start, bucket)
+    return buckets
+
+
+def period_range(filter_type, from_date=None, to_date=None):
+    """(from_date, to_date) for the dashboards' filter_type values; (None, None) = all time."""
+    current = getdate(today())
+    if filter_type == "today":
+        return current, current
+    if filter_type == "this_week":
+        # Sunday-Saturday, like MySQL's default YEARWEEK()
+        start = add_days(current, -((current.weekday() + 1) % 7))
+        return start, add_days(start, 6)
+    if filter_type == "this_month":
+        return get_first_day(current), get_last_day(current)
+    if filter_type == "this_year":
+        return current.replace(month=1, day=1), current.replace(month=12, day=31)
+    if filter_type == "custom" and from_date and to_date:
+        return getdate(from_date), getdate(to_date)
+    return None, None
+
+
+# --------------------------------------------------------------------
+# AGGREGATION
+# --------------------------------------------------------------------
+
+def query_source(source, from_date=None, to_date=None, bucket=None):
+    """One grouped query: count and sum per (bucket, type) within the range."""
+    col = f"`{source.date_field}`"
+    bucket_expr = BUCKET_SQL[bucket].format(col=col) if bucket else "NULL"
+    type_expr = f"`{source.type_field}`" if source.type_field else "NULL"
+
+    # Whole days, as half-open ranges so Datetime columns need no DATE() wrapper
+    conditions, values = [], {}
+    if from_date:
+        conditions.append(f"{col} >= %(from_date)s")
+        values["from_date"] = from_date
+    if to_date:
+        conditions.append(f"{col} < %(to_date)s")
+        values["to_date"] = add_days(to_date, 1)
+
+    return frappe.db.sql(f"""
+        SELECT {bucket_expr} AS bucket, {type_expr} AS kind,
+            COUNT(*) AS count, IFNULL(SUM(`{source.amount_field}`), 0) AS total
+        FROM `tab{source.doctype}`
+        {"WHERE " + " AND ".join(conditions) if conditions else ""}
+        GROUP BY bucket, kind
+    """, values, as_dict=True)
+
+
+def summarize_rows(rows, buckets=None, types=()):
+    index = {b: i for i, b in enumerate(buckets or [])}
+
+    def empty():
+        entry = {"total": 0.0, "count": 0}
+        if buckets is not None:
+            entry["series"] = {"total": [0.0] * len(buckets), "count": [0] * len(buckets)}
+        return entry
+
+    summary = empty()
+    by_type = {t: empty() for t in types}
+    for row in rows:
+        position = index.get(getdate(row.bucket)) if row.bucket else None
+        for entry in [summary] + ([by_type[row.kind]] if row.kind in by_type else []):
+            entry["total"] += flt(row.total)
+            entry["count"] += row.count
+            if position is not None:
+                entry["series"]["total"][position] += flt(row.total)
+                entry["series"]["count"][position] += row.count
+
+    if types:
+        summary["types"] = by_type
+    return summary
+
+
+def get_summary(sources=None, from_date=None, to_date=None, bucket=None):
+    """
+    {"buckets", "labels", "sources": {name: {"total", "count", "series"?, "types"?}}} for
+    the named SOURCES over [from_date, to_date] (either end optional). With a `bucket`
+    (day/week/month/fy), every source also gets "series" aligned with "buckets"; typed
+    sources (the expense trackers) carry the same breakdown per type under "types".
+    """
+    sources = list(sources or SOURCES)
+    unknown = set(sources) - set(SOURCES)
+    if unknown:
+        frappe.throw(f"Unknown summary source(s): {', '.join(sorted(unknown))}")
+    if bucket and bucket not in BUCKET_SQL:
+        frappe.throw(f"Bucket must be one of {', '.join(BUCKET_SQL)}")
+
+    from_date = getdate(from_date) if from_date else None
+    to_date = getdate(to_date) if to_date else None
+
+    doctypes = [SOURCES[name].doctype for name in sources]
+    signature = json.dumps(
+        [sources, from_date, to_date, bucket, get_report_versions(doctypes)], default=str
+    )
+    cache_key = f"company:finance_summary:{hashlib.sha1(signature.encode()).hexdigest()}"
+    result = frappe.cache().get_value(cache_key)
+    if result is not None:
+        return result
+
+    rows = {name: query_source(SOURCES[name], from_date, to_date, bucket) for name in sources}
+
+    buckets = None
+    if bucket:
+        if from_date and to_date:
+            buckets = iter_buckets(from_date, to_date, bucket)
+        else:
+            # Open-ended range: just the buckets that have rows
+            buckets = sorted({getdate(r.bucket) for source_rows in rows.values() for r in source_rows if r.bucket})
+
+    result = {
+        "from_date": from_date,
+        "to_date": to_date,
+        "bucket": bucket,
+        "buckets": [str(b) for b in buckets or []],
+        "labels": [bucket_label(b, bucket) for b in buckets or []],
+        "sources": {
+            name: summarize_rows(source_rows, buckets, SOURCES[name].types or ())
+            for name, source_rows in rows.items()
+        },
+    }
+    frappe.cache().set_value(cache_key, result, expires_in_sec=SUMMARY_CACHE_TTL)
+    return result
+
+
+def get_tracker_totals(source, from_date=None, to_date=None, expense_type=None):
+    """{"total_income", "total_expense", "balance"} for an expense tracker source."""
+    types = get_summary([source], from_date, to_date)["sources"][source]["types"]
+    income = types["Income"]["total"] if expense_type in (None, "", "All", "Income") else 0
+    expense = types["Expense"]["total"] if expense_type in (None, "", "All", "Expense") else 0
+    return {"total_income": income, "total_expense": expense, "balance": income - expense}
+
+
+@frappe.whitelist()
+def get_finance_summary(from_date=None, to_date=None, bucket=None, sources=None):
+    """Totals and bucketed series for the requested sources (default: all) in a date range."""
+    if isinstance(sources, str):
+        sources = json.loads(sources) if sources.startswith("[") else [s.strip() for s in sources.split(",")]
+    sources = [s for s in sources or SOURCES if s]
+
+    for name in sources:
+        if name in SOURCES:
+            frappe.has_permission(SOURCES[name].doctype, "read", throw=True)
+
+    return get_summary(sources, from_date, to_date, bucket or None)
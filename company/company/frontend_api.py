@@ -4,6 +4,11 @@ from frappe import _
 from livekit import api
 from frappe.utils import getdate, add_months, get_first_day, get_last_day, flt, today
 from datetime import datetime
+from company.company.permission_matrix import get_cached_doc_permissions, get_user_permission_matrix
+from company.company.hr_snapshot import get_hr_snapshot
+from company.company.bulk_conversion import make_invoice_from_estimation
+from company.company.finance_summary import get_summary, get_tracker_totals
+from company.company.settings_cache import get_settings
 
 
 @frappe.whitelist(allow_guest=True)
@@ -244,12 +249,7 @@ def get_doc_permissions(doctype):
     """
     Check if the current user has read, write, and delete permissions for a given DocType.
     """
-    return {
-        "read": bool(frappe.has_permission(doctype, "read")),
-        "write": bool(frappe.has_permission(doctype, "write")),
-        "create": bool(frappe.has_permission(doctype, "create")),
-        "delete": bool(frappe.has_permission(doctype, "delete")),
-    }
+    return dict(get_cached_doc_permissions(doctype))
 
 
 @frappe.whitelist()
@@ -267,17 +267,11 @@ def get_current_user_info():
     # Fetch employee info
     employee = frappe.db.get_value("Employee", {"user": user.name}, ["name", "employee_name"], as_dict=True)
 
-    has_crm_permission = bool(frappe.db.exists("User Permission", {"user": user.name}))
-
-    # Retrieve custom role permissions
-    user_pm_names = frappe.get_all(
-        "User Custom Permission",
-        filters={"parent": user.name, "parenttype": "User"},
-        fields=["permission_manager"]
-    )
-    custom_permissions_assigned = len(user_pm_names) > 0
+    # Custom role permissions and the row-level User Permission check come from the cached matrix
+    permission_matrix = get_user_permission_matrix(user.name)
+    has_crm_permission = permission_matrix["has_user_permission"]
     user_permissions = get_user_permissions(user.name)
-    user_permissions["custom_permissions_assigned"] = custom_permissions_assigned
+    user_permissions["custom_permissions_assigned"] = permission_matrix["custom_permissions_assigned"]
 
     return {
         "status": "success",
@@ -458,34 +452,7 @@ def get_expense_tracker_stats(start_date=None, end_date=None):
     Get dashboard stats for Expense Tracker.
     Calculates total income, total expense and balance based on the period.
     """
-    filters = {}
-    if start_date and end_date:
-        filters["date_time"] = ["between", [start_date, end_date]]
-    elif start_date:
-        filters["date_time"] = [">=", start_date]
-    elif end_date:
-        filters["date_time"] = ["<=", end_date]
-
-    stats = {
-        "total_income": 0,
-        "total_expense": 0,
-        "balance": 0
-    }
-
-    try:
-        data = frappe.get_all("Expense Tracker", filters=filters, fields=["type", "amount"])
-
-        for d in data:
-            if d.type == "Income":
-                stats["total_income"] += frappe.utils.flt(d.amount)
-            elif d.type == "Expense":
-                stats["total_expense"] += frappe.utils.flt(d.amount)
-
-        stats["balance"] = stats["total_income"] - stats["total_expense"]
-    except Exception as e:
-        frappe.log_error(f"Error fetching Expense Tracker stats: {str(e)}")
-
-    return stats
+    return get_tracker_totals("expense_tracker", start_date, end_date)
 
 @frappe.whitelist()
 def update_request_status(name, workflow_state, update_data=None):
@@ -994,117 +961,26 @@ def download_import_template(doctype):
 @frappe.whitelist()
 def update_import_file(data_import_name, data):
     """
-    Save edited preview data back to a CSV file and update the Data Import record.
+    Save edited preview rows for a Data Import. `data` is the header followed by the
+    edited rows replacing the first rows of the file; they are kept as staged patches
+    and written to a new import file when the import is started.
     """
     import json
-    import csv
-    import io
-    from frappe.utils.file_manager import save_file
+    from company.company.import_staging import patch_leading_rows
 
-    data_import = frappe.get_doc("Data Import", data_import_name)
-    data_import.check_permission("write")
-
-    rows = json.loads(data)
-
-    # Read the original file's full content
-    original_rows = []
-    if data_import.import_file:
-        try:
-            parts = data_import.import_file.split(".")
-            ext = parts[-1].lower() if parts else "csv"
-            
-            file_name = frappe.db.get_value("File", {"file_url": data_import.import_file})
-            if file_name:
-                file_doc = frappe.get_doc("File", file_name)
-                file_content = file_doc.get_content()
-                
-                if ext == "csv":
-                    from frappe.utils.csvutils import read_csv_content
-                    original_rows = read_csv_content(file_content)
-                elif ext == "xlsx":
-                    from frappe.utils.xlsxutils import read_xlsx_file_from_attached_file
-                    original_rows = read_xlsx_file_from_attached_file(fcontent=file_content)
-                elif ext == "xls":
-                    from frappe.utils.xlsxutils import read_xls_file_from_attached_file
-                    original_rows = read_xls_file_from_attached_file(file_content)
-        except Exception as e:
-            frappe.logger().error(f"Error reading original import file: {str(e)}")
-
-    # Merge edited preview rows with original rows
-    if original_rows and len(original_rows) > 0:
-        edited_preview_rows = rows[1:]
-        original_data_rows = original_rows[1:]
-        
-        # Replace the first len(edited_preview_rows) data rows with the edited ones
-        num_edited = len(edited_preview_rows)
-        merged_data_rows = edited_preview_rows + original_data_rows[num_edited:]
-        
-        # Keep the header row from original_rows
-        final_rows = [original_rows[0]] + merged_data_rows
-    else:
-        final_rows = rows
-
-    # Create CSV in memory
-    output = io.StringIO()
-    writer = csv.writer(output)
-    for row in final_rows:
-        writer.writerow(row)
-
-    content = output.getvalue()
-
-    # Save as a new file
-    filename = f"edited_{data_import_name}.csv"
-    file_doc = save_file(
-        filename,
-        content.encode("utf-8"),
-        "Data Import",
-        data_import_name,
-        is_private=1,
-        df="import_file"
-    )
-
-    # Update Data Import record
-    data_import.import_file = file_doc.file_url
-    data_import.save()
-
-    return {"status": "success", "file_url": file_doc.file_url}
+    return patch_leading_rows(data_import_name, json.loads(data))
 
 @frappe.whitelist()
-def get_custom_import_preview(data_import_name):
+def get_custom_import_preview(data_import_name, start=None, page_length=None):
     """
-    Get the complete import preview data (all rows) without truncating.
+    Get the import preview from the staged rows: one page when `page_length` is given,
+    otherwise every row.
     """
-    data_import = frappe.get_doc("Data Import", data_import_name)
-    data_import.check_permission("read")
-    
-    importer = data_import.get_importer()
-    i = importer.import_file
-    
-    columns = [frappe._dict({"header_title": "Sr. No", "skip_import": True})]
-    columns += [col.as_dict() for col in i.columns]
-    for col in columns:
-        if col.df:
-            col.df = {
-                "fieldtype": col.df.fieldtype,
-                "fieldname": col.df.fieldname,
-                "label": col.df.label,
-                "options": col.df.options,
-                "parent": col.df.parent,
-                "reqd": col.df.reqd,
-                "default": col.df.default,
-                "read_only": col.df.read_only,
-            }
-            
-    data = [[row.row_number, *row.as_list()] for row in i.data]
-    warnings = i.get_warnings()
-    
-    out = frappe._dict()
-    out.data = data
-    out.columns = columns
-    out.warnings = warnings
-    out.total_number_of_rows = len(data)
-    
-    return out
+    from company.company.import_staging import get_full_preview, get_import_preview_page
+
+    if page_length:
+        return get_import_preview_page(data_import_name, start or 0, page_length)
+    return get_full_preview(data_import_name)
 
 @frappe.whitelist()
 def get_doctype_fields(doctype):
@@ -1135,103 +1011,21 @@ def get_hr_dashboard_data():
     """
     Fetch HR dashboard statistics and data.
     """
-    data = {}
-    today = frappe.utils.today()
-    
-    # 1. Announcements
-    try:
-        announcements = frappe.get_all(
-            "Announcement",
-            filters={"is_active": 1},
-            fields=["announcement_name", "announcement", "creation"],
-            order_by="creation desc",
-            limit=5
-        )
-        # Map to expected frontend format
-        data["announcements"] = [
-            {
-                "title": a.announcement_name,
-                "message": a.announcement,
-                "posting_date": str(a.creation.date()) if a.creation else ""
-            }
-            for a in announcements
-        ]
-    except Exception:
-        data["announcements"] = []
-
-    # 2. Employee Stats
-    try:
-        data["total_employees"] = frappe.db.count("Employee", {"status": "Active"})
-    except Exception:
-        data["total_employees"] = 0
-
-    # 3. Pending Leaves (Workflow based)
-    try:
-        # Assuming workflow states 'Pending' or 'Draft' are pending
-        data["pending_leaves"] = frappe.db.count("Leave Application", {
-            "workflow_state": "Pending"
-        })
-    except Exception:
-        data["pending_leaves"] = 0
-
-    # 3.1 Pending Requests Count
-    try:
-        data["pending_request"] = frappe.db.count("Request", {
-            "workflow_state": "Pending"
-        })
-    except Exception:
-        data["pending_request"] = 0
-
-    # 5. Today's Leaves
-    try:
-        # Check Attendance for "On Leave" status or Leave Application for approved leaves today
-        data["todays_leaves"] = frappe.db.sql("""
-            SELECT e.employee_name, e.name as employee
-            FROM `tabLeave Application` la
-            JOIN `tabEmployee` e ON la.employee = e.name
-            WHERE la.workflow_state = 'Approved'
-            AND %s BETWEEN la.from_date AND la.to_date
-        """, (today,), as_dict=True)
-    except Exception:
-        data["todays_leaves"] = []
-
-    # 6. Today's Birthdays
-    try:
-        # Match day and month
-        data["todays_birthdays"] = frappe.db.sql("""
-            SELECT employee_name, name as employee
-            FROM `tabEmployee`
-            WHERE status = 'Active'
-            AND DAY(dob) = DAY(%s)
-            AND MONTH(dob) = MONTH(%s)
-        """, (today, today), as_dict=True)
-    except Exception:
-        data["todays_birthdays"] = []
-
-    # 8. Pending Leave Applications List
-    try:
-        data["pending_leaves_list"] = frappe.get_all(
-            "Leave Application",
-            filters={"workflow_state": "Pending"},
-            fields=["name", "employee", "employee_name", "leave_type", "from_date", "to_date", "total_days"],
-            order_by="creation desc",
-            limit=10
-        )
-    except Exception:
-        data["pending_leaves_list"] = []
-
-    # 9. Pending Requests List
-    try:
-        data["pending_requests_list"] = frappe.get_all(
-            "Request",
-            filters={"workflow_state": "Pending"},
-            fields=["name", "employee_id", "employee_name", "subject", "creation"],
-            order_by="creation desc",
-            limit=10
-        )
-    except Exception:
-        data["pending_requests_list"] = []
+    snapshot = get_hr_snapshot()
+    keys = [
+        "announcements", "total_employees", "pending_leaves", "pending_request",
+        "pending_leaves_list", "pending_requests_list", "todays_anniversaries"
+    ]
+    data = {key: snapshot[key] for key in keys}
 
+    data["todays_leaves"] = [
+        {"employee_name": d["employee_name"], "employee": d["employee"]}
+        for d in snapshot.todays_leaves
+    ]
+    data["todays_birthdays"] = [
+        {"employee_name": d["employee_name"], "employee": d["name"]}
+        for d in snapshot.todays_birthdays
+    ]
     return data
 
 
@@ -1254,61 +1048,7 @@ def convert_estimation_to_invoice(estimation):
         return existing_invoice
 
     # Create new invoice
-    inv = frappe.new_doc("Invoice")
-    inv.flags.ignore_mandatory = True
-
-    # Copy main fields
-    fields_to_copy = [
-        "customer_name",
-        "billing_name",
-        "billing_address",
-        "phone_number",
-        "deal",
-        "total_qty",
-        "total_amount",
-        "overall_discount_type",
-        "overall_discount",
-        "grand_total",
-        "description",
-        "terms_and_conditions",
-        "bank_account"
-    ]
-
-    for f in fields_to_copy:
-        inv.set(f, est.get(f))
-
-    # Set client_name (contact ID) from estimation
-    inv.client_name = est.client_name
-
-    # Invoice date
-    inv.invoice_date = frappe.utils.nowdate()
-
-    # Conversion flags
-    inv.converted_from_estimation = 1
-    inv.converted_estimation_id = est.name
-
-    # Copy items
-    for item in est.get("table_qecz"):
-        inv.append("table_qecz", {
-            "service": item.service,
-            "hsn_code": item.hsn_code,
-            "description": item.description,
-            "quantity": item.quantity,
-            "price": item.price,
-            "discount_type": item.discount_type,
-            "discount": item.discount,
-            "tax_type": item.tax_type,
-            "tax_category": item.tax_category,
-            "tax_percent": item.tax_percent,
-            "tax_amount": item.tax_amount,
-            "cgst": item.cgst,
-            "sgst": item.sgst,
-            "igst": item.igst,
-            "sub_total": item.sub_total
-        })
-
-    # Save invoice
-    inv.insert(ignore_permissions=True, ignore_mandatory=True)
+    inv = make_invoice_from_estimation(est, est.get("table_qecz"))
 
     # SUCCESS MESSAGE
     frappe.msgprint(
@@ -1778,140 +1518,24 @@ def get_financial_totals(start_date=None, end_date=None):
     Fetch financial totals for Invoices, Estimations, Purchases, and Expenses.
     Includes total amount, count, and 7-day trend chart data.
     """
-    data = {}
+    sources = ["invoices", "estimations", "purchases", "expenses"]
+    if not (start_date and end_date):
+        start_date = end_date = None
 
-    # Get last 7 days for chart
-    days = []
-    for i in range(6, -1, -1):
-        date = frappe.utils.add_days(frappe.utils.nowdate(), -i)
-        day_name = frappe.utils.get_datetime(date).strftime('%a')
-        days.append(day_name)
+    totals = get_summary(sources, start_date, end_date)["sources"]
 
-    # 1. Invoices
-    try:
-        cond = ""
-        if start_date and end_date:
-            cond = f"WHERE DATE(invoice_date) BETWEEN '{start_date}' AND '{end_date}'"
-        invoices_total = frappe.db.sql(f"""
-            SELECT SUM(grand_total) as total, COUNT(*) as count
-            FROM `tabInvoice`
-            {cond}
-        """, as_dict=True)[0]
+    # Count of records per day over the last 7 days
+    week = get_summary(sources, frappe.utils.add_days(today(), -6), today(), bucket="day")
 
-        # Chart data for last 7 days (count of invoices created each day)
-        invoice_chart = []
-        for i in range(6, -1, -1):
-            date = frappe.utils.add_days(frappe.utils.nowdate(), -i)
-            count = frappe.db.sql("""
-                SELECT COUNT(*) as count
-                FROM `tabInvoice`
-                WHERE DATE(invoice_date) = %s
-            """, (date,), as_dict=True)[0]
-            invoice_chart.append(count.get('count') or 0)
-
-        data["invoices"] = {
-            "total": frappe.utils.flt(invoices_total.get('total') or 0),
-            "count": invoices_total.get('count') or 0,
-            "chart": invoice_chart
-        }
-    except Exception as e:
-        frappe.log_error(f"Error fetching invoice totals: {str(e)}")
-        data["invoices"] = {"total": 0, "count": 0, "chart": [0]*7}
-
-    # 2. Estimations
-    try:
-        cond = ""
-        if start_date and end_date:
-            cond = f"WHERE DATE(estimate_date) BETWEEN '{start_date}' AND '{end_date}'"
-        estimations_total = frappe.db.sql(f"""
-            SELECT SUM(grand_total) as total, COUNT(*) as count
-            FROM `tabEstimation`
-            {cond}
-        """, as_dict=True)[0]
-
-        # Chart data for last 7 days (count of estimations created each day)
-        estimation_chart = []
-        for i in range(6, -1, -1):
-            date = frappe.utils.add_days(frappe.utils.nowdate(), -i)
-            count = frappe.db.sql("""
-                SELECT COUNT(*) as count
-                FROM `tabEstimation`
-                WHERE DATE(estimate_date) = %s
-            """, (date,), as_dict=True)[0]
-            estimation_chart.append(count.get('count') or 0)
-
-        data["estimations"] = {
-            "total": frappe.utils.flt(estimations_total.get('total') or 0),
-            "count": estimations_total.get('count') or 0,
-            "chart": estimation_chart
-        }
-    except Exception as e:
-        frappe.log_error(f"Error fetching estimation totals: {str(e)}")
-        data["estimations"] = {"total": 0, "count": 0, "chart": [0]*7}
-
-    # 3. Purchases
-    try:
-        cond = ""
-        if start_date and end_date:
-            cond = f"WHERE DATE(purchase_date) BETWEEN '{start_date}' AND '{end_date}'"
-        purchases_total = frappe.db.sql(f"""
-            SELECT SUM(grand_total) as total, COUNT(*) as count
-            FROM `tabPurchase`
-            {cond}
-        """, as_dict=True)[0]
-
-        # Chart data for last 7 days (count of purchases created each day)
-        purchase_chart = []
-        for i in range(6, -1, -1):
-            date = frappe.utils.add_days(frappe.utils.nowdate(), -i)
-            count = frappe.db.sql("""
-                SELECT COUNT(*) as count
-                FROM `tabPurchase`
-                WHERE DATE(purchase_date) = %s
-            """, (date,), as_dict=True)[0]
-            purchase_chart.append(count.get('count') or 0)
-
-        data["purchases"] = {
-            "total": frappe.utils.flt(purchases_total.get('total') or 0),
-            "count": purchases_total.get('count') or 0,
-            "chart": purchase_chart
-        }
-    except Exception as e:
-        frappe.log_error(f"Error fetching purchase totals: {str(e)}")
-        data["purchases"] = {"total": 0, "count": 0, "chart": [0]*7}
-
-    # 4. Expenses
-    try:
-        cond = ""
-        if start_date and end_date:
-            cond = f"WHERE DATE(date) BETWEEN '{start_date}' AND '{end_date}'"
-        expenses_total = frappe.db.sql(f"""
-            SELECT SUM(total) as total, COUNT(*) as count
-            FROM `tabExpenses`
-            {cond}
-        """, as_dict=True)[0]
-
-        # Chart data for last 7 days (count of expenses created each day)
-        expense_chart = []
-        for i in range(6, -1, -1):
-            date = frappe.utils.add_days(frappe.utils.nowdate(), -i)
-            count = frappe.db.sql("""
-                SELECT COUNT(*) as count
-                FROM `tabExpenses`
-                WHERE DATE(date) = %s
-            """, (date,), as_dict=True)[0]
-            expense_chart.append(count.get('count') or 0)
-
-        data["expenses"] = {
-            "total": frappe.utils.flt(expenses_total.get('total') or 0),
-            "count": expenses_total.get('count') or 0,
-            "chart": expense_chart
+    data = {
+        name: {
+            "total": totals[name]["total"],
+            "count": totals[name]["count"],
+            "chart": week["sources"][name]["series"]["count"]
         }
-    except Exception as e:
-        frappe.log_error(f"Error fetching expense totals: {str(e)}")
-        data["expenses"] = {"total": 0, "count": 0, "chart": [0]*7}
-
-    data["categories"] = days
+        for name in sources
+    }
+    data["categories"] = [getdate(day).strftime('%a') for day in week["buckets"]]
 
     return data
 
@@ -1921,30 +1545,9 @@ def get_crm_expense_tracker_stats(start_date=None, end_date=None):
     Get dashboard stats for CRM Expense Tracker.
     Calculates total income, total expense and balance based on the period.
     """
-    filters = {}
-    if start_date and end_date:
-        filters["date_time"] = ["between", [start_date, end_date]]
-
-    stats = {
-        "total_income": 0,
-        "total_expense": 0,
-        "balance": 0
-    }
-
-    try:
-        data = frappe.get_all("CRM Expense Tracker", filters=filters, fields=["type", "amount"])
-
-        for d in data:
-            if d.type == "Income":
-                stats["total_income"] += frappe.utils.flt(d.amount)
-            elif d.type == "Expense":
-                stats["total_expense"] += frappe.utils.flt(d.amount)
-
-        stats["balance"] = stats["total_income"] - stats["total_expense"]
-    except Exception as e:
-        frappe.log_error(f"Error fetching CRM Expense Tracker stats: {str(e)}")
-
-    return stats
+    if not (start_date and end_date):
+        start_date = end_date = None
+    return get_tracker_totals("crm_expense_tracker", start_date, end_date)
 
 @frappe.whitelist()
 def apply_workflow_action(doctype, name, action, comment=None, payment_details=None, update_data=None):
@@ -2106,7 +1709,7 @@ def get_employee_dashboard_data(attendance_range="This Month"):
         seven_days_ago = frappe.utils.add_days(today, -6)  # Include today
 
         # Get Source Setting
-        settings = frappe.get_doc("HRMS Settings")
+        settings = get_settings("HRMS Settings")
         source = settings.get("weekly_chart_source") or "Attendance"
         p_threshold = settings.get("present_threshold") or 5.0
         h_threshold = settings.get("half_day_threshold") or 3.0
@@ -2831,7 +2434,7 @@ def get_weekly_present_absent_data(filter_type=None, from_date=None, to_date=Non
         end_date = today_dt
 
     # 3. Get Settings, Baseline and Holiday dates for the range
-    settings = frappe.get_doc("HRMS Settings")
+    settings = get_settings("HRMS Settings")
     source = settings.get("weekly_chart_source") or "Attendance"
     total_active_employees = frappe.db.count("Employee", {"status": "Active"})
 
@@ -4430,114 +4033,15 @@ def get_user_permissions(user=None):
     """
     Fetches the Frontend Permission configuration for the logged-in User
     by inspecting their assigned Frontend Role (from Employee or custom mapping).
+    The merged matrix is compiled once per user and served from Redis afterwards.
     """
-    if not user:
-        user = frappe.session.user
-    
-    # 1. Initialize empty fallback permissions shape
-    permissions_data = {
-        "frontend_role": None,
-        "menus": {},
-        "actions": {},
-        "menu_mapping": {}
+    matrix = get_user_permission_matrix(user)
+    return {
+        "frontend_role": matrix["frontend_role"],
+        "menus": matrix["menus"],
+        "actions": matrix["actions"],
+        "menu_mapping": matrix["menu_mapping"]
     }
-    
-    # 2. Check if the user has custom permissions selected in User Doctype
-    user_pm_names = frappe.get_all(
-        "User Custom Permission",
-        filters={"parent": user, "parenttype": "User"},
-        fields=["permission_manager"]
-    )
-    user_pm_list = [d.permission_manager for d in user_pm_names if d.permission_manager]
-
-    matched_pm = []
-    if user_pm_list:
-        matched_pm = frappe.get_all(
-            "Permission Management",
-            filters={"name": ["in", user_pm_list], "status": "Enabled"},
-            fields=["name", "frontend_role_name"]
-        )
-
-    # If no custom permissions assigned to this user, return empty maps so they fall back to system roles (custom_permissions_assigned: false)
-    if not matched_pm:
-        return permissions_data
-
-    # Set frontend_role (using comma-separated list if multiple)
-    permissions_data["frontend_role"] = ", ".join([pm.frontend_role_name for pm in matched_pm])
-
-    # Populate and merge Menus and Screen actions matrices
-    for pm_info in matched_pm:
-        pm_doc = frappe.get_doc("Permission Management", pm_info.name)
-        for perm in pm_doc.permissions:
-            screen = perm.screen_id
-            module = perm.module_id
-
-            if screen:
-                screen_key = screen.strip().lower().replace(" ", "_")
-                permissions_data["menu_mapping"][screen_key] = module
-                if screen_key not in permissions_data["menus"]:
-                    permissions_data["menus"][screen_key] = False
-                if perm.view_permission:
-                    permissions_data["menus"][screen_key] = True
-
-            # Module view access controls parent item rendering
-            if module not in permissions_data["menus"]:
-                permissions_data["menus"][module] = False
-            if perm.view_permission:
-                permissions_data["menus"][module] = True
-
-            # Screen-level CRUD authorizations using screen_key instead of aggregating under parent module
-            if screen:
-                screen_key = screen.strip().lower().replace(" ", "_")
-                if screen_key not in permissions_data["actions"]:
-                    permissions_data["actions"][screen_key] = {
-                        "view": False,
-                        "create": False,
-                        "edit": False,
-                        "delete": False,
-                        "export": False,
-                        "import": False
-                    }
-
-                if perm.view_permission:
-                    permissions_data["actions"][screen_key]["view"] = True
-                if perm.add_permission:
-                    permissions_data["actions"][screen_key]["create"] = True
-                if perm.edit_permission:
-                    permissions_data["actions"][screen_key]["edit"] = True
-                if perm.delete_permission:
-                    permissions_data["actions"][screen_key]["delete"] = True
-                if perm.export_permission:
-                    permissions_data["actions"][screen_key]["export"] = True
-                if perm.get("import_permission"):
-                    permissions_data["actions"][screen_key]["import"] = True
-            
-            # Also keep module level fallback permissions
-            if module not in permissions_data["actions"]:
-                permissions_data["actions"][module] = {
-                    "view": False,
-                    "create": False,
-                    "edit": False,
-                    "delete": False,
-                    "export": False,
-                    "import": False
-                }
-
-            # Keep track of aggregated permissions per screen/module mapping
-            if perm.view_permission:
-                permissions_data["actions"][module]["view"] = True
-            if perm.add_permission:
-                permissions_data["actions"][module]["create"] = True
-            if perm.edit_permission:
-                permissions_data["actions"][module]["edit"] = True
-            if perm.delete_permission:
-                permissions_data["actions"][module]["delete"] = True
-            if perm.export_permission:
-                permissions_data["actions"][module]["export"] = True
-            if perm.get("import_permission"):
-                permissions_data["actions"][module]["import"] = True
-            
-    return permissions_data
 
 
 @frappe.whitelist()
@@ -0,0 +1,198 @@
+import json
+import os
+import sqlite3
+import threading
+
+import frappe
+
+# Country / state / city lookups for the address forms. The 4 MB location_data.json is
+# compiled once (after migrate, or on first use when it is missing or older than the
+# JSON) into an indexed SQLite file next to it. Workers open that file read-only and
+# answer each lookup with an index seek instead of parsing and scanning the JSON.
+#
+# bench --site <site> execute company.company.geo_lookup.build_geo_store
+SOURCE_FILE = "location_data.json"
+STORE_FILE = "location_data.sqlite"
+STORE_VERSION = "1"
+
+DEFAULT_SEARCH_LIMIT = 20
+
+_local = threading.local()
+_build_lock = threading.Lock()
+
+
+def normalize(value):
+    return (value or "").strip().casefold()
+
+
+def get_source_path():
+    return frappe.get_app_path("company", "utils", SOURCE_FILE)
+
+
+def get_store_path():
+    return frappe.get_app_path("company", "utils", STORE_FILE)
+
+
+def get_source_signature(source_path):
+    stat = os.stat(source_path)
+    return f"{STORE_VERSION}:{stat.st_size}:{int(stat.st_mtime)}"
+
+
+# --------------------------------------------------------------------
+# BUILD
+# --------------------------------------------------------------------
+
+def build_geo_store(source_path=None, store_path=None):
+    """Compile the JSON into the SQLite store; written to a temp file and swapped in."""
+    source_path = source_path or get_source_path()
+    store_path = store_path or get_store_path()
+    tmp_path = f"{store_path}.{os.getpid()}.tmp"
+
+    with open(source_path, encoding="utf-8") as f:
+        countries = json.load(f)
+
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    conn = sqlite3.connect(tmp_path)
+    try:
+        # Cities are clustered by (state, name) so a state's cities and prefix searches are
+        # one range read; `position` keeps the JSON order the endpoints return.
+        conn.executescript("""
+            CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT) WITHOUT ROWID;
+            CREATE TABLE countries (
+                id INTEGER PRIMARY KEY, country_key TEXT UNIQUE, name TEXT, iso2 TEXT, iso3 TEXT
+            );
+            CREATE TABLE states (id INTEGER PRIMARY KEY, country_id INTEGER, state_key TEXT, name TEXT);
+            CREATE TABLE cities (
+                state_id INTEGER, name TEXT COLLATE NOCASE, position INTEGER,
+                PRIMARY KEY (state_id, name, position)
+            ) WITHOUT ROWID;
+        """)
+
+        country_rows, state_rows, city_rows = [], [], []
+        seen_countries = set()
+        for country in countries:
+            country_key = normalize(country.get("country"))
+            # The old linear scan only ever reached the first entry of a repeated country
+            if country_key in seen_countries:
+                continue
+            seen_countries.add(country_key)
+            country_id = len(country_rows) + 1
+            country_rows.append(
+                (country_id, country_key, country.get("country"), country.get("iso2"), country.get("iso3"))
+            )
+            for state in country.get("states") or []:
+                state_id = len(state_rows) + 1
+                state_rows.append((state_id, country_id, normalize(state.get("name")), state.get("name")))
+                for position, city in enumerate(state.get("cities") or []):
+                    city_rows.append((state_id, city, position))
+
+        conn.executemany("INSERT INTO countries VALUES (?, ?, ?, ?, ?)", country_rows)
+        conn.executemany("INSERT INTO states VALUES (?, ?, ?, ?)", state_rows)
+        conn.executemany("INSERT INTO cities VALUES (?, ?, ?)", city_rows)
+        conn.execute("CREATE INDEX states_by_key ON states (country_id, state_key)")
+        conn.execute(
+            "INSERT INTO meta VALUES ('signature', ?)", (get_source_signature(source_path),)
+        )
+        conn.commit()
+        conn.execute("VACUUM")
+    finally:
+        conn.close()
+
+    os.replace(tmp_path, store_path)
+    return store_path
+
+
+def is_store_current(store_path, source_path):
+    if not os.path.exists(store_path):
+        return False
+    try:
+        conn = sqlite3.connect(f"file:{store_path}?mode=ro", uri=True)
+        try:
+            row = conn.execute("SELECT value FROM meta WHERE key = 'signature'").fetchone()
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        return False
+    return bool(row) and row[0] == get_source_signature(source_path)
+
+
+def get_connection():
+    """Read-only connection for this thread, building the store first if needed."""
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        return conn
+
+    store_path, source_path = get_store_path(), get_source_path()
+    with _build_lock:
+        if not is_store_current(store_path, source_path):
+            build_geo_store(source_path, store_path)
+
+    conn = sqlite3.connect(f"file:{store_path}?mode=ro", uri=True, check_same_thread=False)
+    conn.execute("PRAGMA mmap_size = 16777216")
+    _local.conn = conn
+    return conn
+
+
+def query(sql, params):
+    return [row[0] for row in get_connection().execute(sql, params)]
+
+
+# --------------------------------------------------------------------
+# LOOKUPS
+# --------------------------------------------------------------------
+
+def get_country_names():
+    return query("SELECT name FROM countries ORDER BY id", ())
+
+
+def get_state_names(country):
+    return query("""
+        SELECT s.name FROM states s
+        JOIN countries c ON c.id = s.country_id
+        WHERE c.country_key = ?
+        ORDER BY s.id
+    """, (normalize(country),))
+
+
+def get_city_names(country, state):
+    # A state listed twice resolves to its first entry, as before
+    return query("""
+        SELECT name FROM cities
+        WHERE state_id = (
+            SELECT MIN(s.id) FROM states s
+            JOIN countries c ON c.id = s.country_id
+            WHERE c.country_key = ? AND s.state_key = ?
+        )
+        ORDER BY position
+    """, (normalize(country), normalize(state)))
+
+
+def search_city_names(country, prefix, state=None, limit=DEFAULT_SEARCH_LIMIT):
+    """Cities starting with `prefix` (case-insensitive), as an index range scan."""
+    prefix = (prefix or "").strip()
+    if not prefix:
+        return []
+
+    # Under NOCASE, [prefix, prefix + U+10FFFF) covers every name that starts with `prefix`;
+    # without a state this is one such range per state of the country
+    condition, params = "", [normalize(country)]
+    if state:
+        condition, params = "AND s.state_key = ?", [*params, normalize(state)]
+
+    return query(f"""
+        SELECT DISTINCT name FROM cities
+        WHERE state_id IN (
+            SELECT s.id FROM states s JOIN countries c ON c.id = s.country_id
+            WHERE c.country_key = ? {condition}
+        )
+        AND name >= ? AND name < ?
+        ORDER BY name
+        LIMIT ?
+    """, (*params, prefix, prefix + "\U0010ffff", max(1, min(int(limit), 100))))
+
+
+@frappe.whitelist()
+def search_cities(country, prefix, state=None, limit=DEFAULT_SEARCH_LIMIT):
+    """City autocomplete: names in `country` (and optionally `state`) starting with `prefix`."""
+    return search_city_names(country, prefix, state=state, limit=limit)
@@ -0,0 +1,224 @@
+import datetime
+
+import frappe
+from frappe.utils import add_days, get_first_day, getdate, now, today
+
+# The HR home page used to fire six endpoints that each recounted active employees,
+# looked up holidays day by day and re-ran today's leave join. They now read one
+# snapshot, built in a handful of set-based queries and shared by every HR user.
+# A cron job rebuilds it every minute and changes to the doctypes below drop it.
+HR_SNAPSHOT_KEY = "company:hr_snapshot"
+HR_SNAPSHOT_TTL = 2 * 60
+
+HR_SNAPSHOT_DOCTYPES = {
+    "Announcement", "Attendance", "Employee", "Holiday List", "Leave Application", "Request",
+}
+
+ATTENDANCE_STATUSES = ("Present", "Absent", "Half Day", "On Leave")
+
+
+def month_day_key(date):
+    """MMDD string for birthday/anniversary lookups, or None when `date` is empty."""
+    return getdate(date).strftime("%m%d") if date else None
+
+
+def get_hr_snapshot():
+    """Cached snapshot for today; rebuilt when missing or left over from yesterday."""
+    snapshot = frappe.cache().get_value(HR_SNAPSHOT_KEY)
+    if not snapshot or snapshot.get("date") != today():
+        snapshot = refresh_hr_snapshot()
+    return frappe._dict(snapshot)
+
+
+def refresh_hr_snapshot():
+    """Scheduler entry point (every minute); also used by readers on a cache miss."""
+    snapshot = build_hr_snapshot()
+    frappe.cache().set_value(HR_SNAPSHOT_KEY, snapshot, expires_in_sec=HR_SNAPSHOT_TTL)
+    return snapshot
+
+
+def invalidate_hr_snapshot(doc, method=None):
+    """doc_events("*") handler: drop the snapshot once a relevant change is committed."""
+    if doc.doctype in HR_SNAPSHOT_DOCTYPES:
+        frappe.db.after_commit.add(_clear_hr_snapshot)
+
+
+def _clear_hr_snapshot():
+    frappe.cache().delete_value(HR_SNAPSHOT_KEY)
+
+
+# --------------------------------------------------------------------
+# BUILD
+# --------------------------------------------------------------------
+
+def build_hr_snapshot():
+    date = getdate(today())
+    monday = date - datetime.timedelta(days=date.weekday())
+    month_start = getdate(get_first_day(date))
+    # Earliest day any of the charts or stat ranges look at
+    range_start = min(monday, month_start, add_days(date, -6))
+
+    total_employees = frappe.db.count("Employee", {"status": "Active"})
+    holidays = get_holiday_dates(range_start, date)
+    attendance = get_attendance_counts(range_start, date)
+    mmdd = month_day_key(date)
+
+    return {
+        "date": str(date),
+        "last_sync": now(),
+        "total_employees": total_employees,
+        "announcements": get_announcements(),
+        "pending_leaves": frappe.db.count("Leave Application", {"workflow_state": "Pending"}),
+        "pending_request": frappe.db.count("Request", {"workflow_state": "Pending"}),
+        "pending_leaves_list": frappe.get_all(
+            "Leave Application",
+            filters={"workflow_state": "Pending"},
+            fields=["name", "employee", "employee_name", "leave_type", "from_date", "to_date", "total_days"],
+            order_by="creation desc",
+            limit=10
+        ),
+        "pending_requests_list": frappe.get_all(
+            "Request",
+            filters={"workflow_state": "Pending"},
+            fields=["name", "employee_id", "employee_name", "subject", "creation"],
+            order_by="creation desc",
+            limit=10
+        ),
+        "todays_leaves": get_leaves_on(date),
+        "todays_birthdays": get_employees_by_month_day("dob_month_day", mmdd),
+        "todays_anniversaries": [
+            emp for emp in get_employees_by_month_day("doj_month_day", mmdd)
+            if getdate(emp.date_of_joining) < date
+        ],
+        "attendance_stats": {
+            "today": summarize_attendance(attendance, holidays, date, date),
+            "week": summarize_attendance(attendance, holidays, monday, date),
+            "month": summarize_attendance(attendance, holidays, month_start, date),
+        },
+        "missing_attendance_chart": [
+            {
+                "date": str(day),
+                "count": 0 if day in holidays else max(0, total_employees - sum(attendance.get(day, {}).values()))
+            }
+            for day in (add_days(date, -i) for i in range(6, -1, -1))
+        ],
+        "weekly_present_chart": [
+            {
+                "date": str(day),
+                "day": day.strftime("%a"),
+                "count": 0 if day > date else (
+                    total_employees if day in holidays else attendance.get(day, {}).get("Present", 0)
+                )
+            }
+            for day in (monday + datetime.timedelta(days=i) for i in range(7))
+        ],
+    }
+
+
+def get_holiday_dates(from_date, to_date):
+    """Non-working days between the two dates across every Holiday List."""
+    return {
+        getdate(d) for d in frappe.db.sql_list("""
+            SELECT DISTINCT h.holiday_date
+            FROM `tabHolidays` h
+            JOIN `tabHoliday List` hl ON hl.name = h.parent
+            WHERE h.parenttype = 'Holiday List'
+              AND h.is_working_day = 0
+              AND h.holiday_date BETWEEN %s AND %s
+        """, (from_date, to_date))
+    }
+
+
+def get_attendance_counts(from_date, to_date):
+    """{date: {status: count}} for every employee, in one grouped query."""
+    counts = {}
+    for row in frappe.db.sql("""
+        SELECT attendance_date, status, COUNT(*) AS count
+        FROM `tabAttendance`
+        WHERE attendance_date BETWEEN %s AND %s
+        GROUP BY attendance_date, status
+    """, (from_date, to_date), as_dict=True):
+        counts.setdefault(getdate(row.attendance_date), {})[row.status] = row.count
+    return counts
+
+
+def summarize_attendance(attendance, holidays, from_date, to_date):
+    """Company-wide attendance totals for a range, as returned by `get_attendance_stats`."""
+    totals = dict.fromkeys(ATTENDANCE_STATUSES, 0)
+    day = from_date
+    while day <= to_date:
+        for status, count in attendance.get(day, {}).items():
+            if status in totals:
+                totals[status] += count
+        day += datetime.timedelta(days=1)
+
+    holiday_count = len([d for d in holidays if from_date <= d <= to_date])
+    total_days = (to_date - from_date).days + 1
+    return {
+        "present": totals["Present"] + holiday_count,
+        "absent": totals["Absent"],
+        "half_day": totals["Half Day"],
+        "on_leave": totals["On Leave"],
+        "missing": max(total_days - (sum(totals.values()) + holiday_count), 0),
+    }
+
+
+def get_announcements():
+    return [
+        {
+            "title": a.announcement_name,
+            "message": a.announcement,
+            "posting_date": str(a.creation.date()) if a.creation else ""
+        }
+        for a in frappe.get_all(
+            "Announcement",
+            filters={"is_active": 1},
+            fields=["announcement_name", "announcement", "creation"],
+            order_by="creation desc",
+            limit=5
+        )
+    ]
+
+
+def get_leaves_on(date):
+    """Approved leave applications covering `date`, dates as strings for the frontend."""
+    leaves = frappe.db.sql("""
+        SELECT la.employee, la.employee_name, la.leave_type, la.from_date, la.to_date
+        FROM `tabLeave Application` la
+        JOIN `tabEmployee` e ON e.name = la.employee
+        WHERE la.workflow_state = 'Approved'
+          AND la.from_date <= %(date)s
+          AND la.to_date >= %(date)s
+    """, {"date": date}, as_dict=True)
+    for leave in leaves:
+        leave.from_date = str(leave.from_date)
+        leave.to_date = str(leave.to_date)
+    return leaves
+
+
+def get_employees_by_month_day(fieldname, mmdd):
+    """Active employees whose indexed MMDD field (`dob_month_day` / `doj_month_day`) matches."""
+    employees = frappe.get_all(
+        "Employee",
+        filters={"status": "Active", fieldname: mmdd},
+        fields=["name", "employee_id", "employee_name", "dob", "date_of_joining"],
+        order_by="employee_name asc"
+    )
+    for emp in employees:
+        emp.dob = str(emp.dob) if emp.dob else None
+        emp.date_of_joining = str(emp.date_of_joining) if emp.date_of_joining else None
+    return employees
+
+
+def backfill_month_day_keys():
+    """Set `dob_month_day` / `doj_month_day` on existing employees."""
+    for row in frappe.db.sql("""
+        SELECT name, dob, date_of_joining, dob_month_day, doj_month_day
+        FROM `tabEmployee`
+    """, as_dict=True):
+        dob_key, doj_key = month_day_key(row.dob), month_day_key(row.date_of_joining)
+        if (dob_key, doj_key) != (row.dob_month_day, row.doj_month_day):
+            frappe.db.set_value("Employee", row.name, {
+                "dob_month_day": dob_key,
+                "doj_month_day": doj_key,
+            }, update_modified=False)
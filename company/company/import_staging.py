@@ -0,0 +1,412 @@
+import csv
+import io
+import json
+import os
+import sqlite3
+
+import frappe
+from frappe import _
+from frappe.utils import cint, getdate, now
+
+# Data Import staging for the custom import screen. The uploaded file is parsed once
+# into a per-import SQLite store under the site's private folder; preview pages and
+# column validation summaries are read from it, edits are stored as sparse per-row
+# patches, and a new CSV is written only when the import is started (and only if
+# something was edited). A replaced import file is detected by its signature and
+# restaged automatically.
+STAGING_FOLDER = "import_staging"
+DEFAULT_PAGE_LENGTH = 100
+MAX_PAGE_LENGTH = 1000
+SUMMARY_SAMPLE_SIZE = 10
+
+TRUTHY = {"1", "0", "yes", "no", "true", "false"}
+
+
+# --------------------------------------------------------------------
+# STORE
+# --------------------------------------------------------------------
+
+def get_store_path(data_import_name):
+    folder = frappe.get_site_path("private", STAGING_FOLDER)
+    os.makedirs(folder, exist_ok=True)
+    return os.path.join(folder, f"{frappe.scrub(data_import_name)}.sqlite")
+
+
+def connect(data_import_name):
+    conn = sqlite3.connect(get_store_path(data_import_name), timeout=30)
+    conn.execute("PRAGMA journal_mode = WAL")
+    return conn
+
+
+def get_file_signature(data_import):
+    """Changes whenever the Data Import points at a different or re-uploaded file."""
+    modified = frappe.db.get_value("File", {"file_url": data_import.import_file}, "modified")
+    return f"{data_import.import_file}|{modified}"
+
+
+def read_meta(conn):
+    try:
+        return {k: json.loads(v) for k, v in conn.execute("SELECT key, value FROM meta")}
+    except sqlite3.OperationalError:
+        return {}
+
+
+def write_meta(conn, **values):
+    conn.executemany(
+        "INSERT OR REPLACE INTO meta VALUES (?, ?)",
+        [(k, json.dumps(v, default=str)) for k, v in values.items()]
+    )
+
+
+def get_data_import(data_import_name, ptype="read"):
+    data_import = frappe.get_doc("Data Import", data_import_name)
+    data_import.check_permission(ptype)
+    return data_import
+
+
+def stage(data_import, force=False):
+    """Open the store for `data_import`, (re)parsing the file when it is missing or stale."""
+    conn = connect(data_import.name)
+    signature = get_file_signature(data_import)
+    meta = read_meta(conn)
+    if not force and meta.get("signature") == signature:
+        return conn, meta
+
+    import_file = data_import.get_importer().import_file
+
+    columns = [{"header_title": "Sr. No", "skip_import": True}]
+    for col in import_file.columns:
+        col = col.as_dict()
+        if col.df:
+            col.df = {
+                "fieldtype": col.df.fieldtype,
+                "fieldname": col.df.fieldname,
+                "label": col.df.label,
+                "options": col.df.options,
+                "parent": col.df.parent,
+                "reqd": col.df.reqd,
+                "default": col.df.default,
+                "read_only": col.df.read_only,
+            }
+        columns.append(col)
+
+    with conn:
+        conn.executescript("""
+            DROP TABLE IF EXISTS meta;
+            DROP TABLE IF EXISTS rows;
+            DROP TABLE IF EXISTS patches;
+            CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT) WITHOUT ROWID;
+            CREATE TABLE rows (position INTEGER PRIMARY KEY, row_number INTEGER UNIQUE, data TEXT);
+            CREATE TABLE patches (row_number INTEGER PRIMARY KEY, data TEXT);
+        """)
+        conn.executemany(
+            "INSERT INTO rows VALUES (?, ?, ?)",
+            (
+                (position, row.row_number, json.dumps(row.as_list(), default=str))
+                for position, row in enumerate(import_file.data)
+            )
+        )
+        meta = {
+            "signature": signature,
+            "staged_at": now(),
+            "columns": columns,
+            "header": [col.header_title for col in import_file.columns],
+            "warnings": import_file.get_warnings(),
+            "total_number_of_rows": len(import_file.data),
+        }
+        write_meta(conn, **meta)
+    return conn, read_meta(conn)
+
+
+def apply_patch(values, patch):
+    values = list(values)
+    for index, value in patch.items():
+        index = int(index)
+        if index >= len(values):
+            values.extend([None] * (index + 1 - len(values)))
+        values[index] = value
+    return values
+
+
+def iter_rows(conn, start=0, limit=-1):
+    """(row_number, values) in file order with patches applied."""
+    for row_number, data, patch in conn.execute("""
+        SELECT r.row_number, r.data, p.data
+        FROM rows r LEFT JOIN patches p ON p.row_number = r.row_number
+        WHERE r.position >= ?
+        ORDER BY r.position
+        LIMIT ?
+    """, (start, limit)):
+        values = json.loads(data)
+        yield row_number, apply_patch(values, json.loads(patch)) if patch else values
+
+
+# --------------------------------------------------------------------
+# PREVIEW
+# --------------------------------------------------------------------
+
+@frappe.whitelist()
+def get_import_preview_page(data_import_name, start=0, page_length=DEFAULT_PAGE_LENGTH):
+    """
+    One page of the staged preview: rows as [row_number, *values] (edits applied) plus
+    the column definitions, warnings and totals the preview table needs.
+    """
+    data_import = get_data_import(data_import_name)
+    conn, meta = stage(data_import)
+    try:
+        start = max(cint(start), 0)
+        page_length = min(max(cint(page_length), 1), MAX_PAGE_LENGTH)
+        data = [[row_number, *values] for row_number, values in iter_rows(conn, start, page_length)]
+        edited_rows = conn.execute("SELECT COUNT(*) FROM patches").fetchone()[0]
+    finally:
+        conn.close()
+
+    return frappe._dict({
+        "data": data,
+        "columns": meta["columns"],
+        "warnings": meta["warnings"],
+        "start": start,
+        "page_length": page_length,
+        "total_number_of_rows": meta["total_number_of_rows"],
+        "edited_rows": edited_rows,
+    })
+
+
+def get_full_preview(data_import_name):
+    """Every staged row at once, for callers of the old unpaginated preview."""
+    data_import = get_data_import(data_import_name)
+    conn, meta = stage(data_import)
+    try:
+        data = [[row_number, *values] for row_number, values in iter_rows(conn)]
+    finally:
+        conn.close()
+    return frappe._dict({
+        "data": data,
+        "columns": meta["columns"],
+        "warnings": meta["warnings"],
+        "total_number_of_rows": len(data),
+    })
+
+
+@frappe.whitelist()
+def get_import_column_summary(data_import_name, columns=None):
+    """
+    Validation summary per mapped column (index as in the preview columns): filled and
+    empty counts, missing mandatory values, values that are not valid for the field
+    type, Select options or Link targets, with a few sample row numbers for each.
+    """
+    data_import = get_data_import(data_import_name)
+    conn, meta = stage(data_import)
+
+    wanted = None
+    if columns:
+        wanted = {cint(c) for c in (frappe.parse_json(columns) if isinstance(columns, str) else columns)}
+
+    summaries = {}
+    for index, column in enumerate(meta["columns"]):
+        if index == 0 or column.get("skip_import") or not column.get("df"):
+            continue
+        if wanted is not None and index not in wanted:
+            continue
+        summaries[index] = {
+            "header_title": column.get("header_title"),
+            "df": column["df"],
+            "filled": 0,
+            "empty": 0,
+            "missing_mandatory": [],
+            "invalid": [],
+            "values": {},
+        }
+
+    try:
+        for row_number, values in iter_rows(conn):
+            for index, summary in summaries.items():
+                value = values[index - 1] if index - 1 < len(values) else None
+                if value in (None, ""):
+                    summary["empty"] += 1
+                    if summary["df"].get("reqd"):
+                        summary["missing_mandatory"].append(row_number)
+                    continue
+                summary["filled"] += 1
+                if not is_valid_value(summary["df"], value):
+                    summary["invalid"].append(row_number)
+                if summary["df"].get("fieldtype") == "Link":
+                    summary["values"].setdefault(str(value), []).append(row_number)
+    finally:
+        conn.close()
+
+    for summary in summaries.values():
+        df = summary["df"]
+        if df.get("fieldtype") == "Link" and df.get("options") and summary["values"]:
+            existing = set(frappe.get_all(
+                df["options"], filters={"name": ["in", list(summary["values"])]}, pluck="name"
+            ))
+            for value, row_numbers in summary["values"].items():
+                if value not in existing:
+                    summary["invalid"].extend(row_numbers)
+            summary["invalid"].sort()
+
+        summary["missing_mandatory_count"] = len(summary["missing_mandatory"])
+        summary["invalid_count"] = len(summary["invalid"])
+        summary["missing_mandatory"] = summary["missing_mandatory"][:SUMMARY_SAMPLE_SIZE]
+        summary["invalid"] = summary["invalid"][:SUMMARY_SAMPLE_SIZE]
+        del summary["values"]
+
+    return summaries
+
+
+def is_valid_value(df, value):
+    fieldtype = df.get("fieldtype")
+    text = str(value).strip()
+    try:
+        if fieldtype in ("Int", "Float", "Currency", "Percent"):
+            float(text.replace(",", ""))
+        elif fieldtype == "Check":
+            return text.lower() in TRUTHY
+        elif fieldtype == "Select" and df.get("options"):
+            return text in (df["options"] or "").split("\n")
+        elif fieldtype in ("Date", "Datetime"):
+            getdate(text)
+    except Exception:
+        return False
+    return True
+
+
+# --------------------------------------------------------------------
+# EDITS
+# --------------------------------------------------------------------
+
+@frappe.whitelist()
+def patch_import_rows(data_import_name, patches):
+    """
+    Store sparse edits: `patches` is [{"row_number": n, "values": {column index: value}}]
+    with column indexes as in the preview columns (0 is "Sr. No" and cannot be edited).
+    """
+    data_import = get_data_import(data_import_name, "write")
+    patches = frappe.parse_json(patches) if isinstance(patches, str) else patches
+
+    conn, meta = stage(data_import)
+    try:
+        with conn:
+            save_patches(conn, {
+                cint(p.get("row_number")): {cint(k) - 1: v for k, v in (p.get("values") or {}).items()}
+                for p in patches or []
+            })
+            edited_rows = conn.execute("SELECT COUNT(*) FROM patches").fetchone()[0]
+    finally:
+        conn.close()
+
+    return {"status": "success", "edited_rows": edited_rows}
+
+
+def save_patches(conn, patches):
+    """Merge {row_number: {data index: value}} into the stored patches."""
+    for row_number, values in patches.items():
+        if any(index < 0 for index in values):
+            frappe.throw(_("Row {0}: the Sr. No column cannot be edited").format(row_number))
+        if not conn.execute("SELECT 1 FROM rows WHERE row_number = ?", (row_number,)).fetchone():
+            frappe.throw(_("Row {0} is not part of this import").format(row_number))
+
+        current = conn.execute("SELECT data FROM patches WHERE row_number = ?", (row_number,)).fetchone()
+        merged = json.loads(current[0]) if current else {}
+        merged.update({str(k): v for k, v in values.items()})
+        conn.execute("INSERT OR REPLACE INTO patches VALUES (?, ?)", (row_number, json.dumps(merged, default=str)))
+
+
+def patch_leading_rows(data_import_name, rows):
+    """
+    Old `update_import_file` contract: `rows` is a header followed by edited rows that
+    replace the first len(rows) - 1 data rows. Stored as whole-row patches.
+    """
+    data_import = get_data_import(data_import_name, "write")
+    conn, meta = stage(data_import)
+    try:
+        with conn:
+            row_numbers = [r[0] for r in conn.execute(
+                "SELECT row_number FROM rows ORDER BY position LIMIT ?", (max(len(rows) - 1, 0),)
+            )]
+            save_patches(conn, {
+                row_number: dict(enumerate(values))
+                for row_number, values in zip(row_numbers, rows[1:], strict=False)
+            })
+    finally:
+        conn.close()
+    return {"status": "success", "file_url": data_import.import_file}
+
+
+@frappe.whitelist()
+def discard_import_patches(data_import_name):
+    data_import = get_data_import(data_import_name, "write")
+    conn, meta = stage(data_import)
+    try:
+        with conn:
+            conn.execute("DELETE FROM patches")
+    finally:
+        conn.close()
+    return {"status": "success"}
+
+
+# --------------------------------------------------------------------
+# START
+# --------------------------------------------------------------------
+
+def materialize_import_file(data_import):
+    """Write the edited rows into a new CSV for the import; a no-op without edits."""
+    from frappe.utils.file_manager import save_file
+
+    conn, meta = stage(data_import)
+    try:
+        if not conn.execute("SELECT COUNT(*) FROM patches").fetchone()[0]:
+            return data_import.import_file
+
+        output = io.StringIO()
+        writer = csv.writer(output)
+        writer.writerow(meta["header"])
+        for _row_number, values in iter_rows(conn):
+            writer.writerow(["" if v is None else v for v in values])
+
+        file_doc = save_file(
+            f"edited_{data_import.name}.csv",
+            output.getvalue().encode("utf-8"),
+            "Data Import",
+            data_import.name,
+            is_private=1,
+            df="import_file"
+        )
+        data_import.import_file = file_doc.file_url
+        data_import.save()
+
+        # The staged rows now match the new file; fold the edits in instead of re-parsing
+        with conn:
+            for row_number, values in list(iter_rows(conn)):
+                conn.execute(
+                    "UPDATE rows SET data = ? WHERE row_number = ?",
+                    (json.dumps(values, default=str), row_number)
+                )
+            conn.execute("DELETE FROM patches")
+            write_meta(conn, signature=get_file_signature(data_import))
+    finally:
+        conn.close()
+
+    return data_import.import_file
+
+
+@frappe.whitelist()
+def start_staged_import(data_import_name):
+    """Materialize pending edits, then start the standard Data Import job."""
+    data_import = get_data_import(data_import_name, "write")
+    materialize_import_file(data_import)
+    return data_import.start_import()
+
+
+def form_start_import(data_import):
+    """Override of the desk "Start Import" action so staged edits are never skipped."""
+    return start_staged_import(data_import)
+
+
+def clear_import_staging(doc, method=None):
+    """Data Import on_trash: drop the staged store."""
+    path = get_store_path(doc.name)
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
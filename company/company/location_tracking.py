@@ -0,0 +1,394 @@
+import json
+import math
+from itertools import pairwise
+
+import frappe
+from frappe import _
+from frappe.utils import (
+    add_days,
+    cint,
+    convert_utc_to_system_timezone,
+    flt,
+    get_datetime,
+    getdate,
+    now_datetime,
+)
+
+from company.company.settings_cache import get_settings
+
+# Raw GPS pings live in Employee Location Log for `location_retention_days`; after that
+# the daily compaction folds them into one Employee Location Track per session and day,
+# keeping only the points needed to draw the same path (Douglas-Peucker).
+MAX_POINTS_PER_BATCH = 500
+DEFAULT_RETENTION_DAYS = 7
+DEFAULT_TOLERANCE_METERS = 10
+EARTH_RADIUS_METERS = 6371000
+
+LOCATION_LOG_FIELDS = [
+    "name", "employee", "session", "status", "source", "latitude", "longitude",
+    "accuracy", "logged_at", "device_type", "ip_address"
+]
+
+
+def get_location_settings():
+    return get_settings("Employee Presence Settings")
+
+
+def parse_logged_at(value, now):
+    """Client timestamps arrive as ISO strings in UTC; store local server time, never in the future."""
+    if not value:
+        return now
+    logged_at = get_datetime(value)
+    if logged_at.tzinfo is not None:
+        logged_at = convert_utc_to_system_timezone(logged_at).replace(tzinfo=None)
+    return min(logged_at, now)
+
+
+def resolve_location_session(employee, allow_last_session=False):
+    from company.company.presence_api import get_active_session_name
+
+    session_name = get_active_session_name(employee)
+    if not session_name and allow_last_session:
+        session_name = frappe.db.get_value("Employee Session", {"employee": employee}, "name", order_by="modified desc")
+    return session_name
+
+
+def insert_location_points(employee, points, device_type=None, ip_address=None):
+    """
+    Validate and bulk insert GPS points for `employee`. Settings and session are
+    resolved once for the whole batch. Returns (inserted names, ignored count).
+    """
+    settings = get_location_settings()
+    min_accuracy = flt(settings.minimum_gps_accuracy) or 100
+    now = now_datetime()
+
+    accepted = []
+    for point in points:
+        accuracy = point.get("accuracy")
+        if accuracy is not None and flt(accuracy) > min_accuracy:
+            continue
+        if point.get("latitude") is None or point.get("longitude") is None:
+            continue
+        accepted.append(point)
+
+    if not accepted:
+        return [], len(points)
+
+    session_name = resolve_location_session(
+        employee, allow_last_session=any(p.get("source") == "Logout" for p in accepted)
+    )
+
+    # Get details if not provided
+    if not device_type and getattr(frappe.local, "request", None):
+        device_type = frappe.request.headers.get("User-Agent")
+    if not ip_address:
+        ip_address = getattr(frappe.local, "request_ip", None)
+
+    fields = ["name", "owner", "creation", "modified", "modified_by", "docstatus"] + LOCATION_LOG_FIELDS[1:]
+    names = []
+    values = []
+    user = frappe.session.user
+    for point in accepted:
+        name = frappe.generate_hash(length=10)
+        names.append(name)
+        values.append((
+            name, user, now, now, user, 0,
+            employee,
+            session_name,
+            point.get("status"),
+            point.get("source"),
+            flt(point.get("latitude")),
+            flt(point.get("longitude")),
+            flt(point.get("accuracy")) if point.get("accuracy") is not None else None,
+            parse_logged_at(point.get("logged_at"), now),
+            device_type,
+            ip_address,
+        ))
+
+    frappe.db.bulk_insert("Employee Location Log", fields, values)
+    return names, len(points) - len(accepted)
+
+
+@frappe.whitelist()
+def log_locations(points, device_type=None, ip_address=None):
+    """
+    Batch ingest for the mobile/web tracker: `points` is a list (or JSON list) of
+    {latitude, longitude, accuracy, status, source, logged_at}. Clients buffer pings
+    and flush them here instead of calling `log_location` once per ping.
+    """
+    if not get_location_settings().enable_location_tracking:
+        return {"status": "ignored", "message": "Location tracking is disabled globally."}
+
+    if isinstance(points, str):
+        points = json.loads(points)
+    points = points or []
+    if len(points) > MAX_POINTS_PER_BATCH:
+        frappe.throw(_("At most {0} points can be sent per call").format(MAX_POINTS_PER_BATCH))
+
+    employee = frappe.db.get_value("Employee", {"user": frappe.session.user}, "name")
+    if not employee:
+        frappe.throw(_("Employee not found for current user"))
+
+    names, ignored = insert_location_points(employee, points, device_type, ip_address)
+    frappe.db.commit()
+    return {"status": "success", "inserted": len(names), "ignored": ignored}
+
+
+# --------------------------------------------------------------------
+# TRACK SIMPLIFICATION
+# --------------------------------------------------------------------
+
+def _to_xy(lat, lon, ref_lat):
+    """Equirectangular projection in meters; accurate enough at city scale."""
+    x = math.radians(lon) * EARTH_RADIUS_METERS * math.cos(math.radians(ref_lat))
+    y = math.radians(lat) * EARTH_RADIUS_METERS
+    return x, y
+
+
+def _distance_to_segment(p, a, b):
+    (px, py), (ax, ay), (bx, by) = p, a, b
+    dx, dy = bx - ax, by - ay
+    if dx == 0 and dy == 0:
+        return math.hypot(px - ax, py - ay)
+    t = max(0, min(1, ((px - ax) * dx + (py - ay) * dy) / (dx * dx + dy * dy)))
+    return math.hypot(px - (ax + t * dx), py - (ay + t * dy))
+
+
+def simplify_track(points, tolerance=DEFAULT_TOLERANCE_METERS):
+    """
+    Douglas-Peucker over time-ordered points (dicts with latitude/longitude). Points
+    where the status or source changes are always kept, since they mark events
+    (login, logout, status change) rather than movement.
+    """
+    if len(points) <= 2 or flt(tolerance) <= 0:
+        return list(points)
+
+    ref_lat = flt(points[0].get("latitude"))
+    xy = [_to_xy(flt(p.get("latitude")), flt(p.get("longitude")), ref_lat) for p in points]
+
+    keep = [False] * len(points)
+    keep[0] = keep[-1] = True
+    for i in range(1, len(points)):
+        if (points[i].get("status"), points[i].get("source")) != (points[i - 1].get("status"), points[i - 1].get("source")):
+            keep[i] = keep[i - 1] = True
+
+    # Simplify each run between kept anchors with an explicit stack
+    anchors = [i for i, k in enumerate(keep) if k]
+    stack = list(pairwise(anchors))
+    while stack:
+        start, end = stack.pop()
+        max_distance, index = 0, None
+        for i in range(start + 1, end):
+            distance = _distance_to_segment(xy[i], xy[start], xy[end])
+            if distance > max_distance:
+                max_distance, index = distance, i
+        if index is not None and max_distance > tolerance:
+            keep[index] = True
+            stack.append((start, index))
+            stack.append((index, end))
+
+    return [p for p, k in zip(points, keep, strict=True) if k]
+
+
+def _pack_point(point):
+    return [
+        flt(point.latitude), flt(point.longitude), str(point.logged_at),
+        point.accuracy, point.status, point.source
+    ]
+
+
+def _unpack_points(track):
+    return [
+        frappe._dict({
+            "name": None,
+            "employee": track.employee,
+            "session": track.session,
+            "latitude": lat,
+            "longitude": lon,
+            "logged_at": get_datetime(logged_at),
+            "accuracy": accuracy,
+            "status": status,
+            "source": source,
+            "device_type": None,
+            "ip_address": None,
+        })
+        for lat, lon, logged_at, accuracy, status, source in frappe.parse_json(track.points or "[]")
+    ]
+
+
+# --------------------------------------------------------------------
+# COMPACTION (daily)
+# --------------------------------------------------------------------
+
+def compact_location_logs(retention_days=None, tolerance=None):
+    """
+    Scheduler job: fold raw points older than the retention window into one
+    Employee Location Track per employee, session and day, then delete them.
+    """
+    settings = get_location_settings()
+    retention_days = cint(retention_days or settings.get("location_retention_days")) or DEFAULT_RETENTION_DAYS
+    tolerance = flt(tolerance or settings.get("location_track_tolerance")) or DEFAULT_TOLERANCE_METERS
+    cutoff = getdate(add_days(now_datetime(), -retention_days))
+
+    groups = frappe.db.sql("""
+        SELECT employee, session, DATE(logged_at) AS track_date
+        FROM `tabEmployee Location Log`
+        WHERE logged_at < %s
+        GROUP BY employee, session, DATE(logged_at)
+    """, (cutoff,), as_dict=True)
+
+    for group in groups:
+        try:
+            compact_location_group(group.employee, group.session, group.track_date, tolerance)
+            frappe.db.commit()
+        except Exception:
+            frappe.db.rollback()
+            frappe.log_error(frappe.get_traceback(), "Location Log Compaction Error")
+
+
+def compact_location_group(employee, session, track_date, tolerance=DEFAULT_TOLERANCE_METERS):
+    day_start = getdate(track_date)
+    logs = frappe.db.sql("""
+        SELECT name, latitude, longitude, accuracy, logged_at, status, source
+        FROM `tabEmployee Location Log`
+        WHERE employee = %(employee)s
+            AND IFNULL(session, '') = %(session)s
+            AND logged_at >= %(day_start)s AND logged_at < %(day_end)s
+        ORDER BY logged_at ASC
+    """, {
+        "employee": employee,
+        "session": session or "",
+        "day_start": day_start,
+        "day_end": add_days(day_start, 1),
+    }, as_dict=True)
+    if not logs:
+        return
+
+    track_name = frappe.db.get_value("Employee Location Track", {
+        "employee": employee,
+        "session": session or ["is", "not set"],
+        "track_date": day_start,
+    })
+    if track_name:
+        track = frappe.get_doc("Employee Location Track", track_name)
+        existing = _unpack_points(track)
+    else:
+        track = frappe.new_doc("Employee Location Track")
+        track.update({"employee": employee, "session": session, "track_date": day_start})
+        existing = []
+
+    merged = sorted(existing + logs, key=lambda p: get_datetime(p.logged_at))
+    simplified = simplify_track(merged, tolerance)
+
+    track.points = json.dumps([_pack_point(p) for p in simplified])
+    track.point_count = len(simplified)
+    track.original_point_count = cint(track.original_point_count) + len(logs)
+    track.from_time = merged[0].logged_at
+    track.to_time = merged[-1].logged_at
+    track.save(ignore_permissions=True)
+
+    frappe.db.delete("Employee Location Log", {"name": ("in", [log.name for log in logs])})
+
+
+# --------------------------------------------------------------------
+# QUERIES
+# --------------------------------------------------------------------
+
+def _location_filters(employee=None, session=None):
+    conditions = []
+    values = {}
+    if employee:
+        conditions.append("employee = %(employee)s")
+        values["employee"] = employee
+    if session:
+        conditions.append("session = %(session)s")
+        values["session"] = session
+    return conditions, values
+
+
+def get_track_points(employee=None, session=None, from_date=None, to_date=None, status=None, source=None):
+    """Points from compacted tracks matching the filters, oldest first."""
+    conditions, values = _location_filters(employee, session)
+    if from_date:
+        conditions.append("track_date >= %(from_date)s")
+        values["from_date"] = getdate(from_date)
+    if to_date:
+        conditions.append("track_date <= %(to_date)s")
+        values["to_date"] = getdate(to_date)
+
+    tracks = frappe.db.sql(f"""
+        SELECT employee, session, points
+        FROM `tabEmployee Location Track`
+        {"WHERE " + " AND ".join(conditions) if conditions else ""}
+        ORDER BY from_time ASC
+    """, values, as_dict=True)
+
+    points = []
+    for track in tracks:
+        points.extend(
+            p for p in _unpack_points(track)
+            if (not status or p.status == status) and (not source or p.source == source)
+        )
+    return points
+
+
+def get_raw_points(employee=None, session=None, from_date=None, to_date=None, status=None, source=None,
+        limit_start=0, limit_page_length=0):
+    conditions, values = _location_filters(employee, session)
+    if from_date:
+        conditions.append("logged_at >= %(from_date)s")
+        values["from_date"] = getdate(from_date)
+    if to_date:
+        conditions.append("logged_at < %(to_date)s")
+        values["to_date"] = add_days(getdate(to_date), 1)
+    if status:
+        conditions.append("status = %(status)s")
+        values["status"] = status
+    if source:
+        conditions.append("source = %(source)s")
+        values["source"] = source
+
+    limit = ""
+    if cint(limit_page_length):
+        limit = "LIMIT %(limit_page_length)s OFFSET %(limit_start)s"
+        values.update({"limit_page_length": cint(limit_page_length), "limit_start": cint(limit_start)})
+
+    return frappe.db.sql(f"""
+        SELECT {", ".join(LOCATION_LOG_FIELDS)}
+        FROM `tabEmployee Location Log`
+        {"WHERE " + " AND ".join(conditions) if conditions else ""}
+        ORDER BY logged_at ASC
+        {limit}
+    """, values, as_dict=True)
+
+
+def get_location_points(employee=None, session=None, from_date=None, to_date=None, status=None, source=None,
+        limit_start=0, limit_page_length=0):
+    """
+    Compacted track points followed by raw points, oldest first. Tracks only hold
+    points older than the raw retention window, so the two never interleave and a
+    page can be cut across them without sorting the raw table in Python.
+    """
+    filters = dict(employee=employee, session=session, from_date=from_date, to_date=to_date, status=status, source=source)
+    track_points = get_track_points(**filters)
+
+    limit_start = cint(limit_start)
+    limit_page_length = cint(limit_page_length)
+    if not limit_page_length:
+        return track_points + get_raw_points(**filters)
+
+    page = track_points[limit_start:limit_start + limit_page_length]
+    remaining = limit_page_length - len(page)
+    if remaining > 0:
+        page += get_raw_points(
+            **filters,
+            limit_start=max(0, limit_start - len(track_points)),
+            limit_page_length=remaining
+        )
+    return page
+
+
+def get_simplified_track(employee=None, session=None, from_date=None, to_date=None, tolerance=DEFAULT_TOLERANCE_METERS):
+    """Path for the map view: every point in range, simplified to `tolerance` meters."""
+    points = get_location_points(employee=employee, session=session, from_date=from_date, to_date=to_date)
+    return simplify_track(points, flt(tolerance))
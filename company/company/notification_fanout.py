@@ -0,0 +1,253 @@
+import json
+
+import frappe
+
+# Workflow notifications (Request, Leave Application, WFH Attendance, Reimbursement
+# Claim) render their email bodies and chat messages once per event inside the save,
+# and queue the actual deliveries here. Everything queued during a request goes out
+# as one background job after the transaction commits, so workflow actions never
+# wait on SMTP, the chat app or FCM.
+ROLE_USERS_CACHE_KEY = "company:role_users"
+HR_SETTINGS_CACHE_KEY = "company:hr_email_settings"
+
+
+# --------------------------------------------------------------------
+# RECIPIENTS
+# --------------------------------------------------------------------
+
+def get_role_users(role="HR"):
+    """Enabled users holding `role`, cached per role until a User or Role changes."""
+    cache = frappe.cache()
+    users = cache.hget(ROLE_USERS_CACHE_KEY, role)
+    if users is None:
+        users = frappe.db.sql_list("""
+            SELECT DISTINCT hr.parent
+            FROM `tabHas Role` hr
+            JOIN `tabUser` u ON u.name = hr.parent
+            WHERE hr.role = %s
+              AND hr.parenttype = 'User'
+              AND u.enabled = 1
+        """, (role,))
+        cache.hset(ROLE_USERS_CACHE_KEY, role, users)
+    return list(users)
+
+
+def clear_role_users_cache(doc=None, method=None):
+    """doc_events handler for User and Role; role assignments are saved with the User."""
+    frappe.cache().delete_value(ROLE_USERS_CACHE_KEY)
+
+
+def get_hr_settings():
+    """HR email, CC list and display name from Company Email Settings."""
+    settings = frappe.cache().get_value(HR_SETTINGS_CACHE_KEY)
+    if settings is None:
+        rows = frappe.get_all(
+            "Company Email Settings",
+            fields=["hr_email", "hr_cc_emails", "hr_name"],
+            limit=1
+        )
+        settings = rows[0] if rows else {}
+        frappe.cache().set_value(HR_SETTINGS_CACHE_KEY, settings)
+    return frappe._dict(settings)
+
+
+def clear_hr_settings_cache(doc=None, method=None):
+    frappe.cache().delete_value(HR_SETTINGS_CACHE_KEY)
+
+
+def split_emails(value):
+    """Comma/newline separated addresses as a list."""
+    return [e.strip() for e in (value or "").replace("\n", ",").split(",") if e.strip()]
+
+
+def get_employee_contacts(employee):
+    """Company/personal emails, the preferred address and the linked User in one query."""
+    emp = frappe.db.get_value("Employee", employee, ["email", "personal_email", "user"], as_dict=True)
+    if not emp:
+        return frappe._dict({"emails": [], "primary_email": None, "user": None})
+    return frappe._dict({
+        "emails": list({e for e in (emp.email, emp.personal_email) if e}),
+        "primary_email": emp.email or emp.personal_email,
+        "user": emp.user,
+    })
+
+
+# --------------------------------------------------------------------
+# QUEUEING
+# --------------------------------------------------------------------
+
+def _get_batch():
+    batch = getattr(frappe.local, "notification_batch", None)
+    if batch is None:
+        batch = frappe.local.notification_batch = {"emails": [], "chats": [], "pushes": []}
+        frappe.db.after_commit.add(flush_notifications)
+        frappe.db.after_rollback.add(discard_notifications)
+    return batch
+
+
+def discard_notifications():
+    """Nothing is sent for a rolled back transaction."""
+    frappe.local.notification_batch = None
+
+
+def queue_email(doc, recipients, subject, message, cc=None, sender=None, reply_to=None):
+    """Queue one rendered email about `doc`."""
+    recipients = [r for r in recipients or [] if r]
+    if not recipients:
+        return
+    _get_batch()["emails"].append({
+        "recipients": recipients,
+        "cc": cc or [],
+        "subject": subject,
+        "message": message,
+        "sender": sender,
+        "reply_to": reply_to,
+        "reference_doctype": doc.doctype,
+        "reference_name": doc.name,
+    })
+
+
+def queue_chat(doc, sender, receivers, content):
+    """Queue the same chat message from `sender` to each receiver (the sender is skipped)."""
+    if isinstance(receivers, str):
+        receivers = [receivers]
+    for receiver in receivers or []:
+        if receiver and receiver != sender:
+            _get_batch()["chats"].append({
+                "sender": sender,
+                "receiver": receiver,
+                "content": content,
+                "reference_doctype": doc.doctype,
+            })
+
+
+def queue_push(users, title, body, data=None):
+    """Queue a browser/device push notification to each user."""
+    if isinstance(users, str):
+        users = [users]
+    users = [u for u in users or [] if u]
+    if users:
+        _get_batch()["pushes"].append({"users": users, "title": title, "body": body, "data": data or {}})
+
+
+def flush_notifications():
+    """after_commit callback: hand everything queued in this request to one job."""
+    batch = getattr(frappe.local, "notification_batch", None)
+    frappe.local.notification_batch = None
+    if not batch or not any(batch.values()):
+        return
+
+    frappe.enqueue(
+        "company.company.notification_fanout.deliver_notifications",
+        queue="short",
+        **batch
+    )
+
+
+# --------------------------------------------------------------------
+# DELIVERY (background job)
+# --------------------------------------------------------------------
+
+def deliver_notifications(emails=None, chats=None, pushes=None):
+    for email in emails or []:
+        try:
+            frappe.sendmail(**email)
+        except Exception:
+            frappe.log_error(title=f"{email['reference_doctype']} Notification Mail Error")
+
+    full_names = {}
+    job_user = frappe.session.user
+    try:
+        for chat in chats or []:
+            sender = chat["sender"]
+            if sender not in full_names:
+                full_names[sender] = frappe.db.get_value("User", sender, "full_name") or sender
+            # The chat app identifies the author from the session user
+            frappe.set_user(sender)
+            send_chat_message(sender, chat["receiver"], chat["content"], full_names[sender], chat["reference_doctype"])
+    finally:
+        frappe.set_user(job_user)
+
+    if pushes:
+        from company.company.push_notifications import send_push_to_users
+        for push in pushes:
+            try:
+                send_push_to_users(push["users"], push["title"], push["body"], push["data"], strip_body=True)
+            except Exception:
+                frappe.log_error(title="Notification Push Error")
+
+    frappe.db.commit()
+
+
+def get_direct_room(sender, receiver):
+    rooms = frappe.db.sql("""
+        SELECT c.name
+        FROM `tabClefinCode Chat Channel` c
+        JOIN `tabClefinCode Chat Channel User` u1 ON u1.parent = c.name
+        JOIN `tabClefinCode Chat Channel User` u2 ON u2.parent = c.name
+        WHERE c.type = 'Direct'
+        AND c.is_parent = 1
+        AND u1.user = %s
+        AND u2.user = %s
+    """, (sender, receiver), pluck=True)
+    return rooms[0] if rooms else None
+
+
+def send_chat_message(sender, receiver, content, sender_full_name=None, reference_doctype=None):
+    """Send a direct chat message via clefincode_chat, creating the room if needed."""
+    sender_full_name = sender_full_name or frappe.db.get_value("User", sender, "full_name") or sender
+    label = reference_doctype or "Notification"
+    log_data = {"sender_id": sender, "receiver_id": receiver, "content": content}
+
+    try:
+        from clefincode_chat.api.api_1_2_1.api import create_channel, send, share_doctype
+
+        room_name = get_direct_room(sender, receiver)
+        if room_name:
+            # Make sure the receiver is still an active member of the room
+            frappe.db.sql("""
+                UPDATE `tabClefinCode Chat Channel User`
+                SET is_removed = 0, active = 1
+                WHERE parent = %s AND user = %s
+            """, (room_name, receiver))
+            share_doctype("ClefinCode Chat Channel", room_name, receiver)
+        else:
+            users = [
+                {"email": sender, "platform": "Chat"},
+                {"email": receiver, "platform": "Chat"}
+            ]
+            res = create_channel(
+                channel_name="",
+                users=json.dumps(users),
+                type="Direct",
+                last_message=content,
+                creator_email=sender,
+                creator=sender_full_name
+            )
+            log_data["create_channel_response"] = res
+            if res and res.get("results"):
+                room_name = res["results"][0]["room"]
+
+        if not room_name:
+            log_data["error"] = "Room name could not be determined"
+            frappe.log_error(title=f"{label} Chat Failed", message=frappe.as_json(log_data))
+            return
+
+        send(content=content, user=sender_full_name, room=room_name, email=sender)
+
+        # Refresh the receiver's chat sidebar
+        refresh_data = {
+            "room": room_name,
+            "realtime_type": "update_room",
+            "content": content,
+            "user": sender_full_name,
+            "sender_email": sender,
+            "room_type": "Direct"
+        }
+        frappe.publish_realtime(event="update_room", message=refresh_data, user=receiver)
+        frappe.publish_realtime(event="new_chat_notification", message=refresh_data, user=receiver)
+
+    except Exception as e:
+        log_data["exception"] = str(e)
+        log_data["traceback"] = frappe.get_traceback()
+        frappe.log_error(title=f"{label} Chat Notification Exception", message=frappe.as_json(log_data))
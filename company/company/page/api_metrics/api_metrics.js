@@ -0,0 +1,114 @@
+frappe.pages['api-metrics'].on_page_load = function(wrapper) {
+    var page = frappe.ui.make_app_page({
+        parent: wrapper,
+        title: 'API Metrics',
+        single_column: true
+    });
+
+    const custom_css = `
+        <style>
+            .api-metrics-container { padding: 20px; }
+            .api-metrics-table td, .api-metrics-table th { font-size: 12px; white-space: nowrap; }
+            .api-metrics-table .endpoint { white-space: normal; word-break: break-all; font-weight: 500; }
+            .api-metrics-table .over-budget { color: #e03131; font-weight: bold; }
+            .api-metrics-slow { font-family: monospace; font-size: 11px; color: #555; white-space: pre-wrap; }
+        </style>
+    `;
+    $('head').append(custom_css);
+
+    let container = $('<div class="api-metrics-container"></div>').appendTo(page.main);
+
+    page.set_primary_action(__('Refresh'), () => load_metrics(), 'refresh');
+    page.set_secondary_action(__('Clear'), () => {
+        frappe.confirm(__('Clear all collected API metrics?'), () => {
+            frappe.call({
+                method: 'company.company.api_metrics.clear_endpoint_metrics',
+                callback: () => load_metrics()
+            });
+        });
+    });
+
+    function fmt(stat, suffix) {
+        if (!stat || stat.p50 === null || stat.p50 === undefined) return '-';
+        return `${stat.p50}${suffix} / ${stat.p95}${suffix}`;
+    }
+
+    function fmt_size(stat) {
+        if (!stat || stat.p50 === null || stat.p50 === undefined) return '-';
+        return `${format_bytes(stat.p50)} / ${format_bytes(stat.p95)}`;
+    }
+
+    function format_bytes(value) {
+        if (value < 1024) return value + ' B';
+        if (value < 1024 * 1024) return (value / 1024).toFixed(1) + ' KB';
+        return (value / (1024 * 1024)).toFixed(1) + ' MB';
+    }
+
+    function render(data) {
+        container.empty();
+
+        if (!data.enabled) {
+            $(`<div class="alert alert-warning">${__('Collection is off. Set {0} in site config to record new calls.', ['<code>enable_api_metrics: 1</code>'])}</div>`)
+                .appendTo(container);
+        }
+
+        if (!data.endpoints.length) {
+            $(`<p class="text-muted">${__('No endpoint calls recorded yet.')}</p>`).appendTo(container);
+            return;
+        }
+
+        $(`<p class="text-muted">${__('p50 / p95 over the last {0} calls of each endpoint, sorted by p95 query count.', [data.window])}</p>`)
+            .appendTo(container);
+
+        let table = $(`
+            <table class="table table-bordered api-metrics-table">
+                <thead>
+                    <tr>
+                        <th>${__('Endpoint')}</th>
+                        <th>${__('Calls')}</th>
+                        <th>${__('Queries')}</th>
+                        <th>${__('Total')}</th>
+                        <th>${__('DB')}</th>
+                        <th>${__('Python')}</th>
+                        <th>${__('Response')}</th>
+                        <th>${__('Over Budget')}</th>
+                    </tr>
+                </thead>
+                <tbody></tbody>
+            </table>
+        `).appendTo(container);
+
+        let tbody = table.find('tbody');
+        data.endpoints.forEach(row => {
+            let slow = (row.slow_queries || []).map(q =>
+                `${q.max_ms} ms × ${q.count}  ${frappe.utils.escape_html(q.query)}`
+            ).join('\n');
+
+            $(`
+                <tr>
+                    <td class="endpoint">
+                        ${frappe.utils.escape_html(row.endpoint)}
+                        ${slow ? `<details><summary class="text-muted">${__('Slowest queries')}</summary><div class="api-metrics-slow">${slow}</div></details>` : ''}
+                    </td>
+                    <td>${row.calls}</td>
+                    <td>${fmt(row.queries, '')}</td>
+                    <td>${fmt(row.total_ms, ' ms')}</td>
+                    <td>${fmt(row.db_ms, ' ms')}</td>
+                    <td>${fmt(row.py_ms, ' ms')}</td>
+                    <td>${fmt_size(row.size)}</td>
+                    <td class="${row.budget_violations ? 'over-budget' : ''}">${row.budget_violations || 0}</td>
+                </tr>
+            `).appendTo(tbody);
+        });
+    }
+
+    function load_metrics() {
+        frappe.call({
+            method: 'company.company.api_metrics.get_endpoint_metrics',
+            freeze: true,
+            callback: r => render(r.message || { endpoints: [] })
+        });
+    }
+
+    load_metrics();
+};
@@ -0,0 +1,128 @@
+import hashlib
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import frappe
+from frappe.utils import cint
+
+# Print-format PDFs are cached by (doctype, name, modified, print format): any edit to
+# the document changes `modified` and therefore the key, so stale PDFs are never served.
+# Batches that miss the cache render in a pool of worker processes, each with its own
+# site connection, so a month of salary slips is not rendered one after another.
+PDF_CACHE_TTL = 6 * 60 * 60
+DEFAULT_RENDER_WORKERS = 4
+
+
+def get_default_print_format(doctype):
+    return frappe.get_meta(doctype).default_print_format or "Standard"
+
+
+def pdf_cache_key(doctype, name, modified, print_format):
+    signature = f"{doctype}|{name}|{modified}|{print_format}"
+    return f"company:pdf:{hashlib.sha1(signature.encode()).hexdigest()}"
+
+
+def render_pdf(doctype, name, print_format=None):
+    return frappe.get_print(doctype, name, print_format=print_format, as_pdf=True)
+
+
+def get_cached_pdf(doctype, name, print_format=None):
+    """PDF bytes for one document, rendered at most once per version."""
+    errors = {}
+    pdfs = render_pdfs(doctype, [name], print_format, errors=errors)
+    if name in errors:
+        raise errors[name]
+    return pdfs[name]
+
+
+def render_pdfs(doctype, names, print_format=None, workers=None, errors=None):
+    """
+    {name: PDF bytes} for many documents of one doctype. Cached versions are reused;
+    the rest are rendered in parallel (or inline for a single document) and cached.
+    A document that fails to render is left out and does not stop the others; its
+    exception goes into `errors` ({name: exception}) when a dict is passed.
+    """
+    print_format = print_format or get_default_print_format(doctype)
+    names = list(dict.fromkeys(names))
+    modified = dict(frappe.get_all(
+        doctype, filters={"name": ["in", names]}, fields=["name", "modified"], as_list=True
+    )) if names else {}
+
+    cache = frappe.cache()
+    keys = {name: pdf_cache_key(doctype, name, modified.get(name), print_format) for name in names}
+    pdfs = {}
+    missing = []
+    for name in names:
+        pdf = cache.get_value(keys[name])
+        if pdf is None:
+            missing.append(name)
+        else:
+            pdfs[name] = pdf
+
+    for name, pdf, error in _render_missing(doctype, missing, print_format, workers):
+        if error is not None:
+            if errors is not None:
+                errors[name] = error
+            continue
+        cache.set_value(keys[name], pdf, expires_in_sec=PDF_CACHE_TTL)
+        pdfs[name] = pdf
+
+    return pdfs
+
+
+def _render_missing(doctype, names, print_format, workers=None):
+    """Yields (name, pdf, None) per rendered document and (name, None, exception) per failure."""
+    workers = min(
+        cint(workers) or cint(frappe.conf.get("pdf_render_workers")) or DEFAULT_RENDER_WORKERS,
+        len(names),
+    )
+    if workers <= 1:
+        for name in names:
+            try:
+                pdf = render_pdf(doctype, name, print_format)
+            except Exception as e:
+                yield name, None, e
+                continue
+            yield name, pdf, None
+        return
+
+    # "spawn" gives each worker a clean interpreter instead of a fork of this one's
+    # open database and Redis connections
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_render_worker,
+        initargs=(frappe.local.site, os.path.abspath(frappe.local.sites_path), frappe.session.user),
+    ) as pool:
+        futures = [pool.submit(_render_in_worker, doctype, name, print_format) for name in names]
+        for name, future in zip(names, futures, strict=True):
+            try:
+                pdf = future.result()
+            except Exception as e:
+                yield name, None, e
+                continue
+            yield name, pdf, None
+
+
+def _init_render_worker(site, sites_path, user):
+    frappe.init(site=site, sites_path=sites_path)
+    frappe.connect()
+    frappe.set_user(user)
+
+
+def _render_in_worker(doctype, name, print_format):
+    try:
+        return render_pdf(doctype, name, print_format)
+    finally:
+        # Print views may write (e.g. print logs); nothing should stay open between tasks
+        frappe.db.commit()
+
+
+@frappe.whitelist()
+def download_pdf(doctype, name, print_format=None):
+    """Cached print-format PDF of a document the user may print."""
+    frappe.has_permission(doctype, "print", name, throw=True)
+    frappe.local.response.filename = f"{name}.pdf"
+    frappe.local.response.filecontent = get_cached_pdf(doctype, name, print_format)
+    frappe.local.response.type = "pdf"
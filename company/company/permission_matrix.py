@@ -0,0 +1,232 @@
+import frappe
+
+# Redis entries holding the compiled permission structures.
+#   PM_MATRIX_CACHE_KEY   -> {permission_management_name: compiled matrix}
+#   USER_MATRIX_CACHE_KEY -> {user: merged matrix for the user's assigned Permission Managements}
+#   DOC_PERMISSION_CACHE_KEY:<user>::<doctype> -> read/write/create/delete flags
+# The doctype flags also depend on roles, role profiles and standard DocPerms, which can
+# change without any hook here (e.g. on migrate), so those entries expire as well.
+PM_MATRIX_CACHE_KEY = "company:permission_matrix"
+USER_MATRIX_CACHE_KEY = "company:user_permission_matrix"
+DOC_PERMISSION_CACHE_KEY = "company:user_doc_permissions"
+DOC_PERMISSION_TTL = 60 * 60
+
+ACTION_FLAGS = (
+    ("view", "view_permission"),
+    ("create", "add_permission"),
+    ("edit", "edit_permission"),
+    ("delete", "delete_permission"),
+    ("export", "export_permission"),
+    ("import", "import_permission"),
+)
+
+
+def _empty_matrix():
+    return {
+        "frontend_role": None,
+        "menus": {},
+        "actions": {},
+        "menu_mapping": {}
+    }
+
+
+def _empty_actions():
+    return {key: False for key, _ in ACTION_FLAGS}
+
+
+def normalize_screen_key(screen):
+    return screen.strip().lower().replace(" ", "_")
+
+
+def compile_permission_matrix(pm_name, rows=None):
+    """
+    Build the menus/actions/menu_mapping structure for a single Permission Management.
+    `rows` may be passed in when the Permission Access rows were already fetched in bulk.
+    """
+    if rows is None:
+        rows = frappe.get_all(
+            "Permission Access",
+            filters={"parent": pm_name, "parenttype": "Permission Management"},
+            fields=["module_id", "screen_id"] + [field for _, field in ACTION_FLAGS],
+            order_by="idx asc"
+        )
+
+    matrix = _empty_matrix()
+    for perm in rows:
+        screen = perm.get("screen_id")
+        module = perm.get("module_id")
+        granted = [key for key, field in ACTION_FLAGS if perm.get(field)]
+
+        # Screen-level CRUD authorizations keyed by the normalized screen name
+        if screen:
+            screen_key = normalize_screen_key(screen)
+            matrix["menu_mapping"][screen_key] = module
+            matrix["menus"][screen_key] = matrix["menus"].get(screen_key, False) or "view" in granted
+            screen_actions = matrix["actions"].setdefault(screen_key, _empty_actions())
+            for key in granted:
+                screen_actions[key] = True
+
+        # Module view access controls parent item rendering, and module actions
+        # aggregate every screen mapped under it as a fallback
+        matrix["menus"][module] = matrix["menus"].get(module, False) or "view" in granted
+        module_actions = matrix["actions"].setdefault(module, _empty_actions())
+        for key in granted:
+            module_actions[key] = True
+
+    return matrix
+
+
+def get_compiled_permission_matrices(pm_names):
+    """
+    Return {pm_name: compiled matrix}, compiling and caching only the Permission
+    Managements that are not already in Redis. Missing ones are fetched with one query.
+    """
+    cache = frappe.cache()
+    compiled = {}
+    missing = []
+    for pm_name in pm_names:
+        matrix = cache.hget(PM_MATRIX_CACHE_KEY, pm_name)
+        if matrix is None:
+            missing.append(pm_name)
+        else:
+            compiled[pm_name] = matrix
+
+    if missing:
+        rows_by_parent = {name: [] for name in missing}
+        for row in frappe.get_all(
+            "Permission Access",
+            filters={"parent": ["in", missing], "parenttype": "Permission Management"},
+            fields=["parent", "module_id", "screen_id"] + [field for _, field in ACTION_FLAGS],
+            order_by="parent asc, idx asc"
+        ):
+            rows_by_parent[row.parent].append(row)
+
+        for pm_name in missing:
+            matrix = compile_permission_matrix(pm_name, rows_by_parent[pm_name])
+            cache.hset(PM_MATRIX_CACHE_KEY, pm_name, matrix)
+            compiled[pm_name] = matrix
+
+    return compiled
+
+
+def merge_permission_matrices(matrices):
+    merged = _empty_matrix()
+    for matrix in matrices:
+        merged["menu_mapping"].update(matrix["menu_mapping"])
+        for key, allowed in matrix["menus"].items():
+            merged["menus"][key] = merged["menus"].get(key, False) or allowed
+        for key, actions in matrix["actions"].items():
+            target = merged["actions"].setdefault(key, _empty_actions())
+            for action, allowed in actions.items():
+                if allowed:
+                    target[action] = True
+    return merged
+
+
+def get_user_permission_matrix(user=None):
+    """
+    Return the merged frontend permission matrix for `user`, served from Redis when available.
+    Besides the menus/actions/menu_mapping shape returned by `get_user_permissions`, the cached
+    entry records whether custom permissions are assigned and whether the user has any
+    row-level User Permission, so callers do not need extra queries for those.
+    """
+    if not user:
+        user = frappe.session.user
+
+    cache = frappe.cache()
+    cached = cache.hget(USER_MATRIX_CACHE_KEY, user)
+    if cached is not None:
+        return cached
+
+    user_pm_list = frappe.get_all(
+        "User Custom Permission",
+        filters={"parent": user, "parenttype": "User"},
+        pluck="permission_manager"
+    )
+    user_pm_list = [pm for pm in user_pm_list if pm]
+
+    matched_pm = []
+    if user_pm_list:
+        matched_pm = frappe.get_all(
+            "Permission Management",
+            filters={"name": ["in", user_pm_list], "status": "Enabled"},
+            fields=["name", "frontend_role_name"]
+        )
+
+    if matched_pm:
+        compiled = get_compiled_permission_matrices([pm.name for pm in matched_pm])
+        matrix = merge_permission_matrices([compiled[pm.name] for pm in matched_pm])
+        matrix["frontend_role"] = ", ".join([pm.frontend_role_name for pm in matched_pm])
+    else:
+        # No custom permissions: empty maps so the frontend falls back to system roles
+        matrix = _empty_matrix()
+
+    matrix["custom_permissions_assigned"] = bool(user_pm_list)
+    matrix["has_user_permission"] = bool(frappe.db.exists("User Permission", {"user": user}))
+
+    cache.hset(USER_MATRIX_CACHE_KEY, user, matrix)
+    return matrix
+
+
+def get_cached_doc_permissions(doctype, user=None):
+    """
+    Return read/write/create/delete flags for `doctype`, memoized per user alongside the
+    compiled permission matrix and invalidated with it.
+    """
+    if not user:
+        user = frappe.session.user
+
+    cache = frappe.cache()
+    cache_key = f"{DOC_PERMISSION_CACHE_KEY}:{user}::{doctype}"
+    cached = cache.get_value(cache_key)
+    if cached is not None:
+        return cached
+
+    permissions = {
+        ptype: bool(frappe.has_permission(doctype, ptype, user=user))
+        for ptype in ("read", "write", "create", "delete")
+    }
+    cache.set_value(cache_key, permissions, expires_in_sec=DOC_PERMISSION_TTL)
+    return permissions
+
+
+def clear_doc_permission_cache(user=None):
+    """Drop cached doctype flags for one user, or for every user; also used by after_migrate."""
+    frappe.cache().delete_keys(f"{DOC_PERMISSION_CACHE_KEY}:{user}::" if user else f"{DOC_PERMISSION_CACHE_KEY}:")
+
+
+def clear_user_permission_cache(user=None):
+    """Drop cached matrices for one user, or for every user when `user` is None."""
+    cache = frappe.cache()
+    if not user:
+        cache.delete_key(USER_MATRIX_CACHE_KEY)
+    else:
+        cache.hdel(USER_MATRIX_CACHE_KEY, user)
+    clear_doc_permission_cache(user)
+
+
+def clear_permission_matrix_cache(pm_name=None):
+    """
+    Invalidate a compiled Permission Management matrix. Every user matrix is dropped too,
+    since any user may have the Permission Management assigned.
+    """
+    cache = frappe.cache()
+    if pm_name:
+        cache.hdel(PM_MATRIX_CACHE_KEY, pm_name)
+    else:
+        cache.delete_key(PM_MATRIX_CACHE_KEY)
+    clear_user_permission_cache()
+
+
+def on_user_change(doc, method=None):
+    # Custom permissions, roles and blocked modules all live on the User doc
+    clear_user_permission_cache(doc.name)
+
+
+def on_user_permission_change(doc, method=None):
+    clear_user_permission_cache(doc.user)
+
+
+def on_docperm_change(doc, method=None):
+    # Role permission and role profile changes affect the doctype flags of every user
+    clear_doc_permission_cache()
@@ -0,0 +1,69 @@
+import frappe
+
+# Numbers are stored in many shapes ("+91-98765 43210", "919876543210", "09876543210").
+# Each record also keeps a `phone_key` — the last 10 digits — in an indexed column, so
+# matching a number is one equality lookup instead of a leading-wildcard LIKE scan.
+PHONE_KEY_LENGTH = 10
+
+# doctype -> field holding the number
+PHONE_KEY_SOURCES = {
+    "Lead": "phone_number",
+    "Lead Phone": "phone",
+    "Contacts": "phone",
+    "CRM WhatsApp Conversation": "mobile_number",
+}
+
+
+def normalize_phone_key(phone):
+    """Last 10 digits of `phone`, or None when it has no digits."""
+    digits = "".join(filter(str.isdigit, str(phone or "")))
+    return digits[-PHONE_KEY_LENGTH:] or None
+
+
+def set_phone_keys(doc, method=None):
+    """doc_events validate handler for Lead, Contacts and CRM WhatsApp Conversation."""
+    doc.phone_key = normalize_phone_key(doc.get(PHONE_KEY_SOURCES[doc.doctype]))
+
+    # Child rows do not get their own hooks
+    if doc.doctype == "Lead":
+        for row in doc.get("phone_numbers") or []:
+            row.phone_key = normalize_phone_key(row.phone)
+
+
+def find_lead_by_phone(phone):
+    """Lead whose main number or any extra Lead Phone row matches `phone`."""
+    phone_key = normalize_phone_key(phone)
+    if not phone_key:
+        return None
+
+    lead = frappe.db.sql("""
+        SELECT name FROM `tabLead` WHERE phone_key = %(phone_key)s
+        UNION ALL
+        SELECT parent FROM `tabLead Phone` WHERE phone_key = %(phone_key)s AND parenttype = 'Lead'
+        LIMIT 1
+    """, {"phone_key": phone_key})
+    return lead[0][0] if lead else None
+
+
+def find_conversation_by_phone(phone):
+    phone_key = normalize_phone_key(phone)
+    if not phone_key:
+        return None
+    return frappe.db.get_value("CRM WhatsApp Conversation", {"phone_key": phone_key})
+
+
+def backfill_phone_keys(doctypes=None):
+    """Fill `phone_key` for existing records; only rows whose key changed are written."""
+    for doctype in doctypes or PHONE_KEY_SOURCES:
+        source_field = PHONE_KEY_SOURCES[doctype]
+        rows = frappe.db.sql(f"""
+            SELECT name, `{source_field}` AS phone, phone_key
+            FROM `tab{doctype}`
+        """, as_dict=True)
+
+        for row in rows:
+            phone_key = normalize_phone_key(row.phone)
+            if phone_key != row.phone_key:
+                frappe.db.sql(f"""
+                    UPDATE `tab{doctype}` SET phone_key = %s WHERE name = %s
+                """, (phone_key, row.name))
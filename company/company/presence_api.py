@@ -1,10 +1,27 @@
 import re
+import json
 import time
+import calendar
 import frappe
 from frappe import _
-from frappe.utils import now_datetime, time_diff_in_seconds, flt, today
+from frappe.utils import now_datetime, time_diff_in_seconds, flt, today, cint, getdate, add_days, get_last_day
 from frappe.exceptions import TimestampMismatchError
 
+from company.company.location_tracking import (
+    get_location_points,
+    get_location_settings,
+    get_simplified_track,
+    insert_location_points,
+)
+from company.company.session_totals import (
+    get_live_active_seconds,
+    get_live_break_seconds,
+    get_live_status_seconds,
+    get_session_totals,
+    recompute_session_totals,
+)
+from company.company.settings_cache import get_settings
+
 DEFAULT_STATUS_MESSAGES = {
     "Busy": "In a meeting",
     "Do Not Disturb": "Do not disturb",
@@ -209,16 +226,6 @@ def update_presence(status, employee=None, status_message=None, source="Manual",
                 "status": status
             })
             
-    # Update live totals before saving
-    if active_session:
-        # Calculate Total Working Hours based on active segments only (excl. Offline, Break, Away)
-        total_active_seconds = sum(flt(i.duration_seconds) for i in active_session.intervals if i.duration_seconds and i.status not in ("Offline", "Break", "Away"))
-        active_session.total_work_hours = max(0, flt(total_active_seconds) / 3600.0)
-        
-        # Calculate Total Break Hours
-        total_break_seconds = get_live_break_seconds(active_session)
-        active_session.total_break_hours = flt(total_break_seconds) / 3600.0
-
     # Single save for the active session at the end with retry logic
     if active_session:
         for i in range(3):
@@ -287,10 +294,10 @@ def ping_presence(employee=None):
     frappe.db.set_value("Employee Presence", employee, "last_updated", now)
     
     # Update Active Session last_seen using db_set with update_modified=False to prevent conflicts with manual edits
-    active_session = get_active_session(employee)
-    if active_session:
-        active_session.db_set("last_seen", now, update_modified=False)
-        return {"status": "success", "session": active_session.name}
+    session_name = get_active_session_name(employee)
+    if session_name:
+        frappe.db.set_value("Employee Session", session_name, "last_seen", now, update_modified=False)
+        return {"status": "success", "session": session_name}
     
     return {"status": "no_active_session"}
 
@@ -309,7 +316,8 @@ def get_presence(employee=None):
     if not presence:
         presence = {"status": "Offline", "last_updated": None, "status_message": ""}
     
-    active_session = get_active_session(employee)
+    # Running totals only; the interval rows are not needed for the live counters
+    active_session = get_session_totals(get_active_session_name(employee))
     
     active_break = None
     total_active_seconds = 0
@@ -347,89 +355,11 @@ def get_all_presences():
     
     return { d.user_id: d for d in data if d.user_id }
 
-def get_live_active_seconds(session):
-    if not session:
-        return 0
-    
-    now = now_datetime()
-    # 1. Sum up all completed intervals (excluding Offline, Break, Away)
-    total_seconds = sum(flt(i.duration_seconds) for i in session.intervals if i.to_time and i.status not in ("Offline", "Break", "Away"))
-    
-    # 2. Add current interval if it's open (excluding Offline/Break)
-    if session.intervals and not session.intervals[-1].to_time:
-        last = session.intervals[-1]
-        if last.status not in ("Offline", "Break", "Away"):
-            total_seconds += time_diff_in_seconds(now, last.from_time)
-    
-    return total_seconds
-
-def get_live_status_seconds(session, status):
-    if not session:
-        return 0
-    
-    now = now_datetime()
-    # 1. Sum up all completed intervals with this status
-    total_seconds = sum(flt(i.duration_seconds) for i in session.intervals if i.to_time and i.status == status)
-    
-    # 2. Add current interval if it matches status and is open
-    if session.intervals and not session.intervals[-1].to_time:
-        last = session.intervals[-1]
-        if last.status == status:
-            total_seconds += time_diff_in_seconds(now, last.from_time)
-            
-    return total_seconds
-
-def get_live_break_seconds(session):
-    if not session:
-        return 0
-    
-    now = now_datetime()
-    # 1. Sum up all completed breaks for this session
-    breaks = frappe.get_all("Employee Break", 
-        filters={"session": session.name}, 
-        fields=["break_duration", "break_start", "break_end"])
-    
-    total_seconds = 0
-    for b in breaks:
-        if b.break_end:
-            total_seconds += flt(b.break_duration) * 60.0
-        else:
-            # Current active break
-            total_seconds += time_diff_in_seconds(now, b.break_start)
-            
-    return total_seconds
-
-def update_session_break_hours(doc, method=None):
-    if doc.session:
-        # Define filters: only exclude the current record if we are deleting it
-        filters = {"session": doc.session}
-        if method == "on_trash":
-            filters["name"] = ["!=", doc.name]
-            
-        # Re-calculate total from relevant breaks in DB
-        breaks = frappe.get_all("Employee Break", 
-            filters=filters, 
-            fields=["break_duration", "break_start", "break_end"]
-        )
-        
-        total_seconds = 0
-        now = now_datetime()
-        for b in breaks:
-            if b.break_end:
-                # Use break_duration if available, else calculate from start/end
-                if b.break_duration:
-                    total_seconds += flt(b.break_duration) * 60.0
-                else:
-                    total_seconds += time_diff_in_seconds(b.break_end, b.break_start)
-            else:
-                # Current active break
-                total_seconds += time_diff_in_seconds(now, b.break_start)
-        
-        # Update modified=False to avoid conflicts with manual edits in progress
-        frappe.db.set_value("Employee Session", doc.session, "total_break_hours", flt(total_seconds) / 3600.0, update_modified=False)
+def get_active_session_name(employee):
+    return frappe.db.get_value("Employee Session", {"employee": employee, "status": "Active"}, "name")
 
 def get_active_session(employee):
-    session_name = frappe.db.get_value("Employee Session", {"employee": employee, "status": "Active"}, "name")
+    session_name = get_active_session_name(employee)
     if session_name:
         return frappe.get_doc("Employee Session", session_name)
     return None
@@ -499,15 +429,7 @@ def close_session(session, now):
         "status": "Offline"
     })
     
-    # Calculate Total Working Hours based on active segments only (excl. Offline, Break, Away)
-    total_active_seconds = sum(flt(i.duration_seconds) for i in session.intervals if i.status not in ("Offline", "Break", "Away"))
-    
-    session.total_work_hours = max(0, flt(total_active_seconds) / 3600.0)
-    
-    # Calculate Total Break Hours
-    total_break_seconds = get_live_break_seconds(session)
-    session.total_break_hours = flt(total_break_seconds) / 3600.0
-    
+    # Work/break totals and the running counters are refreshed in EmployeeSession.validate
     session.save(ignore_permissions=True)
     
     # Publish session update
@@ -527,7 +449,7 @@ def notify_auto_status_change(employee, status):
             from company.company.api import send_automated_chat_message, send_chat_notification_to_user
             
             # Fetch the threshold that actually triggered this status
-            settings = frappe.get_single("Employee Presence Settings")
+            settings = get_settings("Employee Presence Settings")
             if status == "Away":
                 threshold_s = settings.away_threshold or 300
             elif status == "Break":
@@ -613,10 +535,84 @@ def close_active_break(session_name, now):
         if user_id:
             frappe.publish_realtime('session_update', {"user_id": user_id, "name": session_name}, after_commit=True)
 
+WEEKDAYS = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday")
+MONTH_NAMES = tuple(calendar.month_name)[1:]
+
+def parse_session_date_search(text):
+    """
+    Turn date-like search text into a (from_date, to_date) range on login_date, so the
+    filter stays an index range instead of `login_date LIKE '%text%'`. Understands
+    DD-MM-YYYY, YYYY-MM-DD, MM-YYYY, YYYY-MM, YYYY and month names ("March",
+    "Mar 2026"; a bare month name means that month this year). Returns None for
+    anything else.
+    """
+    text = (text or "").strip()
+    if not text:
+        return None
+
+    try:
+        if re.match(r"^\d{1,2}[-/]\d{1,2}[-/]\d{4}$", text):
+            day_, month_, year_ = re.split(r"[-/]", text)
+            date_ = getdate(f"{year_}-{month_.zfill(2)}-{day_.zfill(2)}")
+            return date_, date_
+        if re.match(r"^\d{4}-\d{1,2}-\d{1,2}$", text):
+            date_ = getdate(text)
+            return date_, date_
+        match = re.match(r"^(\d{1,2})[-/](\d{4})$", text) or re.match(r"^(\d{4})[-/](\d{1,2})$", text)
+        if match:
+            first, second = match.groups()
+            year_, month_ = (second, first) if len(first) <= 2 else (first, second)
+            first_day = getdate(f"{year_}-{month_.zfill(2)}-01")
+            return first_day, get_last_day(first_day)
+        if re.match(r"^\d{4}$", text):
+            return getdate(f"{text}-01-01"), getdate(f"{text}-12-31")
+
+        match = re.match(r"^([A-Za-z]{3,9})(?:\s+(\d{4}))?$", text)
+        if match:
+            month_name, year_ = match.groups()
+            month_ = next(
+                (idx for idx, name in enumerate(MONTH_NAMES, 1) if name.lower().startswith(month_name.lower())),
+                None
+            )
+            if month_ and len(month_name) >= 3:
+                first_day = getdate(f"{year_ or getdate(today()).year}-{month_:02d}-01")
+                return first_day, get_last_day(first_day)
+    except Exception:
+        return None
+
+    return None
+
+def get_weekday_dates(day, from_date, to_date):
+    """Every date with weekday `day` between the bounds, for an IN filter instead of DAYNAME()."""
+    weekday = WEEKDAYS.index(day)
+    current = add_days(from_date, (weekday - from_date.weekday()) % 7)
+    dates = []
+    while current <= to_date:
+        dates.append(current)
+        current = add_days(current, 7)
+    return dates
+
+def parse_employee_filter(employee):
+    if isinstance(employee, list):
+        return employee
+    if employee.startswith("[") and employee.endswith("]"):
+        try:
+            return json.loads(employee)
+        except Exception:
+            return [employee]
+    if "," in employee:
+        return [x.strip() for x in employee.split(",") if x.strip()]
+    return [employee]
+
 @frappe.whitelist()
-def get_detailed_sessions(employee=None, limit_start=0, limit_page_length=20, date_search="", status="all", sort_by="login_date_desc", day=None, date=None, from_date=None, to_date=None):
+def get_detailed_sessions(employee=None, limit_start=0, limit_page_length=20, date_search="", status="all", sort_by="login_date_desc", day=None, date=None, from_date=None, to_date=None, cursor=None, with_count=1):
     """
     Fetch sessions with their child intervals and related breaks.
+
+    Intervals and breaks for the whole page are loaded with one IN query each. For
+    login_date sorts, pass the returned `next_cursor` back as `cursor` to page by
+    (login_date, name) instead of an OFFSET; `limit_page_length=0` returns every
+    matching session (e.g. a month across all staff) in one call.
     """
     is_hr_or_admin = "HR" in frappe.get_roles() or "Administrator" in frappe.get_roles()
 
@@ -624,95 +620,90 @@ def get_detailed_sessions(employee=None, limit_start=0, limit_page_length=20, da
         # Non-HR/Admin users MUST be restricted to their own ID
         employee = frappe.db.get_value("Employee", {"user": frappe.session.user}, "name")
         if not employee:
-            return {"data": [], "total_count": 0}
+            return {"data": [], "total_count": 0, "next_cursor": None}
     # For HR/Admin, 'employee' is already either None (all) or from param (specific)
-    
-    # Map sort_by to SQL order by
-    order_by_sql = "s.login_date desc"
-    if sort_by == "login_date_asc":
-        order_by_sql = "s.login_date asc"
-    elif sort_by == "working_hours_desc":
-        order_by_sql = "s.total_work_hours desc"
-    elif sort_by == "working_hours_asc":
-        order_by_sql = "s.total_work_hours asc"
+
+    # Map sort_by to SQL order by; name is the tie-breaker that makes keyset paging stable
+    descending = sort_by != "login_date_asc" and sort_by != "working_hours_asc"
+    direction = "desc" if descending else "asc"
+    sort_column = "s.total_work_hours" if sort_by in ("working_hours_desc", "working_hours_asc") else "s.login_date"
+    order_by_sql = f"{sort_column} {direction}, s.name {direction}"
 
     # Build SQL based on filters
     query_filters = []
     values = {}
-    
+    needs_employee_join = False
+    range_from = getdate(from_date) if from_date else None
+    range_to = getdate(to_date) if to_date else None
+
+    if date:
+        range_from = max(filter(None, [range_from, getdate(date)]))
+        range_to = min(filter(None, [range_to, getdate(date)]))
+
     if date_search:
-        # Check if it looks like a date (DD-MM-YYYY or DD/MM/YYYY)
-        if re.match(r"^\d{1,2}[-/]\d{1,2}[-/]\d{4}$", date_search.strip()):
-            try:
-                parts = re.split(r"[-/]", date_search.strip())
-                if len(parts) == 3:
-                     # Add equality check for the date
-                     # We use an OR because we want to match either the login_date strictly
-                     # or fallback to string search if the name contains these numbers (unlikely but safe)
-                     formatted_date = f"{parts[2]}-{parts[1].zfill(2)}-{parts[0].zfill(2)}"
-                     query_filters.append("(s.login_date = %(formatted_date)s OR s.employee LIKE %(search)s OR e.employee_name LIKE %(search)s)")
-                     values["formatted_date"] = formatted_date
-                     values["search"] = f"%{date_search}%"
-                else:
-                     query_filters.append("(s.employee LIKE %(search)s OR e.employee_name LIKE %(search)s OR s.login_date LIKE %(search)s)")
-                     values["search"] = f"%{date_search}%"
-            except Exception:
-                query_filters.append("(s.employee LIKE %(search)s OR e.employee_name LIKE %(search)s OR s.login_date LIKE %(search)s)")
-                values["search"] = f"%{date_search}%"
+        search_range = parse_session_date_search(date_search)
+        values["search"] = f"%{date_search.strip()}%"
+        needs_employee_join = True
+        if search_range:
+            # Dates also match as text in the employee ID or name (unlikely but safe)
+            query_filters.append(
+                "((s.login_date >= %(search_from)s AND s.login_date <= %(search_to)s)"
+                " OR s.employee LIKE %(search)s OR e.employee_name LIKE %(search)s)"
+            )
+            values["search_from"], values["search_to"] = search_range
         else:
-            # Not a specific date format, search name or ID or login_date string
-            query_filters.append("(s.employee LIKE %(search)s OR e.employee_name LIKE %(search)s OR s.login_date LIKE %(search)s)")
-            values["search"] = f"%{date_search}%"
-        
+            query_filters.append("(s.employee LIKE %(search)s OR e.employee_name LIKE %(search)s)")
+
     if status and status != "all":
         query_filters.append("s.status = %(status)s")
         values["status"] = status
 
-    if day and day != "all":
-        query_filters.append("DAYNAME(s.login_date) = %(day)s")
-        values["day"] = day
-
-    if date:
-        query_filters.append("s.login_date = %(date)s")
-        values["date"] = date
-        
-    if from_date and to_date:
-        query_filters.append("s.login_date BETWEEN %(from_date)s AND %(to_date)s")
-        values["from_date"] = from_date
-        values["to_date"] = to_date
-    elif from_date:
-        query_filters.append("s.login_date >= %(from_date)s")
-        values["from_date"] = from_date
-    elif to_date:
-        query_filters.append("s.login_date <= %(to_date)s")
-        values["to_date"] = to_date
-
     if employee and employee != "all":
-        import json
-        selected_employees = []
-        if isinstance(employee, list):
-            selected_employees = employee
-        elif isinstance(employee, str):
-            if employee.startswith("[") and employee.endswith("]"):
-                try:
-                    selected_employees = json.loads(employee)
-                except Exception:
-                    selected_employees = [employee]
-            elif "," in employee:
-                selected_employees = [x.strip() for x in employee.split(",") if x.strip()]
-            else:
-                selected_employees = [employee]
-        
+        selected_employees = parse_employee_filter(employee)
         if selected_employees:
-            placeholders = []
-            for idx, emp_id in enumerate(selected_employees):
-                key = f"emp_filter_{idx}"
-                placeholders.append(f"%({key})s")
-                values[key] = emp_id
-            query_filters.append(f"s.employee IN ({', '.join(placeholders)})")
+            query_filters.append("s.employee IN %(employees)s")
+            values["employees"] = tuple(selected_employees)
+
+    if day and day != "all" and day in WEEKDAYS:
+        if not (range_from and range_to):
+            # Bound an open range by the data itself (index-only MIN/MAX)
+            bounds = frappe.db.sql("SELECT MIN(login_date), MAX(login_date) FROM `tabEmployee Session`")[0]
+            range_from = range_from or (getdate(bounds[0]) if bounds[0] else None)
+            range_to = range_to or (getdate(bounds[1]) if bounds[1] else None)
+        weekday_dates = get_weekday_dates(day, range_from, range_to) if range_from and range_to else []
+        if not weekday_dates:
+            return {"data": [], "total_count": 0, "next_cursor": None}
+        query_filters.append("s.login_date IN %(weekday_dates)s")
+        values["weekday_dates"] = tuple(weekday_dates)
+
+    if range_from:
+        query_filters.append("s.login_date >= %(from_date)s")
+        values["from_date"] = range_from
+    if range_to:
+        query_filters.append("s.login_date <= %(to_date)s")
+        values["to_date"] = range_to
 
     where_clause = f"WHERE {' AND '.join(query_filters)}" if query_filters else ""
-    
+    join_clause = "LEFT JOIN `tabEmployee` e ON s.employee = e.name" if needs_employee_join else ""
+
+    page_filters = list(query_filters)
+    if isinstance(cursor, str) and cursor:
+        cursor = json.loads(cursor)
+    use_keyset = bool(cursor) and sort_column == "s.login_date"
+    if use_keyset:
+        comparison = "<" if descending else ">"
+        page_filters.append(f"(s.login_date, s.name) {comparison} (%(cursor_date)s, %(cursor_name)s)")
+        values["cursor_date"] = getdate(cursor.get("login_date"))
+        values["cursor_name"] = cursor.get("name")
+    page_where = f"WHERE {' AND '.join(page_filters)}" if page_filters else ""
+
+    limit_sql = ""
+    limit_page_length = cint(limit_page_length)
+    if limit_page_length > 0:
+        limit_sql = "LIMIT %(limit_page_length)s" if use_keyset else "LIMIT %(limit_start)s, %(limit_page_length)s"
+        values["limit_start"] = cint(limit_start)
+        values["limit_page_length"] = limit_page_length
+
     sessions = frappe.db.sql(f"""
         SELECT 
             s.name, s.employee, e.employee_name, s.login_time, s.login_date, s.logout_time, s.total_work_hours, s.total_break_hours, s.status
@@ -720,41 +711,53 @@ def get_detailed_sessions(employee=None, limit_start=0, limit_page_length=20, da
             `tabEmployee Session` s
         LEFT JOIN 
             `tabEmployee` e ON s.employee = e.name
-        {where_clause}
+        {page_where}
         ORDER BY 
             {order_by_sql}
-        LIMIT 
-            %(limit_start)s, %(limit_page_length)s
-    """, {
-        **values,
-        "limit_start": int(limit_start),
-        "limit_page_length": int(limit_page_length)
-    }, as_dict=True)
-    
-    # Get count using the same where_clause
-    count_res = frappe.db.sql(f"""
-        SELECT COUNT(*)
-        FROM `tabEmployee Session` s
-        LEFT JOIN `tabEmployee` e ON s.employee = e.name
-        {where_clause}
-    """, values)
-    total_count = count_res[0][0] if count_res else 0
+        {limit_sql}
+    """, values, as_dict=True)
+
+    total_count = None
+    if cint(with_count):
+        # Get count using the same filters (without the page cursor)
+        count_res = frappe.db.sql(f"""
+            SELECT COUNT(*)
+            FROM `tabEmployee Session` s
+            {join_clause}
+            {where_clause}
+        """, values)
+        total_count = count_res[0][0] if count_res else 0
+
+    # Child rows for the whole page: one query each, grouped in memory
+    session_names = [s.name for s in sessions]
+    intervals_by_session = {}
+    breaks_by_session = {}
+    if session_names:
+        for row in frappe.db.sql("""
+            SELECT parent, from_time, to_time, status, duration_seconds
+            FROM `tabEmployee Session Interval`
+            WHERE parenttype = 'Employee Session' AND parent IN %(names)s
+            ORDER BY from_time ASC
+        """, {"names": tuple(session_names)}, as_dict=True):
+            intervals_by_session.setdefault(row.pop("parent"), []).append(row)
+
+        for row in frappe.db.sql("""
+            SELECT session, break_start, break_end, break_duration, source, reason
+            FROM `tabEmployee Break`
+            WHERE session IN %(names)s
+            ORDER BY break_start ASC
+        """, {"names": tuple(session_names)}, as_dict=True):
+            breaks_by_session.setdefault(row.pop("session"), []).append(row)
 
     for s in sessions:
-        # Get intervals (child table of Session)
-        s.intervals = frappe.get_all("Employee Session Interval",
-            filters={"parent": s.name},
-            fields=["from_time", "to_time", "status", "duration_seconds"],
-            order_by="from_time asc"
-        )
-        # Get breaks (separate DocType linked to Session)
-        s.breaks = frappe.get_all("Employee Break",
-            filters={"session": s.name},
-            fields=["break_start", "break_end", "break_duration", "source", "reason"],
-            order_by="break_start asc"
-        )
-
-    return {"data": sessions, "total_count": total_count}
+        s.intervals = intervals_by_session.get(s.name, [])
+        s.breaks = breaks_by_session.get(s.name, [])
+
+    next_cursor = None
+    if sessions and limit_page_length > 0 and len(sessions) == limit_page_length:
+        next_cursor = {"login_date": str(sessions[-1].login_date), "name": sessions[-1].name}
+
+    return {"data": sessions, "total_count": total_count, "next_cursor": next_cursor}
 
 @frappe.whitelist()
 def update_detailed_session(name, login_time=None, logout_time=None, intervals=None, breaks=None):
@@ -820,13 +823,6 @@ def update_detailed_session(name, login_time=None, logout_time=None, intervals=N
             })
             doc.insert(ignore_permissions=True)
             
-    # Re-calculate totals before final save
-    total_active_seconds = sum(flt(i.duration_seconds) for i in session.intervals if i.status not in ("Offline", "Break", "Away"))
-    session.total_work_hours = max(0, flt(total_active_seconds) / 3600.0)
-    
-    total_break_seconds = get_live_break_seconds(session)
-    session.total_break_hours = flt(total_break_seconds) / 3600.0
-
     # Single save for the active session at the end with retry logic to handle background updates
     for i in range(3):
         try:
@@ -839,6 +835,9 @@ def update_detailed_session(name, login_time=None, logout_time=None, intervals=N
             latest_modified = frappe.db.get_value("Employee Session", name, "modified")
             session.modified = latest_modified
 
+    # Breaks were deleted without hooks above, so rebuild the running totals from scratch
+    recompute_session_totals(name)
+
     frappe.db.commit()
     
     return {"status": "success"}
@@ -899,7 +898,7 @@ def process_auto_breaks():
     """
     from frappe.utils import add_seconds
     
-    settings = frappe.get_single("Employee Presence Settings")
+    settings = get_settings("Employee Presence Settings")
     
     # 1. Skip if auto-status is disabled globally
     if not settings.enable_auto_status:
@@ -979,7 +978,7 @@ def force_offline_all():
 
 @frappe.whitelist()
 def log_location(latitude, longitude, accuracy=None, status=None, source=None, device_type=None, ip_address=None):
-    settings = frappe.get_single("Employee Presence Settings")
+    settings = get_location_settings()
     if not settings.enable_location_tracking:
         return {"status": "ignored", "message": "Location tracking is disabled globally."}
 
@@ -991,56 +990,58 @@ def log_location(latitude, longitude, accuracy=None, status=None, source=None, d
     if not employee:
         frappe.throw(_("Employee not found for current user"))
 
-    active_session = get_active_session(employee)
-    session_name = active_session.name if active_session else None
-
-    if not session_name and source == "Logout":
-        session_name = frappe.db.get_value("Employee Session", {"employee": employee}, "name", order_by="modified desc")
-
-    # Get details if not provided
-    if not device_type and hasattr(frappe, "request") and frappe.request:
-        device_type = frappe.request.headers.get("User-Agent")
-    if not ip_address and hasattr(frappe, "local") and frappe.local:
-        ip_address = frappe.local.request_ip
-
-    doc = frappe.get_doc({
-        "doctype": "Employee Location Log",
-        "employee": employee,
-        "session": session_name,
+    # Single-point form of location_tracking.log_locations, kept for older clients
+    names, ignored = insert_location_points(employee, [{
+        "latitude": latitude,
+        "longitude": longitude,
+        "accuracy": accuracy,
         "status": status,
-        "source": source,
-        "latitude": flt(latitude),
-        "longitude": flt(longitude),
-        "accuracy": flt(accuracy) if accuracy is not None else None,
-        "logged_at": now_datetime(),
-        "device_type": device_type,
-        "ip_address": ip_address
-    })
-    doc.insert(ignore_permissions=True)
+        "source": source
+    }], device_type=device_type, ip_address=ip_address)
     frappe.db.commit()
-    return {"status": "success", "name": doc.name}
+    return {"status": "success", "name": names[0] if names else None}
 
 @frappe.whitelist()
-def get_location_logs(employee=None, session=None, from_date=None, to_date=None, status=None, source=None):
-    is_hr_or_admin = "HR" in frappe.get_roles() or "Administrator" in frappe.get_roles()
-    if not is_hr_or_admin:
-        employee = frappe.db.get_value("Employee", {"user": frappe.session.user}, "name")
-        if not employee:
-            return []
+def get_location_logs(employee=None, session=None, from_date=None, to_date=None, status=None, source=None, limit_start=0, limit_page_length=0):
+    """
+    Location points oldest first, including points already compacted into tracks.
+    Pass `limit_page_length` to page through long ranges.
+    """
+    employee = get_location_employee_scope(employee)
+    if employee is False:
+        return []
+
+    return get_location_points(
+        employee=employee,
+        session=session,
+        from_date=from_date,
+        to_date=to_date,
+        status=status if status and status != "all" else None,
+        source=source if source and source != "all" else None,
+        limit_start=limit_start,
+        limit_page_length=limit_page_length
+    )
 
-    filters = {}
-    if employee:
-        filters["employee"] = employee
-    if session:
-        filters["session"] = session
-    if status and status != "all":
-        filters["status"] = status
-    if source and source != "all":
-        filters["source"] = source
-
-    logs = frappe.get_all("Employee Location Log",
-        filters=filters,
-        fields=["name", "employee", "session", "status", "source", "latitude", "longitude", "accuracy", "logged_at", "device_type", "ip_address"],
-        order_by="logged_at asc"
+@frappe.whitelist()
+def get_location_track(employee=None, session=None, from_date=None, to_date=None, tolerance=None):
+    """
+    Simplified path for the map view (Douglas-Peucker, `tolerance` in meters).
+    """
+    employee = get_location_employee_scope(employee)
+    if employee is False:
+        return []
+
+    return get_simplified_track(
+        employee=employee,
+        session=session,
+        from_date=from_date,
+        to_date=to_date,
+        tolerance=flt(tolerance) or flt(get_location_settings().get("location_track_tolerance")) or 10
     )
-    return logs
+
+def get_location_employee_scope(employee=None):
+    """HR/Admin may query anyone; everyone else only their own points (False if not an employee)."""
+    is_hr_or_admin = "HR" in frappe.get_roles() or "Administrator" in frappe.get_roles()
+    if is_hr_or_admin:
+        return employee
+    return frappe.db.get_value("Employee", {"user": frappe.session.user}, "name") or False
@@ -0,0 +1,265 @@
+import datetime
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import frappe
+import requests
+from frappe.utils import cint
+from requests.adapters import HTTPAdapter
+
+# httpx only negotiates HTTP/2 when h2 is installed
+try:
+    import h2
+    import httpx
+except ImportError:
+    httpx = None
+
+FCM_SCOPE = "https://www.googleapis.com/auth/firebase.messaging"
+FCM_SEND_URL = "https://fcm.googleapis.com/v1/projects/{project_id}/messages:send"
+
+# Access tokens live for an hour; stop using one a few minutes before it expires
+ACCESS_TOKEN_CACHE_KEY = "company:fcm_access_token"
+ACCESS_TOKEN_MARGIN = 5 * 60
+
+DEFAULT_MAX_CONCURRENCY = 10
+
+_credentials = {}
+_credentials_lock = threading.Lock()
+_client = None
+_client_lock = threading.Lock()
+
+
+# --------------------------------------------------------------------
+# AUTH
+# --------------------------------------------------------------------
+
+def get_service_account_credentials():
+    """Service account from site_config `fcm_key_path`, loaded once per process."""
+    from google.oauth2 import service_account
+
+    key_relative = frappe.get_site_config().get("fcm_key_path")
+    if not key_relative:
+        frappe.throw("FCM key path not configured in site_config.json (fcm_key_path)")
+    key_path = frappe.get_site_path(key_relative)
+
+    with _credentials_lock:
+        if key_path not in _credentials:
+            _credentials[key_path] = service_account.Credentials.from_service_account_file(
+                key_path, scopes=[FCM_SCOPE]
+            )
+        return _credentials[key_path]
+
+
+def get_access_token():
+    """
+    (access_token, project_id), shared through Redis by every worker until shortly
+    before expiry, so Google is asked for a new token about once an hour.
+    """
+    cached = frappe.cache().get_value(ACCESS_TOKEN_CACHE_KEY)
+    if cached and cached["expires_at"] - ACCESS_TOKEN_MARGIN > time.time():
+        return cached["token"], cached["project_id"]
+
+    import google.auth.transport.requests
+
+    creds = get_service_account_credentials()
+    with _credentials_lock:
+        creds.refresh(google.auth.transport.requests.Request())
+        token = creds.token
+        # google-auth reports expiry as a naive UTC datetime
+        expires_at = (
+            creds.expiry.replace(tzinfo=datetime.timezone.utc).timestamp()
+            if creds.expiry else time.time() + 3600
+        )
+
+    frappe.cache().set_value(
+        ACCESS_TOKEN_CACHE_KEY,
+        {"token": token, "project_id": creds.project_id, "expires_at": expires_at},
+        expires_in_sec=max(int(expires_at - time.time() - ACCESS_TOKEN_MARGIN), 1)
+    )
+    return token, creds.project_id
+
+
+def clear_access_token():
+    frappe.cache().delete_value(ACCESS_TOKEN_CACHE_KEY)
+
+
+def get_fcm_client():
+    """Process-wide keep-alive client; HTTP/2 through httpx when available."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            if httpx:
+                _client = httpx.Client(http2=True, timeout=10)
+            else:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=32)
+                session.mount("https://", adapter)
+                _client = session
+    return _client
+
+
+# --------------------------------------------------------------------
+# MESSAGES
+# --------------------------------------------------------------------
+
+def strip_html(body):
+    """Plain text for a notification body, keeping <br> line breaks."""
+    if not body:
+        return body
+
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(body, "html.parser")
+    for br in soup.find_all("br"):
+        br.replace_with("\n")
+    body = soup.get_text(separator=" ").strip()
+    body = re.sub(r"[ \t]+", " ", body)
+    return re.sub(r"\n\s*\n", "\n\n", body)
+
+
+def build_message(token, title, body, data=None):
+    # FCM data payloads only accept string values
+    payload = {"title": title or "", "body": body or ""}
+    payload.update({key: str(value) for key, value in (data or {}).items() if value is not None})
+    return {"message": {"token": token, "data": payload}}
+
+
+def is_invalid_token_error(result):
+    """True when FCM says the token will never work again."""
+    error = (result or {}).get("error") or {}
+    if not isinstance(error, dict):
+        return False
+    codes = {d.get("errorCode") for d in error.get("details") or [] if isinstance(d, dict)}
+    if "UNREGISTERED" in codes or error.get("status") == "NOT_FOUND":
+        return True
+    return error.get("status") == "INVALID_ARGUMENT" and "registration token" in (error.get("message") or "")
+
+
+def _post(client, url, headers, message):
+    """HTTP only; safe to run on worker threads."""
+    try:
+        resp = client.post(url, headers=headers, json=message, timeout=10)
+        try:
+            result = resp.json()
+        except ValueError:
+            result = {"error": "non-json-response", "status_code": resp.status_code, "text": resp.text}
+        return resp.status_code, result
+    except Exception as e:
+        return None, {"error": str(e)}
+
+
+def send_to_tokens(messages, max_workers=None):
+    """
+    Send prepared FCM messages ({"message": {...}}) concurrently over one client.
+    Returns [(token, status_code, response)] in input order. An expired access token
+    is refreshed once and the rejected messages retried.
+    """
+    if not messages:
+        return []
+
+    max_workers = max_workers or cint(frappe.conf.get("fcm_max_concurrency")) or DEFAULT_MAX_CONCURRENCY
+    client = get_fcm_client()
+
+    def send_all(pending):
+        access_token, project_id = get_access_token()
+        url = FCM_SEND_URL.format(project_id=project_id)
+        headers = {"Authorization": f"Bearer {access_token}", "Content-Type": "application/json; UTF-8"}
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(pending))) as pool:
+            return list(pool.map(lambda m: _post(client, url, headers, m), pending))
+
+    outcomes = send_all(messages)
+    retry = [i for i, (status, _) in enumerate(outcomes) if status == 401]
+    if retry:
+        clear_access_token()
+        for i, outcome in zip(retry, send_all([messages[i] for i in retry]), strict=True):
+            outcomes[i] = outcome
+
+    return [(m["message"]["token"], status, result) for m, (status, result) in zip(messages, outcomes, strict=True)]
+
+
+def prune_tokens(tokens):
+    """Forget device tokens FCM reported as unregistered/invalid."""
+    tokens = tuple(set(tokens))
+    if not tokens:
+        return
+    frappe.db.sql("UPDATE `tabUser` SET fcm_token = '' WHERE fcm_token IN %(tokens)s", {"tokens": tokens})
+    frappe.db.sql("""
+        UPDATE `tabClefinCode Chat Profile` SET registration_token = ''
+        WHERE registration_token IN %(tokens)s
+    """, {"tokens": tokens})
+
+
+def get_user_tokens(users):
+    """{user: fcm_token} for the users that have one, in one query."""
+    users = [u for u in set(users or []) if u]
+    if not users:
+        return {}
+    return dict(frappe.db.sql("""
+        SELECT name, fcm_token FROM `tabUser`
+        WHERE name IN %(users)s AND IFNULL(fcm_token, '') != ''
+    """, {"users": tuple(users)}))
+
+
+def send_push_to_users(users, title, body, data=None, strip_body=False):
+    """
+    Send one notification to many users. Devices shared by several users get it once;
+    tokens FCM rejects as dead are cleared. Returns a summary with the raw responses.
+    """
+    if isinstance(users, str):
+        users = [users]
+    if strip_body:
+        body = strip_html(body)
+
+    tokens = get_user_tokens(users)
+    user_by_token = {}
+    for user, token in tokens.items():
+        user_by_token.setdefault(token, user)
+
+    results = send_to_tokens([build_message(token, title, body, data) for token in user_by_token])
+
+    summary = frappe._dict({
+        "sent": 0,
+        "failed": 0,
+        "pruned": 0,
+        "no_token": [u for u in users if u and u not in tokens],
+        "responses": {},
+    })
+    dead_tokens = []
+    for token, status, result in results:
+        summary.responses[user_by_token[token]] = result
+        if status == 200:
+            summary.sent += 1
+            continue
+        summary.failed += 1
+        if is_invalid_token_error(result):
+            dead_tokens.append(token)
+
+    if dead_tokens:
+        prune_tokens(dead_tokens)
+        summary.pruned = len(dead_tokens)
+    return summary
+
+
+def enqueue_push_to_users(users, title, body, data=None, strip_body=False):
+    """Background variant for broadcasts (announcements, reminders, task updates)."""
+    frappe.enqueue(
+        "company.company.push_notifications.send_push_to_users",
+        queue="short",
+        enqueue_after_commit=True,
+        users=list(users),
+        title=title,
+        body=body,
+        data=data,
+        strip_body=strip_body
+    )
+
+
+@frappe.whitelist()
+def broadcast_push(users, title, body, url=None):
+    """Queue a push notification to a list of users (HR / System Manager only)."""
+    frappe.only_for(("HR", "System Manager"))
+    users = frappe.parse_json(users) if isinstance(users, str) else users
+    enqueue_push_to_users(users, title, body, data={"url": url} if url else None, strip_body=True)
+    return {"status": "queued", "users": len(users or [])}
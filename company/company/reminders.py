@@ -1,5 +1,7 @@
+import random
+
 import frappe
-from frappe.utils import now_datetime, add_to_date, format_datetime, format_date, get_url_to_form, get_datetime
+from frappe.utils import cint, now_datetime, add_to_date, format_datetime, format_date, get_url_to_form, get_datetime
 
 
 # Workflow
@@ -163,122 +165,196 @@ def create_or_update_call_queue(call):
     queue.insert(ignore_permissions=True)
 
 
-def run_email_reminders():
-    now = now_datetime()
-    now_str = now.strftime('%Y-%m-%d %H:%M:%S')
-    print(f"\n[SCHEDULER TRIGGERED] run_email_reminders running at {now_str}\n")
-    logger.info(f"[CRON START] run_email_reminders started at {now_str}")
-    frappe.log_error(title="DEBUG: Reminder Cron Start", message=f"Started at {now_str}")
+# Dispatch
+# ----------------------------------------------------------------
+# Each run claims due Pending rows in batches with FOR UPDATE SKIP LOCKED, so
+# overlapping runs never pick up the same reminder, and marks them Processing.
+# The referenced Calls / Meetings are read once per batch, each reminder body is
+# rendered once per run, mails go through the email queue, and every reminder gets
+# a single status update. The email queue is flushed once at the end.
+
+DISPATCH_BATCH_SIZE = 100
+# Rows left in Processing by a run that died are picked up again after this long
+STALE_PROCESSING_MINUTES = 15
+DEFAULT_LOG_SAMPLE_RATE = 0.05
+
+
+def log_sampled(message):
+    """Routine cron tracing; only a sample goes to the log. Failures are always logged."""
+    rate = frappe.conf.get("reminder_log_sample_rate", DEFAULT_LOG_SAMPLE_RATE)
+    if random.random() < float(rate):
+        logger.info(message)
+
+
+def get_reminder_handlers():
+    """reference_doctype -> (fields to read, renderer, sender)"""
+    return {
+        "Calls": (
+            ["name", "title", "call_start_time", "outgoing_call_status"],
+            get_call_reminder_html,
+            send_call_email,
+        ),
+        "Meeting": (
+            ["name", "title", "from", "outgoing_call_status"],
+            get_meet_reminder_html,
+            send_meet_email,
+        ),
+    }
 
-    # Check ALL pending first to see if any exist regardless of time
-    all_pending = frappe.get_all("Reminder Queue", filters={"status": "Pending"}, fields=["name", "trigger_at"])
-    frappe.log_error(title="DEBUG: All Pending Count", message=f"Count: {len(all_pending)}\n{all_pending}")
 
-    queues = frappe.get_all(
-        "Reminder Queue",
-        filters={
-            "status": "Pending",
-            "trigger_at": ["<=", now_str],
-        },
-        fields=["name", "trigger_at", "reference_doctype", "reference_name"]
-    )
+def run_email_reminders():
+    now_str = now_datetime().strftime('%Y-%m-%d %H:%M:%S')
+    release_stale_claims()
+
+    context = frappe._dict(rendered={}, fallback_recipients=None)
+    sent = failed = 0
+    while True:
+        rows = claim_due_reminders(now_str)
+        if not rows:
+            break
+        batch_sent, batch_failed = dispatch_reminders(rows, context)
+        sent += batch_sent
+        failed += batch_failed
+        if len(rows) < DISPATCH_BATCH_SIZE:
+            break
+
+    log_sampled(f"[CRON] run_email_reminders at {now_str}: sent={sent} failed={failed}")
+    flush_email_queue()
+
+
+def release_stale_claims():
+    cutoff = add_to_date(now_datetime(), minutes=-STALE_PROCESSING_MINUTES)
+    frappe.db.sql("""
+        UPDATE `tabReminder Queue`
+        SET status = 'Pending'
+        WHERE status = 'Processing' AND modified < %s
+    """, (cutoff,))
+    frappe.db.commit()
 
-    logger.info(f"[CRON] Pending reminders count: {len(queues)}")
-    if queues:
-        frappe.log_error(title="Pending Reminders Found", message=f"Count: {len(queues)}\nRecords: {queues}")
 
-    for q in queues:
-        logger.info(
-            f"[CRON PROCESSING START] Processing {q.name} | trigger_at={q.trigger_at}"
-        )
-        if q.reference_doctype == "Calls":
-            process_call_queue_item(q)
-        elif q.reference_doctype == "Meeting":
-            process_meet_queue_item(q)
-            
+def claim_due_reminders(now_str, name=None):
+    """Lock and mark Processing the next batch of due reminders (or just `name`)."""
+    condition, params = "trigger_at <= %(now)s", {"now": now_str, "limit": DISPATCH_BATCH_SIZE}
+    if name:
+        condition, params["name"] = "name = %(name)s", name
+
+    rows = frappe.db.sql(f"""
+        SELECT name, reference_doctype, reference_name, recipients, attempts
+        FROM `tabReminder Queue`
+        WHERE status = 'Pending' AND {condition}
+        ORDER BY trigger_at
+        LIMIT %(limit)s
+        FOR UPDATE SKIP LOCKED
+    """, params, as_dict=True)
+
+    if rows:
+        frappe.db.sql("""
+            UPDATE `tabReminder Queue`
+            SET status = 'Processing', modified = %s
+            WHERE name IN %s
+        """, (now_datetime(), tuple(r.name for r in rows)))
     frappe.db.commit()
+    return rows
 
-    # Ensure all created email queues are dispatched immediately
-    try:
-        from frappe.email.queue import flush
-        flush()
-    except Exception as e:
-        logger.error(f"[CRON EMAIL FLUSH FAILURE]: {str(e)}")
 
+def dispatch_reminders(rows, context):
+    handlers = get_reminder_handlers()
+
+    references = {}
+    for doctype in {r.reference_doctype for r in rows} & set(handlers):
+        names = [r.reference_name for r in rows if r.reference_doctype == doctype]
+        for ref in frappe.get_all(doctype, filters={"name": ["in", names]}, fields=handlers[doctype][0]):
+            references[(doctype, ref.name)] = ref
 
+    sent = failed = 0
+    for row in rows:
+        values = send_reminder(row, references.get((row.reference_doctype, row.reference_name)), handlers, context)
+        frappe.db.set_value("Reminder Queue", row.name, values)
+        if values["status"] == "Sent":
+            sent += 1
+        else:
+            failed += 1
 
-def process_call_queue_item(queue_row):
+    frappe.db.commit()
+    return sent, failed
 
-    queue = frappe.get_doc("Reminder Queue", queue_row.name)
 
-    # Avoid double-processing
-    if queue.status != "Pending":
-        return
+def send_reminder(row, ref, handlers, context):
+    """Send one claimed reminder; returns the Reminder Queue values to store."""
+    recipients = [r for r in (row.recipients or "").split(",") if r]
+    handler = handlers.get(row.reference_doctype)
+    message = None
 
     try:
-        queue.db_set("status", "Processing")
+        if not handler:
+            raise Exception(f"Unsupported reference_doctype: {row.reference_doctype}")
+        if not ref:
+            raise Exception(f"{row.reference_doctype} {row.reference_name} not found")
 
-        doc = frappe.get_doc(
-            queue.reference_doctype,
-            queue.reference_name
-        )
+        key = (row.reference_doctype, ref.name)
+        if key not in context.rendered:
+            context.rendered[key] = handler[1](ref)
+        message = context.rendered[key]
 
-        logger.info(f"[CRON EMAIL ATTEMPT] Sending email for Call {queue.reference_name}")
-        if queue.reference_doctype == "Calls":
-            recipients = [r for r in (queue.recipients or "").split(",") if r]
-            send_call_email(doc, recipients)
+        handler[2](ref, recipients, message)
+        return {"status": "Sent", "sent_at": now_datetime()}
 
-        else:
-            raise Exception(
-                f"Unsupported reference_doctype: {queue.reference_doctype}"
-            )
+    except Exception as e:
+        if message is not None:
+            if context.fallback_recipients is None:
+                context.fallback_recipients = get_reminder_emails()
+            fallback_recipients = context.fallback_recipients
+
+            # If we have fallback recipients and they are different from what we just tried
+            if fallback_recipients and set(fallback_recipients) != set(recipients):
+                try:
+                    handler[2](ref, fallback_recipients, message)
+                    return {
+                        "status": "Sent",
+                        "sent_at": now_datetime(),
+                        "recipients": ",".join(fallback_recipients),
+                    }
+                except Exception as fallback_e:
+                    e = fallback_e
+
+        logger.error(f"[CRON FAILURE] Reminder {row.name} failed: {str(e)}")
+        frappe.log_error(title=f"Reminder Queue Failure: {row.name}", message=frappe.get_traceback())
+        return {
+            "status": "Failed",
+            "attempts": cint(row.attempts) + 1,
+            "last_error": str(e),
+        }
 
-        queue.db_set("status", "Sent")
-        queue.db_set("sent_at", now_datetime())
-        logger.info(f"[CRON SUCCESS] Reminder {queue_row.name} marked as Sent")
-        frappe.db.commit()
 
+def process_queue_item(queue_name):
+    """Send one reminder right away (used by the force-send buttons)."""
+    rows = claim_due_reminders(None, name=queue_name)
+    if rows:
+        dispatch_reminders(rows, frappe._dict(rendered={}, fallback_recipients=None))
+        flush_email_queue()
+
+
+def flush_email_queue():
+    # Dispatch the queued reminder emails now instead of waiting for the next flush job
+    try:
+        from frappe.email.queue import flush
+        flush()
     except Exception as e:
-        fallback_recipients = get_reminder_emails()
-        original_recipients = [r for r in (queue.recipients or "").split(",") if r]
-        
-        # If we have fallback recipients and they are different from what we just tried
-        if fallback_recipients and set(fallback_recipients) != set(original_recipients):
-            try:
-                logger.info(f"[CRON EMAIL FALLBACK] Trying fallback for Call {queue.reference_name}")
-                send_call_email(doc, fallback_recipients)
-                queue.db_set("recipients", ",".join(fallback_recipients))
-                queue.db_set("status", "Sent")
-                queue.db_set("sent_at", now_datetime())
-                frappe.db.commit()
-                return
-            except Exception as fallback_e:
-                e = fallback_e
-
-        logger.error(f"[CRON FAILURE] Reminder {queue_row.name} failed: {str(e)}")
-        frappe.log_error(title=f"Reminder Queue Failure: {queue_row.name}", message=frappe.get_traceback())
-        queue.db_set("status", "Failed")
-        queue.db_set("attempts", (queue.attempts or 0) + 1)
-        queue.db_set("last_error", str(e))
-        frappe.db.commit()
-
-
-
-def send_call_email(call, recipients):
+        logger.error(f"[CRON EMAIL FLUSH FAILURE]: {str(e)}")
+
+
+def send_call_email(call, recipients, message=None):
     if not recipients:
         raise Exception("No reminder recipients configured")
 
     subject = f"Reminder: Call at {call.call_start_time}"
-    
 
     frappe.sendmail(
         recipients=recipients,
         subject=subject,
-        message=get_call_reminder_html(call),
+        message=message or get_call_reminder_html(call),
         reference_doctype="Calls",
-        reference_name=call.name,
-        delayed=False,
-        now=True
+        reference_name=call.name
     )
 
 
@@ -522,75 +598,19 @@ def create_or_update_meet_queue(meet):
     queue.insert(ignore_permissions=True)
 
 
-def process_meet_queue_item(queue_row):
-
-    queue = frappe.get_doc("Reminder Queue", queue_row.name)
-
-    # Avoid double-processing
-    if queue.status != "Pending":
-        return
-
-    try:
-        queue.db_set("status", "Processing")
-
-        doc = frappe.get_doc(
-            queue.reference_doctype,
-            queue.reference_name
-        )
-
-        if queue.reference_doctype == "Meeting":
-            recipients = [r for r in (queue.recipients or "").split(",") if r]
-            send_meet_email(doc, recipients)
-
-        else:
-            raise Exception(
-                f"Unsupported reference_doctype: {queue.reference_doctype}"
-            )
-
-        queue.db_set("status", "Sent")
-        queue.db_set("sent_at", now_datetime())
-        logger.info(f"[CRON SUCCESS] Reminder {queue_row.name} marked as Sent")
-        frappe.db.commit()
-
-    except Exception as e:
-        fallback_recipients = get_reminder_emails()
-        original_recipients = [r for r in (queue.recipients or "").split(",") if r]
-        
-        # If we have fallback recipients and they are different from what we just tried
-        if fallback_recipients and set(fallback_recipients) != set(original_recipients):
-            try:
-                logger.info(f"[CRON EMAIL FALLBACK] Trying fallback for Meeting {queue.reference_name}")
-                send_meet_email(doc, fallback_recipients)
-                queue.db_set("recipients", ",".join(fallback_recipients))
-                queue.db_set("status", "Sent")
-                queue.db_set("sent_at", now_datetime())
-                frappe.db.commit()
-                return
-            except Exception as fallback_e:
-                e = fallback_e
-
-        logger.error(f"[CRON FAILURE] Reminder {queue_row.name} failed: {str(e)}")
-        frappe.log_error(title=f"Reminder Queue Failure: {queue_row.name}", message=frappe.get_traceback())
-        queue.db_set("status", "Failed")
-        queue.db_set("attempts", (queue.attempts or 0) + 1)
-        queue.db_set("last_error", str(e))
-        frappe.db.commit()
-
-def send_meet_email(meet, recipients):
+def send_meet_email(meet, recipients, message=None):
     if not recipients:
         raise Exception("No reminder recipients configured")
 
     start_on = meet.get("from")
     subject = f"Reminder: Meeting at {start_on}"
-    
+
     frappe.sendmail(
         recipients=recipients,
         subject=subject,
-        message=get_meet_reminder_html(meet),
+        message=message or get_meet_reminder_html(meet),
         reference_doctype="Meeting",
-        reference_name=meet.name,
-        delayed=False,
-        now=True
+        reference_name=meet.name
     )
 
 
@@ -774,11 +794,14 @@ def force_send_call_queue(queue_name):
     if queue.status == "Sent":
         frappe.throw("Reminder already sent")
 
-    # Override trigger time
-    queue.db_set("trigger_at", now_datetime())
+    if queue.status == "Processing":
+        frappe.throw("Reminder is being sent")
+
+    # Override trigger time; a failed reminder is queued again
+    queue.db_set({"trigger_at": now_datetime(), "status": "Pending"})
 
     # Process immediately
-    process_call_queue_item(queue)
+    process_queue_item(queue.name)
 
 
 @frappe.whitelist()
@@ -788,11 +811,14 @@ def force_send_meet_queue(queue_name):
     if queue.status == "Sent":
         frappe.throw("Reminder already sent")
 
-    # Override trigger time
-    queue.db_set("trigger_at", now_datetime())
+    if queue.status == "Processing":
+        frappe.throw("Reminder is being sent")
+
+    # Override trigger time; a failed reminder is queued again
+    queue.db_set({"trigger_at": now_datetime(), "status": "Pending"})
 
     # Process immediately
-    process_meet_queue_item(queue)
+    process_queue_item(queue.name)
 
 
 @frappe.whitelist()
@@ -1,6 +1,9 @@
 import frappe
 
+from company.company.report_query import ReportQuery, cached_report
 
+
+@cached_report("Accounts")
 def execute(filters=None):
     columns = get_columns()
     data = get_data(filters or {})
@@ -72,46 +75,13 @@ def get_columns():
 # DATA
 # ------------------------------------------------------
 def get_data(filters):
-    conditions = []
-    values = {}
-
-    if filters.get("account_name"):
-        conditions.append("a.account_name LIKE %(account_name)s")
-        values["account_name"] = f"%{filters['account_name']}%"
-
-    if filters.get("country"):
-        conditions.append("a.country = %(country)s")
-        values["country"] = filters["country"]
-
-    if filters.get("state"):
-        conditions.append("a.state = %(state)s")
-        values["state"] = filters["state"]
-
-    if filters.get("city"):
-        conditions.append("a.city = %(city)s")
-        values["city"] = filters["city"]
-
-    has_permission = frappe.db.exists("User Permission", {"user": frappe.session.user})
-    owner_val = filters.get("owner")
-    if has_permission:
-        owner_filter = owner_val if (owner_val and owner_val != "all") else frappe.session.user
-        conditions.append("a.owner_name = %(owner)s")
-        values["owner"] = owner_filter
-    elif owner_val and owner_val != "all":
-        conditions.append("a.owner_name = %(owner)s")
-        values["owner"] = owner_val
-
-    if filters.get("from_date"):
-        conditions.append("DATE(a.creation) >= %(from_date)s")
-        values["from_date"] = filters["from_date"]
-
-    if filters.get("to_date"):
-        conditions.append("DATE(a.creation) <= %(to_date)s")
-        values["to_date"] = filters["to_date"]
-
-    where_clause = " AND ".join(conditions)
-    if where_clause:
-        where_clause = "WHERE " + where_clause
+    query = ReportQuery(filters)
+    query.like("a.account_name", "account_name")
+    query.equals("a.country", "country")
+    query.equals("a.state", "state")
+    query.equals("a.city", "city")
+    query.owner_scope("a.owner_name")
+    query.filter_date_range("a.creation", is_datetime=True)
 
     return frappe.db.sql(
         f"""
@@ -130,10 +100,10 @@ def get_data(filters):
             a.modified
         FROM `tabAccounts` a
         LEFT JOIN `tabUser` u ON u.name = a.owner_name
-        {where_clause}
+        {query.where()}
         ORDER BY a.creation DESC
         """,
-        values,
+        query.values,
         as_dict=True
     )
 
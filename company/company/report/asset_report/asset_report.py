@@ -1,6 +1,8 @@
 
 import frappe
+from company.company.report_query import ReportQuery, cached_report
 
+@cached_report("Asset", "Asset Assignment", "Employee")
 def execute(filters=None):
     if not filters:
         filters = {}
@@ -21,33 +23,17 @@ def get_columns():
     ]
 
 def get_data(filters):
-    conditions = []
-    values = {}
+    query = ReportQuery(filters)
+    query.equals("aa.asset", "asset")
+    query.equals("aa.assigned_to", "assigned_to")
+    query.filter_date_range("aa.assigned_on")
 
-    if filters.get("asset"):
-        conditions.append("aa.asset = %(asset)s")
-        values["asset"] = filters["asset"]
+    if query.filters.get("returned_status") == "Returned":
+        query.add("aa.returned_on IS NOT NULL")
+    elif query.filters.get("returned_status") == "Not Returned":
+        query.add("aa.returned_on IS NULL")
 
-    if filters.get("assigned_to"):
-        conditions.append("aa.assigned_to = %(assigned_to)s")
-        values["assigned_to"] = filters["assigned_to"]
-
-    if filters.get("from_date"):
-        conditions.append("aa.assigned_on >= %(from_date)s")
-        values["from_date"] = filters["from_date"]
-
-    if filters.get("to_date"):
-        conditions.append("aa.assigned_on <= %(to_date)s")
-        values["to_date"] = filters["to_date"]
-
-    if filters.get("returned_status") == "Returned":
-        conditions.append("aa.returned_on IS NOT NULL")
-    elif filters.get("returned_status") == "Not Returned":
-        conditions.append("aa.returned_on IS NULL")
-
-    where_clause = " AND ".join(conditions) if conditions else "1=1"
-
-    query = f"""
+    sql = f"""
         SELECT
             aa.asset,
             a.asset_name,
@@ -58,8 +44,8 @@ def get_data(filters):
         FROM `tabAsset Assignment` aa
         LEFT JOIN `tabAsset` a ON a.name = aa.asset
         LEFT JOIN `tabEmployee` e ON e.name = aa.assigned_to
-        WHERE {where_clause}
+        {query.where()}
         ORDER BY aa.assigned_on DESC
     """
 
-    return frappe.db.sql(query, values, as_dict=True)
+    return frappe.db.sql(sql, query.values, as_dict=True)
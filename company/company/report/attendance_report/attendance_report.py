@@ -4,7 +4,10 @@
 import frappe
 from frappe import _
 
+from company.company.report_query import cached_report
 
+
+@cached_report("Attendance", "Employee", "Holiday List")
 def execute(filters: dict | None = None):
 	"""Return columns and data for the report."""
 	columns = get_columns()
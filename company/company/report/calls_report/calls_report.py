@@ -1,6 +1,9 @@
 import frappe
 
+from company.company.report_query import ReportQuery, cached_report
 
+
+@cached_report("Calls", "Lead", "Contacts", "Accounts")
 def execute(filters=None):
     columns = get_columns()
     data = get_data(filters or {})
@@ -92,42 +95,14 @@ def get_columns():
 # DATA
 # ------------------------------------------------------
 def get_data(filters):
-    conditions = []
-    values = {}
-
-    if filters.get("from_date"):
-        conditions.append("DATE(c.call_start_time) >= %(from_date)s")
-        values["from_date"] = filters["from_date"]
-
-    if filters.get("to_date"):
-        conditions.append("DATE(c.call_start_time) <= %(to_date)s")
-        values["to_date"] = filters["to_date"]
-
-    if filters.get("call_for"):
-        conditions.append("c.call_for = %(call_for)s")
-        values["call_for"] = filters["call_for"]
-
-    if filters.get("status"):
-        conditions.append("c.outgoing_call_status = %(status)s")
-        values["status"] = filters["status"]
-
-    has_permission = frappe.db.exists("User Permission", {"user": frappe.session.user})
-    owner_val = filters.get("owner_name")
-    if has_permission:
-        owner_filter = owner_val if (owner_val and owner_val != "all") else frappe.session.user
-        conditions.append("c.owner_name = %(owner_name)s")
-        values["owner_name"] = owner_filter
-    elif owner_val and owner_val != "all":
-        conditions.append("c.owner_name = %(owner_name)s")
-        values["owner_name"] = owner_val
-
-    if filters.get("enable_reminder") is not None:
-        conditions.append("c.enable_reminder = %(enable_reminder)s")
-        values["enable_reminder"] = filters["enable_reminder"]
-
-    where_clause = " AND ".join(conditions)
-    if where_clause:
-        where_clause = "WHERE " + where_clause
+    query = ReportQuery(filters)
+    query.filter_date_range("c.call_start_time", is_datetime=True)
+    query.equals("c.call_for", "call_for")
+    query.equals("c.outgoing_call_status", "status")
+    query.owner_scope("c.owner_name", filter_key="owner_name", param="owner_name")
+    # A 0 (reminder off) is a real filter value, so this cannot go through `equals`
+    if query.filters.get("enable_reminder") is not None:
+        query.add("c.enable_reminder = %(enable_reminder)s", enable_reminder=query.filters.enable_reminder)
 
     return frappe.db.sql(
         f"""
@@ -155,10 +130,10 @@ def get_data(filters):
         LEFT JOIN `tabContacts` cnt ON cnt.name = c.contact_name
         LEFT JOIN `tabAccounts` acc ON acc.name = c.account_name
         LEFT JOIN `tabUser` u ON u.name = c.owner_name
-        {where_clause}
+        {query.where()}
         ORDER BY c.call_start_time DESC
         """,
-        values,
+        query.values,
         as_dict=True
     )
 
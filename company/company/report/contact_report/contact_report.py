@@ -1,6 +1,9 @@
 import frappe
 
+from company.company.report_query import ReportQuery, cached_report
 
+
+@cached_report("Contacts", "Accounts", "Lead")
 def execute(filters=None):
     columns = get_columns()
     data = get_data(filters or {})
@@ -31,46 +34,13 @@ def get_columns():
 # DATA
 # ------------------------------------------------------
 def get_data(filters):
-    conditions = []
-    values = {}
-
-    if filters.get("country"):
-        conditions.append("c.country = %(country)s")
-        values["country"] = filters["country"]
-
-    if filters.get("state"):
-        conditions.append("c.state = %(state)s")
-        values["state"] = filters["state"]
-
-    if filters.get("city"):
-        conditions.append("c.city = %(city)s")
-        values["city"] = filters["city"]
-
-    if filters.get("source_lead"):
-        conditions.append("c.source_lead = %(source_lead)s")
-        values["source_lead"] = filters["source_lead"]
-
-    has_permission = frappe.db.exists("User Permission", {"user": frappe.session.user})
-    owner_val = filters.get("owner")
-    if has_permission:
-        owner_filter = owner_val if (owner_val and owner_val != "all") else frappe.session.user
-        conditions.append("c.owner_name = %(owner)s")
-        values["owner"] = owner_filter
-    elif owner_val and owner_val != "all":
-        conditions.append("c.owner_name = %(owner)s")
-        values["owner"] = owner_val
-    
-    if filters.get("from_date"):
-        conditions.append("DATE(c.creation) >= %(from_date)s")
-        values["from_date"] = filters["from_date"]
-    
-    if filters.get("to_date"):
-        conditions.append("DATE(c.creation) <= %(to_date)s")
-        values["to_date"] = filters["to_date"]
-
-    where_clause = " AND ".join(conditions)
-    if where_clause:
-        where_clause = "WHERE " + where_clause
+    query = ReportQuery(filters)
+    query.equals("c.country", "country")
+    query.equals("c.state", "state")
+    query.equals("c.city", "city")
+    query.equals("c.source_lead", "source_lead")
+    query.owner_scope("c.owner_name")
+    query.filter_date_range("c.creation", is_datetime=True)
 
     return frappe.db.sql(
         f"""
@@ -97,10 +67,10 @@ def get_data(filters):
         FROM `tabContacts` c
         LEFT JOIN `tabLead` l ON l.name = c.source_lead
         LEFT JOIN `tabUser` u ON u.name = c.owner_name
-        {where_clause}
+        {query.where()}
         ORDER BY c.creation DESC
         """,
-        values,
+        query.values,
         as_dict=True
     )
 
@@ -1,7 +1,9 @@
 import frappe
 import json
 from frappe import _
+from company.company.report_query import ReportQuery, cached_report
 
+@cached_report("Estimation", "Accounts")
 def execute(filters=None):
     if isinstance(filters, str):
         filters = json.loads(filters)
@@ -25,37 +27,20 @@ def get_columns():
         {"label": _("Grand Total"), "fieldname": "grand_total", "fieldtype": "Currency", "width": 130},
     ]
 
-def get_data(filters):
-    conditions = []
-    query_filters = {}
-
-    if filters.get("client_name"):
-        conditions.append("e.client_name = %(client_name)s")
-        query_filters["client_name"] = filters["client_name"]
-    if filters.get("billing_name"):
-        conditions.append("e.billing_name = %(billing_name)s")
-        query_filters["billing_name"] = filters["billing_name"]
-    if filters.get("from_date"):
-        conditions.append("e.estimate_date >= %(from_date)s")
-        query_filters["from_date"] = filters["from_date"]
-    if filters.get("to_date"):
-        conditions.append("e.estimate_date <= %(to_date)s")
-        query_filters["to_date"] = filters["to_date"]
-    has_permission = frappe.db.exists("User Permission", {"user": frappe.session.user})
-    owner_val = filters.get("owner")
-    if has_permission:
-        owner_filter = owner_val if (owner_val and owner_val != "all") else frappe.session.user
-        conditions.append("e.owner = %(owner)s")
-        query_filters["owner"] = owner_filter
-    elif owner_val and owner_val != "all":
-        conditions.append("e.owner = %(owner)s")
-        query_filters["owner"] = owner_val
+def get_query(filters, alias="e"):
+    """Filter conditions shared by the table and the summary cards"""
+    prefix = f"{alias}." if alias else ""
+    query = ReportQuery(filters)
+    query.equals(f"{prefix}client_name", "client_name")
+    query.equals(f"{prefix}billing_name", "billing_name")
+    query.filter_date_range(f"{prefix}estimate_date")
+    query.owner_scope(f"{prefix}owner")
+    return query
 
-    where = " AND ".join(conditions)
-    if where:
-        where = "WHERE " + where
+def get_data(filters):
+    query = get_query(filters)
 
-    query = f"""
+    sql = f"""
         SELECT
             e.name,
             e.customer_name,
@@ -72,7 +57,7 @@ def get_data(filters):
         FROM `tabEstimation` e
         LEFT JOIN `tabAccounts` a ON a.name = e.billing_name
         LEFT JOIN `tabEstimation Items` i ON i.parent = e.name
-        {where}
+        {query.where()}
         GROUP BY 
             e.name,
             e.customer_name,
@@ -87,62 +72,20 @@ def get_data(filters):
             e.modified
         ORDER BY e.estimate_date DESC
     """
-    return frappe.db.sql(query, query_filters, as_dict=True)
+    return frappe.db.sql(sql, query.values, as_dict=True)
 
 def get_summary(filters):
-    conditions = []
-    query_filters = {}
-
-    if filters.get("client_name"):
-        conditions.append("client_name = %(client_name)s")
-        query_filters["client_name"] = filters["client_name"]
-    if filters.get("billing_name"):
-        conditions.append("billing_name = %(billing_name)s")
-        query_filters["billing_name"] = filters["billing_name"]
-    if filters.get("from_date"):
-        conditions.append("estimate_date >= %(from_date)s")
-        query_filters["from_date"] = filters["from_date"]
-    if filters.get("to_date"):
-        conditions.append("estimate_date <= %(to_date)s")
-        query_filters["to_date"] = filters["to_date"]
-    has_permission = frappe.db.exists("User Permission", {"user": frappe.session.user})
-    owner_val = filters.get("owner")
-    if has_permission:
-        owner_filter = owner_val if (owner_val and owner_val != "all") else frappe.session.user
-        conditions.append("owner = %(owner)s")
-        query_filters["owner"] = owner_filter
-    elif owner_val and owner_val != "all":
-        conditions.append("owner = %(owner)s")
-        query_filters["owner"] = owner_val
-
-    where = " AND ".join(conditions)
-    if where:
-        where = "WHERE " + where
+    query = get_query(filters, alias=None)
 
+    # Totals and record count in a single pass
     totals = frappe.db.sql(f"""
         SELECT
             SUM(grand_total) AS total_amount,
-            SUM(total_qty) AS total_qty
+            SUM(total_qty) AS total_qty,
+            COUNT(*) AS estimation_count
         FROM `tabEstimation`
-        {where}
-    """, query_filters, as_dict=True)[0]
-
-    count_filters = []
-    if filters.get("client_name"):
-        count_filters.append(["client_name", "=", filters["client_name"]])
-    if filters.get("billing_name"):
-        count_filters.append(["billing_name", "=", filters["billing_name"]])
-    if filters.get("from_date"):
-        count_filters.append(["estimate_date", ">=", filters["from_date"]])
-    if filters.get("to_date"):
-        count_filters.append(["estimate_date", "<=", filters["to_date"]])
-    if has_permission:
-        owner_filter = owner_val if (owner_val and owner_val != "all") else frappe.session.user
-        count_filters.append(["owner", "=", owner_filter])
-    elif owner_val and owner_val != "all":
-        count_filters.append(["owner", "=", owner_val])
-
-    estimation_count = frappe.db.count("Estimation", filters=count_filters)
+        {query.where()}
+    """, query.values, as_dict=True)[0]
 
     return [
         {
@@ -159,7 +102,7 @@ def get_summary(filters):
         },
         {
             "label": "Estimation Records",
-            "value": estimation_count,
+            "value": totals.estimation_count or 0,
             "indicator": "orange"
         }
     ]
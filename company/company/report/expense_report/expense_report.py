@@ -1,8 +1,10 @@
 import frappe
 from frappe.utils import flt
 import json
+from company.company.report_query import ReportQuery, cached_report
 
 
+@cached_report("Expenses")
 def execute(filters=None):
 
     # Convert JSON to dict if needed
@@ -41,31 +43,19 @@ def get_columns():
 # ---------------------------------------------------
 #  DATA
 # ---------------------------------------------------
-def get_data(filters):
-    conditions = []
-    query_filters = {}
-
-    if filters.get("expense_category"):
-        conditions.append("e.expense_category LIKE %(expense_category)s")
-        query_filters["expense_category"] = f"%{filters['expense_category']}%"
-
-    if filters.get("payment_type"):
-        conditions.append("e.payment_type = %(payment_type)s")
-        query_filters["payment_type"] = filters["payment_type"]
+def get_query(filters, alias="e"):
+    """Filter conditions shared by the table and the summary cards"""
+    prefix = f"{alias}." if alias else ""
+    query = ReportQuery(filters)
+    query.like(f"{prefix}expense_category", "expense_category")
+    query.equals(f"{prefix}payment_type", "payment_type")
+    query.filter_date_range(f"{prefix}date")
+    return query
 
-    if filters.get("from_date"):
-        conditions.append("e.date >= %(from_date)s")
-        query_filters["from_date"] = filters["from_date"]
-
-    if filters.get("to_date"):
-        conditions.append("e.date <= %(to_date)s")
-        query_filters["to_date"] = filters["to_date"]
-
-    condition_sql = " AND ".join(conditions)
-    if condition_sql:
-        condition_sql = "WHERE " + condition_sql
+def get_data(filters):
+    query = get_query(filters)
 
-    query = f"""
+    sql = f"""
         SELECT
             e.name,
             e.expense_no,
@@ -79,43 +69,22 @@ def get_data(filters):
             c.amount
         FROM `tabExpenses` e
         LEFT JOIN `tabExpenses Items` c ON c.parent = e.name
-        {condition_sql}
+        {query.where()}
         ORDER BY e.date DESC
     """
 
-    return frappe.db.sql(query, query_filters, as_dict=True)
+    return frappe.db.sql(sql, query.values, as_dict=True)
 
 def get_summary(data, filters):
-    conditions = []
-    query_filters = {}
-
-    if filters.get("expense_category"):
-        conditions.append("expense_category LIKE %(expense_category)s")
-        query_filters["expense_category"] = f"%{filters['expense_category']}%"
-
-    if filters.get("payment_type"):
-        conditions.append("payment_type = %(payment_type)s")
-        query_filters["payment_type"] = filters["payment_type"]
-
-    if filters.get("from_date"):
-        conditions.append("date >= %(from_date)s")
-        query_filters["from_date"] = filters["from_date"]
-
-    if filters.get("to_date"):
-        conditions.append("date <= %(to_date)s")
-        query_filters["to_date"] = filters["to_date"]
-
-    where = " AND ".join(conditions)
-    if where:
-        where = "WHERE " + where
+    query = get_query(filters, alias=None)
 
     res = frappe.db.sql(f"""
         SELECT 
             SUM(total) as total_expense,
             COUNT(*) as record_count
         FROM `tabExpenses`
-        {where}
-    """, query_filters, as_dict=True)[0]
+        {query.where()}
+    """, query.values, as_dict=True)[0]
 
     total_qty = sum(flt(d.get("quantity")) for d in data)
 
@@ -1,8 +1,10 @@
 import frappe
 from frappe.utils import flt
 import json
+from company.company.report_query import ReportQuery, cached_report
 
 
+@cached_report("Invoice Collection")
 def execute(filters=None):
 
     # Convert JSON to dict (Frappe sends filters as string)
@@ -38,37 +40,15 @@ def get_columns():
 #  MAIN DATA
 # ---------------------------------------------------
 def get_data(filters):
-
-    conditions = []
-    values = {}
-
-    if filters.get("from_date"):
-        conditions.append("ic.collection_date >= %(from_date)s")
-        values["from_date"] = filters["from_date"]
-
-    if filters.get("to_date"):
-        conditions.append("ic.collection_date <= %(to_date)s")
-        values["to_date"] = filters["to_date"]
-
-    if filters.get("customer"):
-        conditions.append("(ic.customer_name LIKE %(customer)s OR ic.customer LIKE %(customer)s)")
-        values["customer"] = f"%{filters['customer']}%"
-
-    if filters.get("invoice"):
-        conditions.append("ic.invoice = %(invoice)s")
-        values["invoice"] = filters["invoice"]
-
-    has_permission = frappe.db.exists("User Permission", {"user": frappe.session.user})
-    owner_val = filters.get("owner")
-    if has_permission:
-        owner_filter = owner_val if (owner_val and owner_val != "all") else frappe.session.user
-        conditions.append("ic.owner = %(owner)s")
-        values["owner"] = owner_filter
-    elif owner_val and owner_val != "all":
-        conditions.append("ic.owner = %(owner)s")
-        values["owner"] = owner_val
-
-    where_clause = " AND ".join(conditions) if conditions else "1=1"
+    query = ReportQuery(filters)
+    query.filter_date_range("ic.collection_date")
+    if query.filters.get("customer"):
+        query.add(
+            "(ic.customer_name LIKE %(customer)s OR ic.customer LIKE %(customer)s)",
+            customer=f"%{query.filters.customer}%",
+        )
+    query.equals("ic.invoice", "invoice")
+    query.owner_scope("ic.owner")
 
     collections = frappe.db.sql(f"""
         SELECT
@@ -84,9 +64,9 @@ def get_data(filters):
             ic.creation,
             ic.modified
         FROM `tabInvoice Collection` ic
-        WHERE {where_clause}
+        {query.where()}
         ORDER BY ic.collection_date DESC, ic.creation DESC
-    """, values, as_dict=True)
+    """, query.values, as_dict=True)
 
     return collections or []
 
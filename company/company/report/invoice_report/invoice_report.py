@@ -1,14 +1,10 @@
 import frappe
 from frappe import _
 from frappe.utils import flt
+from company.company.report_query import ReportQuery, cached_report
 
+@cached_report("Invoice", "Accounts")
 def execute(filters=None):
-    if isinstance(filters, str):
-        import json
-        filters = json.loads(filters)
-    
-    filters = filters or {}
-    
     columns = get_columns()
     data = get_data(filters)
     summary = get_summary(filters)
@@ -27,37 +23,20 @@ def get_columns():
         {"label": _("Grand Total"), "fieldname": "grand_total", "fieldtype": "Currency", "width": 120},
     ]
 
-def get_data(filters):
-    conditions = []
-    params = {}
+def get_query(filters, alias="i"):
+    """Filter conditions shared by the table and the summary cards"""
+    prefix = f"{alias}." if alias else ""
+    query = ReportQuery(filters)
+    query.equals(f"{prefix}client_name", "client_name")
+    query.equals(f"{prefix}billing_name", "billing_name")
+    query.filter_date_range(f"{prefix}invoice_date")
+    query.owner_scope(f"{prefix}owner")
+    return query
 
-    if filters.get("client_name"):
-        conditions.append("i.client_name = %(client_name)s")
-        params["client_name"] = filters["client_name"]
-    if filters.get("billing_name"):
-        conditions.append("i.billing_name = %(billing_name)s")
-        params["billing_name"] = filters["billing_name"]
-    if filters.get("from_date"):
-        conditions.append("i.invoice_date >= %(from_date)s")
-        params["from_date"] = filters["from_date"]
-    if filters.get("to_date"):
-        conditions.append("i.invoice_date <= %(to_date)s")
-        params["to_date"] = filters["to_date"]
-    has_permission = frappe.db.exists("User Permission", {"user": frappe.session.user})
-    owner_val = filters.get("owner")
-    if has_permission:
-        owner_filter = owner_val if (owner_val and owner_val != "all") else frappe.session.user
-        conditions.append("i.owner = %(owner)s")
-        params["owner"] = owner_filter
-    elif owner_val and owner_val != "all":
-        conditions.append("i.owner = %(owner)s")
-        params["owner"] = owner_val
-
-    where = " AND ".join(conditions)
-    if where:
-        where = "WHERE " + where
+def get_data(filters):
+    query = get_query(filters)
 
-    query = f"""
+    sql = f"""
         SELECT
             i.name,
             i.customer_name,
@@ -74,7 +53,7 @@ def get_data(filters):
         FROM `tabInvoice` i
         LEFT JOIN `tabAccounts` a ON a.name = i.billing_name
         LEFT JOIN `tabInvoice Items` it ON it.parent = i.name
-        {where}
+        {query.where()}
         GROUP BY 
             i.name,
             i.customer_name,
@@ -88,64 +67,27 @@ def get_data(filters):
             i.creation,
             i.modified
         ORDER BY i.invoice_date DESC
+        {query.limit()}
     """
-    return frappe.db.sql(query, params, as_dict=True)
+    return frappe.db.sql(sql, query.values, as_dict=True)
 
 def get_summary(filters):
-    conditions = []
-    params = {}
-    count_filters = []
-
-    if filters.get("client_name"):
-        conditions.append("client_name = %(client_name)s")
-        params["client_name"] = filters["client_name"]
-        count_filters.append(["client_name", "=", filters["client_name"]])
-        
-    if filters.get("billing_name"):
-        conditions.append("billing_name = %(billing_name)s")
-        params["billing_name"] = filters["billing_name"]
-        count_filters.append(["billing_name", "=", filters["billing_name"]])
-
-    if filters.get("from_date"):
-        conditions.append("invoice_date >= %(from_date)s")
-        params["from_date"] = filters["from_date"]
-        count_filters.append(["invoice_date", ">=", filters["from_date"]])
-        
-    if filters.get("to_date"):
-        conditions.append("invoice_date <= %(to_date)s")
-        params["to_date"] = filters["to_date"]
-        count_filters.append(["invoice_date", "<=", filters["to_date"]])
-
-    has_permission = frappe.db.exists("User Permission", {"user": frappe.session.user})
-    owner_val = filters.get("owner")
-    if has_permission:
-        owner_filter = owner_val if (owner_val and owner_val != "all") else frappe.session.user
-        conditions.append("owner = %(owner)s")
-        params["owner"] = owner_filter
-        count_filters.append(["owner", "=", owner_filter])
-    elif owner_val and owner_val != "all":
-        conditions.append("owner = %(owner)s")
-        params["owner"] = owner_val
-        count_filters.append(["owner", "=", owner_val])
-
-    where = " AND ".join(conditions)
-    if where:
-        where = "WHERE " + where
+    query = get_query(filters, alias=None)
 
+    # Totals and record count in a single pass
     totals_res = frappe.db.sql(f"""
         SELECT
             SUM(grand_total) AS total_amount,
-            SUM(total_qty) AS total_qty
+            SUM(total_qty) AS total_qty,
+            COUNT(*) AS invoice_count
         FROM `tabInvoice`
-        {where}
-    """, params, as_dict=True)
+        {query.where()}
+    """, query.values, as_dict=True)
     
-    totals = totals_res[0] if totals_res else frappe._dict(total_amount=0, total_qty=0)
-
-    invoice_count = frappe.db.count("Invoice", filters=count_filters)
+    totals = totals_res[0] if totals_res else frappe._dict(total_amount=0, total_qty=0, invoice_count=0)
 
     return [
         {"label": _("Total Amount"), "value": flt(totals.total_amount), "indicator": "blue", "datatype": "Currency"},
         {"label": _("Total Quantity"), "value": flt(totals.total_qty), "indicator": "green", "datatype": "Float"},
-        {"label": _("Invoice Records"), "value": invoice_count, "indicator": "orange"},
+        {"label": _("Invoice Records"), "value": totals.invoice_count or 0, "indicator": "orange"},
     ]
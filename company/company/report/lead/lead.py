@@ -1,6 +1,9 @@
 import frappe
 
+from company.company.report_query import ReportQuery, cached_report
 
+
+@cached_report("Lead")
 def execute(filters=None):
     columns = get_columns()
     data = get_data(filters or {})
@@ -30,42 +33,12 @@ def get_columns():
 # DATA
 # ------------------------------------------------------
 def get_data(filters):
-    conditions = []
-    values = {}
-
-    if filters.get("from_date"):
-        conditions.append("DATE(l.creation) >= %(from_date)s")
-        values["from_date"] = filters["from_date"]
-
-    if filters.get("to_date"):
-        conditions.append("DATE(l.creation) <= %(to_date)s")
-        values["to_date"] = filters["to_date"]
-
-    if filters.get("leads_type"):
-        conditions.append("l.leads_type = %(leads_type)s")
-        values["leads_type"] = filters["leads_type"]
-
-    if filters.get("leads_from"):
-        conditions.append("l.leads_from = %(leads_from)s")
-        values["leads_from"] = filters["leads_from"]
-
-    if filters.get("service"):
-        conditions.append("l.service = %(service)s")
-        values["service"] = filters["service"]
-
-    has_permission = frappe.db.exists("User Permission", {"user": frappe.session.user})
-    owner_val = filters.get("owner")
-    if has_permission:
-        owner_filter = owner_val if (owner_val and owner_val != "all") else frappe.session.user
-        conditions.append("l.owner_name = %(owner)s")
-        values["owner"] = owner_filter
-    elif owner_val and owner_val != "all":
-        conditions.append("l.owner_name = %(owner)s")
-        values["owner"] = owner_val
-
-    where_clause = " AND ".join(conditions)
-    if where_clause:
-        where_clause = "WHERE " + where_clause
+    query = ReportQuery(filters)
+    query.filter_date_range("l.creation", is_datetime=True)
+    query.equals("l.leads_type", "leads_type")
+    query.equals("l.leads_from", "leads_from")
+    query.equals("l.service", "service")
+    query.owner_scope("l.owner_name")
 
     return frappe.db.sql(
         f"""
@@ -84,10 +57,10 @@ def get_data(filters):
             l.modified
         FROM `tabLead` l
         LEFT JOIN `tabUser` u ON u.name = l.owner_name
-        {where_clause}
+        {query.where()}
         ORDER BY l.creation DESC
         """,
-        values,
+        query.values,
         as_dict=True
     )
 
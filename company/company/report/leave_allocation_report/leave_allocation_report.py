@@ -4,7 +4,10 @@
 import frappe
 from frappe import _
 
+from company.company.report_query import ReportQuery, cached_report
 
+
+@cached_report("Leave Allocation", "Leave Type")
 def execute(filters: dict | None = None):
 	"""Return columns and data for the report."""
 	columns = get_columns()
@@ -31,47 +34,21 @@ def get_columns() -> list[dict]:
 def get_data(filters: dict | None) -> list[dict]:
 	"""Return data for the report based on leave allocations and type master."""
 	try:
-		if isinstance(filters, str):
-			import json
-			filters = json.loads(filters)
-
-		conditions = []
-		values = {}
-
-		# Date filter parsing
-		from_date = filters.get("from_date")
-		to_date = filters.get("to_date")
-		if from_date:
-			conditions.append("la.from_date >= %(from_date)s")
-			values["from_date"] = from_date
-		if to_date:
-			conditions.append("la.to_date <= %(to_date)s")
-			values["to_date"] = to_date
-
-		# Employee filter parsing
-		employee = filters.get("employee")
-		if employee and employee != "all" and employee != "":
-			if isinstance(employee, list):
-				if len(employee) > 0:
-					conditions.append("la.employee in %(employee)s")
-					values["employee"] = tuple(employee)
-			else:
-				conditions.append("la.employee = %(employee)s")
-				values["employee"] = employee
-
-		# Leave Type filter parsing
-		leave_type = filters.get("leave_type")
-		if leave_type and leave_type != "all" and leave_type != "":
-			conditions.append("la.leave_type = %(leave_type)s")
-			values["leave_type"] = leave_type
+		query = ReportQuery(filters)
+		# The allocation must lie within the period: starts on/after from_date, ends on/before to_date
+		query.date_range("la.from_date", from_date=query.filters.get("from_date"))
+		query.date_range("la.to_date", to_date=query.filters.get("to_date"))
 
-		conditions.append("la.docstatus < 2")  # Exclude cancelled
+		employee = query.filters.get("employee")
+		if isinstance(employee, list):
+			query.one_of("la.employee", employee, "employee")
+		else:
+			query.equals("la.employee", "employee")
+		query.equals("la.leave_type", "leave_type")
 
-		where_clause = " AND ".join(conditions)
-		if where_clause:
-			where_clause = "WHERE " + where_clause
+		query.add("la.docstatus < 2")  # Exclude cancelled
 
-		query = f"""
+		sql = f"""
 			SELECT
 				la.name,
 				la.employee,
@@ -85,11 +62,11 @@ def get_data(filters: dict | None) -> list[dict]:
 				la.to_date
 			FROM `tabLeave Allocation` la
 			LEFT JOIN `tabLeave Type` lt ON la.leave_type = lt.name
-			{where_clause}
+			{query.where()}
 			ORDER BY la.creation DESC
 		"""
 
-		data = frappe.db.sql(query, values, as_dict=True)
+		data = frappe.db.sql(sql, query.values, as_dict=True)
 		return data
 
 	except Exception as e:
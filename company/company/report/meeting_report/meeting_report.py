@@ -1,6 +1,9 @@
 import frappe
 
+from company.company.report_query import ReportQuery, cached_report
 
+
+@cached_report("Meeting", "Lead", "Contacts", "Accounts")
 def execute(filters=None):
     columns = get_columns()
     data = get_data(filters or {})
@@ -103,42 +106,14 @@ def get_columns():
 # DATA
 # ------------------------------------------------------
 def get_data(filters):
-    conditions = []
-    values = {}
-
-    if filters.get("from_date"):
-        conditions.append("DATE(m.`from`) >= %(from_date)s")
-        values["from_date"] = filters["from_date"]
-
-    if filters.get("to_date"):
-        conditions.append("DATE(m.`from`) <= %(to_date)s")
-        values["to_date"] = filters["to_date"]
-
-    if filters.get("meet_for"):
-        conditions.append("m.meet_for = %(meet_for)s")
-        values["meet_for"] = filters["meet_for"]
-
-    if filters.get("status"):
-        conditions.append("m.outgoing_call_status = %(status)s")
-        values["status"] = filters["status"]
-
-    has_permission = frappe.db.exists("User Permission", {"user": frappe.session.user})
-    owner_val = filters.get("owner")
-    if has_permission:
-        owner_filter = owner_val if (owner_val and owner_val != "all") else frappe.session.user
-        conditions.append("m.owner_name = %(owner)s")
-        values["owner"] = owner_filter
-    elif owner_val and owner_val != "all":
-        conditions.append("m.owner_name = %(owner)s")
-        values["owner"] = owner_val
-
-    if filters.get("enable_reminder") is not None:
-        conditions.append("m.enable_reminder = %(enable_reminder)s")
-        values["enable_reminder"] = filters["enable_reminder"]
-
-    where_clause = " AND ".join(conditions)
-    if where_clause:
-        where_clause = "WHERE " + where_clause
+    query = ReportQuery(filters)
+    query.filter_date_range("m.`from`", is_datetime=True)
+    query.equals("m.meet_for", "meet_for")
+    query.equals("m.outgoing_call_status", "status")
+    query.owner_scope("m.owner_name")
+    # A 0 (reminder off) is a real filter value, so this cannot go through `equals`
+    if query.filters.get("enable_reminder") is not None:
+        query.add("m.enable_reminder = %(enable_reminder)s", enable_reminder=query.filters.enable_reminder)
 
     return frappe.db.sql(
         f"""
@@ -171,10 +146,10 @@ def get_data(filters):
         LEFT JOIN `tabContacts` cnt ON cnt.name = m.contact_name
         LEFT JOIN `tabAccounts` acc ON acc.name = m.accounts_name
         LEFT JOIN `tabUser` u ON u.name = m.owner_name
-        {where_clause}
+        {query.where()}
         ORDER BY m.`from` DESC
         """,
-        values,
+        query.values,
         as_dict=True
     )
 
@@ -1,34 +1,21 @@
 import frappe
 from frappe.utils import getdate
 from frappe import _
-from datetime import date, timedelta
+from company.company.report_query import MONTHS, ReportQuery, cached_report, month_date_range
 
+@cached_report("Attendance", "Employee", "Holiday List")
 def execute(filters=None):
-    if not filters:
-        filters = {}
-
     today = getdate()
 
-    # Map month names to numbers
-    MONTHS = {
-        "January": 1, "February": 2, "March": 3, "April": 4,
-        "May": 5, "June": 6, "July": 7, "August": 8,
-        "September": 9, "October": 10, "November": 11, "December": 12
-    }
-
     # Get month and year from filters
     month_name = filters.get("month") or today.strftime("%B")
     month = MONTHS.get(month_name, 1)
     year = int(filters.get("year") or today.year)
-    employee_filter = filters.get("employee")
-
-    # --- Get Attendance records ---
-    conditions = "MONTH(attendance_date) = %s AND YEAR(attendance_date) = %s"
-    values = [month, year]
 
-    if employee_filter:
-        conditions += " AND employee = %s"
-        values.append(employee_filter)
+    # --- Get Attendance records (date range instead of MONTH()/YEAR() so the index is used) ---
+    query = ReportQuery(filters)
+    query.month("a.attendance_date", year, month)
+    query.equals("a.employee", "employee")
 
     attendance_records = frappe.db.sql(
         f"""
@@ -41,9 +28,9 @@ def execute(filters=None):
             a.out_time
         FROM `tabAttendance` a
         LEFT JOIN `tabEmployee` e ON e.name = a.employee
-        WHERE {conditions}
+        {query.where()}
         """,
-        values,
+        query.values,
         as_dict=True
     )
 
@@ -65,8 +52,7 @@ def execute(filters=None):
         return f"{hours}:{mins:02d}"
 
     # --- Get Holiday List and calculate working days ---
-    start_date = date(year, month, 1)
-    end_date = date(year, month + 1, 1) - timedelta(days=1) if month != 12 else date(year, 12, 31)
+    start_date, end_date = month_date_range(year, month)
 
     holiday_list = frappe.db.get_value("Holiday List", {"year": year, "month_year": str(month)}, "name")
 
@@ -1,6 +1,8 @@
 import frappe
 from frappe import _
+from company.company.report_query import ReportQuery, cached_report
 
+@cached_report("Proposal")
 def execute(filters=None):
     if isinstance(filters, str):
         import json
@@ -27,41 +29,15 @@ def get_columns():
     ]
 
 def get_data(filters):
-    conditions = []
-    params = {}
-
-    if filters.get("lead") and filters.get("lead") != "all":
-        conditions.append("lead = %(lead)s")
-        params["lead"] = filters["lead"]
-    if filters.get("status") and filters.get("status") != "all":
-        conditions.append("status = %(status)s")
-        params["status"] = filters["status"]
-    if filters.get("company_name") and filters.get("company_name") != "all":
-        conditions.append("company_name LIKE %(company_name)s")
-        params["company_name"] = f"%{filters['company_name']}%"
-    if filters.get("from_date"):
-        conditions.append("proposal_date >= %(from_date)s")
-        params["from_date"] = filters["from_date"]
-    if filters.get("to_date"):
-        conditions.append("proposal_date <= %(to_date)s")
-        params["to_date"] = filters["to_date"]
-
-    has_permission = frappe.db.exists("User Permission", {"user": frappe.session.user})
-    owner_val = filters.get("owner")
-    if has_permission:
-        owner_filter = owner_val if (owner_val and owner_val != "all") else frappe.session.user
-        conditions.append("owner_name = %(owner)s")
-        params["owner"] = owner_filter
-    elif owner_val and owner_val != "all":
-        conditions.append("owner_name = %(owner)s")
-        params["owner"] = owner_val
-
-    where = " AND ".join(conditions)
-    if where:
-        where = "WHERE " + where
+    query = ReportQuery(filters)
+    query.equals("lead", "lead")
+    query.equals("status", "status")
+    query.like("company_name", "company_name")
+    query.filter_date_range("proposal_date")
+    query.owner_scope("owner_name")
 
     # Sort order is handled client-side or we can default to creation DESC
-    query = f"""
+    sql = f"""
         SELECT
             name,
             proposal_title,
@@ -76,10 +52,10 @@ def get_data(filters):
             creation,
             modified
         FROM `tabProposal`
-        {where}
+        {query.where()}
         ORDER BY creation DESC
     """
-    return frappe.db.sql(query, params, as_dict=True)
+    return frappe.db.sql(sql, query.values, as_dict=True)
 
 def get_summary(data):
     total = len(data)
@@ -1,8 +1,10 @@
 import frappe
 import json
 from frappe import _
+from company.company.report_query import ReportQuery, cached_report
 
 
+@cached_report("Deal", "Contacts", "Accounts")
 def execute(filters=None):
     if isinstance(filters, str):
         filters = json.loads(filters)
@@ -28,44 +30,14 @@ def get_columns():
 
 
 def get_data(filters):
-    conditions = []
-    query_filters = {}
-
-    if filters.get("contact"):
-        conditions.append("d.contact = %(contact)s")
-        query_filters["contact"] = filters["contact"]
-
-    if filters.get("account"):
-        conditions.append("d.account = %(account)s")
-        query_filters["account"] = filters["account"]
-
-    if filters.get("stage") and filters.get("stage") != "all":
-        conditions.append("d.stage = %(stage)s")
-        query_filters["stage"] = filters["stage"]
-
-    if filters.get("from_date"):
-        conditions.append("DATE(d.creation) >= %(from_date)s")
-        query_filters["from_date"] = filters["from_date"]
-
-    if filters.get("to_date"):
-        conditions.append("DATE(d.creation) <= %(to_date)s")
-        query_filters["to_date"] = filters["to_date"]
-
-    has_permission = frappe.db.exists("User Permission", {"user": frappe.session.user})
-    owner_val = filters.get("owner")
-    if has_permission:
-        owner_filter = owner_val if (owner_val and owner_val != "all") else frappe.session.user
-        conditions.append("d.owner = %(owner)s")
-        query_filters["owner"] = owner_filter
-    elif owner_val and owner_val != "all":
-        conditions.append("d.owner = %(owner)s")
-        query_filters["owner"] = owner_val
-
-    where = " AND ".join(conditions)
-    if where:
-        where = "WHERE " + where
-
-    query = f"""
+    query = ReportQuery(filters)
+    query.equals("d.contact", "contact")
+    query.equals("d.account", "account")
+    query.equals("d.stage", "stage")
+    query.filter_date_range("d.creation", is_datetime=True)
+    query.owner_scope("d.owner")
+
+    sql = f"""
         SELECT
             d.name,
             d.deal_title,
@@ -80,10 +52,10 @@ def get_data(filters):
         FROM `tabDeal` d
         LEFT JOIN `tabContacts` c ON c.name = d.contact
         LEFT JOIN `tabAccounts` a ON a.name = d.account
-        {where}
+        {query.where()}
         ORDER BY d.creation DESC
     """
-    return frappe.db.sql(query, query_filters, as_dict=True)
+    return frappe.db.sql(sql, query.values, as_dict=True)
 
 
 def get_summary(data):
@@ -1,14 +1,9 @@
 import frappe
-import json
+from company.company.report_query import ReportQuery, cached_report
 
+@cached_report("Purchase", "Contacts")
 def execute(filters=None):
 
-    # Convert JSON to dict
-    if isinstance(filters, str):
-        filters = json.loads(filters)
-
-    filters = filters or {}
-
     columns = get_columns()
     data = get_data(filters)
     summary = get_summary(filters)
@@ -43,40 +38,25 @@ def get_columns():
     ]
 
 
+# ----------------------------------
+#  SHARED FILTER CONDITIONS
+# ----------------------------------
+def get_query(filters, alias="p"):
+    prefix = f"{alias}." if alias else ""
+    query = ReportQuery(filters)
+    query.equals(f"{prefix}vendor_name", "vendor")
+    query.filter_date_range(f"{prefix}bill_date")
+    query.owner_scope(f"{prefix}owner")
+    return query
+
+
 # ----------------------------------
 #  MAIN TABLE DATA
 # ----------------------------------
 def get_data(filters):
-    conditions = []
-    query_filters = {}
-
-    if filters.get("vendor"):
-        conditions.append("p.vendor_name = %(vendor)s")
-        query_filters["vendor"] = filters["vendor"]
-
-    if filters.get("from_date"):
-        conditions.append("p.bill_date >= %(from_date)s")
-        query_filters["from_date"] = filters["from_date"]
-
-    if filters.get("to_date"):
-        conditions.append("p.bill_date <= %(to_date)s")
-        query_filters["to_date"] = filters["to_date"]
-
-    has_permission = frappe.db.exists("User Permission", {"user": frappe.session.user})
-    owner_val = filters.get("owner")
-    if has_permission:
-        owner_filter = owner_val if (owner_val and owner_val != "all") else frappe.session.user
-        conditions.append("p.owner = %(owner)s")
-        query_filters["owner"] = owner_filter
-    elif owner_val and owner_val != "all":
-        conditions.append("p.owner = %(owner)s")
-        query_filters["owner"] = owner_val
-
-    where = " AND ".join(conditions)
-    if where:
-        where = "WHERE " + where
-
-    query = f"""
+    query = get_query(filters)
+
+    sql = f"""
         SELECT
             p.name,
             p.vendor_name,
@@ -99,76 +79,32 @@ def get_data(filters):
         FROM `tabPurchase` p
         LEFT JOIN `tabContacts` v ON v.name = p.vendor_name
         LEFT JOIN `tabPurchase Items` c ON c.parent = p.name
-        {where}
+        {query.where()}
         ORDER BY p.bill_date DESC
+        {query.limit()}
     """
 
-    return frappe.db.sql(query, query_filters, as_dict=True)
+    return frappe.db.sql(sql, query.values, as_dict=True)
 
 
 # ----------------------------------
 #  SUMMARY CARDS (ONLY THIS YOU WANT)
 # ----------------------------------
 def get_summary(filters):
-    conditions = []
-    query_filters = {}
-
-    if filters.get("vendor"):
-        conditions.append("vendor_name = %(vendor)s")
-        query_filters["vendor"] = filters["vendor"]
-
-    if filters.get("from_date"):
-        conditions.append("bill_date >= %(from_date)s")
-        query_filters["from_date"] = filters["from_date"]
-
-    if filters.get("to_date"):
-        conditions.append("bill_date <= %(to_date)s")
-        query_filters["to_date"] = filters["to_date"]
-
-    has_permission = frappe.db.exists("User Permission", {"user": frappe.session.user})
-    owner_val = filters.get("owner")
-    if has_permission:
-        owner_filter = owner_val if (owner_val and owner_val != "all") else frappe.session.user
-        conditions.append("owner = %(owner)s")
-        query_filters["owner"] = owner_filter
-    elif owner_val and owner_val != "all":
-        conditions.append("owner = %(owner)s")
-        query_filters["owner"] = owner_val
-
-    where = " AND ".join(conditions)
-    if where:
-        where = "WHERE " + where
+    query = get_query(filters, alias=None)
 
     totals = frappe.db.sql(f"""
         SELECT
             SUM(grand_total) AS total_purchase,
-            SUM(total_qty) AS total_qty
+            SUM(total_qty) AS total_qty,
+            COUNT(*) AS purchase_count
         FROM `tabPurchase`
-        {where}
-    """, query_filters, as_dict=True)[0]
+        {query.where()}
+    """, query.values, as_dict=True)[0]
 
     total_purchase = totals.total_purchase or 0
     total_qty = totals.total_qty or 0
-
-    # Safe count
-    count_filters_for_db_count = {}
-
-    if filters.get("vendor"):
-        count_filters_for_db_count["vendor_name"] = filters["vendor"]
-
-    if filters.get("from_date"):
-        count_filters_for_db_count["bill_date"] = (">=", filters["from_date"])
-
-    if filters.get("to_date"):
-        count_filters_for_db_count["bill_date"] = ("<=", filters["to_date"])
-
-    if has_permission:
-        owner_filter = owner_val if (owner_val and owner_val != "all") else frappe.session.user
-        count_filters_for_db_count["owner"] = owner_filter
-    elif owner_val and owner_val != "all":
-        count_filters_for_db_count["owner"] = owner_val
-
-    purchase_count = frappe.db.count("Purchase", filters=count_filters_for_db_count)
+    purchase_count = totals.purchase_count or 0
 
     return [
         {
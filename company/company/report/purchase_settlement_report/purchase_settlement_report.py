@@ -1,8 +1,10 @@
 import frappe
 from frappe.utils import flt
 import json
+from company.company.report_query import ReportQuery, cached_report
 
 
+@cached_report("Purchase Collection")
 def execute(filters=None):
 
     # Convert JSON to dict (Frappe sends filters as string)
@@ -41,36 +43,15 @@ def get_columns():
 # ---------------------------------------------------
 def get_data(filters):
 
-    conditions = []
-    values = {}
-
-    if filters.get("from_date"):
-        conditions.append("pc.collection_date >= %(from_date)s")
-        values["from_date"] = filters["from_date"]
-
-    if filters.get("to_date"):
-        conditions.append("pc.collection_date <= %(to_date)s")
-        values["to_date"] = filters["to_date"]
-
-    if filters.get("vendor"):
-        conditions.append("(pc.vendor_name LIKE %(vendor)s OR pc.vendor LIKE %(vendor)s)")
-        values["vendor"] = f"%{filters['vendor']}%"
-
-    if filters.get("purchase"):
-        conditions.append("pc.purchase = %(purchase)s")
-        values["purchase"] = filters["purchase"]
-
-    has_permission = frappe.db.exists("User Permission", {"user": frappe.session.user})
-    owner_val = filters.get("owner")
-    if has_permission:
-        owner_filter = owner_val if (owner_val and owner_val != "all") else frappe.session.user
-        conditions.append("pc.owner = %(owner)s")
-        values["owner"] = owner_filter
-    elif owner_val and owner_val != "all":
-        conditions.append("pc.owner = %(owner)s")
-        values["owner"] = owner_val
-
-    where_clause = " AND ".join(conditions) if conditions else "1=1"
+    query = ReportQuery(filters)
+    query.filter_date_range("pc.collection_date")
+    if query.filters.get("vendor"):
+        query.add(
+            "(pc.vendor_name LIKE %(vendor)s OR pc.vendor LIKE %(vendor)s)",
+            vendor=f"%{query.filters.vendor}%",
+        )
+    query.equals("pc.purchase", "purchase")
+    query.owner_scope("pc.owner")
 
     settlements = frappe.db.sql(f"""
         SELECT
@@ -86,9 +67,9 @@ def get_data(filters):
             pc.creation,
             pc.modified
         FROM `tabPurchase Collection` pc
-        WHERE {where_clause}
+        {query.where()}
         ORDER BY pc.collection_date DESC, pc.creation DESC
-    """, values, as_dict=True)
+    """, query.values, as_dict=True)
 
     return settlements or []
 
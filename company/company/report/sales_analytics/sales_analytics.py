@@ -1,16 +1,10 @@
 import frappe
-import json
+from company.company.report_query import ReportQuery, cached_report
 
 @frappe.whitelist()
+@cached_report("Invoice", "Invoice Collection")
 def execute(filters=None):
 
-    # Ensure filters is a dict
-    if isinstance(filters, str):
-        filters = json.loads(filters)
-
-    if not filters:
-        filters = {}
-
     # Columns
     columns = [
         {"fieldname": "client_name", "label": "Client Name", "fieldtype": "Data", "width": 200},
@@ -24,32 +18,28 @@ def execute(filters=None):
         {"fieldname": "balance_amount", "label": "Pending", "fieldtype": "Currency", "width": 150},
     ]
 
-    # SQL Conditions
-    conditions = []
-
-    if filters.get("from_date"):
-        conditions.append(f"inv.invoice_date >= '{filters['from_date']}'")
-
-    if filters.get("to_date"):
-        conditions.append(f"inv.invoice_date <= '{filters['to_date']}'")
-
-    if filters.get("customer"):
-        conditions.append(f"inv.client_name = '{filters['customer']}'")
+    # SQL Conditions (all values bound as parameters)
+    query = ReportQuery(filters)
+    query.filter_date_range("inv.invoice_date")
+    query.equals("inv.client_name", "customer")
 
+    # An item filter keeps only invoices containing the item (so the totals below
+    # do not double count multi-row invoices) and only that item's rows
+    item_condition = ""
     if filters.get("item"):
-        conditions.append(f"child.service = '{filters['item']}'")
-
-    where = " AND ".join(conditions)
-    if where:
-        where = "WHERE " + where
+        query.add(
+            "EXISTS (SELECT 1 FROM `tabInvoice Items` it WHERE it.parent = inv.name AND it.service = %(item)s)",
+            item=filters["item"]
+        )
+        item_condition = "AND child.service = %(item)s"
 
     # GROUP BY logic
     group_by = ""
     if filters.get("group_by_invoice"):
         group_by = "GROUP BY inv.name"
 
-    # Main Query
-    query = f"""
+    # Main Query (optionally paginated with page / page_length filters)
+    sql = f"""
         SELECT
             inv.client_name,
             inv.name AS invoice_no,
@@ -64,13 +54,14 @@ def execute(filters=None):
         FROM `tabInvoice` inv
         LEFT JOIN `tabInvoice Items` child ON child.parent = inv.name
 
-        {where}
+        {query.where()} {item_condition}
         {group_by}
 
         ORDER BY inv.invoice_date DESC
+        {query.limit()}
     """
 
-    data = frappe.db.sql(query, as_dict=True)
+    data = frappe.db.sql(sql, query.values, as_dict=True)
 
     # Totals (for summary cards)
     totals = frappe.db.sql(f"""
@@ -79,8 +70,8 @@ def execute(filters=None):
             SUM(received_amount) AS total_received,
             SUM(balance_amount) AS total_pending
         FROM `tabInvoice` inv
-        {where.replace("inv.", "")}
-    """, as_dict=True)[0]
+        {query.where()}
+    """, query.values, as_dict=True)[0]
 
     total_sales = totals.total_sales or 0
     total_received = totals.total_received or 0
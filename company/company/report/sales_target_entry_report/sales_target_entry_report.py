@@ -5,7 +5,10 @@ import frappe
 from frappe import _
 from frappe.utils import flt
 
+from company.company.report_query import ReportQuery, cached_report
 
+
+@cached_report("Sales Target Entry")
 def execute(filters=None):
     columns = get_columns()
     data = get_data(filters or {})
@@ -114,28 +117,12 @@ def get_columns():
 
 
 def get_data(filters):
-    conditions = ""
-    values = {}
-
-    if filters.get("sales_person"):
-        conditions += " AND sales_person = %(sales_person)s"
-        values["sales_person"] = filters["sales_person"]
-
-    if filters.get("month"):
-        conditions += " AND month = %(month)s"
-        values["month"] = filters["month"]
-
-    if filters.get("status"):
-        conditions += " AND status = %(status)s"
-        values["status"] = filters["status"]
-
-    if filters.get("from_date"):
-        conditions += " AND in_date >= %(from_date)s"
-        values["from_date"] = filters["from_date"]
-
-    if filters.get("to_date"):
-        conditions += " AND in_date <= %(to_date)s"
-        values["to_date"] = filters["to_date"]
+    query = ReportQuery(filters)
+    query.add("docstatus < 2")
+    query.equals("sales_person", "sales_person")
+    query.equals("month", "month")
+    query.equals("status", "status")
+    query.filter_date_range("in_date")
 
     return frappe.db.sql(
         f"""
@@ -156,11 +143,10 @@ def get_data(filters):
             status,
             out_date
         FROM `tabSales Target Entry`
-        WHERE docstatus < 2
-        {conditions}
+        {query.where()}
         ORDER BY in_date DESC
         """,
-        values,
+        query.values,
         as_dict=True,
     )
 
@@ -1,21 +1,18 @@
 import frappe
 import json
 from frappe.utils import getdate
+from company.company.report_query import ReportQuery, cached_report
 
+@cached_report("Timesheet", "Employee")
 def execute(filters=None):
 
-    # Ensure filters is proper dict
-    if isinstance(filters, str):
-        filters = json.loads(filters)
-    if not filters:
-        filters = {}
-
     columns = get_columns()
     data = get_data(filters)
 
-    # --- Calculate Total Hours ---
-    total_hours = sum([d.get("hours", 0) for d in data])
-    entry_count = len(data)
+    # --- Calculate Total Hours (over every matching entry, not just the current page) ---
+    totals = get_totals(filters)
+    total_hours = totals.total_hours or 0
+    entry_count = totals.entry_count or 0
 
     # --- Add Summary Row at Bottom ---
     if data:
@@ -67,54 +64,38 @@ def get_columns():
     ]
 
 
-def get_conditions(filters):
-    conditions = ""
-
-    employee = filters.get("employee")
-    if employee:
-        import json
-        selected_employees = []
-        if isinstance(employee, list):
-            selected_employees = employee
-        elif isinstance(employee, str):
-            if employee.startswith("[") and employee.endswith("]"):
-                try:
-                    selected_employees = json.loads(employee)
-                except Exception:
-                    selected_employees = [employee]
-            elif "," in employee:
-                selected_employees = [x.strip() for x in employee.split(",") if x.strip()]
-            else:
+def get_selected_employees(employee):
+    """Employee filter may be a list, a JSON list, a comma-separated string or a single ID"""
+    selected_employees = []
+    if isinstance(employee, list):
+        selected_employees = employee
+    elif isinstance(employee, str):
+        if employee.startswith("[") and employee.endswith("]"):
+            try:
+                selected_employees = json.loads(employee)
+            except Exception:
                 selected_employees = [employee]
-        
-        selected_employees = [e for e in selected_employees if e and e != "all"]
-        if selected_employees:
-            placeholders = []
-            for idx, emp_id in enumerate(selected_employees):
-                key = f"emp_filter_{idx}"
-                placeholders.append(f"%({key})s")
-                filters[key] = emp_id
-            conditions += f" AND ts.employee IN ({', '.join(placeholders)})"
-
-    if filters.get("project"):
-        conditions += " AND tse.project = %(project)s"
-
-    if filters.get("activity_type"):
-        conditions += " AND tse.activity_type = %(activity_type)s"
+        elif "," in employee:
+            selected_employees = [x.strip() for x in employee.split(",") if x.strip()]
+        else:
+            selected_employees = [employee]
 
-    if filters.get("from_date"):
-        conditions += " AND ts.timesheet_date >= %(from_date)s"
+    return [e for e in selected_employees if e and e != "all"]
 
-    if filters.get("to_date"):
-        conditions += " AND ts.timesheet_date <= %(to_date)s"
 
-    return conditions
+def get_query(filters):
+    query = ReportQuery(filters)
+    query.one_of("ts.employee", get_selected_employees(filters.get("employee")), "employees")
+    query.equals("tse.project", "project")
+    query.equals("tse.activity_type", "activity_type")
+    query.filter_date_range("ts.timesheet_date")
+    return query
 
 
 def get_data(filters):
-    conditions = get_conditions(filters)
+    query = get_query(filters)
 
-    query = f"""
+    sql = f"""
         SELECT
             ts.name,
             ts.employee,
@@ -127,8 +108,22 @@ def get_data(filters):
         FROM `tabTimesheet` ts
         INNER JOIN `tabTimesheet Entries` tse
             ON tse.parent = ts.name
-        WHERE 1 = 1 {conditions}
+        {query.where()}
         ORDER BY ts.timesheet_date DESC
+        {query.limit()}
     """
 
-    return frappe.db.sql(query, filters, as_dict=True)
+    return frappe.db.sql(sql, query.values, as_dict=True)
+
+
+def get_totals(filters):
+    query = get_query(filters)
+    return frappe.db.sql(f"""
+        SELECT
+            SUM(tse.hours) AS total_hours,
+            COUNT(*) AS entry_count
+        FROM `tabTimesheet` ts
+        INNER JOIN `tabTimesheet Entries` tse
+            ON tse.parent = ts.name
+        {query.where()}
+    """, query.values, as_dict=True)[0]
@@ -0,0 +1,229 @@
+import functools
+import hashlib
+import json
+
+import frappe
+from frappe.utils import add_days, cint, get_first_day, get_last_day, getdate
+
+from company.company.permission_matrix import get_user_permission_matrix
+
+# Script reports cache their full result per user + normalized filters. Each cached
+# entry is tagged with the current "version" of every doctype the report reads, so a
+# save/delete on any of them (see `bump_report_version`) makes the old entry unreachable.
+REPORT_CACHE_TTL = 10 * 60
+REPORT_VERSION_KEY = "company:report_versions"
+# Per-user version, bumped when one of the user's User Permission restrictions changes
+USER_PERMISSION_VERSION_KEY = "company:user_permission_versions"
+
+# Doctypes read by the app's script reports and the finance summary; only changes to
+# these bump a version.
+REPORT_DOCTYPES = {
+    "Accounts", "Asset", "Asset Assignment", "Attendance", "Calls", "Contacts",
+    "CRM Expense Tracker", "Deal", "Employee", "Estimation", "Expense", "Expense Tracker",
+    "Expenses", "Holiday List", "Income", "Invoice", "Invoice Collection", "Lead",
+    "Leave Allocation", "Leave Type", "Meeting", "Proposal", "Purchase",
+    "Purchase Collection", "Sales Target Entry", "Timesheet",
+}
+
+MONTHS = {
+    "January": 1, "February": 2, "March": 3, "April": 4,
+    "May": 5, "June": 6, "July": 7, "August": 8,
+    "September": 9, "October": 10, "November": 11, "December": 12
+}
+
+
+def normalize_filters(filters):
+    """Parse JSON filters and drop empty values so equivalent filter sets compare equal."""
+    if isinstance(filters, str):
+        filters = json.loads(filters)
+    return frappe._dict({k: v for k, v in (filters or {}).items() if v not in (None, "", [])})
+
+
+def month_date_range(year, month):
+    """First and last date of a month; `month` may be a number or a month name."""
+    month = MONTHS.get(month, month)
+    first_day = get_first_day(f"{cint(year)}-{cint(month):02d}-01")
+    return first_day, get_last_day(first_day)
+
+
+class ReportQuery:
+    """
+    Parameterized WHERE-clause builder for script reports.
+
+    Every condition binds its value as a named parameter, and date filters become
+    plain range predicates on the raw column (never DATE()/MONTH()/YEAR() wrappers),
+    so MariaDB can use indexes on the filtered columns. The report filters' "all"
+    option means no condition, as an empty value does.
+    """
+
+    def __init__(self, filters=None):
+        self.filters = normalize_filters(filters)
+        self.conditions = []
+        self.values = {}
+
+    def add(self, condition, **values):
+        self.conditions.append(condition)
+        self.values.update(values)
+        return self
+
+    def equals(self, column, filter_key, param=None):
+        value = self.filters.get(filter_key)
+        if value and value != "all":
+            param = param or filter_key
+            self.add(f"{column} = %({param})s", **{param: value})
+        return self
+
+    def like(self, column, filter_key, param=None):
+        value = self.filters.get(filter_key)
+        if value and value != "all":
+            param = param or filter_key
+            self.add(f"{column} LIKE %({param})s", **{param: f"%{value}%"})
+        return self
+
+    def one_of(self, column, values, param):
+        values = [v for v in (values or []) if v]
+        if values:
+            self.add(f"{column} IN %({param})s", **{param: tuple(values)})
+        return self
+
+    def date_range(self, column, from_date=None, to_date=None, is_datetime=False, param=None):
+        """
+        Inclusive date range on `column`. For Datetime columns the upper bound is the
+        start of the next day, which keeps the predicate sargable.
+        """
+        param = param or column.split(".")[-1].strip("`")
+        if from_date:
+            self.add(f"{column} >= %({param}_from)s", **{f"{param}_from": getdate(from_date)})
+        if to_date:
+            if is_datetime:
+                self.add(f"{column} < %({param}_to)s", **{f"{param}_to": add_days(getdate(to_date), 1)})
+            else:
+                self.add(f"{column} <= %({param}_to)s", **{f"{param}_to": getdate(to_date)})
+        return self
+
+    def filter_date_range(self, column, from_key="from_date", to_key="to_date", is_datetime=False):
+        return self.date_range(
+            column, self.filters.get(from_key), self.filters.get(to_key), is_datetime=is_datetime
+        )
+
+    def month(self, column, year, month, is_datetime=False):
+        """Replacement for `MONTH(col) = %s AND YEAR(col) = %s`."""
+        first_day, last_day = month_date_range(year, month)
+        return self.date_range(column, first_day, last_day, is_datetime=is_datetime)
+
+    def owner_scope(self, column, filter_key="owner", param="owner"):
+        """
+        Users restricted by a row-level User Permission only see their own records;
+        everyone else may narrow by the owner filter ("all" means no restriction).
+        """
+        owner_val = self.filters.get(filter_key)
+        if has_user_permission():
+            owner = owner_val if (owner_val and owner_val != "all") else frappe.session.user
+            self.add(f"{column} = %({param})s", **{param: owner})
+        elif owner_val and owner_val != "all":
+            self.add(f"{column} = %({param})s", **{param: owner_val})
+        return self
+
+    def where(self):
+        return ("WHERE " + " AND ".join(self.conditions)) if self.conditions else ""
+
+    def and_where(self):
+        return ("AND " + " AND ".join(self.conditions)) if self.conditions else ""
+
+    def limit(self):
+        """
+        Optional pagination driven by `page_length` / `page` filters (page starts at 1),
+        for API callers of large reports; the desk report view sends neither and gets
+        every row. Returns an empty string when the caller did not ask for a page.
+        Reports that show totals must compute them with a separate aggregate query.
+        """
+        page_length = cint(self.filters.get("page_length"))
+        if not page_length:
+            return ""
+        self.values["page_length"] = page_length
+        self.values["page_start"] = (max(cint(self.filters.get("page")), 1) - 1) * page_length
+        return "LIMIT %(page_length)s OFFSET %(page_start)s"
+
+
+def has_user_permission(user=None):
+    """Row-level User Permission flag, read from the cached permission matrix."""
+    return get_user_permission_matrix(user)["has_user_permission"]
+
+
+def get_report_versions(doctypes):
+    versions = {
+        frappe.safe_decode(key): value
+        for key, value in (frappe.cache().hgetall(REPORT_VERSION_KEY) or {}).items()
+    }
+    return [versions.get(doctype) for doctype in doctypes]
+
+
+def get_user_permission_version(user):
+    return frappe.cache().hget(USER_PERMISSION_VERSION_KEY, user)
+
+
+def cached_report(*doctypes, ttl=REPORT_CACHE_TTL):
+    """
+    Cache a report's `execute(filters)` result per user and normalized filters.
+    `doctypes` are the doctypes the report reads; a change to any of them misses the cache.
+    """
+    unknown = set(doctypes) - REPORT_DOCTYPES
+    if unknown:
+        raise ValueError(f"Add {', '.join(sorted(unknown))} to REPORT_DOCTYPES for cache invalidation")
+
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(filters=None):
+            filters = normalize_filters(filters)
+            signature = json.dumps(
+                [
+                    fn.__module__, frappe.session.user, filters, get_report_versions(doctypes),
+                    get_user_permission_version(frappe.session.user),
+                ],
+                sort_keys=True,
+                default=str,
+            )
+            cache_key = f"company:report:{hashlib.sha1(signature.encode()).hexdigest()}"
+
+            result = frappe.cache().get_value(cache_key)
+            if result is None:
+                result = fn(filters)
+                frappe.cache().set_value(cache_key, result, expires_in_sec=ttl)
+            return result
+
+        wrapper.report_doctypes = doctypes
+        return wrapper
+
+    return decorator
+
+
+def bump_report_version(doc, method=None):
+    """doc_events("*") handler: invalidate cached reports that read `doc.doctype`."""
+    bump_report_versions([doc.doctype])
+
+
+def bump_report_versions(doctypes):
+    """
+    New versions for the given doctypes, now and again after commit: a report read
+    between the two may have cached pre-commit rows under the first version.
+    """
+    doctypes = [d for d in set(doctypes) if d in REPORT_DOCTYPES]
+    if not doctypes:
+        return
+
+    def bump():
+        cache = frappe.cache()
+        for doctype in doctypes:
+            cache.hset(REPORT_VERSION_KEY, doctype, frappe.generate_hash(length=10))
+
+    bump()
+    frappe.db.after_commit.add(bump)
+
+
+def bump_user_permission_version(doc, method=None):
+    """User Permission on_update/on_trash: the user's cached report rows may now differ."""
+    def bump():
+        frappe.cache().hset(USER_PERMISSION_VERSION_KEY, doc.user, frappe.generate_hash(length=10))
+
+    bump()
+    frappe.db.after_commit.add(bump)
@@ -0,0 +1,203 @@
+import json
+
+import frappe
+from frappe.utils import flt, get_datetime, now_datetime, time_diff_in_seconds
+
+# Interval statuses that do not count as working time
+INACTIVE_STATUSES = ("Offline", "Break", "Away")
+
+# Running totals stored on Employee Session. Interval totals are derived from the
+# in-memory child rows whenever the session is saved (see EmployeeSession.calculate_hours);
+# break totals are adjusted by the Employee Break hooks below. Live readers only add the
+# still-open interval/break on top, so they never load the child table or the breaks.
+SESSION_TOTAL_FIELDS = [
+    "name", "employee", "login_time", "status",
+    "closed_active_seconds", "closed_status_seconds",
+    "open_interval_from", "open_interval_status",
+    "closed_break_seconds", "open_break_start",
+]
+
+
+def get_session_totals(session_name):
+    """Lightweight view of a session's running totals, enough for the live readers."""
+    if not session_name:
+        return None
+    return frappe.db.get_value("Employee Session", session_name, SESSION_TOTAL_FIELDS, as_dict=True)
+
+
+def compute_interval_totals(intervals):
+    """
+    Running totals for a list of interval rows: seconds of completed active intervals,
+    completed seconds per status, and the still-open last interval (if any).
+    """
+    closed_active_seconds = 0
+    closed_status_seconds = {}
+    for d in intervals:
+        if not d.get("to_time"):
+            continue
+        status = d.get("status") or ""
+        closed_status_seconds[status] = flt(closed_status_seconds.get(status)) + flt(d.get("duration_seconds"))
+        if status not in INACTIVE_STATUSES:
+            closed_active_seconds += flt(d.get("duration_seconds"))
+
+    last = intervals[-1] if intervals else None
+    open_interval = last if last and not last.get("to_time") else None
+    return frappe._dict({
+        "closed_active_seconds": closed_active_seconds,
+        "closed_status_seconds": json.dumps(closed_status_seconds),
+        "open_interval_from": open_interval.get("from_time") if open_interval else None,
+        "open_interval_status": open_interval.get("status") if open_interval else None,
+    })
+
+
+def _open_interval_seconds(session, now=None):
+    if not session.get("open_interval_from"):
+        return 0
+    return max(0, time_diff_in_seconds(now or now_datetime(), session.get("open_interval_from")))
+
+
+def get_live_active_seconds(session):
+    """Completed active seconds plus the open interval when it is an active status."""
+    if not session:
+        return 0
+
+    total_seconds = flt(session.get("closed_active_seconds"))
+    if session.get("open_interval_status") not in INACTIVE_STATUSES:
+        total_seconds += _open_interval_seconds(session)
+    return total_seconds
+
+
+def get_live_status_seconds(session, status):
+    """Completed seconds spent in `status` plus the open interval when it matches."""
+    if not session:
+        return 0
+
+    total_seconds = flt(frappe.parse_json(session.get("closed_status_seconds") or "{}").get(status))
+    if session.get("open_interval_status") == status:
+        total_seconds += _open_interval_seconds(session)
+    return total_seconds
+
+
+def get_live_break_seconds(session):
+    """Completed break seconds plus the running break, if one is open."""
+    if not session:
+        return 0
+
+    total_seconds = flt(session.get("closed_break_seconds"))
+    if session.get("open_break_start"):
+        total_seconds += max(0, time_diff_in_seconds(now_datetime(), session.get("open_break_start")))
+    return total_seconds
+
+
+def get_break_seconds(brk):
+    """Seconds a break contributes to the closed total; open breaks contribute nothing yet."""
+    if not brk or not brk.get("break_end"):
+        return 0
+    if brk.get("break_duration"):
+        return flt(brk.get("break_duration")) * 60.0
+    return max(0, time_diff_in_seconds(brk.get("break_end"), brk.get("break_start")))
+
+
+def lock_session_break_totals(session_name):
+    """Row-lock the session and return its stored break totals."""
+    row = frappe.db.sql("""
+        SELECT closed_break_seconds, open_break_start
+        FROM `tabEmployee Session`
+        WHERE name = %s
+        FOR UPDATE
+    """, (session_name,), as_dict=True)
+    return row[0] if row else None
+
+
+def apply_break_change(session_name, delta_seconds=0, open_break_start=None, closed_break_start=None):
+    """
+    Add `delta_seconds` to the session's closed break total. `open_break_start` marks a
+    newly opened break; `closed_break_start` clears the open marker if it belongs to
+    the break that was just closed or removed.
+    """
+    if not session_name:
+        return
+
+    totals = lock_session_break_totals(session_name)
+    if not totals:
+        return
+
+    closed_break_seconds = max(0, flt(totals.closed_break_seconds) + flt(delta_seconds))
+    current_open = totals.open_break_start
+    if open_break_start:
+        current_open = open_break_start
+    elif closed_break_start and current_open and get_datetime(current_open) == get_datetime(closed_break_start):
+        current_open = None
+
+    frappe.db.set_value("Employee Session", session_name, {
+        "closed_break_seconds": closed_break_seconds,
+        "open_break_start": current_open,
+        "total_break_hours": closed_break_seconds / 3600.0,
+    }, update_modified=False)
+
+
+def update_break_totals(doc, method=None):
+    """doc_events handler for Employee Break on_update and on_trash."""
+    if method == "on_trash":
+        apply_break_change(doc.session, -get_break_seconds(doc), closed_break_start=doc.break_start)
+        return
+
+    before = doc.get_doc_before_save()
+    if before and before.session != doc.session:
+        apply_break_change(before.session, -get_break_seconds(before), closed_break_start=before.break_start)
+        before = None
+
+    apply_break_change(
+        doc.session,
+        get_break_seconds(doc) - get_break_seconds(before),
+        open_break_start=doc.break_start if not doc.break_end else None,
+        closed_break_start=before.break_start if before and doc.break_end else None,
+    )
+
+
+def recompute_session_totals(sessions=None):
+    """
+    Rebuild the stored totals from the interval rows and Employee Break records, for
+    sessions edited by hand (`update_detailed_session`) or created before the totals
+    existed. `sessions` is a name or list of names; None recomputes every session.
+    """
+    if isinstance(sessions, str):
+        sessions = [sessions]
+
+    conditions = ""
+    break_conditions = ""
+    values = {}
+    if sessions is not None:
+        if not sessions:
+            return
+        conditions = "AND parent IN %(sessions)s"
+        break_conditions = "AND session IN %(sessions)s"
+        values["sessions"] = tuple(sessions)
+
+    intervals_by_session = {}
+    for row in frappe.db.sql(f"""
+        SELECT parent, from_time, to_time, status, duration_seconds
+        FROM `tabEmployee Session Interval`
+        WHERE parenttype = 'Employee Session' {conditions}
+        ORDER BY parent, idx
+    """, values, as_dict=True):
+        intervals_by_session.setdefault(row.parent, []).append(row)
+
+    breaks_by_session = {}
+    for row in frappe.db.sql(f"""
+        SELECT session, break_start, break_end, break_duration
+        FROM `tabEmployee Break`
+        WHERE session IS NOT NULL {break_conditions}
+        ORDER BY session, break_start
+    """, values, as_dict=True):
+        breaks_by_session.setdefault(row.session, []).append(row)
+
+    names = sessions if sessions is not None else frappe.get_all("Employee Session", pluck="name")
+    for name in names:
+        totals = compute_interval_totals(intervals_by_session.get(name, []))
+        breaks = breaks_by_session.get(name, [])
+        open_breaks = [b.break_start for b in breaks if not b.break_end]
+        totals.closed_break_seconds = sum(get_break_seconds(b) for b in breaks)
+        totals.open_break_start = open_breaks[-1] if open_breaks else None
+        totals.total_break_hours = totals.closed_break_seconds / 3600.0
+        frappe.db.set_value("Employee Session", name, totals, update_modified=False)
@@ -0,0 +1,169 @@
+import threading
+import time
+from collections import OrderedDict
+
+import frappe
+from frappe.utils import cint, cstr, flt
+
+# Settings singletons read on hot paths (presence pings, scheduler ticks, per-email and
+# per-message sends). `get_settings` returns a plain dict of the fields listed below,
+# converted to their types, from a small per-process LRU; behind it sits one Redis hash
+# shared by every worker, and only a miss there reads tabSingles.
+#
+# Saving a settings doc clears its Redis entry (again after commit, so a concurrent
+# reader cannot re-cache the old values) and this process's copy. Other processes keep
+# theirs for at most LOCAL_TTL seconds before going back to Redis. Writes that bypass
+# the document (frappe.db.set_single_value, raw SQL) run no hooks and must call
+# clear_settings_cache() themselves.
+#
+# Password fields are never cached; read those with get_decrypted_password.
+SETTINGS_CACHE_KEY = "company:settings"
+LOCAL_TTL = 10
+LOCAL_MAX_ENTRIES = 64
+
+
+def check(value):
+    return bool(cint(value))
+
+
+# doctype -> {fieldname: (type, default)}; the default applies when the field was never saved
+SETTINGS_FIELDS = {
+    "Employee Presence Settings": {
+        "enable_auto_status": (check, True),
+        "idle_threshold": (cint, 60),
+        "away_threshold": (cint, 300),
+        "break_threshold": (cint, 900),
+        "offline_threshold": (cint, 3600),
+        "enable_auto_resume_break": (check, True),
+        "enable_location_tracking": (check, False),
+        "track_on_login": (check, False),
+        "track_on_logout": (check, False),
+        "track_on_status_change": (check, False),
+        "tracking_interval_minutes": (cint, 10),
+        "minimum_gps_accuracy": (cint, 100),
+        "location_retention_days": (cint, 7),
+        "location_track_tolerance": (cint, 10),
+    },
+    "HRMS Settings": {
+        "weekly_chart_source": (cstr, "Attendance"),
+        "present_threshold": (flt, 5.0),
+        "half_day_threshold": (flt, 3.0),
+        "salary_calculation_source": (cstr, "Attendance"),
+        "salary_holiday_handling": (cstr, "Include in Working Days"),
+        "salary_slip_present_threshold": (flt, 5.0),
+        "salary_slip_half_day_threshold": (flt, 3.0),
+        "salary_slip_absent_threshold": (flt, 3.0),
+        "leave_notification": (check, True),
+        "wfh_notification": (check, True),
+        "request_notification": (check, True),
+        "reimbursement_notification": (check, True),
+        "task_notification": (check, True),
+        "job_notification": (check, True),
+        "default_currency": (cstr, "INR"),
+        "default_locale": (cstr, "en-IN"),
+    },
+    "Employee Remainder Settings": {
+        "enable_hr_reminders": (check, False),
+        "enable_break_reminders": (check, False),
+        "enable_max_break_reminders": (check, False),
+        "max_break_duration_threshold": (flt, 0.0),
+        "max_break_reminder_message": (cstr, ""),
+        "break_reminder_frequency": (cint, 0),
+        "enable_lunch_reminders": (check, False),
+        "enable_lunch_start_reminder": (check, False),
+        "lunch_reminder_message": (cstr, ""),
+        "lunch_start_time": (cstr, ""),
+        "enable_lunch_end_reminder": (check, False),
+        "lunch_end_time": (cstr, ""),
+        "lunch_end_reminder_message": (cstr, ""),
+        "enable_max_lunch_reminders": (check, False),
+        "max_lunch_duration_threshold": (flt, 0.0),
+        "max_lunch_reminder_message": (cstr, ""),
+        "lunch_reminder_frequency": (cint, 0),
+    },
+    "CRM Email Settings": {
+        "default_email_account": (cstr, ""),
+        "max_emails_per_batch": (cint, 100),
+        "batch_delay": (cint, 5),
+        "maximum_retry_count": (cint, 3),
+        "auto_retry_failed_emails": (check, True),
+        "enable_email_automation": (check, True),
+    },
+    "CRM WhatsApp Settings": {
+        "enable_whatsapp": (check, True),
+        "phone_number_id": (cstr, ""),
+        "business_account_id": (cstr, ""),
+        "whatsapp_number": (cstr, ""),
+        "max_success_send_message_limit": (cint, 0),
+        "messages_per_second": (cint, 80),
+        "max_concurrent_sends": (cint, 8),
+    },
+}
+
+_local = OrderedDict()
+_local_lock = threading.Lock()
+
+
+# --------------------------------------------------------------------
+# READ
+# --------------------------------------------------------------------
+
+def get_settings(doctype):
+    """The SETTINGS_FIELDS of a settings singleton as a typed frappe._dict (a copy; safe to modify)."""
+    fields = SETTINGS_FIELDS.get(doctype)
+    if fields is None:
+        frappe.throw(f"{doctype} is not a cached settings doctype")
+
+    key = (frappe.local.site, doctype)
+    now = time.monotonic()
+    with _local_lock:
+        entry = _local.get(key)
+        if entry and entry[0] > now:
+            _local.move_to_end(key)
+            return frappe._dict(entry[1])
+
+    values = frappe.cache().hget(SETTINGS_CACHE_KEY, doctype)
+    if values is None:
+        values = load_settings(doctype, fields)
+        frappe.cache().hset(SETTINGS_CACHE_KEY, doctype, values)
+
+    with _local_lock:
+        _local[key] = (now + LOCAL_TTL, values)
+        _local.move_to_end(key)
+        while len(_local) > LOCAL_MAX_ENTRIES:
+            _local.popitem(last=False)
+    return frappe._dict(values)
+
+
+def get_setting(doctype, fieldname):
+    return get_settings(doctype).get(fieldname)
+
+
+def load_settings(doctype, fields):
+    stored = frappe.db.get_singles_dict(doctype)
+    values = {}
+    for fieldname, (convert, default) in fields.items():
+        value = stored.get(fieldname)
+        values[fieldname] = default if value is None else convert(value)
+    return values
+
+
+# --------------------------------------------------------------------
+# INVALIDATION
+# --------------------------------------------------------------------
+
+def clear_settings_cache(doc=None, method=None):
+    """doc_events on_update handler for the doctypes in SETTINGS_FIELDS."""
+    doctype = doc.doctype if doc else None
+
+    def clear():
+        if doctype:
+            frappe.cache().hdel(SETTINGS_CACHE_KEY, doctype)
+        else:
+            frappe.cache().delete_value(SETTINGS_CACHE_KEY)
+        with _local_lock:
+            for key in [k for k in _local if doctype in (None, k[1])]:
+                _local.pop(key, None)
+
+    clear()
+    frappe.db.after_commit.add(clear)
@@ -0,0 +1,289 @@
+import mimetypes
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import frappe
+import requests
+from frappe.utils import cint, get_first_day, today
+from frappe.utils.password import get_decrypted_password
+from requests.adapters import HTTPAdapter
+
+from company.company.settings_cache import get_settings
+
+GRAPH_API_URL = "https://graph.facebook.com/v23.0"
+
+# Meta's default throughput for a business phone number
+DEFAULT_MESSAGES_PER_SECOND = 80
+DEFAULT_MAX_CONCURRENT_SENDS = 8
+
+# Uploaded media stays available on Meta for 30 days; re-upload a little before that
+MEDIA_ID_TTL = 25 * 24 * 60 * 60
+MONTH_COUNTER_TTL = 40 * 24 * 60 * 60
+
+IMAGE_EXTENSIONS = ("jpg", "jpeg", "png", "gif", "webp")
+
+_http_session = None
+_http_session_lock = threading.Lock()
+_rate_limiters = {}
+
+
+class WhatsAppSendError(Exception):
+    pass
+
+
+def get_graph_url(path):
+    """Graph API URL; `whatsapp_graph_api_url` in site config points it at a mock server."""
+    base_url = frappe.conf.get("whatsapp_graph_api_url") or GRAPH_API_URL
+    return f"{base_url.rstrip('/')}/{path}"
+
+
+def get_http_session():
+    """Process-wide keep-alive session so sends reuse TLS connections to the Graph API."""
+    global _http_session
+    with _http_session_lock:
+        if _http_session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=32)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _http_session = session
+    return _http_session
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: refills `rate` tokens per second and holds at most
+    `capacity`. `acquire` blocks until a token is available.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity or rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                wait = (tokens - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def get_rate_limiter(phone_number_id, rate):
+    """One bucket per sending phone number, shared by every sender in this process."""
+    limiter = _rate_limiters.get(phone_number_id)
+    if limiter is None or limiter.rate != float(rate):
+        limiter = _rate_limiters[phone_number_id] = TokenBucket(rate)
+    return limiter
+
+
+# --------------------------------------------------------------------
+# MONTHLY SEND COUNTER
+# --------------------------------------------------------------------
+
+def _month_counter_key():
+    return frappe.cache().make_key(f"company:whatsapp_sent:{today()[:7]}")
+
+
+def count_sent_this_month():
+    return frappe.db.count(
+        "CRM WhatsApp Message",
+        filters={
+            "creation": [">=", get_first_day(today())],
+            "message_direction": "Outgoing",
+            "status": "Sent"
+        }
+    )
+
+
+def get_monthly_sent_count():
+    """Messages sent this month, from a Redis counter seeded once from the database."""
+    cache = frappe.cache()
+    key = _month_counter_key()
+    value = cache.get(key)
+    if value is None:
+        cache.set(key, count_sent_this_month(), ex=MONTH_COUNTER_TTL, nx=True)
+        value = cache.get(key)
+    return cint(value)
+
+
+def reserve_monthly_quota(limit=0, count=1):
+    """
+    Atomically count `count` sends against this month. Returns False, without
+    counting them, when that would exceed `limit` (0 means unlimited).
+    """
+    get_monthly_sent_count()
+    cache = frappe.cache()
+    key = _month_counter_key()
+    if cache.incrby(key, count) > cint(limit) > 0:
+        cache.decrby(key, count)
+        return False
+    return True
+
+
+def release_monthly_quota(count=1):
+    """Give back reserved sends that were not delivered to Meta."""
+    if count > 0:
+        frappe.cache().decrby(_month_counter_key(), count)
+
+
+# --------------------------------------------------------------------
+# SENDER
+# --------------------------------------------------------------------
+
+def clean_phone_number(phone):
+    return "".join(filter(str.isdigit, str(phone or "")))
+
+
+class WhatsAppSender:
+    """
+    Sends WhatsApp messages through the Cloud API.
+
+    `prepare` runs on the calling thread and does everything that needs the database:
+    resolving attachments and uploading each file once, so every recipient is sent the
+    same media ID. `post` only does HTTP and is safe to run from worker threads;
+    `send_many` fans prepared messages out over a bounded pool while a token bucket
+    keeps the whole process under the phone number's throughput.
+    """
+
+    def __init__(self, settings=None):
+        self.settings = settings or get_settings("CRM WhatsApp Settings")
+        self.phone_number_id = self.settings.phone_number_id
+        # Secrets stay out of the settings cache
+        access_token = get_decrypted_password(
+            "CRM WhatsApp Settings", "CRM WhatsApp Settings", "access_token", raise_exception=False
+        )
+        self.headers = {
+            "Authorization": f"Bearer {access_token}"
+        }
+        self.messages_url = get_graph_url(f"{self.phone_number_id}/messages")
+        self.session = get_http_session()
+        self.limiter = get_rate_limiter(
+            self.phone_number_id,
+            cint(self.settings.get("messages_per_second")) or DEFAULT_MESSAGES_PER_SECOND
+        )
+        self.max_workers = cint(self.settings.get("max_concurrent_sends")) or DEFAULT_MAX_CONCURRENT_SENDS
+        self.media = {}
+
+    @property
+    def monthly_limit(self):
+        return cint(self.settings.max_success_send_message_limit)
+
+    def upload_media(self, file_doc):
+        """Upload a File to Meta and return its media ID, cached per file content."""
+        cache_key = f"company:whatsapp_media:{self.phone_number_id}:{file_doc.content_hash or file_doc.name}"
+        media_id = frappe.cache().get_value(cache_key)
+        if media_id:
+            return media_id
+
+        mime_type = mimetypes.guess_type(file_doc.file_name)[0] or "application/octet-stream"
+        response = self.session.post(
+            get_graph_url(f"{self.phone_number_id}/media"),
+            headers=self.headers,
+            data={"messaging_product": "whatsapp", "type": mime_type},
+            files={"file": (file_doc.file_name, file_doc.get_content(), mime_type)},
+            timeout=60
+        )
+        result = response.json()
+        if response.status_code != 200 or not result.get("id"):
+            raise WhatsAppSendError(result)
+
+        media_id = result["id"]
+        frappe.cache().set_value(cache_key, media_id, expires_in_sec=MEDIA_ID_TTL)
+        return media_id
+
+    def resolve_media(self, attachment):
+        if attachment not in self.media:
+            file_doc = frappe.get_doc("File", {"file_url": attachment})
+            extension = file_doc.file_name.split(".")[-1].lower()
+            self.media[attachment] = frappe._dict({
+                "id": self.upload_media(file_doc),
+                "file_name": file_doc.file_name,
+                "kind": "image" if extension in IMAGE_EXTENSIONS else "document",
+            })
+        return self.media[attachment]
+
+    def prepare(self, phone, message=None, attachment=None):
+        """Build the Graph API payloads for one logical message."""
+        phone = clean_phone_number(phone)
+        if not phone:
+            raise WhatsAppSendError("Invalid phone number")
+
+        def text_payload(body):
+            return {"messaging_product": "whatsapp", "to": phone, "type": "text", "text": {"body": body}}
+
+        payloads = []
+        message_type = "Text"
+        if attachment:
+            media = self.resolve_media(attachment)
+            if media.kind == "image":
+                message_type = "Image"
+                payloads.append({
+                    "messaging_product": "whatsapp",
+                    "to": phone,
+                    "type": "image",
+                    "image": {"id": media.id, "caption": message or ""}
+                })
+            else:
+                # Documents carry no caption, so the text goes out first
+                message_type = "Document"
+                if message:
+                    payloads.append(text_payload(message))
+                payloads.append({
+                    "messaging_product": "whatsapp",
+                    "to": phone,
+                    "type": "document",
+                    "document": {"id": media.id, "filename": media.file_name}
+                })
+        else:
+            payloads.append(text_payload(message or ""))
+
+        return frappe._dict({
+            "phone": phone,
+            "message": message,
+            "attachment": attachment,
+            "message_type": message_type,
+            "payloads": payloads,
+        })
+
+    def post(self, prepared):
+        """Send the payloads of a prepared message in order. Returns (success, response)."""
+        result = {}
+        for payload in prepared.payloads:
+            self.limiter.acquire()
+            response = self.session.post(self.messages_url, headers=self.headers, json=payload, timeout=30)
+            result = response.json()
+            if response.status_code != 200:
+                return False, result
+        return True, result
+
+    def _post_sequence(self, messages):
+        outcomes = []
+        for prepared in messages:
+            try:
+                success, result = self.post(prepared)
+            except Exception as e:
+                success, result = False, str(e)
+            outcomes.append((prepared, success, result))
+            if not success:
+                break
+        return outcomes
+
+    def send_many(self, jobs):
+        """
+        `jobs` maps a key to the list of prepared messages for one recipient; each list
+        is sent in order and stops at the first failure. Yields (key, outcomes) on the
+        calling thread as recipients finish, with outcomes as (prepared, success, response).
+        """
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = {pool.submit(self._post_sequence, messages): key for key, messages in jobs.items()}
+            for future in as_completed(futures):
+                yield futures[future], future.result()
@@ -54,7 +54,6 @@ doc_events = {
         "before_insert": "company.company.api.before_insert_invoice"
     },
     "Invoice Collection": {
-        "after_insert": "company.company.api.update_invoice_received_balance",
         "validate": "company.company.api.validate_invoice_collection",
         "on_update": "company.company.api.update_invoice_received_balance",
         "on_trash": "company.company.api.update_invoice_received_balance"
@@ -116,16 +115,11 @@ doc_events = {
         "on_update": "company.company.evaluation_automation.handle_daily_log_automation"
     },
     "Employee Break": {
-        "after_insert": "company.company.presence_api.update_session_break_hours",
-        "on_update": "company.company.presence_api.update_session_break_hours",
-        "on_trash": "company.company.presence_api.update_session_break_hours"
+        "on_update": "company.company.session_totals.update_break_totals",
+        "on_trash": "company.company.session_totals.update_break_totals"
     },
     "Event": {
-        "on_update": [
-            "company.company.crm_api.sync_event_to_call",
-            "company.company.crm_api.sync_event_to_meeting",
-            "company.company.crm_api.sync_event_to_todo"
-        ],
+        "on_update": "company.company.event_sync.sync_event_to_reference",
         "validate": "company.company.crm_api.validate_event",
         "on_trash": "company.company.crm_api.delete_linked_record_on_event_trash"
     },
@@ -135,12 +129,101 @@ doc_events = {
         "on_trash": "company.company.crm_api.delete_event_for_todo"
     },
     "Lead": {
+        "validate": "company.company.phone_index.set_phone_keys",
         "on_update": "company.company.doctype.crm_whatsapp_automation.crm_whatsapp_automation.evaluate_automations",
         "on_update": "company.company.doctype.crm_email_automation.crm_email_automation.evaluate_automations"
     },
     "Deal": {
         "on_update": "company.company.doctype.crm_whatsapp_automation.crm_whatsapp_automation.evaluate_automations",
         "on_update": "company.company.doctype.crm_email_automation.crm_email_automation.evaluate_automations"
+    },
+    "Contacts": {
+        "validate": "company.company.phone_index.set_phone_keys"
+    },
+    "CRM WhatsApp Conversation": {
+        "validate": "company.company.phone_index.set_phone_keys"
+    },
+    "User": {
+        "on_update": [
+            "company.company.permission_matrix.on_user_change",
+            "company.company.notification_fanout.clear_role_users_cache"
+        ],
+        "on_trash": [
+            "company.company.permission_matrix.on_user_change",
+            "company.company.notification_fanout.clear_role_users_cache"
+        ]
+    },
+    "Role": {
+        "on_update": "company.company.notification_fanout.clear_role_users_cache",
+        "on_trash": "company.company.notification_fanout.clear_role_users_cache"
+    },
+    "Company Email Settings": {
+        "on_update": "company.company.notification_fanout.clear_hr_settings_cache",
+        "on_trash": "company.company.notification_fanout.clear_hr_settings_cache"
+    },
+    # Settings read through company.company.settings_cache.get_settings
+    "Employee Presence Settings": {
+        "on_update": "company.company.settings_cache.clear_settings_cache"
+    },
+    "HRMS Settings": {
+        "on_update": "company.company.settings_cache.clear_settings_cache"
+    },
+    "Employee Remainder Settings": {
+        "on_update": "company.company.settings_cache.clear_settings_cache"
+    },
+    "CRM Email Settings": {
+        "on_update": "company.company.settings_cache.clear_settings_cache"
+    },
+    "CRM WhatsApp Settings": {
+        "on_update": "company.company.settings_cache.clear_settings_cache"
+    },
+    "User Permission": {
+        "on_update": [
+            "company.company.permission_matrix.on_user_permission_change",
+            "company.company.report_query.bump_user_permission_version"
+        ],
+        "on_trash": [
+            "company.company.permission_matrix.on_user_permission_change",
+            "company.company.report_query.bump_user_permission_version"
+        ]
+    },
+    "Custom DocPerm": {
+        "on_update": "company.company.permission_matrix.on_docperm_change",
+        "on_trash": "company.company.permission_matrix.on_docperm_change"
+    },
+    "DocPerm": {
+        "on_update": "company.company.permission_matrix.on_docperm_change",
+        "on_trash": "company.company.permission_matrix.on_docperm_change"
+    },
+    "Role Profile": {
+        "on_update": "company.company.permission_matrix.on_docperm_change",
+        "on_trash": "company.company.permission_matrix.on_docperm_change"
+    },
+    "Data Import": {
+        "on_trash": "company.company.import_staging.clear_import_staging"
+    },
+    "*": {
+        # Invalidate cached script report results and the HR dashboard snapshot
+        "on_update": [
+            "company.company.report_query.bump_report_version",
+            "company.company.hr_snapshot.invalidate_hr_snapshot"
+        ],
+        "on_submit": [
+            "company.company.report_query.bump_report_version",
+            "company.company.hr_snapshot.invalidate_hr_snapshot"
+        ],
+        "on_cancel": [
+            "company.company.report_query.bump_report_version",
+            "company.company.hr_snapshot.invalidate_hr_snapshot"
+        ],
+        "on_update_after_submit": [
+            "company.company.report_query.bump_report_version",
+            "company.company.hr_snapshot.invalidate_hr_snapshot"
+        ],
+        "on_trash": [
+            "company.company.report_query.bump_report_version",
+            "company.company.hr_snapshot.invalidate_hr_snapshot"
+        ]
     }
 }
 
@@ -151,11 +234,18 @@ scheduler_events = {
         "company.company.employee_remainder_api.process_remainder_queue",
         "company.company.presence_api.process_auto_breaks",
         "company.company.reminders.run_email_reminders",
+        "company.company.chat_broadcast.enqueue_if_pending",
         "company.company.doctype.crm_email_automation.crm_email_automation.process_email_automations"
     ],
+    "cron": {
+        "* * * * *": [
+            "company.company.hr_snapshot.refresh_hr_snapshot"
+        ]
+    },
     "daily": [
         "company.company.api.update_expired_renewals",
         "company.company.presence_api.daily_reset",
+        "company.company.location_tracking.compact_location_logs",
         "company.company.doctype.employee_monthly_award.employee_monthly_award.calculate_monthly_awards",
     ]
 }
@@ -279,7 +369,18 @@ role_home_page = {
 # ------------
 
 # before_install = "company.install.before_install"
-# after_install = "company.install.after_install"
+# Composite indexes for hot filters (see company/company/db_indexes.py)
+after_install = ["company.company.db_indexes.add_hot_query_indexes"]
+
+# Compile utils/location_data.json into the indexed geo lookup store
+after_migrate = [
+    "company.company.geo_lookup.build_geo_store",
+    "company.company.db_indexes.add_hot_query_indexes",
+    # Fixtures and patches can change settings without running their save hooks
+    "company.company.settings_cache.clear_settings_cache",
+    # Standard DocPerms are synced from the doctype JSON without hooks
+    "company.company.permission_matrix.clear_doc_permission_cache",
+]
 
 # Uninstallation
 # ------------
@@ -375,6 +476,10 @@ permission_query_conditions = {
 # override_whitelisted_methods = {
 # 	"frappe.desk.doctype.event.event.get_events": "company.event.get_events"
 # }
+override_whitelisted_methods = {
+    # Write staged import edits to the file before the import job reads it
+    "frappe.core.doctype.data_import.data_import.form_start_import": "company.company.import_staging.form_start_import"
+}
 #
 # each overriding function accepts a `data` argument;
 # generated from the base implementation of the doctype dashboard,
@@ -394,8 +499,9 @@ permission_query_conditions = {
 
 # Request Events
 # ----------------
-# before_request = ["company.utils.before_request"]
-# after_request = ["company.utils.after_request"]
+# Per-endpoint query/latency metrics; inert unless `enable_api_metrics` is set in site config
+before_request = ["company.company.api_metrics.before_request"]
+after_request = ["company.company.api_metrics.after_request"]
 
 # Job Events
 # ----------
@@ -0,0 +1,6 @@
+from company.company.hr_snapshot import backfill_month_day_keys
+
+
+def execute():
+    # Today's birthdays / anniversaries are now looked up by indexed MMDD keys
+    backfill_month_day_keys()
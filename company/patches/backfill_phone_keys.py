@@ -0,0 +1,6 @@
+from company.company.phone_index import backfill_phone_keys
+
+
+def execute():
+    # Inbound WhatsApp and Meta lead matching now look numbers up by phone_key
+    backfill_phone_keys()
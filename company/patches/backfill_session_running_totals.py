@@ -0,0 +1,6 @@
+from company.company.session_totals import recompute_session_totals
+
+
+def execute():
+    # Live presence counters read the stored totals, so fill them for existing sessions
+    recompute_session_totals()
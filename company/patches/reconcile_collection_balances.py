@@ -0,0 +1,6 @@
+from company.company.collection_balance import reconcile_collection_balances
+
+
+def execute():
+    # Balances are maintained by deltas from here on, so start them from the true totals
+    reconcile_collection_balances()
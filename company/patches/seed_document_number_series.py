@@ -0,0 +1,6 @@
+from company.company.document_numbering import backfill_document_series
+
+
+def execute():
+    # Seed the Estimation / Invoice / Expenses counters from existing ref_no values
+    backfill_document_series()